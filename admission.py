@@ -0,0 +1,211 @@
+"""
+API 准入控制
+所有端點共用固定數量的執行位，滿載時請求依優先級排隊（互動查詢優先於批量場景分析），每個端點的佇列有上限；
+依引擎層的即時延遲估計預估排隊時間，超過端點的截止秒數時立即拒絕並附上 Retry-After
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+from metrics import ADMISSION_REJECTED, ADMISSION_WAIT
+from tracing import tracer
+
+# 優先級（數字越小越先取得執行位）
+INTERACTIVE = 0
+BULK = 1
+
+# 尚無延遲樣本時，以端點實際處理時間的指數移動平均估計
+EWMA_ALPHA = 0.2
+
+
+@dataclass
+class EndpointPolicy:
+    """端點的優先級、佇列上限與可接受的預估等待秒數"""
+    priority: int = INTERACTIVE
+    max_queue: int = 32
+    deadline: float = 10.0
+
+
+class AdmissionRejected(RuntimeError):
+    """佇列已滿或預估等待超過截止時間，請求被拒絕"""
+
+    def __init__(self, endpoint: str, reason: str, retry_after: float):
+        super().__init__(
+            f"端點 {endpoint} 負載過高（{reason}），請於 {retry_after:.1f} 秒後重試"
+        )
+        self.endpoint = endpoint
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class AdmissionController:
+    """單一事件迴圈內的優先級准入控制（每個 worker 進程一個）"""
+
+    def __init__(
+        self,
+        concurrency: int = 8,
+        policies: Optional[Dict[str, EndpointPolicy]] = None,
+        estimator: Optional[Callable[[], Optional[float]]] = None,
+    ):
+        self.concurrency = concurrency
+        self.policies = dict(policies or {})
+        # 回傳每個請求的預估處理秒數（引擎層延遲百分位數），None 表示樣本不足
+        self.estimator = estimator
+        self._active = 0
+        self._waiters: List[list] = []
+        self._seq = itertools.count()
+        self._queued: Dict[str, int] = {}
+        self._service: Dict[str, float] = {}
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    @classmethod
+    def from_settings(
+        cls,
+        settings,
+        estimator: Optional[Callable[[], Optional[float]]] = None,
+        endpoints: Optional[Dict[str, int]] = None,
+    ) -> "AdmissionController":
+        """由 engine_settings.AdmissionSettings 建立；endpoints 為 端點 -> 優先級"""
+        policies = {}
+        for endpoint, priority in (endpoints or {}).items():
+            if priority == INTERACTIVE:
+                policies[endpoint] = EndpointPolicy(
+                    INTERACTIVE,
+                    settings.interactive_queue,
+                    settings.interactive_deadline,
+                )
+            else:
+                policies[endpoint] = EndpointPolicy(
+                    BULK, settings.bulk_queue, settings.bulk_deadline
+                )
+        return cls(settings.concurrency, policies, estimator)
+
+    def _count(self, endpoint: str, key: str):
+        counts = self.stats.setdefault(endpoint, {})
+        counts[key] = counts.get(key, 0) + 1
+
+    def service_time(self, endpoint: str) -> Optional[float]:
+        """每個請求的預估處理秒數：引擎層估計，否則為端點的移動平均"""
+        estimate = None
+        if self.estimator is not None:
+            try:
+                estimate = self.estimator()
+            except Exception as e:
+                print(f"延遲估計失敗: {e}")
+        return estimate if estimate is not None else self._service.get(endpoint)
+
+    def projected_wait(self, endpoint: str) -> Optional[float]:
+        """新請求的預估排隊秒數；只計算優先級不低於它的排隊請求"""
+        if self._active < self.concurrency:
+            return 0.0
+        priority = self.policies[endpoint].priority
+        ahead = sum(
+            1 for entry in self._waiters if entry[0] <= priority and not entry[3].done()
+        )
+        service = self.service_time(endpoint)
+        if service is None:
+            return None
+        return service * (ahead + 1) / self.concurrency
+
+    def _reject(self, endpoint: str, reason: str, retry_after: float):
+        self._count(endpoint, f"rejected_{reason}")
+        ADMISSION_REJECTED.inc(endpoint=endpoint, reason=reason)
+        raise AdmissionRejected(endpoint, reason, retry_after)
+
+    async def acquire(self, endpoint: str):
+        """取得執行位；被拒絕時拋出 AdmissionRejected"""
+        policy = self.policies.setdefault(endpoint, EndpointPolicy())
+        if self._active < self.concurrency and not self._waiters:
+            self._active += 1
+            self._count(endpoint, "admitted")
+            return
+
+        wait = self.projected_wait(endpoint)
+        if self._queued.get(endpoint, 0) >= policy.max_queue:
+            self._reject(
+                endpoint, "queue_full", wait if wait is not None else policy.deadline
+            )
+        if wait is not None and wait > policy.deadline:
+            self._reject(endpoint, "deadline", wait)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(
+            self._waiters, [policy.priority, next(self._seq), endpoint, future]
+        )
+        self._queued[endpoint] = self._queued.get(endpoint, 0) + 1
+        try:
+            # 預估偏低時，排隊超過截止時間同樣放棄，不佔用執行位
+            await asyncio.wait_for(future, policy.deadline)
+        except asyncio.TimeoutError:
+            # 逾時與轉交同時發生時，執行位已屬於此請求
+            if not future.done() or future.cancelled():
+                self._reject(
+                    endpoint, "timeout", self.service_time(endpoint) or policy.deadline
+                )
+        except asyncio.CancelledError:
+            # 用戶端斷線：若執行位已轉交則歸還
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            self._queued[endpoint] -= 1
+        self._count(endpoint, "admitted")
+
+    def release(self):
+        """歸還執行位，直接轉交給優先級最高的排隊請求"""
+        while self._waiters:
+            future = heapq.heappop(self._waiters)[3]
+            if not future.done():
+                future.set_result(True)
+                return
+        self._active -= 1
+
+    def _observe(self, endpoint: str, seconds: float):
+        previous = self._service.get(endpoint)
+        self._service[endpoint] = (
+            seconds
+            if previous is None
+            else previous + EWMA_ALPHA * (seconds - previous)
+        )
+
+    @asynccontextmanager
+    async def admit(self, endpoint: str):
+        """在區塊期間佔用一個執行位"""
+        started = time.perf_counter()
+        with tracer.span("queue.admission", endpoint=endpoint):
+            await self.acquire(endpoint)
+        ADMISSION_WAIT.observe(time.perf_counter() - started, endpoint=endpoint)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._observe(endpoint, time.perf_counter() - started)
+            self.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """執行位、各端點排隊數與預估等待"""
+        return {
+            "concurrency": self.concurrency,
+            "active": self._active,
+            "endpoints": {
+                endpoint: {
+                    "priority": policy.priority,
+                    "queued": self._queued.get(endpoint, 0),
+                    "max_queue": policy.max_queue,
+                    "deadline": policy.deadline,
+                    "projected_wait": self.projected_wait(endpoint),
+                    **self.stats.get(endpoint, {}),
+                }
+                for endpoint, policy in self.policies.items()
+            },
+        }
@@ -0,0 +1,637 @@
+"""
+Omniverse API 靜態檢查
+以預先建立的符號索引（omni.kit.commands 的命令名稱與參數、pxr 模組的類別與方法）
+在執行前檢查生成的腳本，單次走訪 AST 找出不存在的命令、參數與 USD 方法，
+不合格的腳本不必進入執行階段
+
+重新建立索引（需要 usd-core；在 Omniverse 中會一併讀取已註冊的 Kit 命令）：
+
+    python api_index.py
+"""
+
+import ast
+import importlib
+import inspect
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+INDEX_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "omniverse_api_index.json"
+)
+
+# 建立索引時讀取的 pxr 模組
+PXR_MODULES = [
+    "Usd",
+    "UsdGeom",
+    "UsdShade",
+    "UsdLux",
+    "UsdPhysics",
+    "UsdSkel",
+    "UsdVol",
+    "UsdRender",
+    "UsdUtils",
+    "Sdf",
+    "Gf",
+    "Vt",
+    "Tf",
+    "Kind",
+]
+
+# 常用 Kit 命令與其參數（Kit 無法離線取得時的依據；名稱加上 Command 後綴同樣有效）
+KIT_COMMANDS: Dict[str, List[str]] = {
+    "CreatePrim": [
+        "prim_path",
+        "prim_type",
+        "select_new_prim",
+        "attributes",
+        "create_default_xform",
+        "context_name",
+    ],
+    "CreatePrimWithDefaultXform": [
+        "prim_path",
+        "prim_type",
+        "select_new_prim",
+        "attributes",
+        "create_default_xform",
+        "context_name",
+    ],
+    "CreateMeshPrim": [
+        "prim_type",
+        "prim_path",
+        "select_new_prim",
+        "prepend_default_prim",
+        "above_ground",
+        "half_scale",
+        "u_patches",
+        "v_patches",
+        "w_patches",
+        "u_verts_scale",
+        "v_verts_scale",
+        "w_verts_scale",
+        "object_origin",
+    ],
+    "CreateMeshPrimWithDefaultXform": [
+        "prim_type",
+        "prim_path",
+        "select_new_prim",
+        "prepend_default_prim",
+        "above_ground",
+        "half_scale",
+        "u_patches",
+        "v_patches",
+        "w_patches",
+        "u_verts_scale",
+        "v_verts_scale",
+        "w_verts_scale",
+        "object_origin",
+    ],
+    "CreateDefaultXformOnPrim": ["prim_path"],
+    "DeletePrims": ["paths", "destructive", "stage"],
+    "MovePrim": [
+        "path_from",
+        "path_to",
+        "time_code",
+        "keep_world_transform",
+        "on_move_fn",
+        "destructive",
+        "stage_or_context",
+    ],
+    "MovePrims": [
+        "paths_to_move",
+        "on_move_fn",
+        "time_code",
+        "keep_world_transform",
+        "destructive",
+        "stage_or_context",
+    ],
+    "CopyPrim": [
+        "path_from",
+        "path_to",
+        "duplicate_layers",
+        "combine_layers",
+        "exclusive_select",
+        "flatten_references",
+        "copy_to_introducing_layer",
+    ],
+    "CopyPrims": [
+        "paths_from",
+        "paths_to",
+        "duplicate_layers",
+        "combine_layers",
+        "flatten_references",
+    ],
+    "GroupPrims": ["prim_paths", "destructive"],
+    "UngroupPrims": ["prim_paths", "destructive"],
+    "ParentPrims": ["parent_path", "child_paths", "keep_world_transform"],
+    "UnparentPrims": ["paths", "keep_world_transform"],
+    "ToggleActivePrims": ["prim_paths", "active", "stage_or_context"],
+    "ToggleVisibilitySelectedPrims": ["selected_paths", "stage"],
+    "TransformPrim": [
+        "path",
+        "new_transform_matrix",
+        "old_transform_matrix",
+        "time_code",
+        "had_transform_at_key",
+        "usd_context_name",
+    ],
+    "TransformPrims": [
+        "prims_to_transform",
+        "time_code",
+        "had_transform_at_key",
+        "usd_context_name",
+    ],
+    "TransformPrimSRT": [
+        "path",
+        "new_translation",
+        "new_rotation_euler",
+        "new_rotation_order",
+        "new_scale",
+        "new_rotation_quat",
+        "old_translation",
+        "old_rotation_euler",
+        "old_rotation_order",
+        "old_scale",
+        "old_rotation_quat",
+        "time_code",
+        "had_transform_at_key",
+        "usd_context_name",
+    ],
+    "ChangeProperty": [
+        "prop_path",
+        "value",
+        "prev",
+        "timecode",
+        "type_to_create_if_not_exist",
+        "target_layer",
+        "usd_context_name",
+        "is_custom",
+    ],
+    "ChangeMetadata": ["object_paths", "key", "value", "usd_context_name"],
+    "SetRelationshipTargets": ["relationship", "targets"],
+    "RemoveRelationshipTarget": ["relationship", "target"],
+    "CreateReference": [
+        "usd_context",
+        "path_to",
+        "asset_path",
+        "prim_path",
+        "instanceable",
+        "select_prim",
+    ],
+    "CreatePayload": [
+        "usd_context",
+        "path_to",
+        "asset_path",
+        "prim_path",
+        "instanceable",
+        "select_prim",
+    ],
+    "AddReference": ["stage", "prim_path", "reference"],
+    "AddPayload": ["stage", "prim_path", "payload"],
+    "SelectPrims": ["old_selected_paths", "new_selected_paths", "expand_in_stage"],
+    "CreateAndBindMdlMaterialFromLibrary": [
+        "mdl_name",
+        "mtl_name",
+        "mtl_path",
+        "mtl_created_list",
+        "bind_selected_prims",
+        "prim_name",
+        "select_new_prim",
+    ],
+    "CreateMdlMaterialPrim": [
+        "mtl_url",
+        "mtl_name",
+        "mtl_path",
+        "select_new_prim",
+        "stage",
+    ],
+    "CreatePreviewSurfaceMaterialPrim": ["mtl_path", "select_new_prim"],
+    "CreatePreviewSurfaceTextureMaterialPrim": ["mtl_path", "select_new_prim"],
+    "BindMaterial": [
+        "prim_path",
+        "material_path",
+        "strength",
+        "material_purpose",
+        "stage",
+    ],
+    "AddPhysicsComponent": ["usd_prim", "component", "multiple_api_token"],
+    "RemovePhysicsComponent": ["usd_prim", "component", "multiple_api_token"],
+    "SetRigidBody": ["path", "approximationShape", "kinematic"],
+    "SetStaticCollider": ["path", "approximationShape"],
+}
+
+# omni.kit.commands 模組本身的函式
+KIT_COMMAND_FUNCTIONS = [
+    "execute",
+    "execute_argv",
+    "register",
+    "register_all_commands_in_module",
+    "unregister",
+    "create",
+    "get_command_class",
+    "get_commands",
+    "get_commands_list",
+]
+
+# 方法回傳值的型別（用於推斷變數型別；schema 的 Define / Get 回傳自身類別）
+RETURN_TYPES: Dict[Tuple[str, str], str] = {
+    ("Usd.Stage", "CreateInMemory"): "Usd.Stage",
+    ("Usd.Stage", "CreateNew"): "Usd.Stage",
+    ("Usd.Stage", "Open"): "Usd.Stage",
+    ("Usd.Stage", "DefinePrim"): "Usd.Prim",
+    ("Usd.Stage", "OverridePrim"): "Usd.Prim",
+    ("Usd.Stage", "GetPrimAtPath"): "Usd.Prim",
+    ("Usd.Stage", "GetPseudoRoot"): "Usd.Prim",
+    ("Usd.Stage", "GetDefaultPrim"): "Usd.Prim",
+    ("Usd.Stage", "GetRootLayer"): "Sdf.Layer",
+    ("Usd.Prim", "GetAttribute"): "Usd.Attribute",
+    ("Usd.Prim", "CreateAttribute"): "Usd.Attribute",
+    ("Usd.Prim", "GetRelationship"): "Usd.Relationship",
+    ("Usd.Prim", "CreateRelationship"): "Usd.Relationship",
+    ("Usd.Prim", "GetParent"): "Usd.Prim",
+    ("Usd.Prim", "GetChild"): "Usd.Prim",
+    ("Usd.Prim", "GetStage"): "Usd.Stage",
+}
+
+
+def _reflect_pxr() -> Dict[str, Dict[str, Optional[List[str]]]]:
+    """以反射讀取目前環境可匯入的 pxr 模組（未安裝 USD 時為空）"""
+    pxr: Dict[str, Dict[str, Optional[List[str]]]] = {}
+    for module_name in PXR_MODULES:
+        try:
+            module = importlib.import_module(f"pxr.{module_name}")
+        except ImportError:
+            continue
+        entries: Dict[str, Optional[List[str]]] = {}
+        for name in dir(module):
+            if name.startswith("_"):
+                continue
+            value = getattr(module, name)
+            if (
+                inspect.isroutine(value)
+                or inspect.ismodule(value)
+                or isinstance(value, (bool, int, float, str))
+            ):
+                entries[name] = None
+            else:
+                entries[name] = sorted(
+                    member for member in dir(value) if not member.startswith("_")
+                )
+        pxr[module_name] = entries
+    return pxr
+
+
+def _command_kwargs(owners) -> List[str]:
+    kwargs = set()
+    for command_class in owners.values():
+        parameters = inspect.signature(command_class.__init__).parameters
+        kwargs.update(p for p in parameters if p not in ("self", "args", "kwargs"))
+    return sorted(kwargs)
+
+
+def _live_commands() -> Optional[Dict[str, List[str]]]:
+    """Omniverse 中已註冊的 Kit 命令與參數；不在 Kit 中時回傳 None"""
+    try:
+        import omni.kit.commands
+    except ImportError:
+        return None
+    return {
+        name: _command_kwargs(owners)
+        for name, owners in omni.kit.commands.get_commands().items()
+    }
+
+
+def _merge_commands(
+    commands: Dict[str, List[str]], live: Optional[Dict[str, List[str]]]
+) -> Dict[str, List[str]]:
+    merged = {name: sorted(kwargs) for name, kwargs in commands.items()}
+    for name, kwargs in (live or {}).items():
+        merged[name] = sorted(set(merged.get(name, [])) | set(kwargs))
+    return merged
+
+
+def build_index() -> Dict[str, Any]:
+    """以目前環境建立索引：pxr 以反射讀取，Kit 命令以內建表為底並加入已註冊的命令"""
+    return {
+        "pxr": _reflect_pxr(),
+        "commands": _merge_commands(KIT_COMMANDS, _live_commands()),
+    }
+
+
+def load_index(path: str = INDEX_PATH) -> "ApiIndex":
+    """載入索引檔，並以執行環境覆蓋：可匯入的 pxr 模組以目前版本的反射結果取代快照，
+    在 Kit 中加入已註冊的命令（快照以不含 Kit 的 usd-core 產生）"""
+    if not os.path.exists(path):
+        return ApiIndex(build_index(), live_commands=_live_commands() is not None)
+    with open(path, encoding="utf-8") as handle:
+        data = json.load(handle)
+    data["pxr"] = {**data.get("pxr", {}), **_reflect_pxr()}
+    live = _live_commands()
+    data["commands"] = _merge_commands(data.get("commands", {}), live)
+    return ApiIndex(data, live_commands=live is not None)
+
+
+class ApiIndex:
+    """已載入的符號索引"""
+
+    def __init__(self, data: Dict[str, Any], live_commands: bool = False):
+        # 在 Kit 中：查無命令時再查一次命令註冊表（擴充功能可能在索引載入後才註冊命令）
+        self.live_commands = live_commands
+        self.pxr: Dict[str, Dict[str, Optional[List[str]]]] = data.get("pxr", {})
+        # 類別成員轉為集合以便查詢
+        self.members: Dict[str, Optional[frozenset]] = {}
+        for module_name, entries in self.pxr.items():
+            for name, members in entries.items():
+                self.members[f"{module_name}.{name}"] = (
+                    frozenset(members) if members is not None else None
+                )
+        self.commands: Dict[str, frozenset] = {
+            name: frozenset(kwargs) for name, kwargs in data.get("commands", {}).items()
+        }
+
+    def command_kwargs(self, name: str) -> Optional[frozenset]:
+        """命令的參數集合；Kit 同時以 Foo 與 FooCommand 註冊"""
+        kwargs = self._lookup(name)
+        if kwargs is None and self.live_commands:
+            try:
+                import omni.kit.commands
+                registered = omni.kit.commands.get_commands()
+            except ImportError:
+                return None
+            for candidate in (
+                name,
+                name[: -len("Command")] if name.endswith("Command") else None,
+            ):
+                if candidate and candidate in registered:
+                    self.commands[candidate] = frozenset(
+                        _command_kwargs(registered[candidate])
+                    )
+            kwargs = self._lookup(name)
+        return kwargs
+
+    def _lookup(self, name: str) -> Optional[frozenset]:
+        kwargs = self.commands.get(name)
+        if kwargs is None and name.endswith("Command"):
+            kwargs = self.commands.get(name[:-len("Command")])
+        return kwargs
+
+    def has_module(self, module_name: str) -> bool:
+        return module_name in self.pxr
+
+
+_index: Optional[ApiIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> ApiIndex:
+    """載入一次後重複使用（見 load_index）"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = load_index()
+    return _index
+
+
+def _dotted(node: ast.AST) -> Optional[List[str]]:
+    """a.b.c -> ['a', 'b', 'c']"""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return parts[::-1]
+
+
+class _ScriptChecker(ast.NodeVisitor):
+    """依原始碼順序走訪一次：記錄匯入別名與變數型別，同時檢查命令與屬性存取"""
+
+    def __init__(self, index: ApiIndex):
+        self.index = index
+        self.issues: List[Dict[str, Any]] = []
+        # 名稱 -> 完整符號
+        # （"pxr.UsdGeom"、"omni.kit.commands"、"omni.kit.commands.execute"）
+        self.aliases: Dict[str, str] = {}
+        # 變數 -> pxr 類別（"UsdGeom.Cube"）
+        self.types: Dict[str, str] = {}
+
+    def _issue(self, node: ast.AST, kind: str, message: str):
+        self.issues.append(
+            {"line": getattr(node, "lineno", 0), "kind": kind, "message": message}
+        )
+
+    # ---- 匯入 ----
+
+    def visit_Import(self, node: ast.Import):
+        for alias in node.names:
+            if alias.asname:
+                self.aliases[alias.asname] = alias.name
+            else:
+                root = alias.name.split(".", 1)[0]
+                self.aliases[root] = root
+            self._check_pxr_module(node, alias.name)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        if node.level or not node.module:
+            return
+        for alias in node.names:
+            full = f"{node.module}.{alias.name}"
+            self.aliases[alias.asname or alias.name] = full
+            if node.module == "pxr":
+                self._check_pxr_module(node, full)
+            elif node.module.startswith("pxr."):
+                self._check_symbol(node, node.module[len("pxr."):], alias.name)
+
+    def _check_pxr_module(self, node: ast.AST, full: str):
+        parts = full.split(".")
+        if parts[0] == "pxr" and len(parts) > 1 and not self.index.has_module(parts[1]):
+            if self.index.pxr:
+                self._issue(node, "module", f"pxr 沒有模組 {parts[1]}")
+
+    # ---- 符號解析 ----
+
+    def _resolve(self, node: ast.AST) -> Optional[str]:
+        """運算式對應的完整符號（只解析由匯入名稱開始的屬性鏈）"""
+        parts = _dotted(node)
+        if not parts or parts[0] not in self.aliases:
+            return None
+        return ".".join([self.aliases[parts[0]]] + parts[1:])
+
+    def _pxr_symbol(self, full: Optional[str]) -> Optional[str]:
+        if full and full.startswith("pxr.") and full.count(".") >= 2:
+            return full[len("pxr."):]
+        return None
+
+    def _check_symbol(self, node: ast.AST, module_name: str, name: str) -> bool:
+        if not self.index.has_module(module_name):
+            return False
+        if f"{module_name}.{name}" not in self.index.members:
+            self._issue(node, "symbol", f"pxr.{module_name} 沒有 {name}")
+            return False
+        return True
+
+    def _check_member(
+        self, node: ast.AST, owner: str, member: str, instance: bool = False
+    ):
+        members = self.index.members.get(owner)
+        if members is None or member in members:
+            return
+        where = f"{owner} 物件" if instance else owner
+        self._issue(node, "attribute", f"{where} 沒有 {member}")
+
+    def visit_Attribute(self, node: ast.Attribute):
+        if isinstance(node.ctx, ast.Load):
+            full = self._resolve(node)
+            symbol = self._pxr_symbol(full)
+            if symbol is not None:
+                parts = symbol.split(".")
+                # Module.Class 與 Module.Class.member
+                if self._check_symbol(node, parts[0], parts[1]) and len(parts) == 3:
+                    self._check_member(node, f"{parts[0]}.{parts[1]}", parts[2])
+                return
+            if isinstance(node.value, ast.Name) and node.value.id in self.types:
+                self._check_member(
+                    node, self.types[node.value.id], node.attr, instance=True
+                )
+        self.generic_visit(node)
+
+    # ---- 型別推斷 ----
+
+    def _infer(self, node: ast.AST) -> Optional[str]:
+        if isinstance(node, ast.Name):
+            return self.types.get(node.id)
+        if not isinstance(node, ast.Call):
+            return None
+        func = node.func
+        symbol = self._pxr_symbol(self._resolve(func))
+        if symbol is not None:
+            parts = symbol.split(".")
+            if len(parts) == 2 and self.index.members.get(symbol) is not None:
+                # UsdGeom.Cube(prim)、Gf.Vec3d(...)
+                return symbol
+            if len(parts) == 3:
+                owner = f"{parts[0]}.{parts[1]}"
+                if parts[2] in ("Define", "Get"):
+                    return owner
+                return RETURN_TYPES.get((owner, parts[2]))
+            return None
+        if isinstance(func, ast.Attribute):
+            if func.attr == "get_stage" and isinstance(func.value, ast.Call):
+                inner = self._resolve(func.value.func)
+                if inner == "omni.usd.get_context":
+                    return "Usd.Stage"
+            owner = self._infer(func.value)
+            if owner is not None:
+                if func.attr == "GetPrim":
+                    return "Usd.Prim"
+                return RETURN_TYPES.get((owner, func.attr))
+        return None
+
+    def visit_Assign(self, node: ast.Assign):
+        self.visit(node.value)
+        inferred = self._infer(node.value)
+        for target in node.targets:
+            if isinstance(target, ast.Name):
+                if inferred is not None:
+                    self.types[target.id] = inferred
+                else:
+                    self.types.pop(target.id, None)
+                    # 重新賦值會覆蓋同名的匯入
+                    self.aliases.pop(target.id, None)
+            else:
+                self._unbind(target)
+                self.visit(target)
+
+    def _unbind(self, target: ast.AST):
+        for name in ast.walk(target):
+            if isinstance(name, ast.Name):
+                self.types.pop(name.id, None)
+                self.aliases.pop(name.id, None)
+
+    def visit_For(self, node: ast.For):
+        self._unbind(node.target)
+        self.generic_visit(node)
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        # 參數名稱在函式內遮蔽外部變數
+        saved_types, saved_aliases = dict(self.types), dict(self.aliases)
+        for argument in node.args.args + node.args.kwonlyargs:
+            self.types.pop(argument.arg, None)
+            self.aliases.pop(argument.arg, None)
+        self.generic_visit(node)
+        self.types, self.aliases = saved_types, saved_aliases
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    # ---- Kit 命令 ----
+
+    def visit_Call(self, node: ast.Call):
+        full = self._resolve(node.func)
+        if full == "omni.kit.commands.execute":
+            self._check_command(node)
+        elif full and full.startswith("omni.kit.commands.") and full.count(".") == 3:
+            name = full.rsplit(".", 1)[1]
+            if name not in KIT_COMMAND_FUNCTIONS:
+                self._issue(node, "attribute", f"omni.kit.commands 沒有 {name}")
+        self.generic_visit(node)
+
+    def _check_command(self, node: ast.Call):
+        if (
+            not node.args
+            or not isinstance(node.args[0], ast.Constant)
+            or not isinstance(node.args[0].value, str)
+        ):
+            return
+        name = node.args[0].value
+        kwargs = self.index.command_kwargs(name)
+        if kwargs is None:
+            self._issue(node, "command", f"未知的 Kit 命令 {name}")
+            return
+        for keyword in node.keywords:
+            # **kwargs 展開無法靜態檢查
+            if keyword.arg is not None and keyword.arg not in kwargs:
+                self._issue(node, "argument", f"命令 {name} 沒有參數 {keyword.arg}")
+
+
+def validate_script(code: str, index: Optional[ApiIndex] = None) -> Dict[str, Any]:
+    """檢查腳本
+
+    回傳 {"valid", "issues": [{"line", "kind", "message"}], "elapsed_ms"}
+    """
+    # 索引只在首次使用時載入（含 pxr 反射），不計入檢查耗時
+    index = index or get_index()
+    start = time.perf_counter()
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        issues = [
+            {"line": e.lineno or 0, "kind": "syntax", "message": f"語法錯誤: {e.msg}"}
+        ]
+    else:
+        checker = _ScriptChecker(index)
+        checker.visit(tree)
+        issues = checker.issues
+    return {
+        "valid": not issues,
+        "issues": issues,
+        "elapsed_ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+def format_issues(issues: List[Dict[str, Any]]) -> str:
+    """問題清單轉為多行文字（用於錯誤訊息與重新生成的提示）"""
+    return "\n".join(f"第 {issue['line']} 行: {issue['message']}" for issue in issues)
+
+
+if __name__ == "__main__":
+    data = build_index()
+    with open(INDEX_PATH, "w", encoding="utf-8") as handle:
+        json.dump(data, handle, separators=(",", ":"), sort_keys=True)
+    print(
+        f"已寫入 {INDEX_PATH}：{len(data['pxr'])} 個 pxr 模組、"
+        f"{len(data['commands'])} 個 Kit 命令"
+    )
@@ -0,0 +1,138 @@
+"""
+背景任務執行器
+在共享執行緒池中執行 AI 鏈調用，讓 Streamlit 腳本執行緒不被阻塞，並可逐步讀取串流結果
+"""
+
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from tracing import tracer
+
+
+class QueryJob:
+    """單一背景任務的狀態與逐步累積的輸出"""
+
+    def __init__(self, description: str = ""):
+        self.id = uuid.uuid4().hex
+        self.description = description
+        self.status = "pending"  # pending / running / done / error
+        self.chunks: List[str] = []
+        # submit_events 產出的結構化事件
+        self.events: List[Dict[str, Any]] = []
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.traceback: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def text(self) -> str:
+        """目前已收到的串流文字"""
+        return "".join(self.chunks)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "error")
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.time()) - self.created_at
+
+
+class JobRunner:
+    """進程內共用的背景任務執行器（所有瀏覽器會話共用同一個執行緒池）"""
+
+    def __init__(self, max_workers: int = 8, retention: float = 600.0):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="ui-job"
+        )
+        self._jobs: Dict[str, QueryJob] = {}
+        self._lock = threading.Lock()
+        # 已完成任務的保留秒數
+        self.retention = retention
+
+    def _register(self, job: QueryJob) -> QueryJob:
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        return job
+
+    def _prune(self):
+        """移除過期的已完成任務"""
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.done and now - (job.finished_at or now) > self.retention]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _run(self, job: QueryJob, work: Callable[[QueryJob], Any]):
+        job.status = "running"
+        try:
+            # 任務 span 自提交時起算，其中 queue.job 為在執行緒池中等待的時間
+            with tracer.span(
+                "job", start_ns=int(job.created_at * 1e9), description=job.description
+            ) as span:
+                tracer.record("queue.job", job.created_at, parent=span)
+                job.result = work(job)
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.traceback = traceback.format_exc()
+            job.status = "error"
+        finally:
+            job.finished_at = time.time()
+
+    def submit_stream(self, runnable, input: Any, description: str = "") -> QueryJob:
+        """以串流方式執行 Runnable，片段逐步寫入 job.chunks"""
+        job = self._register(QueryJob(description))
+
+        def work(job: QueryJob) -> str:
+            for chunk in runnable.stream(input):
+                job.chunks.append(chunk if isinstance(chunk, str) else str(chunk))
+            return job.text
+
+        self._executor.submit(self._run, job, work)
+        return job
+
+    def submit_call(
+        self, fn: Callable[..., Any], *args: Any, description: str = "", **kwargs: Any
+    ) -> QueryJob:
+        """在背景執行一般函式，結果寫入 job.result"""
+        job = self._register(QueryJob(description))
+        self._executor.submit(self._run, job, lambda job: fn(*args, **kwargs))
+        return job
+
+    def submit_events(
+        self, fn: Callable[..., Any], *args: Any, description: str = "", **kwargs: Any
+    ) -> QueryJob:
+        """在背景迭代產出事件的函式：事件逐步寫入 job.events，
+        type 為 result 的事件作為 job.result"""
+        job = self._register(QueryJob(description))
+
+        def work(job: QueryJob) -> Any:
+            result = None
+            for event in fn(*args, **kwargs):
+                if event.get("type") == "result":
+                    result = event.get("result")
+                else:
+                    job.events.append(event)
+            return result
+
+        self._executor.submit(self._run, job, work)
+        return job
+
+    def get(self, job_id: str) -> Optional[QueryJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active_count(self) -> int:
+        """尚未完成的任務數"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.done)
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,273 @@
+"""
+API 負載測試：以可設定延遲特性的假模型取代 Groq / Ollama，對 /api/query、
+/api/scene/analyze 與 LangServe 路由
+以固定併發送出請求，回報各端點的吞吐量與 p50/p95/p99 延遲。預設在進程內經
+httpx.ASGITransport 執行（不需網路），
+也可以 --api-url / --langserve-url 指向已啟動的服務器
+
+    python benchmarks/bench_api_load.py --profile groq --requests 200 --concurrency 20
+    python benchmarks/bench_api_load.py --save baseline.json
+    python benchmarks/bench_api_load.py --baseline baseline.json --tolerance 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import httpx  # noqa: E402
+
+from fake_llm import PROFILES, FakeStreamingLLM  # noqa: E402
+
+QUERIES = [
+    "如何在 Omniverse 中建立 USD Stage？",
+    "說明 RTX 渲染與 Physics Simulation 的整合方式",
+    "Extension 開發的最佳實踐",
+    "Connector 如何同步 USD 圖層？",
+]
+
+# 端點名稱 -> (服務, 路徑, 請求內容產生函式)
+ENDPOINTS = {
+    "query": ("api", "/api/query", lambda i: {"query": QUERIES[i % len(QUERIES)]}),
+    "scene_analyze": (
+        "api",
+        "/api/scene/analyze",
+        lambda i: {"objects": [f"/World/Obj_{n}" for n in range(i % 20)]},
+    ),
+    "langserve_invoke": (
+        "langserve",
+        "/invoke",
+        lambda i: {"input": {"topic": QUERIES[i % len(QUERIES)]}},
+    ),
+    "langserve_batch": (
+        "langserve",
+        "/batch",
+        lambda i: {"inputs": [{"topic": query} for query in QUERIES]},
+    ),
+    "langserve_stream": (
+        "langserve",
+        "/stream",
+        lambda i: {"input": {"topic": QUERIES[i % len(QUERIES)]}},
+    ),
+}
+
+
+def percentile(samples, q: float) -> float:
+    """最近排名法的百分位數"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[
+        min(len(ordered) - 1, max(0, int(round(q * len(ordered) + 0.5)) - 1))
+    ]
+
+
+def build_clients(llm, api_url=None, langserve_url=None, timeout: float = 120.0):
+    """建立兩個服務的用戶端；未指定 URL 時在進程內建立應用並注入假模型"""
+    clients = {}
+    if api_url:
+        clients["api"] = httpx.AsyncClient(base_url=api_url, timeout=timeout)
+    else:
+        from langserve_launch_example import get_chain
+        from streamlit_api import create_app
+
+        app = create_app(chain=get_chain(llm))
+        clients["api"] = httpx.AsyncClient(transport=httpx.ASGITransport(app=app),
+                                           base_url="http://api", timeout=timeout)
+    if langserve_url:
+        clients["langserve"] = httpx.AsyncClient(
+            base_url=langserve_url, timeout=timeout
+        )
+    else:
+        from langserve_launch_example.server import create_app as create_langserve_app
+
+        # 關閉共享回應緩存，每個請求都經過模型
+        app = create_langserve_app(shared_cache=False, llm=llm)
+        clients["langserve"] = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://langserve",
+            timeout=timeout,
+        )
+    return clients
+
+
+async def _request(client, path: str, body, stream: bool):
+    """送出一個請求，回傳 (延遲秒數, 首個位元組秒數, 是否成功)"""
+    start = time.perf_counter()
+    if stream:
+        first_byte = None
+        async with client.stream("POST", path, json=body) as response:
+            async for _ in response.aiter_bytes():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - start
+            ok = response.status_code == 200
+        return time.perf_counter() - start, first_byte, ok
+    response = await client.post(path, json=body)
+    return time.perf_counter() - start, None, response.status_code == 200
+
+
+async def run_endpoint(
+    client,
+    name: str,
+    requests: int,
+    concurrency: int,
+    warmup: int = 5,
+    measure_ttfb: bool = False,
+) -> dict:
+    """以固定併發執行 requests 個請求（ASGITransport 會先收齊整個回應，
+    只有對外部服務器才量測首個位元組時間）"""
+    _, path, body = ENDPOINTS[name]
+    stream = measure_ttfb and name.endswith("_stream")
+    for index in range(warmup):
+        await _request(client, path, body(index), stream)
+
+    latencies, first_bytes, errors = [], [], 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for index in counter:
+            try:
+                latency, first_byte, ok = await _request(
+                    client, path, body(index), stream
+                )
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            if not ok:
+                errors += 1
+                continue
+            latencies.append(latency)
+            if first_byte is not None:
+                first_bytes.append(first_byte)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    result = {
+        "requests": requests,
+        "errors": errors,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+    }
+    if first_bytes:
+        result["ttfb_p50"] = percentile(first_bytes, 0.50)
+    return result
+
+
+async def run(args) -> dict:
+    llm = FakeStreamingLLM.from_profile(args.profile, seed=args.seed)
+    clients = build_clients(llm, args.api_url, args.langserve_url)
+    results = {}
+    try:
+        for name in args.endpoints:
+            service = ENDPOINTS[name][0]
+            remote = bool(args.api_url if service == "api" else args.langserve_url)
+            results[name] = await run_endpoint(
+                clients[service],
+                name,
+                args.requests,
+                args.concurrency,
+                args.warmup,
+                measure_ttfb=remote,
+            )
+            print_row(name, results[name])
+    finally:
+        for client in clients.values():
+            await client.aclose()
+    return results
+
+
+def print_row(name: str, result: dict):
+    ttfb = f"{result['ttfb_p50'] * 1000:9.1f}" if "ttfb_p50" in result else f"{'-':>9s}"
+    print(
+        f"{name:18s} {result['requests']:6d} {result['errors']:6d} "
+        f"{result['throughput']:9.1f} {result['p50'] * 1000:9.1f} "
+        f"{result['p95'] * 1000:9.1f} {result['p99'] * 1000:9.1f} {ttfb}"
+    )
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """吞吐量下降或 p95 上升超過 tolerance 的端點"""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if result["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: 吞吐量 {before['throughput']:.1f} -> "
+                f"{result['throughput']:.1f} req/s"
+            )
+        if result["p95"] > before["p95"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {before['p95'] * 1000:.1f} -> "
+                f"{result['p95'] * 1000:.1f} ms"
+            )
+        if result["errors"] > before.get("errors", 0):
+            regressions.append(
+                f"{name}: 錯誤數 {before.get('errors', 0)} -> {result['errors']}"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API 端點的吞吐量與延遲百分位數")
+    parser.add_argument(
+        "--profile", choices=sorted(PROFILES), default="groq", help="假模型的延遲特性"
+    )
+    parser.add_argument("--requests", type=int, default=100, help="每個端點的請求數")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--endpoints", nargs="+", choices=list(ENDPOINTS), default=list(ENDPOINTS)
+    )
+    parser.add_argument(
+        "--api-url", help="已啟動的 streamlit_api 服務器（預設在進程內執行）"
+    )
+    parser.add_argument(
+        "--langserve-url", help="已啟動的 LangServe 服務器（預設在進程內執行）"
+    )
+    parser.add_argument("--save", help="把結果寫入 JSON，作為之後比較的基準")
+    parser.add_argument(
+        "--baseline", help="與先前 --save 的結果比較，退步時以狀態碼 1 結束"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="容許的相對退步幅度"
+    )
+    args = parser.parse_args()
+
+    print(f"{'endpoint':18s} {'reqs':>6s} {'errors':>6s} {'req/s':>9s} "
+          f"{'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} {'ttfb ms':>9s}")
+    results = asyncio.run(run(args))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "profile": args.profile,
+                    "concurrency": args.concurrency,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"退步 {line}")
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
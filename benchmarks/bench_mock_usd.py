@@ -0,0 +1,92 @@
+"""
+離線模擬後端的腳本吞吐量：以 OmniverseCodeGenerator.execute_code
+反覆執行代表性的生成腳本，
+每個腳本從空 Stage 開始，輸出每分鐘可執行的腳本數
+
+    python benchmarks/bench_mock_usd.py --repeat 200
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from omniverse_code_generator import OmniverseCodeGenerator  # noqa: E402
+
+# 與提示詞範例相同風格的腳本
+SCRIPTS = {
+    "create_cube": '''
+import omni.usd
+from pxr import UsdGeom, Gf
+stage = omni.usd.get_context().get_stage()
+cube = UsdGeom.Cube.Define(stage, "/World/Cube")
+cube.CreateSizeAttr(2.0)
+UsdGeom.Xformable(cube).AddTranslateOp().Set(Gf.Vec3d(0, 1, 0))
+cube.CreateDisplayColorAttr([Gf.Vec3f(1.0, 0.0, 0.0)])
+''',
+    "kit_commands": '''
+import omni.kit.commands
+for i in range(20):
+    omni.kit.commands.execute(
+        "CreatePrimWithDefaultXform", prim_type="Sphere", prim_path=f"/World/Sphere_{i}"
+    )
+    omni.kit.commands.execute(
+        "ChangeProperty", prop_path=f"/World/Sphere_{i}.radius", value=0.5, prev=None
+    )
+''',
+    "material": '''
+import omni.usd
+from pxr import UsdGeom, UsdShade, Sdf, Gf
+stage = omni.usd.get_context().get_stage()
+cube = UsdGeom.Cube.Define(stage, "/World/Cube")
+material = UsdShade.Material.Define(stage, "/World/Looks/Red")
+shader = UsdShade.Shader.Define(stage, "/World/Looks/Red/Shader")
+shader.CreateIdAttr("UsdPreviewSurface")
+color = shader.CreateInput("diffuseColor", Sdf.ValueTypeNames.Color3f)
+color.Set(Gf.Vec3f(1.0, 0.0, 0.0))
+surface = shader.CreateOutput("surface", Sdf.ValueTypeNames.Token)
+material.CreateSurfaceOutput().ConnectToSource(surface)
+UsdShade.MaterialBindingAPI(cube.GetPrim()).Bind(material)
+''',
+    "animation": '''
+import omni.usd
+import omni.timeline
+from pxr import UsdGeom, Gf
+stage = omni.usd.get_context().get_stage()
+stage.SetStartTimeCode(0)
+stage.SetEndTimeCode(120)
+cube = UsdGeom.Cube.Define(stage, "/World/Cube")
+rotate = UsdGeom.Xformable(cube).AddRotateYOp()
+for frame in range(0, 121, 10):
+    rotate.Set(frame * 3.0, frame)
+omni.timeline.get_timeline_interface().play()
+''',
+    "bulk_1000": '''
+positions = usd_bulk.grid_positions(1000)
+usd_bulk.scatter("/World/Crates", 1000, "Cube", positions=positions, threshold=5000)
+''',
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模擬後端的腳本吞吐量")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    generator = OmniverseCodeGenerator(execution_backend="mock")
+    print(f"{'script':14s} {'ms/script':>10s} {'scripts/min':>12s}")
+    for name, code in SCRIPTS.items():
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            generator.reset_mock_stage()
+            result = generator.execute_code(code)
+            if result["status"] != "success":
+                raise SystemExit(f"{name} 執行失敗: {result['error']}")
+        elapsed = (time.perf_counter() - start) / args.repeat
+        print(f"{name:14s} {elapsed * 1000:10.2f} {60 / elapsed:12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+大量相同物件的比較：逐一定義 prim 與 PointInstancer
+輸出建立時間、Stage 上的 prim 數量與圖層序列化大小（近似記憶體占用）
+--backend mock 在離線模擬後端上執行（不需要 usd-core）
+
+    python benchmarks/bench_point_instancer.py --count 1000 10000 50000
+    python benchmarks/bench_point_instancer.py --backend mock
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import usd_bulk  # noqa: E402
+
+
+def per_prim(bulk, stage, positions, scales, colors):
+    bulk.define_prims(
+        bulk.numbered_paths("/World/Copies", "Cube", len(positions)),
+        translations=positions, scales=scales, colors=colors, stage=stage
+    )
+
+
+def instancer(bulk, stage, positions, scales, colors):
+    bulk.define_point_instancer(
+        "/World/Copies",
+        positions,
+        prototypes=("Cube",),
+        scales=scales,
+        colors=colors,
+        stage=stage,
+    )
+
+
+def load_backend(name: str):
+    """回傳 (usd_bulk 模組, 建立空 Stage 的函式)"""
+    if name == "mock":
+        import mock_usd
+        backend = mock_usd.MockUsdBackend()
+        return backend.load_module(usd_bulk), mock_usd.Stage.CreateInMemory
+    from pxr import Usd
+    return usd_bulk, Usd.Stage.CreateInMemory
+
+
+def measure(fn, count: int, bulk, create_stage):
+    positions = bulk.random_positions(count, seed=0)
+    scales = bulk.random_colors(count, seed=1) + 0.5
+    colors = bulk.random_colors(count, seed=2)
+    stage = create_stage()
+    start = time.perf_counter()
+    fn(bulk, stage, positions, scales, colors)
+    elapsed = time.perf_counter() - start
+    prims = sum(1 for _ in stage.Traverse())
+    size = len(stage.GetRootLayer().ExportToString())
+    return elapsed, prims, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PointInstancer 與逐一定義的比較")
+    parser.add_argument("--count", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--backend", choices=["usd", "mock"], default="usd")
+    args = parser.parse_args()
+    bulk, create_stage = load_backend(args.backend)
+
+    print(
+        f"{'mode':10s} {'count':>7s} {'time(ms)':>10s} {'prims':>7s} {'layer(KB)':>10s}"
+    )
+    for count in args.count:
+        for name, fn in (("per-prim", per_prim), ("instancer", instancer)):
+            elapsed, prims, size = measure(fn, count, bulk, create_stage)
+            print(
+                f"{name:10s} {count:7d} {elapsed * 1000:10.1f} {prims:7d} "
+                f"{size / 1024:10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+批量建立物件的效能比較：逐一 UsdGeom.Cube.Define 與 usd_bulk.define_prims
+
+    python benchmarks/bench_usd_bulk.py --count 10000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from pxr import Gf, Usd, UsdGeom, Vt  # noqa: E402
+
+import usd_bulk  # noqa: E402
+
+
+def per_prim(stage, count: int, positions, colors):
+    """生成腳本常見的逐一寫法"""
+    UsdGeom.Xform.Define(stage, "/World/Cubes")
+    for index in range(count):
+        cube = UsdGeom.Cube.Define(stage, f"/World/Cubes/Cube_{index}")
+        UsdGeom.Xformable(cube).AddTranslateOp().Set(Gf.Vec3d(*positions[index].tolist()))
+        cube.CreateDisplayColorAttr(Vt.Vec3fArray([Gf.Vec3f(*colors[index].tolist())]))
+
+
+def bulk(stage, count: int, positions, colors):
+    usd_bulk.define_prims(
+        usd_bulk.numbered_paths("/World/Cubes", "Cube", count),
+        translations=positions, colors=colors, stage=stage
+    )
+
+
+def run(name, fn, count: int, repeat: int):
+    positions = usd_bulk.random_positions(count, seed=0)
+    colors = usd_bulk.random_colors(count, seed=0)
+    timings = []
+    for _ in range(repeat):
+        stage = Usd.Stage.CreateInMemory()
+        start = time.perf_counter()
+        fn(stage, count, positions, colors)
+        timings.append(time.perf_counter() - start)
+        # 兩種寫法結果需一致
+        prims = [prim for prim in stage.Traverse() if prim.GetTypeName() == "Cube"]
+        assert len(prims) == count, (name, len(prims))
+    best = min(timings)
+    print(
+        f"{name:10s} {count:7d} prims  {best * 1000:9.1f} ms  "
+        f"{count / best:10.0f} prims/s"
+    )
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="USD 批量建立效能比較")
+    parser.add_argument("--count", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for count in args.count:
+        slow = run("per-prim", per_prim, count, args.repeat)
+        fast = run("bulk", bulk, count, args.repeat)
+        print(f"{'speedup':10s} {slow / fast:.1f}x\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+串流代碼塊解析
+逐段接收模型輸出，單次掃描同時切出圍欄代碼塊（任意語言標記、多個區塊）與說明文字，
+代碼可在生成結束前顯示與驗證
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+# 視為 Python 的語言標記（空字串表示未標記）
+PYTHON_LANGUAGES = {"python", "py", "python3", "ipython", ""}
+
+_FENCE_PATTERN = re.compile(r"^[ \t]*(`{3,}|~{3,})[ \t]*([^\s`]*)[^`]*$")
+
+
+class CodeBlock:
+    """一個圍欄代碼塊"""
+
+    __slots__ = ("language", "lines", "closed")
+
+    def __init__(self, language: str):
+        self.language = language
+        self.lines: List[str] = []
+        self.closed = False
+
+    @property
+    def code(self) -> str:
+        return "".join(self.lines).rstrip("\n")
+
+    @property
+    def is_python(self) -> bool:
+        return self.language in PYTHON_LANGUAGES
+
+
+def is_valid_python(code: str) -> bool:
+    try:
+        compile(code, "<generated>", "exec")
+        return True
+    except SyntaxError:
+        return False
+
+
+class CodeBlockExtractor:
+    """增量解析器：feed() 回傳新產生的事件，finish() 結束最後一行與未關閉的區塊
+
+    事件格式：
+      {"type": "text", "text": ...}                          區塊外的說明文字
+      {"type": "block_start", "index": i, "language": ...}
+      {"type": "code", "index": i, "text": ...}              區塊內的代碼片段
+      {"type": "block_end", "index": i, "closed": bool, "valid": bool}
+    """
+
+    def __init__(self):
+        self.blocks: List[CodeBlock] = []
+        self._text: List[str] = []
+        self._current: Optional[CodeBlock] = None
+        self._fence = ""
+        self._buffer = ""
+        # 目前未完成的行已輸出的長度
+        self._emitted = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        events: List[Dict[str, Any]] = []
+        self._buffer += chunk
+        start = 0
+        while True:
+            newline = self._buffer.find("\n", start)
+            if newline < 0:
+                break
+            self._line(self._buffer[start:newline + 1], events)
+            self._emitted = 0
+            start = newline + 1
+        self._buffer = self._buffer[start:]
+
+        # 未完成的行若不可能是圍欄，先輸出讓介面即時顯示
+        if self._buffer.lstrip(" \t")[:1] not in ("`", "~", ""):
+            self._emit(self._buffer[self._emitted:], events)
+            self._emitted = len(self._buffer)
+        return events
+
+    def finish(self) -> List[Dict[str, Any]]:
+        events: List[Dict[str, Any]] = []
+        if self._buffer:
+            self._line(self._buffer, events)
+            self._buffer = ""
+            self._emitted = 0
+        if self._current is not None:
+            self._close(events, closed=False)
+        return events
+
+    def _line(self, line: str, events: List[Dict[str, Any]]):
+        fence = _FENCE_PATTERN.match(line) if not self._emitted else None
+        if self._current is None and fence:
+            self._current = CodeBlock(fence.group(2).lower())
+            self._fence = fence.group(1)
+            self.blocks.append(self._current)
+            events.append({"type": "block_start", "index": len(self.blocks) - 1,
+                           "language": self._current.language})
+        elif (
+            self._current is not None
+            and fence
+            and not fence.group(2)
+            and fence.group(1)[0] == self._fence[0]
+            and len(fence.group(1)) >= len(self._fence)
+        ):
+            self._close(events, closed=True)
+        else:
+            self._emit(line[self._emitted:], events)
+
+    def _emit(self, text: str, events: List[Dict[str, Any]]):
+        if not text:
+            return
+        if self._current is not None:
+            self._current.lines.append(text)
+            events.append({"type": "code", "index": len(self.blocks) - 1, "text": text})
+        else:
+            self._text.append(text)
+            events.append({"type": "text", "text": text})
+
+    def _close(self, events: List[Dict[str, Any]], closed: bool):
+        block = self._current
+        block.closed = closed
+        self._current = None
+        events.append({
+            "type": "block_end", "index": len(self.blocks) - 1, "closed": closed,
+            "valid": is_valid_python(block.code) if block.is_python else True
+        })
+
+    @property
+    def explanation(self) -> str:
+        """區塊外的文字"""
+        return "".join(self._text).strip()
+
+    @property
+    def code(self) -> str:
+        """Python 代碼塊依序合併；沒有 Python 區塊時合併所有區塊"""
+        blocks = [block for block in self.blocks if block.is_python] or self.blocks
+        return "\n\n".join(block.code for block in blocks if block.code.strip())
+
+
+def extract(response: str) -> CodeBlockExtractor:
+    """解析完整回應"""
+    extractor = CodeBlockExtractor()
+    extractor.feed(response)
+    extractor.finish()
+    return extractor
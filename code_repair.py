@@ -0,0 +1,166 @@
+"""
+生成代碼的自動修復
+從靜態檢查或執行錯誤取出出錯的行，組成只含錯誤訊息與相關行（附行號）的精簡修復提示，
+模型以「@@ 起-迄」區段回覆要替換的行，再套用回原代碼
+"""
+
+import re
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from code_extractor import extract
+
+# 執行時代碼以此檔名編譯，traceback 才能對應回生成代碼的行號
+SOURCE_NAME = "<generated>"
+
+_TRACEBACK_LINE = re.compile(r'File "' + re.escape(SOURCE_NAME) + r'", line (\d+)')
+_PRINTED_TRACEBACK = re.compile(r"^Traceback \(most recent call last\):$", re.MULTILINE)
+_HUNK_HEADER = re.compile(r"^@@\s*(\d+)(?:\s*-\s*(\d+))?\s*(?:@@)?\s*$")
+
+# 出錯行前後保留的行數
+CONTEXT_LINES = 3
+# 沒有行號可用時最多附上的行數
+MAX_EXCERPT_LINES = 60
+
+
+def failing_lines(failure: Dict[str, Any]) -> List[int]:
+    """出錯的行號（1 起算）：靜態檢查的問題行，或 traceback 中屬於生成代碼的框架"""
+    validation = failure.get("validation")
+    if validation and validation.get("issues"):
+        return sorted(
+            {issue["line"] for issue in validation["issues"] if issue.get("line")}
+        )
+    lines = [
+        int(number) for number in _TRACEBACK_LINE.findall(failure.get("traceback", ""))
+    ]
+    # 最內層的框架最接近錯誤發生處
+    return sorted(set(lines[-2:]))
+
+
+def printed_traceback(output: str) -> Optional[str]:
+    """輸出中最後一段被印出的 traceback（腳本自行捕捉例外後印出）；沒有時回傳 None"""
+    matches = list(_PRINTED_TRACEBACK.finditer(output or ""))
+    return output[matches[-1].start():] if matches else None
+
+
+def error_summary(failure: Dict[str, Any]) -> str:
+    """精簡的錯誤描述：靜態檢查問題，或 traceback 的最後一行"""
+    error = failure.get("error", "")
+    trace = [
+        line
+        for line in failure.get("traceback", "").strip().splitlines()
+        if line.strip()
+    ]
+    if trace and not failure.get("validation"):
+        last = trace[-1].strip()
+        return last if error in last else f"{last}\n{error}"
+    return error
+
+
+def numbered_excerpt(code: str, lines: List[int], context: int = CONTEXT_LINES) -> str:
+    """出錯行附近的代碼（含行號，出錯行以 > 標示）；不連續的區段以 ... 分隔"""
+    source = code.splitlines()
+    if not lines:
+        selected = list(range(1, min(len(source), MAX_EXCERPT_LINES) + 1))
+    else:
+        selected = sorted(
+            {
+                n
+                for line in lines
+                for n in range(line - context, line + context + 1)
+                if 1 <= n <= len(source)
+            }
+        )
+    width = len(str(len(source)))
+    output = []
+    previous = 0
+    for number in selected:
+        if previous and number != previous + 1:
+            output.append("...")
+        marker = ">" if number in lines else " "
+        output.append(f"{marker}{number:>{width}} | {source[number - 1]}")
+        previous = number
+    return "\n".join(output)
+
+
+def parse_hunks(response: str) -> Optional[List[Tuple[int, int, List[str]]]]:
+    """解析 @@ 起-迄 區段；回覆中沒有區段時回傳 None"""
+    hunks: List[Tuple[int, int, List[str]]] = []
+    current: Optional[List[str]] = None
+    for line in response.splitlines():
+        header = _HUNK_HEADER.match(line.strip())
+        if header:
+            start = int(header.group(1))
+            end = int(header.group(2) or start)
+            current = []
+            hunks.append((start, end, current))
+        elif current is not None and not line.lstrip().startswith(("```", "~~~")):
+            # 去掉模型沿用的行號前綴（例如 "12 | "）
+            current.append(re.sub(r"^[ >]?\s*\d+ \| ", "", line))
+    return hunks or None
+
+
+def apply_repair(code: str, response: str) -> Optional[str]:
+    """套用修復回覆；回覆是完整代碼塊時直接取代。
+    區段超出範圍、重疊或順序錯亂時回傳 None"""
+    hunks = parse_hunks(response)
+    if hunks is None:
+        replacement = extract(response).code
+        return replacement if replacement.strip() else None
+
+    source = code.splitlines()
+    # 區段必須依序且互不重疊，否則替換結果無法預期
+    previous_end = 0
+    for start, end, _ in hunks:
+        if not previous_end < start <= end <= len(source):
+            return None
+        previous_end = end
+    # 由後往前替換，前面的行號才不會位移
+    for start, end, new_lines in reversed(hunks):
+        while new_lines and not new_lines[-1].strip():
+            new_lines.pop()
+        source[start - 1:end] = new_lines
+    return "\n".join(source)
+
+
+class RepairStats:
+    """自動修復的成功率與取得可執行腳本所需時間（執行緒安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.first_try = 0
+        self.repaired = 0
+        self.failed = 0
+        self.repair_iterations = 0
+        self._working_seconds: List[float] = []
+
+    def record(self, success: bool, iterations: int, elapsed: float):
+        with self._lock:
+            self.runs += 1
+            self.repair_iterations += iterations
+            if not success:
+                self.failed += 1
+            elif iterations:
+                self.repaired += 1
+                self._working_seconds.append(elapsed)
+            else:
+                self.first_try += 1
+                self._working_seconds.append(elapsed)
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            runs, first_try, repaired = self.runs, self.first_try, self.repaired
+            iterations = self.repair_iterations
+            working = sorted(self._working_seconds)
+        failed_first = runs - first_try
+        return {
+            "runs": runs,
+            "success_rate": (first_try + repaired) / runs if runs else 0.0,
+            "first_try_rate": first_try / runs if runs else 0.0,
+            # 第一次失敗的腳本中，經修復後成功的比例
+            "repair_success_rate": repaired / failed_first if failed_first else 0.0,
+            "avg_repair_iterations": iterations / runs if runs else 0.0,
+            "avg_time_to_working": sum(working) / len(working) if working else 0.0,
+            "p50_time_to_working": working[len(working) // 2] if working else 0.0,
+        }
@@ -0,0 +1,208 @@
+"""
+對話記憶
+保留 token 預算內的近期對話，較舊的對話在背景壓縮為滾動摘要，
+讓多輪對話的提示長度維持有界
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from rate_limiter import estimate_tokens
+
+# 背景摘要共用的執行緒池
+_compaction_executor = ThreadPoolExecutor(
+    max_workers=2, thread_name_prefix="memory-compact"
+)
+
+ROLE_LABELS = {"user": "用戶", "assistant": "系統"}
+
+TRUNCATION_MARK = "…（已截斷）"
+
+SUMMARY_PROMPT = """請將以下 Omniverse 技術對話壓縮為簡潔的中文摘要，
+保留用戶關注的主題、已確認的結論與未解決的問題，不超過 {limit} 字。
+
+既有摘要：
+{summary}
+
+新增對話：
+{transcript}
+
+摘要："""
+
+
+def extractive_summarizer(
+    summary: str, messages: List[Dict[str, str]], limit: int = 400
+) -> str:
+    """不依賴模型的摘要：保留每個問題與回答開頭，超過長度時捨棄最舊的內容"""
+    lines = [line for line in summary.split("\n") if line.strip()]
+    for message in messages:
+        text = " ".join(message["content"].split())
+        size = 60 if message["role"] == "user" else 40
+        lines.append(
+            f"{ROLE_LABELS.get(message['role'], message['role'])}：{text[:size]}"
+        )
+    while lines and sum(len(line) for line in lines) > limit:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """保留開頭使估計 token 數不超過預算，截斷時加上標記"""
+    if estimate_tokens(text) <= budget:
+        return text
+    budget -= estimate_tokens(TRUNCATION_MARK)
+    cjk = others = end = 0
+    for end, ch in enumerate(text):
+        if ord(ch) >= 0x2E80:
+            cjk += 1
+        else:
+            others += 1
+        if cjk + (others + 3) // 4 > budget:
+            break
+    return text[:end] + TRUNCATION_MARK
+
+
+def create_llm_summarizer(
+    model, limit: int = 400
+) -> Callable[[str, List[Dict[str, str]]], str]:
+    """以模型產生摘要，失敗時退回抽取式摘要"""
+
+    def summarize(summary: str, messages: List[Dict[str, str]]) -> str:
+        transcript = "\n".join(
+            f"{ROLE_LABELS.get(m['role'], m['role'])}：{m['content']}" for m in messages
+        )
+        try:
+            result = model.invoke(SUMMARY_PROMPT.format(
+                limit=limit, summary=summary or "（無）", transcript=transcript
+            ))
+            text = getattr(result, "content", result)
+            return str(text).strip()[:limit * 2]
+        except Exception as e:
+            print(f"對話摘要生成失敗，改用抽取式摘要: {e}")
+            return extractive_summarizer(summary, messages, limit)
+
+    return summarize
+
+
+class ConversationMemory:
+    """token 預算內的滑動視窗 + 背景壓縮的滾動摘要"""
+
+    def __init__(
+        self,
+        max_context_tokens: int = 1200,
+        summarizer: Optional[Callable] = None,
+        compact_threshold_tokens: int = 600,
+    ):
+        self.max_context_tokens = max_context_tokens
+        # 視窗外的對話累積超過此 token 數時觸發壓縮
+        self.compact_threshold_tokens = compact_threshold_tokens
+        self.summarizer = summarizer or extractive_summarizer
+        self.summary = ""
+        self._messages: List[Dict[str, str]] = []
+        self._tokens: List[int] = []
+        self._lock = threading.Lock()
+        self._compacting = False
+        # clear() 後遞增，讓進行中的壓縮結果失效
+        self._generation = 0
+
+    def add(self, role: str, content: str):
+        """加入一則訊息，必要時排程背景壓縮"""
+        with self._lock:
+            self._messages.append({"role": role, "content": content})
+            self._tokens.append(estimate_tokens(content))
+            self._schedule_compaction()
+
+    def _schedule_compaction(self):
+        """視窗外的對話超過門檻時提交背景壓縮（呼叫者需持有鎖）"""
+        if self._compacting:
+            return
+        evicted = self._window_start()
+        if evicted == 0 or sum(self._tokens[:evicted]) < self.compact_threshold_tokens:
+            return
+        self._compacting = True
+        _compaction_executor.submit(
+            self._compact,
+            self.summary,
+            list(self._messages[:evicted]),
+            self._generation,
+        )
+
+    def _summary_budget(self) -> int:
+        return max(0, min(estimate_tokens(self.summary), self.max_context_tokens // 3))
+
+    def _message_budget(self) -> int:
+        return self.max_context_tokens - self._summary_budget()
+
+    def _window_start(self) -> int:
+        """token 預算內最舊一則訊息的索引（呼叫者需持有鎖）"""
+        budget = self._message_budget()
+        used = 0
+        start = len(self._messages)
+        for index in range(len(self._messages) - 1, -1, -1):
+            used += self._tokens[index]
+            if used > budget and start < len(self._messages):
+                break
+            start = index
+        return start
+
+    def _compact(self, summary: str, batch: List[Dict[str, str]], generation: int):
+        """在背景將視窗外的對話併入摘要，完成後才從記憶中移除"""
+        try:
+            new_summary = self.summarizer(summary, batch)
+        except Exception as e:
+            print(f"對話記憶壓縮失敗: {e}")
+            new_summary = extractive_summarizer(summary, batch)
+        with self._lock:
+            self._compacting = False
+            if generation != self._generation:
+                return
+            self.summary = new_summary
+            # 壓縮期間只會在尾端新增訊息，被摘要的批次仍位於開頭
+            del self._messages[:len(batch)]
+            del self._tokens[:len(batch)]
+            # 壓縮期間累積的對話可能已再次超過門檻
+            self._schedule_compaction()
+
+    def context(self) -> str:
+        """提供給鏈的對話上下文；沒有歷史時回傳空字串"""
+        with self._lock:
+            start = self._window_start()
+            recent = self._messages[start:]
+            summary = self.summary
+            budget = self._message_budget()
+            # 最新一則訊息總會保留；單獨就超過預算時截斷到剩餘預算
+            if recent and self._tokens[-1] > budget:
+                newest = recent[-1]
+                content = truncate_to_tokens(newest["content"], budget)
+                recent[-1] = dict(newest, content=content)
+        if not recent and not summary:
+            return ""
+
+        parts = []
+        if summary:
+            parts.append(f"先前對話摘要：\n{summary}")
+        if recent:
+            transcript = "\n".join(
+                f"{ROLE_LABELS.get(m['role'], m['role'])}：{m['content']}"
+                for m in recent
+            )
+            parts.append(f"近期對話：\n{transcript}")
+        return "\n\n".join(parts) + "\n\n"
+
+    def clear(self):
+        with self._lock:
+            self._messages.clear()
+            self._tokens.clear()
+            self.summary = ""
+            self._generation += 1
+
+    def stats(self) -> Dict[str, int]:
+        """記憶體使用狀況"""
+        with self._lock:
+            return {
+                "messages": len(self._messages),
+                "tokens": sum(self._tokens),
+                "window_start": self._window_start(),
+                "summary_tokens": estimate_tokens(self.summary),
+            }
@@ -0,0 +1,396 @@
+"""
+引擎設定層
+以型別化的 dataclass 描述模型層級、端點、緩存 TTL、逾時、重試與執行緒池大小；
+優先順序為 預設值 < YAML 設定檔 (ENGINE_CONFIG_FILE) < 環境變數，
+設定檔變更時自動重新載入。
+設定以 SettingsProvider 注入 UnifiedEngineConfig，再經由它交給鏈與連接測試
+
+    ENGINE_CONFIG_FILE=engine_config.yaml streamlit run streamlit_app.py
+    ENGINE__RESILIENCE__DEADLINE=20 ENGINE__GROQ__MODELS__CODE=llama3-8b-8192 \\
+        python streamlit_api.py
+"""
+
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field, fields, is_dataclass, replace
+from typing import (
+    Any,
+    Dict,
+    Mapping,
+    Optional,
+    Union,
+    get_args,
+    get_origin,
+    get_type_hints,
+)
+
+try:
+    import yaml
+    YAML_AVAILABLE = True
+except ImportError:
+    YAML_AVAILABLE = False
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+
+# 通用環境變數前綴：ENGINE__<區段>__<欄位>[__<鍵>]
+ENV_PREFIX = "ENGINE__"
+
+# 既有的環境變數名稱 -> 設定路徑
+ENV_ALIASES = {
+    "GROQ_API_KEY": ("groq", "api_key"),
+    "GROQ_BASE_URL": ("groq", "base_url"),
+    "OLLAMA_BASE_URL": ("ollama", "base_url"),
+    "SHARED_CACHE_TTL": ("cache", "response_ttl"),
+}
+
+
+@dataclass
+class GroqSettings:
+    """Groq 雲端服務"""
+    # 只從 GROQ_API_KEY、ENGINE__GROQ__API_KEY 或設定檔取得；未設定時 Groq 引擎不可用
+    api_key: Optional[str] = None
+    # None 時使用 Groq SDK 的預設端點；指向 llm_stub_server 可離線測試
+    base_url: Optional[str] = None
+    models: Dict[str, str] = field(default_factory=lambda: {
+        "default": "llama3-8b-8192",
+        "fast": "llama3-8b-8192",
+        "code": "llama3-70b-8192",
+        "semantic": "llama3-8b-8192",
+    })
+
+
+@dataclass
+class OllamaSettings:
+    """Ollama 本地服務"""
+    base_url: str = "http://localhost:11434"
+    models: Dict[str, str] = field(default_factory=lambda: {
+        "default": "llama3.2:3b",
+        "fast": "llama3.2:3b",
+        "code": "llama3.2:3b",
+        "semantic": "llama3.2:3b",
+    })
+
+
+@dataclass
+class GenerationSettings:
+    """通用生成參數"""
+    temperature: float = 0.7
+    max_tokens: int = 1000
+    top_p: float = 1.0
+
+
+@dataclass
+class ChainSettings:
+    """各條鏈的取樣溫度與修復回覆長度"""
+    semantic_temperature: float = 0.7
+    code_temperature: float = 0.3
+    repair_temperature: float = 0.1
+    repair_max_tokens: int = 800
+
+
+@dataclass
+class ResilienceSettings:
+    """截止時間、重試與對沖請求"""
+    deadline: float = 60.0
+    max_retries: int = 2
+    backoff_base: float = 0.5
+    # 對沖目標："same"、"ollama" 或 None (停用)
+    hedge_to: Optional[str] = None
+    hedge_quantile: float = 0.95
+
+
+@dataclass
+class ProbeSettings:
+    """引擎連接測試"""
+    timeout: float = 5.0
+    # Groq 測試使用的模型層級
+    groq_task: str = "fast"
+
+
+@dataclass
+class CacheSettings:
+    """緩存存活秒數"""
+    health_ttl: float = 30.0
+    response_ttl: float = 3600.0
+
+
+@dataclass
+class PoolSettings:
+    """執行緒池與配額等待"""
+    job_workers: int = 8
+    rate_limit_max_wait: float = 30.0
+
+
+@dataclass
+class AdmissionSettings:
+    """API 准入控制：同時執行的鏈調用數、各優先級的佇列上限與可接受的預估等待秒數"""
+    concurrency: int = 8
+    interactive_queue: int = 32
+    interactive_deadline: float = 10.0
+    bulk_queue: int = 8
+    bulk_deadline: float = 30.0
+    # 以引擎延遲的哪個百分位數估計每個請求的處理時間
+    estimate_quantile: float = 0.5
+
+
+@dataclass
+class EngineSettings:
+    """引擎設定"""
+    # 設定檔重新載入時若此值改變，引擎隨之切換
+    engine: str = "groq"
+    groq: GroqSettings = field(default_factory=GroqSettings)
+    ollama: OllamaSettings = field(default_factory=OllamaSettings)
+    generation: GenerationSettings = field(default_factory=GenerationSettings)
+    chains: ChainSettings = field(default_factory=ChainSettings)
+    resilience: ResilienceSettings = field(default_factory=ResilienceSettings)
+    probe: ProbeSettings = field(default_factory=ProbeSettings)
+    cache: CacheSettings = field(default_factory=CacheSettings)
+    pools: PoolSettings = field(default_factory=PoolSettings)
+    admission: AdmissionSettings = field(default_factory=AdmissionSettings)
+
+    @classmethod
+    def from_dict(cls, data: Optional[Mapping[str, Any]] = None) -> "EngineSettings":
+        """以巢狀字典覆蓋預設值（未知欄位與型別錯誤時拋出 ValueError）"""
+        return cls().merged(data or {})
+
+    def merged(self, data: Mapping[str, Any]) -> "EngineSettings":
+        """回傳覆蓋部分欄位後的新設定；模型對應表逐鍵合併"""
+        settings = _merge(self, data, "")
+        settings.validate()
+        return settings
+
+    def validate(self):
+        if self.engine not in ("groq", "ollama"):
+            raise ValueError(f"設定 engine 必須是 groq 或 ollama: {self.engine!r}")
+        for name in ("groq", "ollama"):
+            if "default" not in getattr(self, name).models:
+                raise ValueError(f"設定 {name}.models 缺少 default 層級")
+        if self.resilience.hedge_to not in (None, "same", "ollama"):
+            raise ValueError(
+                "設定 resilience.hedge_to 必須是 same、ollama 或留空: "
+                f"{self.resilience.hedge_to!r}"
+            )
+        if self.resilience.max_retries < 0:
+            raise ValueError("設定 resilience.max_retries 不可為負數")
+        for key, value in (
+            ("resilience.deadline", self.resilience.deadline),
+            ("probe.timeout", self.probe.timeout),
+            ("pools.job_workers", self.pools.job_workers),
+            ("admission.concurrency", self.admission.concurrency),
+            ("admission.interactive_deadline", self.admission.interactive_deadline),
+            ("admission.bulk_deadline", self.admission.bulk_deadline),
+        ):
+            if value <= 0:
+                raise ValueError(f"設定 {key} 必須大於 0: {value!r}")
+
+    def to_dict(self, redact: bool = True) -> Dict[str, Any]:
+        data = asdict(self)
+        if redact and data["groq"]["api_key"]:
+            data["groq"]["api_key"] = "***"
+        return data
+
+
+def _coerce(value: Any, hint: Any, key: str) -> Any:
+    """把設定檔或環境變數的值轉為欄位型別"""
+    if get_origin(hint) is Union:
+        if value is None or (
+            isinstance(value, str) and value.strip().lower() in ("", "none", "null")
+        ):
+            return None
+        hint = next(arg for arg in get_args(hint) if arg is not type(None))
+    if get_origin(hint) is dict:
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                raise ValueError(f"設定 {key} 需要 JSON 物件: {value!r}")
+        if not isinstance(value, Mapping):
+            raise ValueError(f"設定 {key} 需要對應表: {value!r}")
+        return {str(k): str(v) for k, v in value.items()}
+    if hint is bool:
+        if isinstance(value, str):
+            return value.strip().lower() in ("1", "true", "yes", "on")
+        return bool(value)
+    if hint in (int, float):
+        if isinstance(value, bool):
+            raise ValueError(f"設定 {key} 需要 {hint.__name__}: {value!r}")
+        try:
+            return hint(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"設定 {key} 需要 {hint.__name__}: {value!r}")
+    if value is None:
+        raise ValueError(f"設定 {key} 不可留空")
+    return str(value)
+
+
+def _merge(instance, data: Mapping[str, Any], prefix: str):
+    if not isinstance(data, Mapping):
+        raise ValueError(f"設定 {prefix.rstrip('.') or '根'} 需要對應表: {data!r}")
+    hints = get_type_hints(type(instance))
+    names = {f.name for f in fields(instance)}
+    changes = {}
+    for name, value in data.items():
+        key = f"{prefix}{name}"
+        if name not in names:
+            raise ValueError(f"未知的設定: {key}")
+        current = getattr(instance, name)
+        if is_dataclass(current):
+            changes[name] = _merge(current, value or {}, f"{key}.")
+        elif get_origin(hints[name]) is dict and isinstance(value, Mapping):
+            changes[name] = {**current, **_coerce(value, hints[name], key)}
+        else:
+            changes[name] = _coerce(value, hints[name], key)
+    return replace(instance, **changes)
+
+
+def read_config_file(path: str) -> Dict[str, Any]:
+    """讀取 YAML（或 .json）設定檔"""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if path.endswith(".json"):
+        data = json.loads(text or "{}")
+    elif YAML_AVAILABLE:
+        data = yaml.safe_load(text)
+    else:
+        raise RuntimeError(f"讀取 {path} 需要 PyYAML（pip install pyyaml）")
+    return data or {}
+
+
+def env_overrides(environ: Optional[Mapping[str, str]] = None) -> Dict[str, Any]:
+    """環境變數轉為巢狀字典（既有名稱與 ENGINE__ 前綴）"""
+    environ = os.environ if environ is None else environ
+    data: Dict[str, Any] = {}
+
+    def put(path, value):
+        node = data
+        for part in path[:-1]:
+            node = node.setdefault(part, {})
+        node[path[-1]] = value
+
+    for name, path in ENV_ALIASES.items():
+        if environ.get(name):
+            put(path, environ[name])
+    for name, value in environ.items():
+        if name.startswith(ENV_PREFIX) and len(name) > len(ENV_PREFIX):
+            put([part.lower() for part in name[len(ENV_PREFIX):].split("__")], value)
+    return data
+
+
+def load_settings(
+    path: Optional[str] = None, environ: Optional[Mapping[str, str]] = None
+) -> EngineSettings:
+    """預設值 < 設定檔 < 環境變數"""
+    environ = os.environ if environ is None else environ
+    settings = EngineSettings()
+    if path:
+        settings = settings.merged(read_config_file(path))
+    return settings.merged(env_overrides(environ))
+
+
+class SettingsProvider:
+    """持有目前的設定；設定檔修改時間改變後重新載入，新設定無效時保留舊設定"""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        environ: Optional[Mapping[str, str]] = None,
+        check_interval: float = 1.0,
+        settings: Optional[EngineSettings] = None,
+    ):
+        self.path = path
+        self.environ = environ
+        self.check_interval = check_interval
+        self.version = 1
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._observer = None
+        self._mtime = self._stat()
+        self._checked = time.monotonic()
+        self._settings = (
+            settings if settings is not None else load_settings(path, environ)
+        )
+
+    @classmethod
+    def from_env(cls) -> "SettingsProvider":
+        return cls(os.environ.get("ENGINE_CONFIG_FILE") or None)
+
+    @classmethod
+    def static(cls, settings: EngineSettings) -> "SettingsProvider":
+        """固定不變的設定（測試注入用）"""
+        return cls(settings=settings)
+
+    def _stat(self) -> Optional[float]:
+        if not self.path:
+            return None
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def current(self) -> EngineSettings:
+        """目前設定；每 check_interval 秒最多檢查一次設定檔"""
+        if self.path and time.monotonic() - self._checked >= self.check_interval:
+            self._checked = time.monotonic()
+            if self._stat() != self._mtime:
+                self.reload()
+        return self._settings
+
+    def reload(self) -> bool:
+        """重新讀取設定檔與環境變數，成功時遞增 version"""
+        with self._lock:
+            self._mtime = self._stat()
+            try:
+                settings = load_settings(self.path, self.environ)
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"設定重新載入失敗，沿用目前設定: {e}")
+                return False
+            self.last_error = None
+            if settings != self._settings:
+                self._settings = settings
+                self.version += 1
+            return True
+
+    def watch(self) -> bool:
+        """以 watchdog 監看設定檔，修改後立即重新載入（未安裝時依 current() 的輪詢）"""
+        if not (self.path and WATCHDOG_AVAILABLE) or self._observer is not None:
+            return False
+        provider = self
+        target = os.path.abspath(self.path)
+
+        class _Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                paths = (
+                    getattr(event, "src_path", ""),
+                    getattr(event, "dest_path", ""),
+                )
+                if target in (os.path.abspath(p) for p in paths if p):
+                    provider.reload()
+
+        self._observer = Observer()
+        self._observer.schedule(
+            _Handler(), os.path.dirname(target) or ".", recursive=False
+        )
+        self._observer.daemon = True
+        self._observer.start()
+        return True
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer = None
+
+
+# 全域設定來源
+settings_provider = SettingsProvider.from_env()
+
+
+def get_settings() -> EngineSettings:
+    return settings_provider.current()
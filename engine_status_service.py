@@ -0,0 +1,86 @@
+"""
+引擎狀態快照服務
+由單一背景執行緒定期刷新引擎狀態，所有 Streamlit 會話只讀取最新快照，渲染時不等待網路
+I/O
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class EngineStatusService:
+    """進程內共用的引擎狀態快照"""
+
+    def __init__(self, config, interval: float = 30.0):
+        self.config = config
+        self.interval = interval
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._updated_at = 0.0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._force_next = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "EngineStatusService":
+        """啟動背景刷新執行緒（重複呼叫無效果）"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopped.clear()
+                self._thread = threading.Thread(
+                    target=self._loop, name="engine-status", daemon=True
+                )
+                self._thread.start()
+        return self
+
+    def stop(self):
+        """停止背景刷新"""
+        self._stopped.set()
+        self._wakeup.set()
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            # 刷新前先清除喚醒事件：刷新期間收到的要求會讓下一次等待立即結束，不會遺失
+            self._wakeup.clear()
+            with self._lock:
+                force = self._force_next
+                self._force_next = False
+            self.refresh(force=force)
+            self._wakeup.wait(self.interval)
+
+    def refresh(self, force: bool = False):
+        """實際查詢引擎狀態並更新快照（只在背景執行緒中呼叫）"""
+        try:
+            status = self.config.get_engine_status(force_refresh=force)
+            status["rate_limits"] = self.config.get_rate_limit_status()
+            error = None
+        except Exception as e:
+            status, error = None, str(e)
+            print(f"引擎狀態刷新失敗: {e}")
+
+        with self._lock:
+            if status is not None:
+                self._snapshot = status
+            elif self._snapshot is not None:
+                self._snapshot = dict(self._snapshot, error=error)
+            else:
+                self._snapshot = {"error": error}
+            self._updated_at = time.time()
+
+    def request_refresh(self, force: bool = False):
+        """要求背景執行緒盡快刷新（不阻塞呼叫者）"""
+        with self._lock:
+            self._force_next = self._force_next or force
+        self._wakeup.set()
+
+    def snapshot(self) -> Optional[Dict[str, Any]]:
+        """最新的狀態快照；尚未完成第一次刷新時回傳 None"""
+        with self._lock:
+            return self._snapshot
+
+    @property
+    def age(self) -> Optional[float]:
+        """快照距今秒數"""
+        with self._lock:
+            return time.time() - self._updated_at if self._updated_at else None
@@ -0,0 +1,206 @@
+"""
+可設定延遲特性的假模型
+首個 token 延遲、每秒 token 數與抖動皆可調整，串流與非同步路徑都會真實等待（非同步以
+asyncio.sleep，不佔用事件迴圈），
+並回報 usage_metadata；可注入 get_chain(llm) 與 OmniverseCodeGenerator(llm=...)，
+讓測試與基準測試不需網路
+"""
+
+import asyncio
+import random
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from token_usage import count_tokens
+
+# 延遲特性：首個 token 秒數、每秒 token 數（0 為不限速）與相對抖動
+PROFILES: Dict[str, Dict[str, float]] = {
+    "instant": {"first_token_latency": 0.0, "tokens_per_second": 0.0, "jitter": 0.0},
+    "groq": {"first_token_latency": 0.2, "tokens_per_second": 400.0, "jitter": 0.2},
+    "ollama": {"first_token_latency": 0.8, "tokens_per_second": 30.0, "jitter": 0.2},
+}
+
+SEMANTIC_RESPONSE = (
+    "技術架構分析：此需求涉及 USD Stage、Kit Commands 與 Extension 架構。\n"
+    "實作策略建議：先以 omni.usd 取得 Stage，再以 UsdGeom 定義物件並設置變換。\n"
+    "整合方案設計：透過 Nucleus 共享 USD 圖層，讓其他服務即時看到變更。\n"
+    "開發指導原則：批量操作使用 Sdf.ChangeBlock，避免逐一觸發通知。"
+)
+
+CODE_RESPONSE = '''以下代碼建立一個紅色立方體：
+
+```python
+import omni.usd
+from pxr import UsdGeom, Gf
+
+stage = omni.usd.get_context().get_stage()
+cube = UsdGeom.Cube.Define(stage, "/World/Cube")
+cube.CreateSizeAttr(2.0)
+UsdGeom.Xformable(cube).AddTranslateOp().Set(Gf.Vec3d(0, 1, 0))
+cube.CreateDisplayColorAttr([Gf.Vec3f(1.0, 0.0, 0.0)])
+```
+
+說明：立方體位於 (0, 1, 0)，大小為 2。'''
+
+# CJK 字元一個 token，其餘以單字（含前置空白）為 token
+_TOKEN = re.compile(r"\s*[\u2e80-\uffff]|\s*[^\s\u2e80-\uffff]+|\s+")
+
+
+def split_tokens(text: str) -> List[str]:
+    return _TOKEN.findall(text)
+
+
+def default_response(prompt: str) -> str:
+    """代碼生成提示（含 Python 代碼塊範例）回傳代碼，其餘回傳語意分析文字"""
+    return CODE_RESPONSE if "```python" in prompt else SEMANTIC_RESPONSE
+
+
+class FakeStreamingLLM(BaseChatModel):
+    """延遲可設定的確定性聊天模型"""
+
+    response: Optional[str] = None
+    # 依提示文字決定回應；response 與 responder 皆未指定時使用 default_response
+    responder: Optional[Callable[[str], str]] = None
+    first_token_latency: float = 0.0
+    tokens_per_second: float = 0.0
+    jitter: float = 0.0
+    max_tokens: Optional[int] = None
+    seed: int = 0
+    # 不使用全局 LLM 緩存，每次調用都經過延遲模擬
+    cache: Optional[bool] = False
+
+    _rng: random.Random = PrivateAttr(default=None)
+    _rng_lock: Any = PrivateAttr(default=None)
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._rng = random.Random(self.seed)
+        self._rng_lock = threading.Lock()
+
+    @classmethod
+    def from_profile(cls, name: str = "groq", **overrides: Any) -> "FakeStreamingLLM":
+        """以預設的延遲特性建立（groq / ollama / instant）"""
+        if name not in PROFILES:
+            raise ValueError(f"未知的延遲特性: {name}（可用: {', '.join(PROFILES)}）")
+        metadata = {"engine": "fake", "model": f"fake-{name}", "task_type": "default"}
+        return cls(**{**PROFILES[name], "metadata": metadata, **overrides})
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"first_token_latency": self.first_token_latency,
+                "tokens_per_second": self.tokens_per_second, "seed": self.seed}
+
+    def _vary(self, seconds: float) -> float:
+        if not seconds or not self.jitter:
+            return seconds
+        with self._rng_lock:
+            factor = 1.0 + self._rng.uniform(-self.jitter, self.jitter)
+        return max(0.0, seconds * factor)
+
+    def _plan(self, messages: List[BaseMessage]):
+        """回應的 token 與每個 token 之前的等待秒數"""
+        prompt = "\n".join(str(message.content) for message in messages)
+        if self.response is not None:
+            text = self.response
+        else:
+            text = (self.responder or default_response)(prompt)
+        tokens = split_tokens(text)
+        if self.max_tokens is not None:
+            tokens = tokens[:self.max_tokens]
+        interval = 1.0 / self.tokens_per_second if self.tokens_per_second else 0.0
+        delays = [self._vary(self.first_token_latency)] + [
+            self._vary(interval) for _ in tokens[1:]
+        ]
+        usage = {"input_tokens": count_tokens(prompt), "output_tokens": len(tokens)}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        return tokens, delays, usage
+
+    @staticmethod
+    def _chunk(
+        token: str, usage: Optional[Dict[str, int]] = None
+    ) -> ChatGenerationChunk:
+        return ChatGenerationChunk(
+            message=AIMessageChunk(content=token, usage_metadata=usage)
+        )
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        tokens, delays, usage = self._plan(messages)
+        for index, (token, delay) in enumerate(zip(tokens, delays)):
+            if delay:
+                time.sleep(delay)
+            chunk = self._chunk(token, usage if index == len(tokens) - 1 else None)
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        tokens, delays, usage = self._plan(messages)
+        for index, (token, delay) in enumerate(zip(tokens, delays)):
+            if delay:
+                await asyncio.sleep(delay)
+            chunk = self._chunk(token, usage if index == len(tokens) - 1 else None)
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    @staticmethod
+    def _result(text: str, usage: Dict[str, int]) -> ChatResult:
+        return ChatResult(
+            generations=[
+                ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))
+            ]
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        # 非串流調用也依相同的延遲特性等待完整回應
+        tokens, delays, usage = self._plan(messages)
+        total = sum(delays)
+        if total:
+            time.sleep(total)
+        return self._result("".join(tokens), usage)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens, delays, usage = self._plan(messages)
+        total = sum(delays)
+        if total:
+            await asyncio.sleep(total)
+        return self._result("".join(tokens), usage)
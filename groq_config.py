@@ -3,10 +3,17 @@
 支援 Groq 雲端服務和 Ollama 本地服務的動態切換
 """
 
-from groq import Groq
-from typing import Optional, Dict, Any
-import os
 import time
+from dataclasses import asdict
+from typing import Any, Dict, Optional, Union
+
+from groq import Groq
+
+from engine_settings import EngineSettings, SettingsProvider, settings_provider
+from metrics import MetricsCallbackHandler
+from rate_limiter import RateLimiterRegistry, estimate_tokens
+from resilience import ResilientRunnable, estimate_latency, get_resilience_stats
+from tracing import tracer
 
 try:
     from langchain_community.llms import Ollama
@@ -21,79 +28,161 @@ except ImportError:
     GROQ_AVAILABLE = False
 
 
+MISSING_GROQ_KEY = (
+    "未設定 Groq API 金鑰，請設置 GROQ_API_KEY 環境變數或設定檔的 groq.api_key"
+)
+
+
 class UnifiedEngineConfig:
     """統一 AI 引擎配置管理器"""
     
-    def __init__(self):
+    def __init__(self, settings: Union[EngineSettings, SettingsProvider, None] = None):
+        # 設定來源：未指定時讀取目前的環境變數與 ENGINE_CONFIG_FILE，測試可注入
+        # EngineSettings
+        if settings is None:
+            settings = SettingsProvider.from_env()
+        elif isinstance(settings, EngineSettings):
+            settings = SettingsProvider.static(settings)
+        self.settings_provider = settings
+        current = settings.current()
+        
         # 當前引擎設定
-        self.current_engine = "groq"  # 預設使用 Groq
+        self.current_engine = current.engine
+        
+        # 初始化客戶端
+        self._groq_client = None
+        self._ollama_available = OLLAMA_AVAILABLE
+        self._groq_available = GROQ_AVAILABLE
+        
+        # 連接狀態緩存 (避免頻繁測試)
+        self._connection_cache = {}
+        self._last_cache_time = {}
+        
+        # 跨進程共享儲存 (多 worker 部署時共用健康狀態)
+        self._shared_store = None
+        
+        # Groq 用戶端速率限制 (每個模型獨立的請求數/token 數令牌桶)
+        self.rate_limiters = RateLimiterRegistry(
+            max_wait=current.pools.rate_limit_max_wait
+        )
+        
+        # 模型對應表、端點、生成參數、緩存 TTL 與韌性設定皆來自設定
+        self.apply_settings(current)
+        if self.current_engine == "groq" and not self.groq_api_key:
+            print(f"警告: {MISSING_GROQ_KEY}")
+    
+    def apply_settings(self, settings: EngineSettings):
+        """套用設定（設定檔重新載入後由 refresh_settings 呼叫）"""
+        groq = settings.groq
+        previous = getattr(self, "_settings", None)
+        if previous is not None:
+            if (groq.api_key, groq.base_url, settings.probe.timeout) != (
+                    self.groq_api_key, self.groq_base_url, previous.probe.timeout):
+                self._groq_client = None
+            # 設定中的 engine 改變時切換引擎（執行期間以 switch_engine
+            # 手動切換的不受其他欄位的重新載入影響）
+            if (
+                settings.engine != previous.engine
+                and settings.engine != self.current_engine
+            ):
+                print(
+                    f"設定重新載入：引擎由 {self.current_engine} "
+                    f"切換為 {settings.engine}"
+                )
+                self.current_engine = settings.engine
+                self._clear_health_cache()
+        self._settings = settings
+        self._settings_version = self.settings_provider.version
         
         # Groq 配置
-        self.groq_api_key = "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"
-        self.groq_models = {
-            "default": "llama3-8b-8192",
-            "fast": "llama3-8b-8192",
-            "code": "llama3-70b-8192",
-            "semantic": "llama3-8b-8192"
-        }
+        self.groq_api_key = groq.api_key
+        self.groq_base_url = groq.base_url
+        self.groq_models = dict(groq.models)
         
         # Ollama 配置
-        self.ollama_models = {
-            "default": "llama3.2:3b",
-            "fast": "llama3.2:3b", 
-            "code": "llama3.2:3b",
-            "semantic": "llama3.2:3b"
-        }
-        self.ollama_base_url = "http://localhost:11434"
+        self.ollama_models = dict(settings.ollama.models)
+        self.ollama_base_url = settings.ollama.base_url
         
         # 通用生成參數
         self.default_params = {
-            "temperature": 0.7,
-            "max_tokens": 1000,
-            "top_p": 1,
+            "temperature": settings.generation.temperature,
+            "max_tokens": settings.generation.max_tokens,
+            "top_p": settings.generation.top_p,
             "stream": False
         }
         
-        # 初始化客戶端
-        self._groq_client = None
-        self._ollama_available = OLLAMA_AVAILABLE
-        self._groq_available = GROQ_AVAILABLE
+        self._cache_duration = settings.cache.health_ttl
+        self.rate_limiters.set_max_wait(settings.pools.rate_limit_max_wait)
         
-        # 連接狀態緩存 (避免頻繁測試)
-        self._connection_cache = {}
-        self._cache_duration = 30  # 緩存30秒
-        self._last_cache_time = {}
+        # 韌性設定 (截止時間、重試、對沖請求)
+        self.resilience_options = asdict(settings.resilience)
+    
+    def refresh_settings(self) -> EngineSettings:
+        """設定來源有新版本時重新套用"""
+        settings = self.settings_provider.current()
+        if self.settings_provider.version != self._settings_version:
+            self.apply_settings(settings)
+        return self._settings
+    
+    @property
+    def settings(self) -> EngineSettings:
+        """目前生效的設定"""
+        return self.refresh_settings()
+    
+    @property
+    def settings_version(self) -> int:
+        """設定版本，鏈以此判斷模型實例是否需要重建"""
+        self.refresh_settings()
+        return self._settings_version
+    
+    def attach_shared_store(self, store):
+        """連接跨進程共享儲存，讓所有 worker 共用連接狀態緩存"""
+        self._shared_store = store
     
     @property
     def groq_client(self) -> Optional[Groq]:
         """取得 Groq 客戶端"""
-        if not self._groq_client and self._groq_available:
+        self.refresh_settings()
+        if not self._groq_client and self._groq_available and self.groq_api_key:
             try:
-                self._groq_client = Groq(api_key=self.groq_api_key)
+                self._groq_client = Groq(
+                    api_key=self.groq_api_key,
+                    base_url=self.groq_base_url,
+                    timeout=self._settings.probe.timeout,
+                )
             except Exception as e:
                 print(f"Groq 客戶端初始化失敗: {e}")
         return self._groq_client
     
     def _is_cache_valid(self, engine_name: str) -> bool:
         """檢查緩存是否仍然有效"""
+        if self._shared_store is not None:
+            return self._shared_store.get("engine_health", engine_name) is not None
         if engine_name not in self._last_cache_time:
             return False
         return time.time() - self._last_cache_time[engine_name] < self._cache_duration
     
     def _get_cached_status(self, engine_name: str) -> Optional[bool]:
         """獲取緩存的連接狀態"""
+        if self._shared_store is not None:
+            return self._shared_store.get("engine_health", engine_name)
         if self._is_cache_valid(engine_name):
             return self._connection_cache.get(engine_name)
         return None
     
     def _cache_status(self, engine_name: str, status: bool):
         """緩存連接狀態"""
+        if self._shared_store is not None:
+            self._shared_store.set(
+                "engine_health", engine_name, status, ttl=self._cache_duration
+            )
         self._connection_cache[engine_name] = status
         self._last_cache_time[engine_name] = time.time()
     
     def get_available_engines(self, force_test: bool = False) -> Dict[str, bool]:
         """取得可用的引擎列表"""
         engines = {}
+        self.refresh_settings()
         
         # 只測試當前引擎，其他引擎使用緩存或假設不可用
         if self.current_engine == "groq":
@@ -130,7 +219,9 @@ class UnifiedEngineConfig:
                     groq_status = self._groq_available and self.test_groq_connection()
                     self._cache_status("groq", groq_status)
                 else:
-                    groq_status = True if self._groq_available else False  # 假設可用
+                    groq_status = self._groq_available and bool(
+                        self.groq_api_key
+                    )  # 有金鑰時假設可用
             engines["groq"] = groq_status
         
         return engines
@@ -155,50 +246,134 @@ class UnifiedEngineConfig:
                 return False
         
         self.current_engine = engine_name
-        # 清除緩存以強制重新測試
+        self._clear_health_cache()
+        return True
+    
+    def _clear_health_cache(self):
+        """清除連接狀態緩存以強制重新測試"""
         self._connection_cache.clear()
         self._last_cache_time.clear()
-        return True
+        if self._shared_store is not None:
+            self._shared_store.delete("engine_health")
     
     def get_current_engine(self) -> str:
         """取得當前引擎名稱"""
         return self.current_engine
     
-    def get_model(self, task_type: str = "default") -> str:
+    def get_model(
+        self, task_type: str = "default", engine: Optional[str] = None
+    ) -> str:
         """根據當前引擎和任務類型選擇模型"""
-        if self.current_engine == "groq":
+        if (engine or self.current_engine) == "groq":
             return self.groq_models.get(task_type, self.groq_models["default"])
         else:  # ollama
             return self.ollama_models.get(task_type, self.ollama_models["default"])
     
-    def create_model_instance(self, task_type: str = "default", **kwargs):
-        """創建模型實例"""
-        model_name = self.get_model(task_type)
+    def create_model_instance(
+        self, task_type: str = "default", engine: Optional[str] = None, **kwargs
+    ):
+        """創建模型實例 (engine 未指定時使用當前引擎)"""
+        self.refresh_settings()
+        engine = engine or self.current_engine
+        model_name = self.get_model(task_type, engine)
         params = self.default_params.copy()
         params.update(kwargs)
+        # 回調（用量統計等）由 metadata 取得引擎、模型與任務類型
+        metadata = {"engine": engine, "model": model_name, "task_type": task_type}
         
-        if self.current_engine == "groq":
+        if engine == "groq":
             if not self._groq_available:
                 raise RuntimeError("Groq 不可用")
-            return ChatGroq(
+            if not self.groq_api_key:
+                raise RuntimeError(MISSING_GROQ_KEY)
+            max_tokens = params.get("max_tokens", 1000)
+            model = ChatGroq(
                 groq_api_key=self.groq_api_key,
+                groq_api_base=self.groq_base_url,
                 model_name=model_name,
                 temperature=params.get("temperature", 0.7),
-                max_tokens=params.get("max_tokens", 1000)
+                max_tokens=max_tokens,
+                callbacks=[MetricsCallbackHandler(engine, model_name, task_type)],
+                metadata=metadata
             )
+            limiter = self.rate_limiters.get(model_name)
+            if limiter is None:
+                return model
+            return self._rate_limit_gate(limiter, max_tokens) | model
         else:  # ollama
             if not self._ollama_available:
                 raise RuntimeError("Ollama 不可用")
             return Ollama(
                 model=model_name,
                 base_url=self.ollama_base_url,
-                temperature=params.get("temperature", 0.7)
+                temperature=params.get("temperature", 0.7),
+                num_predict=params.get("max_tokens", 1000),
+                callbacks=[MetricsCallbackHandler(engine, model_name, task_type)],
+                metadata=metadata
             )
     
+    def create_resilient_model(self, task_type: str = "default", **kwargs):
+        """創建具備截止時間、重試與對沖請求的模型實例"""
+        self.refresh_settings()
+        options = self.resilience_options
+        model = self.create_model_instance(task_type, **kwargs)
+        
+        fallback = None
+        hedge_to = options.get("hedge_to")
+        if (
+            hedge_to == "ollama"
+            and self.current_engine == "groq"
+            and self._ollama_available
+        ):
+            fallback = self.create_model_instance(task_type, engine="ollama", **kwargs)
+        
+        return ResilientRunnable(
+            model,
+            fallback=fallback,
+            deadline=options["deadline"],
+            max_retries=options["max_retries"],
+            backoff_base=options["backoff_base"],
+            hedge=hedge_to is not None,
+            hedge_quantile=options["hedge_quantile"],
+            name=f"{self.current_engine}:{task_type}"
+        )
+    
+    def get_resilience_status(self) -> Dict[str, Any]:
+        """取得重試、對沖與延遲百分位數統計"""
+        return get_resilience_stats()
+    
+    def estimate_latency(self, q: float = 0.5) -> Optional[float]:
+        """當前引擎各模型層級的即時延遲估計（秒），供准入控制預估等待時間"""
+        return estimate_latency(f"{self.current_engine}:", q)
+    
+    def _rate_limit_gate(self, limiter, max_tokens: int):
+        """建立在模型前取得配額的 Runnable（預估 prompt + max_tokens）"""
+        from langchain.schema.runnable import RunnableLambda
+        
+        def acquire(prompt_value):
+            text = (
+                prompt_value.to_string()
+                if hasattr(prompt_value, "to_string")
+                else str(prompt_value)
+            )
+            with tracer.span("queue.rate_limit"):
+                limiter.acquire(estimate_tokens(text) + max_tokens)
+            return prompt_value
+        
+        return RunnableLambda(acquire, name="groq_rate_limit")
+    
+    def get_rate_limit_status(self) -> Dict[str, Any]:
+        """取得各模型的配額使用狀況"""
+        return self.rate_limiters.status()
+    
+    @tracer.traced("probe.groq")
     def test_groq_connection(self) -> bool:
         """測試 Groq 連接"""
         if not self._groq_available:
             return False
+        if not self.groq_api_key:
+            print(f"Groq 連接測試略過: {MISSING_GROQ_KEY}")
+            return False
             
         try:
             client = self.groq_client
@@ -206,7 +381,7 @@ class UnifiedEngineConfig:
                 return False
                 
             response = client.chat.completions.create(
-                model=self.groq_models["fast"],
+                model=self.get_model(self._settings.probe.groq_task, "groq"),
                 messages=[{"role": "user", "content": "Hello"}],
                 max_tokens=10
             )
@@ -215,14 +390,18 @@ class UnifiedEngineConfig:
             print(f"Groq 連接測試失敗: {e}")
             return False
     
+    @tracer.traced("probe.ollama")
     def test_ollama_connection(self) -> bool:
         """測試 Ollama 連接"""
         if not self._ollama_available:
             return False
             
+        settings = self.refresh_settings()
         try:
             import requests
-            response = requests.get(f"{self.ollama_base_url}/api/tags", timeout=5)
+            response = requests.get(
+                f"{self.ollama_base_url}/api/tags", timeout=settings.probe.timeout
+            )
             return response.status_code == 200
         except Exception as e:
             print(f"Ollama 連接測試失敗: {e}")
@@ -234,22 +413,36 @@ class UnifiedEngineConfig:
         
         return {
             "current_engine": self.current_engine,
+            "settings": {
+                "version": self._settings_version,
+                "config_file": self.settings_provider.path,
+                "reload_error": self.settings_provider.last_error,
+            },
             "current_model": self.get_model("semantic"),
             "available_engines": available_engines,
             "engine_details": {
                 "groq": {
                     "available": available_engines.get("groq", False),
                     "models": self.groq_models,
-                    "status": "雲端推理服務" if available_engines.get("groq", False) else "離線",
-                    "cached": self._is_cache_valid("groq")
+                    "api_key_configured": bool(self.groq_api_key),
+                    "status": (
+                        "雲端推理服務"
+                        if available_engines.get("groq", False)
+                        else "離線" if self.groq_api_key else "未設定 GROQ_API_KEY"
+                    ),
+                    "cached": self._is_cache_valid("groq"),
                 },
                 "ollama": {
                     "available": available_engines.get("ollama", False), 
                     "models": self.ollama_models,
-                    "status": "本地推理服務" if available_engines.get("ollama", False) else "離線",
-                    "cached": self._is_cache_valid("ollama")
-                }
-            }
+                    "status": (
+                        "本地推理服務"
+                        if available_engines.get("ollama", False)
+                        else "離線"
+                    ),
+                    "cached": self._is_cache_valid("ollama"),
+                },
+            },
         }
     
     def test_connection(self) -> bool:
@@ -270,8 +463,8 @@ class UnifiedEngineConfig:
         return result
 
 
-# 全域配置實例
-engine_config = UnifiedEngineConfig()
+# 全域配置實例（與 engine_settings.get_settings() 共用同一個設定來源）
+engine_config = UnifiedEngineConfig(settings_provider)
 
 # 向後相容性
 groq_config = engine_config  # 保持舊的介面
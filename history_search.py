@@ -0,0 +1,188 @@
+"""
+歷程全文與語意搜尋
+在記憶體中維護倒排索引（中文以雙字詞切分、英文以單字切分），以 BM25 排序，
+並可選擇加上雜湊向量的餘弦相似度；索引隨歷程寫入增量更新，查詢不掃描資料庫
+"""
+
+import math
+import re
+import threading
+import zlib
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 連續的中日韓字元或英數字
+_TOKEN_PATTERN = re.compile(r"[぀-ヿ㐀-䶿一-鿿豈-﫿]+|[A-Za-z0-9_]+")
+_CJK_PATTERN = re.compile(r"[぀-ヿ㐀-䶿一-鿿豈-﫿]")
+
+# 索引的欄位與權重（請求最重要）
+FIELD_WEIGHTS = {"request": 3, "response": 1, "code": 1, "explanation": 1}
+
+# 雜湊向量維度
+VECTOR_DIM = 256
+
+
+def tokenize(text: str) -> List[str]:
+    """中文切為相鄰雙字詞（單字時保留單字），英文轉小寫並以單字及駝峰片段切分"""
+    tokens = []
+    for run in _TOKEN_PATTERN.findall(text or ""):
+        if _CJK_PATTERN.match(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            word = run.lower()
+            tokens.append(word)
+            # CreatePrimCommand -> create / prim / command
+            parts = [
+                p.lower() for p in re.findall(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+", run)
+            ]
+            if len(parts) > 1:
+                tokens.extend(parts)
+    return tokens
+
+
+def hashed_vector(tokens: Iterable[str], dim: int = VECTOR_DIM) -> Dict[int, float]:
+    """以特徵雜湊將詞頻投影為固定維度的單位稀疏向量"""
+    vector: Dict[int, float] = defaultdict(float)
+    for token in tokens:
+        h = zlib.crc32(token.encode("utf-8"))
+        vector[h % dim] += 1.0 if (h >> 16) & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector.values()))
+    if not norm:
+        return {}
+    return {k: v / norm for k, v in vector.items() if v}
+
+
+def cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+class HistorySearchIndex:
+    """歷程記錄的倒排索引（執行緒安全，可由 HistoryStore 的寫入回調增量更新）"""
+
+    def __init__(
+        self, store=None, k1: float = 1.2, b: float = 0.75, semantic_weight: float = 0.5
+    ):
+        self.store = store
+        self.k1 = k1
+        self.b = b
+        # 混合排序時語意相似度所占的比重
+        self.semantic_weight = semantic_weight
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._lengths: Dict[int, float] = {}
+        self._kinds: Dict[int, str] = {}
+        self._sessions: Dict[int, str] = {}
+        self._vectors: Dict[int, Dict[int, float]] = {}
+        self._total_length = 0.0
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_store(cls, store, **kwargs) -> "HistorySearchIndex":
+        """從歷程儲存建立索引，並訂閱之後的寫入"""
+        index = cls(store, **kwargs)
+        # 先訂閱再讀取，重複的記錄以 ID 去重
+        store.add_listener(index.add_many)
+        index.add_many(store.iter_all())
+        return index
+
+    def add_many(self, records: Iterable[Dict[str, Any]]):
+        for record in records:
+            self.add(record)
+
+    def add(self, record: Dict[str, Any]):
+        """加入一筆記錄（需含 id）"""
+        doc_id = record.get("id")
+        if doc_id is None:
+            return
+        counts: Counter = Counter()
+        request_tokens = tokenize(record.get("request", ""))
+        for field, weight in FIELD_WEIGHTS.items():
+            tokens = (
+                request_tokens
+                if field == "request"
+                else tokenize(record.get(field, ""))
+            )
+            for token in tokens:
+                counts[token] += weight
+        vector = hashed_vector(request_tokens)
+
+        with self._lock:
+            if doc_id in self._lengths:
+                return
+            for token, tf in counts.items():
+                self._postings[token][doc_id] = tf
+            length = float(sum(counts.values()))
+            self._lengths[doc_id] = length
+            self._total_length += length
+            self._kinds[doc_id] = record.get("kind", "")
+            self._sessions[doc_id] = record.get("session_id", "")
+            self._vectors[doc_id] = vector
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._lengths)
+
+    def _matches(self, doc_id: int, kind: Optional[str],
+                 session_id: Optional[str]) -> bool:
+        return ((not kind or self._kinds[doc_id] == kind)
+                and (session_id is None or self._sessions[doc_id] == session_id))
+
+    def _bm25(self, tokens: List[str], kind: Optional[str],
+              session_id: Optional[str] = None) -> Dict[int, float]:
+        """呼叫者需持有鎖"""
+        total = len(self._lengths)
+        average = self._total_length / total if total else 0.0
+        scores: Dict[int, float] = defaultdict(float)
+        for token in set(tokens):
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                if not self._matches(doc_id, kind, session_id):
+                    continue
+                norm = 1 - self.b + self.b * self._lengths[doc_id] / (average or 1.0)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        return scores
+
+    def search_ids(self, text: str, kind: Optional[str] = None, limit: int = 10,
+                   semantic: bool = False,
+                   session_id: Optional[str] = None) -> List[Tuple[int, float]]:
+        """回傳 (記錄 ID, 分數)，分數由高到低；指定 session_id 時只搜尋該會話"""
+        tokens = tokenize(text)
+        if not tokens:
+            return []
+        with self._lock:
+            scores = self._bm25(tokens, kind, session_id)
+            if semantic and scores:
+                # 只對 BM25 候選集合重新排序：沒有共同詞的記錄向量相似度本就幾乎為 0，
+                # 不必對全部記錄逐一計算
+                query_vector = hashed_vector(tokens)
+                top = max(scores.values())
+                scores = {
+                    doc_id: (1 - self.semantic_weight) * score / top
+                    + self.semantic_weight
+                    * max(cosine(query_vector, self._vectors[doc_id]), 0.0)
+                    for doc_id, score in scores.items()
+                }
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        return ranked[:limit]
+
+    def search(self, text: str, kind: Optional[str] = None, limit: int = 10,
+               semantic: bool = False,
+               session_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """搜尋並從歷程儲存取回完整記錄（附 score 欄位）"""
+        ranked = self.search_ids(text, kind=kind, limit=limit, semantic=semantic,
+                                 session_id=session_id)
+        if self.store is None:
+            return [{"id": doc_id, "score": score} for doc_id, score in ranked]
+        records = self.store.get_many([doc_id for doc_id, _ in ranked])
+        return [
+            dict(records[doc_id], score=score)
+            for doc_id, score in ranked
+            if doc_id in records
+        ]
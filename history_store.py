@@ -0,0 +1,310 @@
+"""
+持久化查詢與代碼生成歷程
+以 SQLite (WAL 模式) 依會話、時間與請求雜湊建立索引，寫入在背景執行緒批次提交，
+不阻塞介面
+"""
+
+import atexit
+import hashlib
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_HISTORY_PATH = os.path.join(
+    os.path.expanduser("~"), ".omniverse_semantic", "history.db"
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    request TEXT NOT NULL,
+    response TEXT NOT NULL DEFAULT '',
+    code TEXT NOT NULL DEFAULT '',
+    explanation TEXT NOT NULL DEFAULT '',
+    request_hash TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_session
+    ON history (session_id, kind, created_at);
+CREATE INDEX IF NOT EXISTS idx_history_hash ON history (request_hash, kind);
+CREATE INDEX IF NOT EXISTS idx_history_created ON history (created_at);
+"""
+
+_COLUMNS = ("id", "session_id", "kind", "request", "response", "code", "explanation",
+            "request_hash", "created_at")
+
+
+def request_hash(request: str) -> str:
+    """請求內容的雜湊（忽略空白差異）"""
+    normalized = " ".join(request.split()).lower()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+class HistoryStore:
+    """歷程儲存：讀取走獨立連接，寫入由背景執行緒批次提交"""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        batch_size: int = 100,
+        flush_interval: float = 0.5,
+    ):
+        self.path = path or os.environ.get("HISTORY_DB_PATH", DEFAULT_HISTORY_PATH)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        self._connect().executescript(_SCHEMA)
+
+        # 批次寫入完成後通知的回調（例如搜尋索引）
+        self._listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+        self._error_listeners: List[
+            Callable[[List[Dict[str, Any]], Exception], None]
+        ] = []
+        # 無法寫入而丟棄的記錄數
+        self.failed = 0
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._flushed = threading.Condition()
+        self._pending = 0
+        self._writer = threading.Thread(
+            target=self._write_loop, name="history-writer", daemon=True
+        )
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        """目前執行緒專用的連接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write_loop(self):
+        """背景寫入：累積到 batch_size 筆或 flush_interval 秒後一次提交"""
+        conn = self._connect()
+        running = True
+        while running:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+                if item is None:
+                    running = False
+                else:
+                    batch.append(item)
+                deadline = time.monotonic() + self.flush_interval
+                while running and len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    item = self._queue.get(timeout=remaining)
+                    if item is None:
+                        running = False
+                    else:
+                        batch.append(item)
+            except queue.Empty:
+                pass
+
+            if batch:
+                written, failed, error = self._write_batch(conn, batch)
+                if written:
+                    self._notify(written)
+                if failed:
+                    self.failed += len(failed)
+                    print(f"歷程寫入失敗（{len(failed)} 筆）: {error}")
+                    self._notify_error(failed, error)
+                with self._flushed:
+                    self._pending -= len(batch)
+                    self._flushed.notify_all()
+
+    def _insert(self, conn: sqlite3.Connection, records: List[Dict[str, Any]]):
+        """在單一交易內寫入，失敗時回滾並拋出例外"""
+        conn.execute("BEGIN")
+        try:
+            for record in records:
+                cursor = conn.execute(
+                    "INSERT INTO history (session_id, kind, request, response, code, "
+                    "explanation, request_hash, created_at) VALUES (:session_id, "
+                    ":kind, :request, :response, :code, :explanation, :request_hash, "
+                    ":created_at)",
+                    record,
+                )
+                record["id"] = cursor.lastrowid
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            for record in records:
+                record.pop("id", None)
+            raise
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[Dict[str, Any]]):
+        """整批提交；整批失敗時逐筆重試，讓單筆錯誤不會丟棄同批的其他記錄。
+        回傳 (已寫入, 失敗, 最後的錯誤)"""
+        try:
+            self._insert(conn, batch)
+            return batch, [], None
+        except Exception:
+            pass
+        written, failed, error = [], [], None
+        for record in batch:
+            try:
+                self._insert(conn, [record])
+                written.append(record)
+            except Exception as e:
+                failed.append(record)
+                error = e
+        return written, failed, error
+
+    def add_listener(self, listener: Callable[[List[Dict[str, Any]]], None]):
+        """註冊批次寫入完成後的回調"""
+        self._listeners.append(listener)
+
+    def add_error_listener(
+        self, listener: Callable[[List[Dict[str, Any]], Exception], None]
+    ):
+        """註冊寫入失敗時的回調，參數為未寫入的記錄與錯誤"""
+        self._error_listeners.append(listener)
+
+    def _notify(self, records: List[Dict[str, Any]]):
+        for listener in self._listeners:
+            try:
+                listener(records)
+            except Exception as e:
+                print(f"歷程回調失敗: {e}")
+
+    def _notify_error(self, records: List[Dict[str, Any]], error: Exception):
+        for listener in self._error_listeners:
+            try:
+                listener(records, error)
+            except Exception as e:
+                print(f"歷程回調失敗: {e}")
+
+    def _enqueue(self, record: Dict[str, Any]):
+        with self._flushed:
+            self._pending += 1
+        self._queue.put(record)
+
+    def record_query(self, session_id: str, request: str, response: str):
+        """記錄語意查詢（非同步）"""
+        self._enqueue(
+            {
+                "session_id": session_id,
+                "kind": "query",
+                "request": request,
+                "response": response,
+                "code": "",
+                "explanation": "",
+                "request_hash": request_hash(request),
+                "created_at": time.time(),
+            }
+        )
+
+    def record_code(
+        self, session_id: str, request: str, code: str, explanation: str = ""
+    ):
+        """記錄代碼生成（非同步）"""
+        self._enqueue(
+            {
+                "session_id": session_id,
+                "kind": "code",
+                "request": request,
+                "response": "",
+                "code": code,
+                "explanation": explanation,
+                "request_hash": request_hash(request),
+                "created_at": time.time(),
+            }
+        )
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """等待所有排隊中的寫入完成"""
+        with self._flushed:
+            return self._flushed.wait_for(lambda: self._pending <= 0, timeout=timeout)
+
+    def close(self):
+        """寫入剩餘資料並停止背景執行緒"""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=5.0)
+
+    def _rows(self, sql: str, params: tuple) -> List[Dict[str, Any]]:
+        rows = self._connect().execute(sql, params).fetchall()
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    def recent(
+        self, session_id: str, kind: str, limit: int = 100, offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """會話最近的記錄（由舊到新）"""
+        rows = self._rows(
+            f"SELECT {', '.join(_COLUMNS)} FROM history "
+            "WHERE session_id = ? AND kind = ? "
+            "ORDER BY created_at DESC LIMIT ? OFFSET ?",
+            (session_id, kind, limit, offset),
+        )
+        rows.reverse()
+        return rows
+
+    def get_many(self, ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """依 ID 取得完整記錄"""
+        if not ids:
+            return {}
+        placeholders = ", ".join("?" for _ in ids)
+        rows = self._rows(
+            f"SELECT {', '.join(_COLUMNS)} FROM history WHERE id IN ({placeholders})",
+            tuple(ids),
+        )
+        return {row["id"]: row for row in rows}
+
+    def iter_all(self, batch_size: int = 1000):
+        """依 ID 順序逐批讀出所有記錄（建立索引用）"""
+        last_id = 0
+        while True:
+            rows = self._rows(
+                f"SELECT {', '.join(_COLUMNS)} FROM history "
+                "WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, batch_size),
+            )
+            if not rows:
+                return
+            yield from rows
+            last_id = rows[-1]["id"]
+
+    def count(self, session_id: str, kind: str) -> int:
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM history WHERE session_id = ? AND kind = ?",
+            (session_id, kind)
+        ).fetchone()[0]
+
+    def find_by_request(self, request: str, kind: str) -> Optional[Dict[str, Any]]:
+        """以請求雜湊找出最近一次相同的請求"""
+        rows = self._rows(
+            f"SELECT {', '.join(_COLUMNS)} FROM history "
+            "WHERE request_hash = ? AND kind = ? "
+            "ORDER BY created_at DESC LIMIT 1",
+            (request_hash(request), kind),
+        )
+        return rows[0] if rows else None
+
+    def search(
+        self, text: str, kind: Optional[str] = None, limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """以子字串搜尋請求、回應與代碼（由新到舊）"""
+        pattern = f"%{text}%"
+        sql = (f"SELECT {', '.join(_COLUMNS)} FROM history "
+               "WHERE (request LIKE ? OR response LIKE ? OR code LIKE ?)")
+        params: tuple = (pattern, pattern, pattern)
+        if kind:
+            sql += " AND kind = ?"
+            params += (kind,)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        return self._rows(sql, params + (limit,))
@@ -0,0 +1,47 @@
+"""
+歷程分頁與摘要
+讓對話歷程與執行記錄只渲染目前頁面，其餘以單行摘要呈現，渲染成本不隨會話長度增加
+"""
+
+from dataclasses import dataclass
+from typing import Any, List, Sequence, Tuple
+
+
+@dataclass
+class HistoryPage:
+    """一頁歷程：items 為 (原始索引, 項目) 列表"""
+    items: List[Tuple[int, Any]]
+    page: int
+    page_count: int
+    total: int
+
+    @property
+    def has_previous(self) -> bool:
+        """是否有較舊的頁面"""
+        return self.page < self.page_count - 1
+
+    @property
+    def has_next(self) -> bool:
+        """是否有較新的頁面"""
+        return self.page > 0
+
+
+def paginate(items: Sequence[Any], page: int = 0, page_size: int = 10,
+             newest_first: bool = False) -> HistoryPage:
+    """取出第 page 頁（第 0 頁為最新的項目），只切片不複製整個列表"""
+    total = len(items)
+    page_count = max(1, (total + page_size - 1) // page_size)
+    page = min(max(page, 0), page_count - 1)
+
+    end = total - page * page_size
+    start = max(0, end - page_size)
+    window = [(index, items[index]) for index in range(start, end)]
+    if newest_first:
+        window.reverse()
+    return HistoryPage(items=window, page=page, page_count=page_count, total=total)
+
+
+def summarize(text: str, limit: int = 80) -> str:
+    """單行摘要"""
+    line = " ".join((text or "").split())
+    return line if len(line) <= limit else line[:limit - 1] + "…"
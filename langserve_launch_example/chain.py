@@ -3,17 +3,39 @@
 Edit this file to implement your chain logic.
 """
 
+from typing import Optional
+
 from langchain.prompts import ChatPromptTemplate, PromptTemplate
-from langchain.schema.runnable import Runnable
 from langchain.schema.output_parser import StrOutputParser
-from groq_config import engine_config
+from langchain.schema.runnable import Runnable, RunnableLambda
+from pydantic import BaseModel
+
+from groq_config import UnifiedEngineConfig, engine_config
+from query_classifier import classify_query
+from tracing import tracer
+
+
+class SemanticQueryInput(BaseModel):
+    """語意查詢鏈的輸入"""
+
+    topic: str
+    # 由 ConversationMemory.context() 產生的對話上下文，可省略
+    history: str = ""
 
 
-def get_chain() -> Runnable:
-    """Return a chain for Omniverse semantic integration platform."""
+def get_chain(
+    llm: Optional[Runnable] = None, engine: Optional[UnifiedEngineConfig] = None
+) -> Runnable:
+    """Return a chain for Omniverse semantic integration platform.
+
+    ``llm`` replaces the engine models for every task tier (tests and
+    benchmarks inject ``fake_llm.FakeStreamingLLM`` here). ``engine``
+    supplies models and settings; it defaults to the global ``engine_config``.
+    """
+    engine = engine or engine_config
     
     # 根據當前引擎選擇合適的提示模板
-    if engine_config.get_current_engine() == "groq":
+    if engine.get_current_engine() == "groq":
         # Groq 使用 ChatPromptTemplate
         prompt = ChatPromptTemplate.from_messages([
             ("system", """您是 Omniverse 語意整合平台的核心分析引擎，專門協助企業團隊深度理解與有效運用 Omniverse 技術生態系統。
@@ -26,14 +48,14 @@ def get_chain() -> Runnable:
 4. 開發指導原則：基於企業級開發標準的技術規範與注意事項
 
 針對不同技術領域（USD、RTX Rendering、Physics Simulation、Extension Development、Connector Integration），請提供深度的技術洞察與實用的開發指引。"""),
-            ("human", "技術查詢：{topic}")
-        ])
+            ("human", "{history}技術查詢：{topic}")
+        ]).partial(history="")
     else:
         # Ollama 使用 PromptTemplate
         prompt = PromptTemplate.from_template(
             """您是 Omniverse 語意整合平台的核心分析引擎，專門協助企業團隊深度理解與有效運用 Omniverse 技術生態系統。
 
-技術查詢：{topic}
+{history}技術查詢：{topic}
 
 請基於 Omniverse 平台的技術架構，提供專業的分析與建議：
 
@@ -45,16 +67,39 @@ def get_chain() -> Runnable:
 針對不同技術領域（USD、RTX Rendering、Physics Simulation、Extension Development、Connector Integration），請提供深度的技術洞察與實用的開發指引。
 
 系統回應："""
-        )
-    
-    # 使用統一引擎配置創建模型實例
-    model = engine_config.create_model_instance(
-        task_type="semantic",
-        temperature=0.7,
-        max_tokens=1000
-    )
+        ).partial(history="")
     
     # 使用字串輸出解析器
     parser = StrOutputParser()
     
-    return prompt | model | parser
+    # 依查詢複雜度選擇模型層級與 max_tokens，相同組合共用模型實例
+    models = {}
+    models_version = None
+    
+    def model_for(task_type: str, max_tokens: int) -> Runnable:
+        nonlocal models_version
+        if llm is not None:
+            return llm
+        # 各層級各保留一個實例；只有設定重新載入（版本改變）時才全部重建
+        version = engine.settings_version
+        if version != models_version:
+            models.clear()
+            models_version = version
+        key = (task_type, max_tokens)
+        if key not in models:
+            # 使用統一引擎配置創建模型實例（含截止時間、重試與對沖請求）
+            models[key] = engine.create_resilient_model(
+                task_type=task_type,
+                temperature=engine.settings.chains.semantic_temperature,
+                max_tokens=max_tokens
+            )
+        return models[key]
+    
+    def route(inputs: dict) -> Runnable:
+        plan = classify_query(inputs.get("topic", ""), task="semantic")
+        return prompt | model_for(plan.task_type, plan.max_tokens) | parser
+    
+    # 提示渲染、模型調用（含首個 token）與解析各記錄為目前請求下的 span
+    return RunnableLambda(route, name="omniverse_semantic_chain").with_types(
+        input_type=SemanticQueryInput, output_type=str
+    ).with_config(callbacks=tracer.callbacks())
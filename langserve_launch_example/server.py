@@ -1,13 +1,103 @@
+import argparse
+import os
+from typing import List, Optional
+
 from fastapi import FastAPI
+from fastapi.responses import Response
+from langchain.schema.runnable import Runnable
 from langserve import add_routes
 
+import metrics
 from langserve_launch_example.chain import get_chain
+from tracing import trace_requests
 
-app = FastAPI(title="LangServe Launch Example")
+DEFAULT_PORT = 8001
 
-add_routes(app, get_chain())
 
-if __name__ == "__main__":
+def create_app(shared_cache: Optional[bool] = None, llm: Optional[Runnable] = None,
+               engine=None) -> FastAPI:
+    """Build the LangServe app.
+
+    When ``shared_cache`` is enabled (default, override with
+    ``SHARED_CACHE=0``), LLM responses and engine health are kept in the
+    SQLite-backed shared store so that all worker processes reuse them;
+    the store is attached to ``engine`` when one is injected.
+    ``llm`` is passed to ``get_chain`` to serve a fake model in tests and
+    benchmarks, ``engine`` to serve a ``UnifiedEngineConfig`` built from
+    injected settings.
+    """
+    if shared_cache is None:
+        shared_cache = os.environ.get("SHARED_CACHE", "1") != "0"
+    if shared_cache:
+        from shared_store import enable_shared_caches
+
+        enable_shared_caches(engine=engine)
+
+    app = FastAPI(title="LangServe Launch Example")
+    app.middleware("http")(trace_requests)
+    app.middleware("http")(metrics.track_requests)
+
+    @app.get("/metrics")
+    async def metrics_endpoint() -> Response:
+        """Prometheus metrics, merged across worker processes."""
+        return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+    add_routes(app, get_chain(llm, engine))
+    return app
+
+
+app = create_app()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Run the server, optionally with several worker processes."""
+    parser = argparse.ArgumentParser(description="LangServe server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument(
+        "--port", type=int, default=int(os.environ.get("PORT", DEFAULT_PORT))
+    )
+    parser.add_argument(
+        "--workers", type=int, default=int(os.environ.get("WEB_CONCURRENCY", 1))
+    )
+    parser.add_argument(
+        "--server",
+        choices=["uvicorn", "gunicorn"],
+        default="uvicorn",
+        help="gunicorn loads the chain once in the master and forks workers",
+    )
+    args = parser.parse_args(argv)
+
+    if args.workers > 1:
+        # every worker flushes its metrics into a shared directory for /metrics
+        metrics.prepare_multiprocess_dir()
+
+    if args.server == "gunicorn":
+        # --preload builds the chain before forking so workers share it
+        gunicorn_args = [
+            "gunicorn",
+            "langserve_launch_example.server:app",
+            "--preload",
+            "--worker-class",
+            "uvicorn.workers.UvicornWorker",
+            "--workers",
+            str(args.workers),
+            "--bind",
+            f"{args.host}:{args.port}",
+        ]
+        os.execvp(gunicorn_args[0], gunicorn_args)
+
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=8001)
+    if args.workers > 1:
+        uvicorn.run(
+            "langserve_launch_example.server:app",
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+        )
+    else:
+        uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
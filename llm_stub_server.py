@@ -0,0 +1,444 @@
+"""
+Groq / Ollama 本地替身服務
+實作 UnifiedEngineConfig 使用到的 API 子集：Groq 的 /openai/v1/chat/completions（含 SSE
+串流）與 /openai/v1/models，
+Ollama 的 /api/tags 與 /api/generate（NDJSON 串流）。延遲、錯誤率、429
+與服務中斷可在啟動時或經 /_stub/config 即時調整；
+把 GROQ_BASE_URL / OLLAMA_BASE_URL 指向此服務，即可在沒有真實服務的環境測試健康探測、
+容錯切換、速率限制與串流
+
+    python llm_stub_server.py --port 9000 --profile groq --error-rate 0.05
+    GROQ_BASE_URL=http://localhost:9000 OLLAMA_BASE_URL=http://localhost:9000 \\
+        python streamlit_api.py
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import socket
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from fake_llm import PROFILES, default_response, split_tokens
+from token_usage import count_tokens
+
+DEFAULT_PORT = 9000
+
+GROQ_MODELS = ["llama3-8b-8192", "llama3-70b-8192"]
+OLLAMA_MODELS = ["llama3.2:3b"]
+
+
+class StubBehavior:
+    """單一服務的模擬行為（執行中可透過 update 調整）"""
+
+    FIELDS = (
+        "first_token_latency",
+        "tokens_per_second",
+        "jitter",
+        "error_rate",
+        "error_status",
+        "fail_next",
+        "rate_limit_rpm",
+        "down",
+        "drop_stream_after",
+        "response",
+    )
+
+    def __init__(self, profile: str = "instant", seed: int = 0, **overrides: Any):
+        self.first_token_latency = 0.0
+        self.tokens_per_second = 0.0
+        self.jitter = 0.0
+        # 隨機錯誤的機率與狀態碼
+        self.error_rate = 0.0
+        self.error_status = 500
+        # 接下來固定失敗的請求數（可重現的錯誤注入）
+        self.fail_next = 0
+        # 每分鐘請求上限，超過時回傳 429（0 為不限制）
+        self.rate_limit_rpm = 0
+        # 服務中斷：所有端點（含健康探測）回傳 503
+        self.down = False
+        # 串流送出指定數量的 token 後中斷連線
+        self.drop_stream_after: Optional[int] = None
+        # 固定回應；未指定時依提示內容回傳代碼或語意分析文字
+        self.response: Optional[str] = None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window: deque = deque()
+        self.stats: Counter = Counter()
+        self.update(**{**PROFILES[profile], **overrides})
+
+    def update(self, **values: Any) -> Dict[str, Any]:
+        unknown = set(values) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"未知的設定: {', '.join(sorted(unknown))}")
+        with self._lock:
+            for key, value in values.items():
+                setattr(self, key, value)
+        return self.to_dict()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def admit(self) -> Optional[JSONResponse]:
+        """依中斷、速率限制與錯誤注入決定是否拒絕請求；接受時回傳 None"""
+        with self._lock:
+            if self.down:
+                return _error(503, "service unavailable", "stub_down")
+            now = time.time()
+            if self.rate_limit_rpm:
+                while self._window and now - self._window[0] >= 60:
+                    self._window.popleft()
+                if len(self._window) >= self.rate_limit_rpm:
+                    retry_after = max(1, math.ceil(60 - (now - self._window[0])))
+                    return _error(
+                        429,
+                        f"Rate limit reached: {self.rate_limit_rpm} "
+                        "requests per minute",
+                        "rate_limit_exceeded",
+                        headers={
+                            "retry-after": str(retry_after),
+                            "x-ratelimit-limit-requests": str(self.rate_limit_rpm),
+                            "x-ratelimit-remaining-requests": "0",
+                        },
+                    )
+                self._window.append(now)
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                return _error(self.error_status, "injected failure", "stub_error")
+            if self.error_rate and self._rng.random() < self.error_rate:
+                return _error(
+                    self.error_status, "injected random failure", "stub_error"
+                )
+        return None
+
+    def plan(self, prompt: str, max_tokens: Optional[int] = None):
+        """回應的 token 與每個 token 之前的等待秒數"""
+        text = self.response if self.response is not None else default_response(prompt)
+        tokens = split_tokens(text)
+        if max_tokens:
+            tokens = tokens[:max_tokens]
+        interval = 1.0 / self.tokens_per_second if self.tokens_per_second else 0.0
+        with self._lock:
+            def vary(seconds: float) -> float:
+                if not seconds or not self.jitter:
+                    return seconds
+                return max(
+                    0.0, seconds * (1.0 + self._rng.uniform(-self.jitter, self.jitter))
+                )
+            delays = [vary(self.first_token_latency)] + [
+                vary(interval) for _ in tokens[1:]
+            ]
+        return tokens, delays
+
+
+def _error(
+    status: int, message: str, code: str, headers: Optional[Dict[str, str]] = None
+) -> JSONResponse:
+    """Groq（OpenAI 相容）格式的錯誤；Ollama 用戶端只檢查狀態碼"""
+    return JSONResponse({"error": {"message": message, "type": "stub", "code": code}},
+                        status_code=status, headers=headers)
+
+
+def _usage(
+    prompt_tokens: int, completion_tokens: int, elapsed: float
+) -> Dict[str, Any]:
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "total_time": round(elapsed, 4),
+    }
+
+
+def _prompt_from_messages(messages: List[Dict[str, Any]]) -> str:
+    parts = []
+    for message in messages:
+        content = message.get("content", "")
+        if isinstance(content, list):
+            content = "".join(
+                part.get("text", "") for part in content if isinstance(part, dict)
+            )
+        parts.append(str(content))
+    return "\n".join(parts)
+
+
+def create_app(
+    groq: Optional[StubBehavior] = None, ollama: Optional[StubBehavior] = None
+) -> FastAPI:
+    """建立替身服務；groq / ollama 為各自的模擬行為"""
+    app = FastAPI(title="LLM Stub Server")
+    behaviors = {"groq": groq or StubBehavior(), "ollama": ollama or StubBehavior()}
+    app.state.behaviors = behaviors
+
+    def rejected(service: str) -> Optional[JSONResponse]:
+        behavior = behaviors[service]
+        response = behavior.admit()
+        behavior.stats[response.status_code if response is not None else 200] += 1
+        return response
+
+    # Groq（OpenAI 相容）
+
+    @app.get("/openai/v1/models")
+    async def groq_models():
+        if behaviors["groq"].down:
+            return _error(503, "service unavailable", "stub_down")
+        return {
+            "object": "list",
+            "data": [
+                {"id": name, "object": "model", "owned_by": "stub"}
+                for name in GROQ_MODELS
+            ],
+        }
+
+    @app.post("/openai/v1/chat/completions")
+    async def groq_chat(request: Request):
+        error = rejected("groq")
+        if error is not None:
+            return error
+        body = await request.json()
+        behavior = behaviors["groq"]
+        model = body.get("model", GROQ_MODELS[0])
+        prompt = _prompt_from_messages(body.get("messages", []))
+        tokens, delays = behavior.plan(
+            prompt, body.get("max_tokens") or body.get("max_completion_tokens")
+        )
+        prompt_tokens = count_tokens(prompt)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        started = time.perf_counter()
+
+        if not body.get("stream"):
+            await asyncio.sleep(sum(delays))
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "".join(tokens)},
+                        "finish_reason": "stop",
+                        "logprobs": None,
+                    }
+                ],
+                "usage": _usage(
+                    prompt_tokens, len(tokens), time.perf_counter() - started
+                ),
+                "system_fingerprint": None,
+                "x_groq": {"id": completion_id},
+            }
+
+        def chunk(
+            delta: Dict[str, Any], finish_reason: Optional[str] = None, **extra: Any
+        ) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "delta": delta,
+                        "finish_reason": finish_reason,
+                        "logprobs": None,
+                    }
+                ],
+                **extra,
+            }
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+        async def events():
+            yield chunk({"role": "assistant", "content": ""})
+            for index, (token, delay) in enumerate(zip(tokens, delays)):
+                if (
+                    behavior.drop_stream_after is not None
+                    and index >= behavior.drop_stream_after
+                ):
+                    raise ConnectionResetError("injected stream drop")
+                await asyncio.sleep(delay)
+                yield chunk({"content": token})
+            # Groq 在最後一個片段的 x_groq.usage 回報用量
+            usage = _usage(prompt_tokens, len(tokens), time.perf_counter() - started)
+            yield chunk({}, "stop", x_groq={"id": completion_id, "usage": usage})
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    # Ollama
+
+    @app.get("/api/tags")
+    async def ollama_tags():
+        if behaviors["ollama"].down:
+            return _error(503, "service unavailable", "stub_down")
+        return {
+            "models": [
+                {
+                    "name": name,
+                    "model": name,
+                    "modified_at": "2024-01-01T00:00:00Z",
+                    "size": 0,
+                    "digest": "stub",
+                }
+                for name in OLLAMA_MODELS
+            ]
+        }
+
+    @app.post("/api/generate")
+    async def ollama_generate(request: Request):
+        error = rejected("ollama")
+        if error is not None:
+            return error
+        body = await request.json()
+        behavior = behaviors["ollama"]
+        model = body.get("model", OLLAMA_MODELS[0])
+        prompt = body.get("prompt", "")
+        options = body.get("options") or {}
+        tokens, delays = behavior.plan(prompt, options.get("num_predict"))
+        started = time.perf_counter()
+
+        def final() -> Dict[str, Any]:
+            elapsed = time.perf_counter() - started
+            return {
+                "model": model,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "response": "",
+                "done": True,
+                "done_reason": "stop",
+                "total_duration": int(elapsed * 1e9),
+                "eval_duration": int(elapsed * 1e9),
+                "prompt_eval_count": count_tokens(prompt),
+                "eval_count": len(tokens),
+            }
+
+        if body.get("stream") is False:
+            await asyncio.sleep(sum(delays))
+            return {**final(), "response": "".join(tokens)}
+
+        async def lines():
+            for index, (token, delay) in enumerate(zip(tokens, delays)):
+                if (
+                    behavior.drop_stream_after is not None
+                    and index >= behavior.drop_stream_after
+                ):
+                    raise ConnectionResetError("injected stream drop")
+                await asyncio.sleep(delay)
+                yield json.dumps(
+                    {"model": model, "response": token, "done": False},
+                    ensure_ascii=False,
+                ) + "\n"
+            yield json.dumps(final()) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    # 控制端點
+
+    @app.get("/_stub/config")
+    async def get_config():
+        return {service: behavior.to_dict() for service, behavior in behaviors.items()}
+
+    @app.post("/_stub/config/{service}")
+    async def update_config(service: str, values: Dict[str, Any]):
+        if service not in behaviors:
+            return _error(404, f"unknown service {service}", "not_found")
+        try:
+            return behaviors[service].update(**values)
+        except ValueError as e:
+            return _error(400, str(e), "invalid_config")
+
+    @app.get("/_stub/stats")
+    async def get_stats():
+        return {
+            service: {str(status): count for status, count in behavior.stats.items()}
+            for service, behavior in behaviors.items()
+        }
+
+    return app
+
+
+class StubServer:
+    """在背景執行緒中執行替身服務（測試與效能測試使用）"""
+
+    def __init__(
+        self, app: Optional[FastAPI] = None, host: str = "127.0.0.1", port: int = 0
+    ):
+        import uvicorn
+
+        self.app = app or create_app()
+        if not port:
+            with socket.socket() as sock:
+                sock.bind((host, 0))
+                port = sock.getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        self._server = uvicorn.Server(
+            uvicorn.Config(self.app, host=host, port=port, log_level="warning")
+        )
+        self._thread = threading.Thread(
+            target=self._server.run, name="llm-stub", daemon=True
+        )
+
+    @property
+    def behaviors(self) -> Dict[str, StubBehavior]:
+        return self.app.state.behaviors
+
+    def start(self, timeout: float = 10.0) -> "StubServer":
+        self._thread.start()
+        deadline = time.time() + timeout
+        while not self._server.started:
+            if time.time() > deadline or not self._thread.is_alive():
+                raise RuntimeError("替身服務啟動失敗")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main(argv: Optional[List[str]] = None):
+    """命令列入口"""
+    parser = argparse.ArgumentParser(description="Groq / Ollama 本地替身服務")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument(
+        "--profile", choices=sorted(PROFILES), default="groq", help="延遲特性"
+    )
+    parser.add_argument("--ollama-profile", choices=sorted(PROFILES), default="ollama")
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="隨機回傳錯誤的機率"
+    )
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument(
+        "--rate-limit-rpm", type=int, default=0, help="每分鐘請求上限（超過回傳 429）"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    options = {"error_rate": args.error_rate, "error_status": args.error_status,
+               "rate_limit_rpm": args.rate_limit_rpm}
+    app = create_app(StubBehavior(args.profile, seed=args.seed, **options),
+                     StubBehavior(args.ollama_profile, seed=args.seed, **options))
+
+    import uvicorn
+
+    print(f"替身服務: GROQ_BASE_URL=http://{args.host}:{args.port} OLLAMA_BASE_URL=http://{args.host}:{args.port}")
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
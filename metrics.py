@@ -0,0 +1,436 @@
+"""
+Prometheus 指標
+進程內的計數器與直方圖（每次記錄只是一次加鎖的字典更新），以 Prometheus 文字格式輸出；
+多 worker 部署時各進程定期把快照寫入 METRICS_DIR 下的 metrics_<pid>.json，/metrics
+合併所有進程的數值
+"""
+
+import atexit
+import glob
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    from langchain_core.callbacks import BaseCallbackHandler
+    LANGCHAIN_AVAILABLE = True
+except ImportError:
+    BaseCallbackHandler = object
+    LANGCHAIN_AVAILABLE = False
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 預設延遲分桶（秒），涵蓋快取命中到長代碼生成
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+# 每個進程寫出快照的間隔秒數
+FLUSH_INTERVAL = 5.0
+
+ENGINE_LABELS = ("engine", "model", "task_type")
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """只增不減的計數器"""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[List[Any]]:
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    """固定分桶的直方圖（每個分桶只記自身的次數，輸出時才累加）"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [各分桶次數（最後一格為 +Inf）, 總和]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def count(self, **labels: Any) -> int:
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return sum(state[0]) if state else 0
+
+    def samples(self) -> List[List[Any]]:
+        with self._lock:
+            return [
+                [list(key), list(state[0]), state[1]]
+                for key, state in self._values.items()
+            ]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Iterable[str], values: Iterable[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class MetricsRegistry:
+    """指標登錄與輸出；directory 指定時以檔案在多個進程間彙總"""
+
+    def __init__(
+        self, directory: Optional[str] = None, flush_interval: float = FLUSH_INTERVAL
+    ):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self._flusher_pid: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "MetricsRegistry":
+        return cls(os.environ.get("METRICS_DIR") or None)
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """目前進程的所有指標"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        snapshot = {}
+        for metric in metrics:
+            entry = {"type": metric.kind, "help": metric.documentation,
+                     "labelnames": list(metric.labelnames), "samples": metric.samples()}
+            if isinstance(metric, Histogram):
+                entry["buckets"] = list(metric.buckets)
+            snapshot[metric.name] = entry
+        return snapshot
+
+    # 多進程彙總
+
+    def _path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"metrics_{pid}.json")
+
+    def flush(self):
+        """把目前進程的快照寫入共享目錄（先寫暫存檔再替換，讀取端不會看到寫一半的檔案）"""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(os.getpid())
+        temporary = f"{path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "pid": os.getpid(),
+                    "updated_at": time.time(),
+                    "metrics": self.snapshot(),
+                },
+                f,
+            )
+        os.replace(temporary, path)
+
+    def ensure_flusher(self):
+        """確保目前進程有定期寫出快照的背景執行緒（fork 後的 worker 會各自啟動一次）"""
+        if not self.directory or self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(
+            target=self._flush_loop, name="metrics-flusher", daemon=True
+        ).start()
+        atexit.register(self._flush_at_exit, os.getpid())
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"指標快照寫出失敗: {e}")
+
+    def _flush_at_exit(self, pid: int):
+        if pid == os.getpid():
+            self.flush()
+
+    def collect(self) -> Dict[str, Dict[str, Any]]:
+        """合併所有進程的指標；已結束進程的快照保留，計數器才不會在 worker 重啟時倒退"""
+        if not self.directory:
+            return self.snapshot()
+        self.flush()
+        merged: Dict[str, Dict[str, Any]] = {}
+        for path in glob.glob(os.path.join(self.directory, "metrics_*.json")):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    metrics = json.load(f)["metrics"]
+            except (OSError, ValueError, KeyError):
+                continue
+            for name, entry in metrics.items():
+                target = merged.setdefault(name, {**entry, "samples": {}})
+                for sample in entry["samples"]:
+                    key = tuple(sample[0])
+                    current = target["samples"].get(key)
+                    if entry["type"] == "counter":
+                        target["samples"][key] = (current or 0.0) + sample[1]
+                    elif current is None:
+                        target["samples"][key] = [list(sample[1]), sample[2]]
+                    else:
+                        current[0] = [a + b for a, b in zip(current[0], sample[1])]
+                        current[1] += sample[2]
+        for entry in merged.values():
+            entry["samples"] = [
+                [list(key), *(value if isinstance(value, list) else [value])]
+                for key, value in entry["samples"].items()
+            ]
+        return merged
+
+    def render(self) -> str:
+        """Prometheus 文字格式"""
+        lines = []
+        for name, entry in sorted(self.collect().items()):
+            lines.append(f"# HELP {name} {entry['help']}")
+            lines.append(f"# TYPE {name} {entry['type']}")
+            labelnames = entry["labelnames"]
+            for sample in entry["samples"]:
+                values = sample[0]
+                if entry["type"] == "counter":
+                    lines.append(
+                        f"{name}{_labels(labelnames, values)} {_number(sample[1])}"
+                    )
+                    continue
+                counts, total = sample[1], sample[2]
+                cumulative = 0
+                for bound, count in zip(
+                    list(entry["buckets"]) + [float("inf")], counts
+                ):
+                    cumulative += count
+                    le = f'le="{_number(bound)}"'
+                    lines.append(
+                        f"{name}_bucket{_labels(labelnames, values, le)} {cumulative}"
+                    )
+                lines.append(
+                    f"{name}_sum{_labels(labelnames, values)} {_number(total)}"
+                )
+                lines.append(f"{name}_count{_labels(labelnames, values)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+
+def prepare_multiprocess_dir(directory: Optional[str] = None) -> str:
+    """在啟動多個 worker 前清空並設定 METRICS_DIR（子進程繼承環境變數）"""
+    directory = directory or os.environ.get("METRICS_DIR") or os.path.join(
+        tempfile.gettempdir(), f"omniverse_metrics_{os.getpid()}"
+    )
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+    os.environ["METRICS_DIR"] = directory
+    registry.directory = directory
+    return directory
+
+
+def response_token_usage(response) -> Dict[str, int]:
+    """從 LLMResult 取出 token 用量：Groq 的 token_usage、訊息的 usage_metadata 或
+    Ollama 的 eval_count"""
+    output = getattr(response, "llm_output", None) or {}
+    usage = output.get("token_usage") or output.get("usage") or {}
+    if (
+        usage.get("prompt_tokens") is not None
+        or usage.get("completion_tokens") is not None
+    ):
+        return {"prompt_tokens": int(usage.get("prompt_tokens") or 0),
+                "completion_tokens": int(usage.get("completion_tokens") or 0)}
+
+    prompt = completion = 0
+    found = False
+    for generations in getattr(response, "generations", None) or []:
+        for generation in generations:
+            metadata = getattr(
+                getattr(generation, "message", None), "usage_metadata", None
+            )
+            info = getattr(generation, "generation_info", None) or {}
+            if metadata:
+                prompt += metadata.get("input_tokens", 0)
+                completion += metadata.get("output_tokens", 0)
+                found = True
+            elif "prompt_eval_count" in info or "eval_count" in info:
+                prompt += info.get("prompt_eval_count") or 0
+                completion += info.get("eval_count") or 0
+                found = True
+    return {"prompt_tokens": prompt, "completion_tokens": completion} if found else {}
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """附加在模型實例上，以固定的 engine / model / task_type 標籤記錄請求數、延遲、首個
+    token 與 token 用量"""
+
+    # 只更新進程內計數，直接在呼叫端執行即可
+    run_inline = True
+
+    def __init__(self, engine: str, model: str, task_type: str):
+        self.labels = {"engine": engine, "model": model, "task_type": task_type}
+        self._started: Dict[Any, List[Any]] = {}
+
+    def _start(self, run_id):
+        # [開始時間, 是否已收到 token]
+        self._started[run_id] = [time.perf_counter(), False]
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        state = self._started.get(run_id)
+        if state is not None and not state[1]:
+            state[1] = True
+            LLM_FIRST_TOKEN.observe(time.perf_counter() - state[0], **self.labels)
+
+    def _finish(self, run_id, status: str):
+        state = self._started.pop(run_id, None)
+        LLM_REQUESTS.inc(status=status, **self.labels)
+        if state is not None:
+            LLM_LATENCY.observe(time.perf_counter() - state[0], **self.labels)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._finish(run_id, "success")
+        usage = response_token_usage(response)
+        for kind in ("prompt", "completion"):
+            if usage.get(f"{kind}_tokens"):
+                LLM_TOKENS.inc(usage[f"{kind}_tokens"], type=kind, **self.labels)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, "error")
+
+
+async def track_requests(request, call_next):
+    """FastAPI / Starlette HTTP 中間件：請求數與延遲（以路由樣板作為 path 標籤，
+    避免標籤數量失控）"""
+    registry.ensure_flusher()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = getattr(route, "path", None) or "unmatched"
+        HTTP_REQUESTS.inc(method=request.method, path=path, status=status)
+        HTTP_LATENCY.observe(
+            time.perf_counter() - started, method=request.method, path=path
+        )
+
+
+# 全局指標登錄（設定 METRICS_DIR 時為多進程模式）
+registry = MetricsRegistry.from_env()
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "HTTP 請求數", ("method", "path", "status")
+)
+HTTP_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "HTTP 請求延遲（秒）", ("method", "path")
+)
+LLM_REQUESTS = registry.counter(
+    "llm_requests_total", "模型調用次數", ENGINE_LABELS + ("status",)
+)
+LLM_LATENCY = registry.histogram(
+    "llm_request_duration_seconds", "模型調用延遲（秒）", ENGINE_LABELS
+)
+LLM_FIRST_TOKEN = registry.histogram(
+    "llm_time_to_first_token_seconds", "串流首個 token 的延遲（秒）", ENGINE_LABELS
+)
+LLM_TOKENS = registry.counter(
+    "llm_tokens_total", "模型 token 用量", ENGINE_LABELS + ("type",)
+)
+CACHE_REQUESTS = registry.counter(
+    "cache_requests_total", "快取查詢次數", ("cache", "result")
+)
+ADMISSION_REJECTED = registry.counter(
+    "api_admission_rejected_total", "准入控制拒絕的請求數", ("endpoint", "reason")
+)
+ADMISSION_WAIT = registry.histogram(
+    "api_admission_wait_seconds", "請求在准入佇列中的等待（秒）", ("endpoint",)
+)
@@ -0,0 +1,3088 @@
+"""
+離線 USD 模擬後端
+在沒有 omni / pxr 的環境中提供 omni.usd、omni.kit.commands、omni.timeline 與
+pxr.Usd / UsdGeom / UsdShade / UsdLux / Gf / Sdf / Vt 的常用介面，讓生成的腳本可在一般
+Linux 主機上
+執行、計時與驗證。prim 以 __slots__ 記錄保存，陣列屬性以 NumPy 陣列保存；
+只有單一圖層，沒有組合（composition）語意
+"""
+
+import builtins
+import math
+import types
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# ---------------------------------------------------------------------------
+# Gf
+# ---------------------------------------------------------------------------
+
+class _Vec:
+    """固定長度的向量（可修改元素，與 Gf.Vec* 相同）"""
+
+    __slots__ = ("_v",)
+    _size = 3
+
+    def __init__(self, *args):
+        if not args:
+            values = [0.0] * self._size
+        elif len(args) == 1 and isinstance(args[0], (int, float, np.number)):
+            values = [float(args[0])] * self._size
+        elif len(args) == 1:
+            values = [float(v) for v in args[0]]
+        else:
+            values = [float(v) for v in args]
+        if len(values) != self._size:
+            raise TypeError(
+                f"{type(self).__name__} 需要 {self._size} 個分量，收到 {len(values)} 個"
+            )
+        self._v = values
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        return self._v[index]
+
+    def __setitem__(self, index, value):
+        self._v[index] = float(value)
+
+    def __iter__(self):
+        return iter(self._v)
+
+    def __eq__(self, other):
+        try:
+            return len(other) == self._size and all(
+                a == b for a, b in zip(self._v, other)
+            )
+        except TypeError:
+            return False
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Gf.{type(self).__name__}({', '.join(repr(v) for v in self._v)})"
+
+    def __add__(self, other):
+        return type(self)([a + b for a, b in zip(self._v, other)])
+
+    def __sub__(self, other):
+        return type(self)([a - b for a, b in zip(self._v, other)])
+
+    def __neg__(self):
+        return type(self)([-a for a in self._v])
+
+    def __mul__(self, other):
+        if isinstance(other, (int, float, np.number)):
+            return type(self)([a * other for a in self._v])
+        # 向量相乘為內積
+        return sum(a * b for a, b in zip(self._v, other))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, scalar):
+        return type(self)([a / scalar for a in self._v])
+
+    def GetLength(self) -> float:
+        return math.sqrt(sum(a * a for a in self._v))
+
+    def GetNormalized(self):
+        length = self.GetLength()
+        return (
+            type(self)([a / length for a in self._v]) if length else type(self)(self._v)
+        )
+
+    def Normalize(self) -> float:
+        length = self.GetLength()
+        if length:
+            self._v = [a / length for a in self._v]
+        return length
+
+    def GetDot(self, other) -> float:
+        return self * other
+
+
+def _vec_type(name: str, size: int):
+    return type(name, (_Vec,), {"__slots__": (), "_size": size})
+
+
+_GF_VECTORS = {
+    name: _vec_type(name, int(name[3]))
+    for name in (
+        "Vec2f",
+        "Vec2d",
+        "Vec2i",
+        "Vec2h",
+        "Vec3f",
+        "Vec3d",
+        "Vec3i",
+        "Vec3h",
+        "Vec4f",
+        "Vec4d",
+        "Vec4i",
+        "Vec4h",
+    )
+}
+
+
+class _Quat:
+    """四元數（實部 + 虛部）"""
+
+    __slots__ = ("_real", "_imaginary")
+
+    def __init__(self, real=1.0, i=0.0, j=0.0, k=0.0):
+        if isinstance(i, (_Vec, tuple, list)):
+            i, j, k = i
+        self._real = float(real)
+        self._imaginary = _GF_VECTORS["Vec3d"](i, j, k)
+
+    def GetReal(self) -> float:
+        return self._real
+
+    def GetImaginary(self):
+        return _GF_VECTORS["Vec3d"](self._imaginary)
+
+    def SetReal(self, value):
+        self._real = float(value)
+
+    def SetImaginary(self, value):
+        self._imaginary = _GF_VECTORS["Vec3d"](value)
+
+    def GetLength(self) -> float:
+        return math.sqrt(self._real ** 2 + sum(v * v for v in self._imaginary))
+
+    def GetNormalized(self):
+        length = self.GetLength() or 1.0
+        return type(self)(self._real / length, *(v / length for v in self._imaginary))
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, _Quat)
+            and self._real == other._real
+            and self._imaginary == other._imaginary
+        )
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Gf.{type(self).__name__}({self._real}, {tuple(self._imaginary)})"
+
+
+Quatf = type("Quatf", (_Quat,), {"__slots__": ()})
+Quatd = type("Quatd", (_Quat,), {"__slots__": ()})
+Quath = type("Quath", (_Quat,), {"__slots__": ()})
+
+
+def _axis_rotation(axis, degrees: float) -> np.ndarray:
+    """列向量慣例（p' = p * M）的 3x3 旋轉矩陣"""
+    axis = np.asarray(list(axis), dtype=np.float64)
+    norm = np.linalg.norm(axis)
+    if not norm:
+        return np.identity(3)
+    x, y, z = axis / norm
+    angle = math.radians(degrees)
+    c, s, t = math.cos(angle), math.sin(angle), 1 - math.cos(angle)
+    column = np.array([
+        [t * x * x + c, t * x * y - s * z, t * x * z + s * y],
+        [t * x * y + s * z, t * y * y + c, t * y * z - s * x],
+        [t * x * z - s * y, t * y * z + s * x, t * z * z + c],
+    ])
+    return column.T
+
+
+def _quat_matrix(quat: _Quat) -> np.ndarray:
+    w = quat.GetReal()
+    x, y, z = quat.GetImaginary()
+    column = np.array([
+        [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+        [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+        [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+    ])
+    return column.T
+
+
+class Rotation:
+    __slots__ = ("_axis", "_angle")
+
+    def __init__(self, axis=(1.0, 0.0, 0.0), angle: float = 0.0):
+        self._axis = _GF_VECTORS["Vec3d"](axis)
+        self._angle = float(angle)
+
+    def GetAxis(self):
+        return _GF_VECTORS["Vec3d"](self._axis)
+
+    def GetAngle(self) -> float:
+        return self._angle
+
+    def GetQuat(self) -> Quatd:
+        half = math.radians(self._angle) / 2.0
+        axis = self._axis.GetNormalized()
+        return Quatd(math.cos(half), *(v * math.sin(half) for v in axis))
+
+    def _matrix(self) -> np.ndarray:
+        return _axis_rotation(self._axis, self._angle)
+
+    def __mul__(self, other: "Rotation") -> "Rotation":
+        # 先套用 self 再套用 other
+        matrix = self._matrix() @ other._matrix()
+        return _rotation_from_matrix(matrix)
+
+
+def _rotation_from_matrix(matrix: np.ndarray) -> Rotation:
+    column = matrix.T
+    angle = math.degrees(math.acos(max(-1.0, min(1.0, (np.trace(column) - 1) / 2))))
+    axis = (
+        column[2, 1] - column[1, 2],
+        column[0, 2] - column[2, 0],
+        column[1, 0] - column[0, 1],
+    )
+    if not any(axis):
+        axis = (1.0, 0.0, 0.0)
+    return Rotation(axis, angle)
+
+
+class Matrix4d:
+    """4x4 矩陣（列向量慣例，平移位於第 4 列）"""
+
+    __slots__ = ("_m",)
+
+    def __init__(self, *args):
+        if not args:
+            self._m = np.identity(4)
+        elif len(args) == 1 and isinstance(args[0], (int, float)):
+            self._m = np.identity(4) * float(args[0])
+        elif len(args) == 1:
+            self._m = np.array(
+                getattr(args[0], "_m", args[0]), dtype=np.float64
+            ).reshape(4, 4)
+        else:
+            self._m = np.array(args, dtype=np.float64).reshape(4, 4)
+
+    def SetIdentity(self):
+        self._m = np.identity(4)
+        return self
+
+    def SetTranslate(self, translation):
+        self._m = np.identity(4)
+        self._m[3, :3] = list(translation)
+        return self
+
+    def SetTranslateOnly(self, translation):
+        self._m[3, :3] = list(translation)
+        return self
+
+    def SetScale(self, scale):
+        if isinstance(scale, (int, float)):
+            scale = (scale, scale, scale)
+        self._m = np.diag(list(scale) + [1.0])
+        return self
+
+    def SetRotate(self, rotation):
+        self._m = np.identity(4)
+        self._m[:3, :3] = (
+            _quat_matrix(rotation)
+            if isinstance(rotation, _Quat)
+            else rotation._matrix()
+        )
+        return self
+
+    def ExtractTranslation(self):
+        return _GF_VECTORS["Vec3d"](self._m[3, :3])
+
+    def ExtractRotation(self) -> Rotation:
+        rows = self._m[:3, :3]
+        scale = np.linalg.norm(rows, axis=1)
+        scale[scale == 0] = 1.0
+        return _rotation_from_matrix(rows / scale[:, None])
+
+    def GetInverse(self):
+        return Matrix4d(np.linalg.inv(self._m))
+
+    def GetTranspose(self):
+        return Matrix4d(self._m.T)
+
+    def Transform(self, point):
+        return _GF_VECTORS["Vec3d"](
+            (np.append(np.asarray(list(point), dtype=np.float64), 1.0) @ self._m)[:3]
+        )
+
+    def __mul__(self, other):
+        if isinstance(other, Matrix4d):
+            return Matrix4d(self._m @ other._m)
+        return Matrix4d(self._m * float(other))
+
+    def __getitem__(self, row):
+        return _GF_VECTORS["Vec4d"](self._m[row])
+
+    def __eq__(self, other):
+        return isinstance(other, Matrix4d) and np.allclose(self._m, other._m)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Gf.Matrix4d({self._m.tolist()})"
+
+
+class Range3d:
+    __slots__ = ("min", "max")
+
+    def __init__(self, minimum=(0.0, 0.0, 0.0), maximum=(0.0, 0.0, 0.0)):
+        self.min = _GF_VECTORS["Vec3d"](minimum)
+        self.max = _GF_VECTORS["Vec3d"](maximum)
+
+    def GetMin(self):
+        return self.min
+
+    def GetMax(self):
+        return self.max
+
+    def GetSize(self):
+        return self.max - self.min
+
+
+def _gf_module() -> types.ModuleType:
+    module = types.ModuleType("pxr.Gf")
+    for name, cls in _GF_VECTORS.items():
+        setattr(module, name, cls)
+    for cls in (Quatf, Quatd, Quath, Rotation, Matrix4d, Range3d):
+        setattr(module, cls.__name__, cls)
+    module.Matrix4f = Matrix4d
+    module.DegreesToRadians = math.radians
+    module.RadiansToDegrees = math.degrees
+    module.IsClose = lambda a, b, epsilon: abs(a - b) <= epsilon
+    return module
+
+
+# ---------------------------------------------------------------------------
+# Vt
+# ---------------------------------------------------------------------------
+
+class _VtArray:
+    """以 NumPy 陣列保存的 Vt 陣列"""
+
+    __slots__ = ("_data",)
+    _dtype: Any = np.float32
+    _width = 0
+    _item: Optional[Callable] = None
+
+    def __init__(self, values=None):
+        if values is None:
+            values = []
+        if isinstance(values, int):
+            shape = (values, self._width) if self._width else (values,)
+            self._data = np.zeros(shape, dtype=self._dtype)
+            return
+        if isinstance(values, _VtArray):
+            values = values._data
+        elif self._item is not None and not isinstance(values, np.ndarray):
+            values = [self._to_row(value) for value in values]
+        data = np.array(values, dtype=self._dtype)
+        if self._width and data.size == 0:
+            data = data.reshape(0, self._width)
+        self._data = data
+
+    def _to_row(self, value):
+        if isinstance(value, _Quat):
+            return list(value.GetImaginary()) + [value.GetReal()]
+        return list(value)
+
+    @classmethod
+    def FromNumpy(cls, array):
+        result = cls.__new__(cls)
+        result._data = np.array(array, dtype=cls._dtype)
+        return result
+
+    def __len__(self):
+        return len(self._data)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return type(self).FromNumpy(self._data[index])
+        row = self._data[index]
+        if self._item is None:
+            return row.item()
+        return self._item(*row.tolist())
+
+    def __setitem__(self, index, value):
+        self._data[index] = self._to_row(value) if self._item is not None else value
+
+    def __iter__(self):
+        for index in range(len(self._data)):
+            yield self[index]
+
+    def __array__(self, dtype=None, copy=None):
+        return self._data if dtype is None else self._data.astype(dtype)
+
+    def __eq__(self, other):
+        try:
+            return np.array_equal(self._data, np.asarray(other, dtype=self._dtype))
+        except (TypeError, ValueError):
+            return False
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Vt.{type(self).__name__}({len(self)})"
+
+
+class _VtObjectArray(_VtArray):
+    """字串類陣列"""
+
+    __slots__ = ()
+    _dtype = object
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return type(self)(list(self._data[index]))
+        return self._data[index]
+
+    def __iter__(self):
+        return iter(self._data.tolist())
+
+
+def _quat_item(x, y, z, w):
+    return Quath(w, x, y, z)
+
+
+def _array_type(name: str, dtype, width: int = 0, item=None, base=_VtArray):
+    return type(name, (base,), {"__slots__": (), "_dtype": dtype, "_width": width,
+                                "_item": staticmethod(item) if item else None})
+
+
+_VT_ARRAYS = {
+    "BoolArray": _array_type("BoolArray", np.bool_),
+    "IntArray": _array_type("IntArray", np.int32),
+    "Int64Array": _array_type("Int64Array", np.int64),
+    "FloatArray": _array_type("FloatArray", np.float32),
+    "DoubleArray": _array_type("DoubleArray", np.float64),
+    "HalfArray": _array_type("HalfArray", np.float16),
+    "Vec2fArray": _array_type("Vec2fArray", np.float32, 2, _GF_VECTORS["Vec2f"]),
+    "Vec3fArray": _array_type("Vec3fArray", np.float32, 3, _GF_VECTORS["Vec3f"]),
+    "Vec3dArray": _array_type("Vec3dArray", np.float64, 3, _GF_VECTORS["Vec3d"]),
+    "Vec3hArray": _array_type("Vec3hArray", np.float16, 3, _GF_VECTORS["Vec3h"]),
+    "Vec4fArray": _array_type("Vec4fArray", np.float32, 4, _GF_VECTORS["Vec4f"]),
+    "QuathArray": _array_type("QuathArray", np.float16, 4, _quat_item),
+    "QuatfArray": _array_type("QuatfArray", np.float32, 4, _quat_item),
+    "TokenArray": _array_type("TokenArray", object, base=_VtObjectArray),
+    "StringArray": _array_type("StringArray", object, base=_VtObjectArray),
+}
+
+
+def _vt_module() -> types.ModuleType:
+    module = types.ModuleType("pxr.Vt")
+    for name, cls in _VT_ARRAYS.items():
+        setattr(module, name, cls)
+    return module
+
+
+# ---------------------------------------------------------------------------
+# Sdf
+# ---------------------------------------------------------------------------
+
+class Path(str):
+    """場景路徑（字串子類別，可直接作為字典鍵）"""
+
+    __slots__ = ()
+
+    @property
+    def pathString(self) -> str:
+        return str(self)
+
+    @property
+    def name(self) -> str:
+        if self == "/":
+            return ""
+        return (
+            self.rsplit(".", 1)[1] if self.IsPropertyPath() else self.rsplit("/", 1)[-1]
+        )
+
+    def IsEmpty(self) -> bool:
+        return not self
+
+    def IsAbsolutePath(self) -> bool:
+        return self.startswith("/")
+
+    def IsAbsoluteRootPath(self) -> bool:
+        return self == "/"
+
+    def IsPropertyPath(self) -> bool:
+        return "." in self.rsplit("/", 1)[-1]
+
+    def IsPrimPath(self) -> bool:
+        return bool(self) and not self.IsPropertyPath()
+
+    def GetPrimPath(self) -> "Path":
+        return Path(self.split(".", 1)[0]) if self.IsPropertyPath() else self
+
+    def GetParentPath(self) -> "Path":
+        if self.IsPropertyPath():
+            return self.GetPrimPath()
+        if self in ("/", ""):
+            return Path("")
+        parent = self.rsplit("/", 1)[0]
+        return Path(parent or "/")
+
+    def AppendChild(self, name: str) -> "Path":
+        return Path(("" if self == "/" else self) + "/" + name)
+
+    def AppendPath(self, relative: str) -> "Path":
+        relative = str(relative).strip("/")
+        return Path(("" if self == "/" else self) + "/" + relative)
+
+    def AppendProperty(self, name: str) -> "Path":
+        return Path(f"{self}.{name}")
+
+    def GetPrefixes(self) -> List["Path"]:
+        parts = [part for part in self.GetPrimPath().split("/") if part]
+        return [Path("/" + "/".join(parts[:index + 1])) for index in range(len(parts))]
+
+    def HasPrefix(self, prefix) -> bool:
+        prefix = str(prefix)
+        return (
+            prefix == "/" or self == prefix or self.startswith(prefix.rstrip("/") + "/")
+        )
+
+    def ReplacePrefix(self, old, new) -> "Path":
+        old, new = str(old), str(new)
+        return Path(new + self[len(old):]) if self.HasPrefix(old) else self
+
+    def __repr__(self):
+        return f"Sdf.Path('{self}')"
+
+
+Path.absoluteRootPath = Path("/")
+Path.emptyPath = Path("")
+
+
+class _ValueTypeName(str):
+    __slots__ = ()
+
+    @property
+    def isArray(self) -> bool:
+        return self.endswith("[]")
+
+    @property
+    def scalarType(self) -> "_ValueTypeName":
+        return _ValueTypeName(self[:-2]) if self.isArray else self
+
+    @property
+    def arrayType(self) -> "_ValueTypeName":
+        return self if self.isArray else _ValueTypeName(self + "[]")
+
+    @property
+    def type(self):
+        return self
+
+
+_SCALAR_TYPES = {
+    "Bool": "bool",
+    "UChar": "uchar",
+    "Int": "int",
+    "UInt": "uint",
+    "Int64": "int64",
+    "Half": "half",
+    "Float": "float",
+    "Double": "double",
+    "TimeCode": "timecode",
+    "String": "string",
+    "Token": "token",
+    "Asset": "asset",
+    "Int2": "int2",
+    "Int3": "int3",
+    "Float2": "float2",
+    "Float3": "float3",
+    "Float4": "float4",
+    "Double2": "double2",
+    "Double3": "double3",
+    "Double4": "double4",
+    "Half3": "half3",
+    "Point3f": "point3f",
+    "Point3d": "point3d",
+    "Vector3f": "vector3f",
+    "Vector3d": "vector3d",
+    "Normal3f": "normal3f",
+    "Normal3d": "normal3d",
+    "Color3f": "color3f",
+    "Color3d": "color3d",
+    "Color4f": "color4f",
+    "Quath": "quath",
+    "Quatf": "quatf",
+    "Quatd": "quatd",
+    "Matrix4d": "matrix4d",
+    "TexCoord2f": "texCoord2f",
+    "Opaque": "opaque",
+}
+
+
+class _ValueTypeNames:
+    pass
+
+
+for _name, _usd_name in _SCALAR_TYPES.items():
+    setattr(_ValueTypeNames, _name, _ValueTypeName(_usd_name))
+    setattr(_ValueTypeNames, _name + "Array", _ValueTypeName(_usd_name + "[]"))
+
+# 屬性型別對應的 Vt 陣列與 Gf 向量，用於寫入時轉換
+_ARRAY_STORAGE = {
+    "bool[]": "BoolArray",
+    "int[]": "IntArray",
+    "int64[]": "Int64Array",
+    "float[]": "FloatArray",
+    "double[]": "DoubleArray",
+    "half[]": "HalfArray",
+    "token[]": "TokenArray",
+    "string[]": "StringArray",
+    "asset[]": "StringArray",
+    "float2[]": "Vec2fArray",
+    "texCoord2f[]": "Vec2fArray",
+    "float3[]": "Vec3fArray",
+    "point3f[]": "Vec3fArray",
+    "vector3f[]": "Vec3fArray",
+    "normal3f[]": "Vec3fArray",
+    "color3f[]": "Vec3fArray",
+    "double3[]": "Vec3dArray",
+    "point3d[]": "Vec3dArray",
+    "half3[]": "Vec3hArray",
+    "float4[]": "Vec4fArray",
+    "color4f[]": "Vec4fArray",
+    "quath[]": "QuathArray",
+    "quatf[]": "QuatfArray",
+}
+_SCALAR_STORAGE = {
+    "float2": "Vec2f",
+    "texCoord2f": "Vec2f",
+    "double2": "Vec2d",
+    "int2": "Vec2i",
+    "float3": "Vec3f",
+    "point3f": "Vec3f",
+    "vector3f": "Vec3f",
+    "normal3f": "Vec3f",
+    "color3f": "Vec3f",
+    "double3": "Vec3d",
+    "point3d": "Vec3d",
+    "vector3d": "Vec3d",
+    "normal3d": "Vec3d",
+    "color3d": "Vec3d",
+    "half3": "Vec3h",
+    "int3": "Vec3i",
+    "float4": "Vec4f",
+    "color4f": "Vec4f",
+    "double4": "Vec4d",
+}
+
+
+def _coerce(type_name: str, value):
+    """依屬性型別轉換寫入的值（陣列轉為 NumPy 儲存）"""
+    if value is None:
+        return None
+    storage = _ARRAY_STORAGE.get(type_name)
+    if storage is not None:
+        cls = _VT_ARRAYS[storage]
+        return value if isinstance(value, cls) else cls(value)
+    storage = _SCALAR_STORAGE.get(type_name)
+    if storage is not None and not isinstance(value, _GF_VECTORS[storage]):
+        return _GF_VECTORS[storage](value)
+    if type_name == "matrix4d" and not isinstance(value, Matrix4d):
+        return Matrix4d(value)
+    return value
+
+
+class ChangeBlock:
+    """變更批次（單一圖層的模擬後端不需要延遲通知）"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class AttributeRecord:
+    __slots__ = (
+        "name",
+        "typeName",
+        "variability",
+        "_default",
+        "time_samples",
+        "custom",
+        "connections",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        type_name: str,
+        variability: str = "varying",
+        custom: bool = False,
+    ):
+        self.name = name
+        self.typeName = _ValueTypeName(type_name)
+        self.variability = variability
+        self._default = None
+        self.time_samples: Dict[float, Any] = {}
+        self.custom = custom
+        self.connections: List[Path] = []
+
+    @property
+    def default(self):
+        return self._default
+
+    @default.setter
+    def default(self, value):
+        self._default = _coerce(self.typeName, value)
+
+
+class PrimRecord:
+    """單一 prim 的資料（同時作為 Sdf.PrimSpec 使用）"""
+
+    __slots__ = (
+        "path",
+        "name",
+        "typeName",
+        "specifier",
+        "active",
+        "attributes",
+        "relationships",
+        "children",
+        "parent",
+        "metadata",
+        "api_schemas",
+    )
+
+    def __init__(self, path: Path, parent: Optional["PrimRecord"] = None):
+        self.path = path
+        self.name = path.name
+        self.typeName = ""
+        self.specifier = "over"
+        self.active = True
+        self.attributes: Dict[str, AttributeRecord] = {}
+        self.relationships: Dict[str, List[Path]] = {}
+        self.children: Dict[str, "PrimRecord"] = {}
+        self.parent = parent
+        self.metadata: Dict[str, Any] = {}
+        self.api_schemas: List[str] = []
+
+
+class Layer:
+    """單一圖層：以字典索引所有 prim 記錄"""
+
+    _anonymous_count = 0
+
+    def __init__(self, identifier: str = ""):
+        if not identifier:
+            Layer._anonymous_count += 1
+            identifier = f"anon:mock_{Layer._anonymous_count}.usda"
+        self.identifier = identifier
+        self.root = PrimRecord(Path("/"))
+        self.root.specifier = "def"
+        self.records: Dict[str, PrimRecord] = {"/": self.root}
+        self.metadata: Dict[str, Any] = {}
+
+    @classmethod
+    def CreateAnonymous(cls, tag: str = ""):
+        return cls()
+
+    def GetPrimAtPath(self, path) -> Optional[PrimRecord]:
+        return self.records.get(str(path))
+
+    def ensure(self, path: Path) -> PrimRecord:
+        """取得或建立記錄（父路徑不存在時一併以 over 建立）"""
+        record = self.records.get(path)
+        if record is not None:
+            return record
+        parent = self.ensure(path.GetParentPath())
+        record = PrimRecord(path, parent)
+        parent.children[record.name] = record
+        self.records[path] = record
+        return record
+
+    def remove(self, path: Path) -> bool:
+        record = self.records.get(path)
+        if record is None or record is self.root:
+            return False
+        for child_path in [p for p in self.records if Path(p).HasPrefix(path)]:
+            del self.records[child_path]
+        del record.parent.children[record.name]
+        return True
+
+    def ExportToString(self) -> str:
+        lines = ["#usda 1.0"]
+        if self.metadata:
+            lines.append("(")
+            lines.extend(
+                f"    {key} = {_format_value(value)}"
+                for key, value in self.metadata.items()
+            )
+            lines.append(")")
+        lines.append("")
+        for child in self.root.children.values():
+            _export_prim(child, lines, 0)
+        return "\n".join(lines) + "\n"
+
+    def Export(self, file_path: str) -> bool:
+        with builtins.open(file_path, "w", encoding="utf-8") as handle:
+            handle.write(self.ExportToString())
+        return True
+
+
+def _format_value(value) -> str:
+    if isinstance(value, _VtArray):
+        return repr(value._data.tolist())
+    if isinstance(value, (_Vec, tuple, list)):
+        return "(" + ", ".join(_format_value(v) for v in value) + ")"
+    if isinstance(value, str):
+        return f'"{value}"'
+    return repr(value)
+
+
+def _export_prim(record: PrimRecord, lines: List[str], depth: int):
+    indent = "    " * depth
+    type_part = f"{record.typeName} " if record.typeName else ""
+    lines.append(f'{indent}{record.specifier} {type_part}"{record.name}"')
+    lines.append(f"{indent}{{")
+    for attribute in record.attributes.values():
+        uniform = "uniform " if attribute.variability == "uniform" else ""
+        text = f"{indent}    {uniform}{attribute.typeName} {attribute.name}"
+        if attribute.default is not None:
+            text += f" = {_format_value(attribute.default)}"
+        lines.append(text)
+        if attribute.time_samples:
+            samples = ", ".join(
+                f"{time}: {_format_value(v)}"
+                for time, v in sorted(attribute.time_samples.items())
+            )
+            lines.append(
+                f"{indent}    {attribute.typeName} {attribute.name}.timeSamples = "
+                f"{{{samples}}}"
+            )
+    for name, targets in record.relationships.items():
+        lines.append(
+            f"{indent}    rel {name} = [{', '.join(f'<{t}>' for t in targets)}]"
+        )
+    for child in record.children.values():
+        _export_prim(child, lines, depth + 1)
+    lines.append(f"{indent}}}")
+
+
+def CreatePrimInLayer(layer: Layer, path) -> PrimRecord:
+    return layer.ensure(Path(path))
+
+
+def AttributeSpec(owner: PrimRecord, name: str, type_name, variability: str = "varying",
+                  declaresCustom: bool = False) -> AttributeRecord:
+    attribute = AttributeRecord(name, type_name, variability, declaresCustom)
+    owner.attributes[name] = attribute
+    return attribute
+
+
+def _sdf_module() -> types.ModuleType:
+    module = types.ModuleType("pxr.Sdf")
+    module.Path = Path
+    module.ValueTypeNames = _ValueTypeNames
+    module.ChangeBlock = ChangeBlock
+    module.Layer = Layer
+    module.PrimSpec = PrimRecord
+    module.CreatePrimInLayer = CreatePrimInLayer
+    module.AttributeSpec = AttributeSpec
+    module.SpecifierDef, module.SpecifierOver, module.SpecifierClass = (
+        "def",
+        "over",
+        "class",
+    )
+    module.VariabilityVarying, module.VariabilityUniform = "varying", "uniform"
+    module.AssetPath = str
+    return module
+
+
+# ---------------------------------------------------------------------------
+# Usd
+# ---------------------------------------------------------------------------
+
+class TimeCode:
+    __slots__ = ("_value",)
+
+    def __init__(self, value: Optional[float] = None):
+        self._value = value._value if isinstance(value, TimeCode) else value
+
+    @classmethod
+    def Default(cls) -> "TimeCode":
+        return cls(None)
+
+    @classmethod
+    def EarliestTime(cls) -> "TimeCode":
+        return cls(-math.inf)
+
+    def IsDefault(self) -> bool:
+        return self._value is None
+
+    def GetValue(self) -> float:
+        return math.nan if self._value is None else self._value
+
+    def __float__(self):
+        return self.GetValue()
+
+    def __repr__(self):
+        return (
+            "Usd.TimeCode.Default()"
+            if self._value is None
+            else f"Usd.TimeCode({self._value})"
+        )
+
+
+def _time_value(time) -> Optional[float]:
+    if time is None:
+        return None
+    if isinstance(time, TimeCode):
+        return time._value
+    return float(time)
+
+
+def _interpolate(samples: Dict[float, Any], time: float):
+    """時間取樣：數值與向量線性內插，其他型別保持前一個值"""
+    times = sorted(samples)
+    if time <= times[0]:
+        return samples[times[0]]
+    if time >= times[-1]:
+        return samples[times[-1]]
+    for lower, upper in zip(times, times[1:]):
+        if lower <= time <= upper:
+            a, b = samples[lower], samples[upper]
+            if time == lower:
+                return a
+            t = (time - lower) / (upper - lower)
+            if isinstance(a, (int, float)) and not isinstance(a, bool):
+                return a + (b - a) * t
+            if isinstance(a, _Vec):
+                return type(a)([x + (y - x) * t for x, y in zip(a, b)])
+            return a
+    return samples[times[-1]]
+
+
+class Attribute:
+    __slots__ = ("_prim", "_name", "_fallback", "_type_name")
+
+    def __init__(
+        self, prim: "Prim", name: str, fallback=None, type_name: Optional[str] = None
+    ):
+        self._prim = prim
+        self._name = name
+        self._fallback = fallback
+        # 結構描述內建屬性的型別：未寫入前也有效，第一次寫入時建立記錄
+        self._type_name = type_name
+
+    @property
+    def _record(self) -> Optional[AttributeRecord]:
+        record = self._prim._record
+        return record.attributes.get(self._name) if record is not None else None
+
+    def _authored(self) -> Optional[AttributeRecord]:
+        """寫入用的記錄；內建屬性尚未寫入時以結構描述的型別建立"""
+        record = self._record
+        if (
+            record is None
+            and self._type_name is not None
+            and self._prim._record is not None
+        ):
+            variability = "uniform" if self._name in _UNIFORM_ATTRIBUTES else "varying"
+            self._prim.CreateAttribute(
+                self._name, self._type_name, custom=False, variability=variability
+            )
+            record = self._record
+        return record
+
+    def IsValid(self) -> bool:
+        return self._record is not None or (
+            self._type_name is not None and self._prim._record is not None
+        )
+
+    __bool__ = IsValid
+
+    def Get(self, time=None):
+        record = self._record
+        if record is None:
+            return self._fallback
+        value = _time_value(time)
+        if value is not None and record.time_samples:
+            return _interpolate(record.time_samples, value)
+        return record.default if record.default is not None else self._fallback
+
+    def Set(self, value, time=None) -> bool:
+        record = self._authored()
+        if record is None:
+            raise RuntimeError(f"屬性不存在: {self.GetPath()}")
+        time = _time_value(time)
+        if time is None:
+            record.default = value
+        else:
+            record.time_samples[time] = _coerce(record.typeName, value)
+        return True
+
+    def Clear(self) -> bool:
+        record = self._record
+        if record is not None:
+            record.default = None
+            record.time_samples.clear()
+        return True
+
+    def Block(self):
+        self.Clear()
+
+    def HasValue(self) -> bool:
+        record = self._record
+        return self._fallback is not None or (
+            record is not None
+            and (record.default is not None or bool(record.time_samples))
+        )
+
+    def HasAuthoredValue(self) -> bool:
+        record = self._record
+        return record is not None and (
+            record.default is not None or bool(record.time_samples)
+        )
+
+    def GetTimeSamples(self) -> List[float]:
+        record = self._record
+        return sorted(record.time_samples) if record is not None else []
+
+    def GetNumTimeSamples(self) -> int:
+        return len(self.GetTimeSamples())
+
+    def GetName(self) -> str:
+        return self._name
+
+    def GetBaseName(self) -> str:
+        return self._name.rsplit(":", 1)[-1]
+
+    def GetNamespace(self) -> str:
+        return self._name.rsplit(":", 1)[0] if ":" in self._name else ""
+
+    def GetTypeName(self):
+        record = self._record
+        if record is not None:
+            return record.typeName
+        return _ValueTypeName(self._type_name or "")
+
+    def GetVariability(self) -> str:
+        record = self._record
+        return record.variability if record is not None else "varying"
+
+    def GetPath(self) -> Path:
+        return self._prim.GetPath().AppendProperty(self._name)
+
+    def GetPrim(self) -> "Prim":
+        return self._prim
+
+    def GetConnections(self) -> List[Path]:
+        record = self._record
+        return list(record.connections) if record is not None else []
+
+    def AddConnection(self, source) -> bool:
+        record = self._authored()
+        if record is not None:
+            record.connections.append(Path(str(source)))
+        return True
+
+    def SetConnections(self, sources) -> bool:
+        record = self._authored()
+        if record is not None:
+            record.connections = [Path(str(source)) for source in sources]
+        return True
+
+    def HasAuthoredConnections(self) -> bool:
+        return bool(self.GetConnections())
+
+    def __repr__(self):
+        return f"Usd.Prim(<{self._prim.GetPath()}>).GetAttribute('{self._name}')"
+
+
+class Relationship:
+    __slots__ = ("_prim", "_name")
+
+    def __init__(self, prim: "Prim", name: str):
+        self._prim = prim
+        self._name = name
+
+    def _targets(self) -> Optional[List[Path]]:
+        record = self._prim._record
+        return record.relationships.get(self._name) if record is not None else None
+
+    def IsValid(self) -> bool:
+        return self._targets() is not None
+
+    __bool__ = IsValid
+
+    def GetTargets(self) -> List[Path]:
+        return list(self._targets() or [])
+
+    def SetTargets(self, targets) -> bool:
+        self._prim._record.relationships[self._name] = [
+            Path(str(getattr(t, "GetPath", lambda: t)())) for t in targets
+        ]
+        return True
+
+    def AddTarget(self, target) -> bool:
+        self._prim._record.relationships.setdefault(self._name, []).append(
+            Path(str(target))
+        )
+        return True
+
+    def RemoveTarget(self, target) -> bool:
+        targets = self._targets()
+        if targets and Path(str(target)) in targets:
+            targets.remove(Path(str(target)))
+        return True
+
+    def ClearTargets(self, removeSpec: bool = False) -> bool:
+        if self._targets() is not None:
+            self._prim._record.relationships[self._name] = []
+        return True
+
+    def GetName(self) -> str:
+        return self._name
+
+    def GetPath(self) -> Path:
+        return self._prim.GetPath().AppendProperty(self._name)
+
+
+class Prim:
+    """Stage 上的 prim 句柄"""
+
+    __slots__ = ("_stage", "_record", "_path")
+
+    def __init__(
+        self,
+        stage: Optional["Stage"] = None,
+        record: Optional[PrimRecord] = None,
+        path: str = "",
+    ):
+        self._stage = stage
+        self._record = record
+        self._path = Path(record.path if record is not None else path)
+
+    def IsValid(self) -> bool:
+        return self._record is not None and self._stage is not None and \
+            self._stage._layer.records.get(self._path) is self._record
+
+    __bool__ = IsValid
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, Prim)
+            and self._record is other._record
+            and self._record is not None
+        )
+
+    def __hash__(self):
+        return hash(self._path)
+
+    def __repr__(self):
+        return (
+            f"Usd.Prim(<{self._path}>)" if self._record is not None else "invalid prim"
+        )
+
+    def GetStage(self) -> "Stage":
+        return self._stage
+
+    def GetPath(self) -> Path:
+        return self._path
+
+    GetPrimPath = GetPath
+
+    def GetName(self) -> str:
+        return self._path.name
+
+    def GetTypeName(self) -> str:
+        return self._record.typeName if self._record is not None else ""
+
+    def SetTypeName(self, type_name: str) -> bool:
+        self._record.typeName = type_name
+        return True
+
+    def GetSpecifier(self) -> str:
+        return self._record.specifier
+
+    def IsDefined(self) -> bool:
+        record = self._record
+        while record is not None:
+            if record.specifier != "def":
+                return False
+            record = record.parent
+        return self._record is not None
+
+    def IsActive(self) -> bool:
+        return self._record is not None and self._record.active
+
+    def SetActive(self, active: bool) -> bool:
+        self._record.active = bool(active)
+        return True
+
+    def IsPseudoRoot(self) -> bool:
+        return self._path == "/"
+
+    def GetParent(self) -> "Prim":
+        parent = self._record.parent if self._record is not None else None
+        return Prim(self._stage, parent) if parent is not None else Prim()
+
+    def GetChildren(self) -> List["Prim"]:
+        return [Prim(self._stage, child) for child in self._record.children.values()
+                if child.active and Prim(self._stage, child).IsDefined()]
+
+    def GetAllChildren(self) -> List["Prim"]:
+        return [Prim(self._stage, child) for child in self._record.children.values()]
+
+    def GetChild(self, name: str) -> "Prim":
+        child = self._record.children.get(name)
+        return (
+            Prim(self._stage, child)
+            if child is not None
+            else Prim(path=self._path.AppendChild(name))
+        )
+
+    def _schema(self):
+        return _SCHEMA_TYPES.get(self.GetTypeName())
+
+    def _builtin(self, name: str) -> Optional[Tuple[str, Any]]:
+        """結構描述定義的內建屬性 (型別, 預設值)"""
+        schema = self._schema()
+        if schema is not None:
+            for cls in schema.__mro__:
+                for usd_name, type_name, fallback in cls.__dict__.get(
+                    "_attributes", {}
+                ).values():
+                    if usd_name == name:
+                        return type_name, fallback
+        return None
+
+    def _fallback(self, name: str):
+        builtin = self._builtin(name)
+        return builtin[1] if builtin is not None else None
+
+    def GetAttribute(self, name: str) -> Attribute:
+        builtin = self._builtin(name)
+        if builtin is None:
+            return Attribute(self, name)
+        return Attribute(self, name, builtin[1], builtin[0])
+
+    def HasAttribute(self, name: str) -> bool:
+        return self._record is not None and (
+            name in self._record.attributes or self._builtin(name) is not None
+        )
+
+    def CreateAttribute(self, name: str, type_name, custom: bool = True,
+                        variability: str = "varying") -> Attribute:
+        if name not in self._record.attributes:
+            self._record.attributes[name] = AttributeRecord(
+                name, type_name, variability, custom
+            )
+        return Attribute(self, name, self._fallback(name))
+
+    def RemoveProperty(self, name: str) -> bool:
+        self._record.attributes.pop(name, None)
+        self._record.relationships.pop(name, None)
+        return True
+
+    def GetAttributes(self) -> List[Attribute]:
+        return [Attribute(self, name) for name in sorted(self._record.attributes)]
+
+    def GetAuthoredAttributes(self) -> List[Attribute]:
+        return self.GetAttributes()
+
+    def GetPropertyNames(self) -> List[str]:
+        return sorted(list(self._record.attributes) + list(self._record.relationships))
+
+    def GetRelationship(self, name: str) -> Relationship:
+        return Relationship(self, name)
+
+    def CreateRelationship(self, name: str, custom: bool = True) -> Relationship:
+        self._record.relationships.setdefault(name, [])
+        return Relationship(self, name)
+
+    def HasRelationship(self, name: str) -> bool:
+        return name in self._record.relationships
+
+    def GetRelationships(self) -> List[Relationship]:
+        return [Relationship(self, name) for name in sorted(self._record.relationships)]
+
+    def IsA(self, schema) -> bool:
+        own = self._schema()
+        return own is not None and isinstance(schema, type) and issubclass(own, schema)
+
+    def HasAPI(self, schema) -> bool:
+        return getattr(schema, "__name__", str(schema)) in self._record.api_schemas
+
+    def ApplyAPI(self, schema) -> bool:
+        name = getattr(schema, "__name__", str(schema))
+        if name not in self._record.api_schemas:
+            self._record.api_schemas.append(name)
+        return True
+
+    def GetAppliedSchemas(self) -> List[str]:
+        return list(self._record.api_schemas)
+
+    def SetMetadata(self, key: str, value) -> bool:
+        self._record.metadata[key] = value
+        return True
+
+    def GetMetadata(self, key: str):
+        return self._record.metadata.get(key)
+
+    def SetCustomDataByKey(self, key: str, value):
+        self._record.metadata.setdefault("customData", {})[key] = value
+
+    def GetCustomDataByKey(self, key: str):
+        return self._record.metadata.get("customData", {}).get(key)
+
+    def GetCustomData(self) -> Dict[str, Any]:
+        return dict(self._record.metadata.get("customData", {}))
+
+    def SetInstanceable(self, instanceable: bool) -> bool:
+        self._record.metadata["instanceable"] = bool(instanceable)
+        return True
+
+    def IsInstanceable(self) -> bool:
+        return bool(self._record.metadata.get("instanceable"))
+
+    def GetReferences(self) -> "_ListEditor":
+        return _ListEditor(self._record, "references")
+
+    def GetPayloads(self) -> "_ListEditor":
+        return _ListEditor(self._record, "payloads")
+
+
+class _ListEditor:
+    """references / payloads：只記錄新增的項目"""
+
+    __slots__ = ("_record", "_key")
+
+    def __init__(self, record: PrimRecord, key: str):
+        self._record = record
+        self._key = key
+
+    def _items(self) -> list:
+        return self._record.metadata.setdefault(self._key, [])
+
+    def AddReference(
+        self, asset_path: str = "", prim_path: str = "", *args, **kwargs
+    ) -> bool:
+        self._items().append((str(asset_path), str(prim_path)))
+        return True
+
+    AddPayload = AddReference
+
+    def AddInternalReference(self, prim_path: str) -> bool:
+        return self.AddReference("", prim_path)
+
+    def ClearReferences(self) -> bool:
+        self._items().clear()
+        return True
+
+    ClearPayloads = ClearReferences
+
+
+class _EditTarget:
+    __slots__ = ("_layer",)
+
+    def __init__(self, layer: Layer):
+        self._layer = layer
+
+    def GetLayer(self) -> Layer:
+        return self._layer
+
+
+class Stage:
+    """單一圖層的 Stage"""
+
+    def __init__(self, layer: Optional[Layer] = None):
+        self._layer = layer or Layer()
+        self._session_layer = Layer()
+
+    @classmethod
+    def CreateInMemory(cls, identifier: str = "", *args, **kwargs) -> "Stage":
+        return cls(Layer(identifier))
+
+    @classmethod
+    def CreateNew(cls, identifier: str, *args, **kwargs) -> "Stage":
+        return cls(Layer(identifier))
+
+    @classmethod
+    def Open(cls, identifier, *args, **kwargs) -> "Stage":
+        # 模擬後端不解析既有檔案，回傳同名的空 Stage
+        return cls(Layer(str(identifier)))
+
+    def GetRootLayer(self) -> Layer:
+        return self._layer
+
+    def GetSessionLayer(self) -> Layer:
+        return self._session_layer
+
+    def GetEditTarget(self) -> _EditTarget:
+        return _EditTarget(self._layer)
+
+    def SetEditTarget(self, target):
+        return None
+
+    def GetPseudoRoot(self) -> Prim:
+        return Prim(self, self._layer.root)
+
+    def GetPrimAtPath(self, path) -> Prim:
+        path = Path(str(path))
+        record = self._layer.records.get(path)
+        return Prim(self, record) if record is not None else Prim(path=path)
+
+    def DefinePrim(self, path, type_name: str = "") -> Prim:
+        path = Path(str(path))
+        if not path.IsAbsolutePath() or path.IsPropertyPath() or path == "/":
+            raise ValueError(f"無效的 prim 路徑: {path}")
+        record = self._layer.ensure(path)
+        # 與 Usd 相同：未定義的祖先以無類型的 def 補上
+        parent = record.parent
+        while parent is not None and parent is not self._layer.root:
+            if parent.specifier != "def":
+                parent.specifier = "def"
+            parent = parent.parent
+        record.specifier = "def"
+        if type_name:
+            record.typeName = str(type_name)
+        return Prim(self, record)
+
+    def OverridePrim(self, path) -> Prim:
+        return Prim(self, self._layer.ensure(Path(str(path))))
+
+    def RemovePrim(self, path) -> bool:
+        return self._layer.remove(Path(str(path)))
+
+    def _walk(self, record: PrimRecord, defined_only: bool) -> Iterator[Prim]:
+        for child in record.children.values():
+            if defined_only and (child.specifier != "def" or not child.active):
+                continue
+            yield Prim(self, child)
+            yield from self._walk(child, defined_only)
+
+    def Traverse(self, *args) -> Iterator[Prim]:
+        return self._walk(self._layer.root, True)
+
+    def TraverseAll(self) -> Iterator[Prim]:
+        return self._walk(self._layer.root, False)
+
+    def GetDefaultPrim(self) -> Prim:
+        name = self._layer.metadata.get("defaultPrim")
+        return self.GetPrimAtPath("/" + name) if name else Prim()
+
+    def SetDefaultPrim(self, prim) -> bool:
+        self._layer.metadata["defaultPrim"] = prim.GetName()
+        return True
+
+    def HasDefaultPrim(self) -> bool:
+        return "defaultPrim" in self._layer.metadata
+
+    def SetMetadata(self, key: str, value) -> bool:
+        self._layer.metadata[key] = value
+        return True
+
+    def GetMetadata(self, key: str):
+        return self._layer.metadata.get(key)
+
+    def GetStartTimeCode(self) -> float:
+        return self._layer.metadata.get("startTimeCode", 0.0)
+
+    def SetStartTimeCode(self, value: float):
+        self._layer.metadata["startTimeCode"] = float(value)
+
+    def GetEndTimeCode(self) -> float:
+        return self._layer.metadata.get("endTimeCode", 0.0)
+
+    def SetEndTimeCode(self, value: float):
+        self._layer.metadata["endTimeCode"] = float(value)
+
+    def GetTimeCodesPerSecond(self) -> float:
+        return self._layer.metadata.get("timeCodesPerSecond", 24.0)
+
+    def SetTimeCodesPerSecond(self, value: float):
+        self._layer.metadata["timeCodesPerSecond"] = float(value)
+
+    def GetFramesPerSecond(self) -> float:
+        return self._layer.metadata.get("framesPerSecond", 24.0)
+
+    def SetFramesPerSecond(self, value: float):
+        self._layer.metadata["framesPerSecond"] = float(value)
+
+    def ExportToString(self) -> str:
+        return self._layer.ExportToString()
+
+    def Export(self, file_path: str, *args, **kwargs) -> bool:
+        return self._layer.Export(file_path)
+
+    def Save(self):
+        return None
+
+
+def _usd_module() -> types.ModuleType:
+    module = types.ModuleType("pxr.Usd")
+    for cls in (Stage, Prim, Attribute, Relationship, TimeCode):
+        setattr(module, cls.__name__, cls)
+    module.EditTarget = _EditTarget
+    module.ListPositionBackOfPrependList = "backOfPrependList"
+    return module
+
+
+# ---------------------------------------------------------------------------
+# 結構描述（UsdGeom / UsdShade / UsdLux）
+# ---------------------------------------------------------------------------
+
+_SCHEMA_TYPES: Dict[str, type] = {}
+
+
+class _SchemaBase:
+    """結構描述類別：Get{Name}Attr / Create{Name}Attr 由 _attributes 表產生"""
+
+    __slots__ = ("_prim",)
+    _type_name = ""
+    # Python 名稱 -> (USD 屬性名稱, 型別, 預設值)
+    _attributes: Dict[str, Tuple[str, str, Any]] = {}
+    # Python 名稱 -> USD 關係名稱
+    _relationships: Dict[str, str] = {}
+
+    def __init__(self, prim=None):
+        if isinstance(prim, _SchemaBase):
+            prim = prim.GetPrim()
+        self._prim = prim if isinstance(prim, Prim) else Prim()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls._type_name:
+            _SCHEMA_TYPES[cls._type_name] = cls
+
+    @classmethod
+    def Define(cls, stage: Stage, path):
+        return cls(stage.DefinePrim(path, cls._type_name))
+
+    @classmethod
+    def Get(cls, stage: Stage, path):
+        return cls(stage.GetPrimAtPath(path))
+
+    def GetPrim(self) -> Prim:
+        return self._prim
+
+    def GetPath(self) -> Path:
+        return self._prim.GetPath()
+
+    def __bool__(self):
+        return bool(self._prim)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self._prim!r})"
+
+    @classmethod
+    def _lookup(cls, table: str, name: str):
+        for klass in cls.__mro__:
+            entry = klass.__dict__.get(table, {}).get(name)
+            if entry is not None:
+                return entry
+        return None
+
+    def __getattr__(self, attr: str):
+        for prefix, suffix, table in (
+            ("Get", "Attr", "_attributes"),
+            ("Create", "Attr", "_attributes"),
+            ("Get", "Rel", "_relationships"),
+            ("Create", "Rel", "_relationships"),
+        ):
+            if attr.startswith(prefix) and attr.endswith(suffix):
+                entry = type(self)._lookup(table, attr[len(prefix):-len(suffix)])
+                if entry is None:
+                    continue
+                if table == "_relationships":
+                    if prefix == "Get":
+                        return lambda: self._prim.GetRelationship(entry)
+                    return lambda: self._prim.CreateRelationship(entry, custom=False)
+                usd_name, type_name, fallback = entry
+                if prefix == "Get":
+                    return lambda: Attribute(self._prim, usd_name, fallback, type_name)
+                return lambda defaultValue=None, writeSparsely=False: self._create(
+                    usd_name, type_name, fallback, defaultValue
+                )
+        raise AttributeError(f"{type(self).__name__} 沒有屬性 {attr}")
+
+    def _create(self, usd_name: str, type_name: str, fallback, value) -> Attribute:
+        variability = "uniform" if usd_name in _UNIFORM_ATTRIBUTES else "varying"
+        attribute = self._prim.CreateAttribute(
+            usd_name, type_name, custom=False, variability=variability
+        )
+        attribute._fallback = fallback
+        if value is not None:
+            attribute.Set(value)
+        return attribute
+
+
+class _APISchemaBase(_SchemaBase):
+    __slots__ = ()
+
+    @classmethod
+    def Apply(cls, prim):
+        prim = prim.GetPrim() if isinstance(prim, _SchemaBase) else prim
+        prim.ApplyAPI(cls)
+        return cls(prim)
+
+    @classmethod
+    def CanApply(cls, prim) -> bool:
+        return bool(prim)
+
+
+_UNIFORM_ATTRIBUTES = {
+    "xformOpOrder",
+    "purpose",
+    "axis",
+    "subdivisionScheme",
+    "orientation",
+    "doubleSided",
+    "projection",
+}
+
+_Vec3d = _GF_VECTORS["Vec3d"]
+_Vec3f = _GF_VECTORS["Vec3f"]
+_Vec2f = _GF_VECTORS["Vec2f"]
+
+
+# ---- UsdGeom ----
+
+class Imageable(_SchemaBase):
+    __slots__ = ()
+    _attributes = {
+        "Visibility": ("visibility", "token", "inherited"),
+        "Purpose": ("purpose", "token", "default"),
+    }
+    _relationships = {"ProxyPrim": "proxyPrim"}
+
+    def MakeVisible(self, time=None):
+        self._create("visibility", "token", "inherited", "inherited")
+
+    def MakeInvisible(self, time=None):
+        self._create("visibility", "token", "inherited", "invisible")
+
+    def ComputeVisibility(self, time=None) -> str:
+        prim = self._prim
+        while prim and not prim.IsPseudoRoot():
+            if prim.GetAttribute("visibility").Get() == "invisible":
+                return "invisible"
+            prim = prim.GetParent()
+        return "inherited"
+
+
+_XFORM_OP_TYPES = {
+    "translate": ("double3", _Vec3d),
+    "scale": ("float3", _Vec3f),
+    "rotateX": ("float", float),
+    "rotateY": ("float", float),
+    "rotateZ": ("float", float),
+    "rotateXYZ": ("float3", _Vec3f),
+    "rotateXZY": ("float3", _Vec3f),
+    "rotateYXZ": ("float3", _Vec3f),
+    "rotateYZX": ("float3", _Vec3f),
+    "rotateZXY": ("float3", _Vec3f),
+    "rotateZYX": ("float3", _Vec3f),
+    "orient": ("quatf", Quatf),
+    "transform": ("matrix4d", Matrix4d),
+}
+# xformOpOrder 中以此前綴表示套用該 op 的反矩陣（例如樞軸）
+_INVERT_PREFIX = "!invert!"
+_PRECISION_TYPES = {
+    "double": {"float3": "double3", "float": "double", "quatf": "quatd"},
+    "half": {"float3": "half3", "double3": "half3", "quatf": "quath"},
+}
+
+
+class XformOp:
+    __slots__ = ("_attribute", "_op_type", "_inverse")
+
+    TypeTranslate, TypeScale, TypeOrient, TypeTransform = (
+        "translate",
+        "scale",
+        "orient",
+        "transform",
+    )
+    TypeRotateX, TypeRotateY, TypeRotateZ, TypeRotateXYZ = (
+        "rotateX",
+        "rotateY",
+        "rotateZ",
+        "rotateXYZ",
+    )
+    TypeRotateZYX = "rotateZYX"
+    PrecisionDouble, PrecisionFloat, PrecisionHalf = "double", "float", "half"
+
+    def __init__(self, attribute: Attribute, op_type: str, inverse: bool = False):
+        self._attribute = attribute
+        self._op_type = op_type
+        self._inverse = inverse
+
+    def Set(self, value, time=None) -> bool:
+        return self._attribute.Set(value, time)
+
+    def Get(self, time=None):
+        return self._attribute.Get(time)
+
+    def GetAttr(self) -> Attribute:
+        return self._attribute
+
+    def GetOpName(self) -> str:
+        return (_INVERT_PREFIX if self._inverse else "") + self._attribute.GetName()
+
+    def GetName(self) -> str:
+        return self._attribute.GetName()
+
+    def IsInverseOp(self) -> bool:
+        return self._inverse
+
+    def GetOpType(self) -> str:
+        return self._op_type
+
+    def GetPrecision(self) -> str:
+        return (
+            "double"
+            if str(self._attribute.GetTypeName()).startswith("double")
+            else "float"
+        )
+
+    def GetOpTransform(self, time=None) -> np.ndarray:
+        matrix = _op_matrix(self._op_type, self.Get(time))
+        return np.linalg.inv(matrix) if self._inverse else matrix
+
+    def __bool__(self):
+        return bool(self._attribute)
+
+
+def _op_matrix(op_type: str, value) -> np.ndarray:
+    """單一 xformOp 的 4x4 矩陣（列向量慣例）"""
+    matrix = np.identity(4)
+    if value is None:
+        return matrix
+    if op_type == "translate":
+        matrix[3, :3] = list(value)
+    elif op_type == "scale":
+        matrix[:3, :3] = np.diag(list(value))
+    elif op_type in ("rotateX", "rotateY", "rotateZ"):
+        axis = {"X": (1, 0, 0), "Y": (0, 1, 0), "Z": (0, 0, 1)}[op_type[-1]]
+        matrix[:3, :3] = _axis_rotation(axis, float(value))
+    elif op_type.startswith("rotate"):
+        rotation = np.identity(3)
+        angles = dict(zip("XYZ", value))
+        # rotateXYZ：先繞 X，再繞 Y，最後繞 Z
+        for axis_name in op_type[len("rotate"):]:
+            axis = {"X": (1, 0, 0), "Y": (0, 1, 0), "Z": (0, 0, 1)}[axis_name]
+            rotation = rotation @ _axis_rotation(axis, angles[axis_name])
+        matrix[:3, :3] = rotation
+    elif op_type == "orient":
+        matrix[:3, :3] = _quat_matrix(value)
+    elif op_type == "transform":
+        matrix = np.array(getattr(value, "_m", value), dtype=np.float64).reshape(4, 4)
+    return matrix
+
+
+class Xformable(Imageable):
+    __slots__ = ()
+    _attributes = {"XformOpOrder": ("xformOpOrder", "token[]", None)}
+
+    def _order(self) -> List[str]:
+        value = self._prim.GetAttribute("xformOpOrder").Get()
+        return list(value) if value is not None else []
+
+    def AddXformOp(
+        self,
+        op_type: str,
+        precision: Optional[str] = None,
+        opSuffix: str = "",
+        isInverseOp: bool = False,
+    ) -> XformOp:
+        name = f"xformOp:{op_type}" + (f":{opSuffix}" if opSuffix else "")
+        order = self._order()
+        if name in order:
+            raise RuntimeError(f"xformOp {name} 已存在於 {self.GetPath()}")
+        type_name = _XFORM_OP_TYPES[op_type][0]
+        if precision in _PRECISION_TYPES:
+            type_name = _PRECISION_TYPES[precision].get(type_name, type_name)
+        attribute = self._prim.CreateAttribute(name, type_name, custom=False)
+        self._create("xformOpOrder", "token[]", None, order + [name])
+        return XformOp(attribute, op_type)
+
+    def AddTranslateOp(
+        self, precision=None, opSuffix: str = "", isInverseOp: bool = False
+    ) -> XformOp:
+        return self.AddXformOp("translate", precision, opSuffix)
+
+    def AddScaleOp(
+        self, precision=None, opSuffix: str = "", isInverseOp: bool = False
+    ) -> XformOp:
+        return self.AddXformOp("scale", precision, opSuffix)
+
+    def AddRotateXOp(
+        self, precision=None, opSuffix: str = "", isInverseOp: bool = False
+    ) -> XformOp:
+        return self.AddXformOp("rotateX", precision, opSuffix)
+
+    def AddRotateYOp(
+        self, precision=None, opSuffix: str = "", isInverseOp: bool = False
+    ) -> XformOp:
+        return self.AddXformOp("rotateY", precision, opSuffix)
+
+    def AddRotateZOp(
+        self, precision=None, opSuffix: str = "", isInverseOp: bool = False
+    ) -> XformOp:
+        return self.AddXformOp("rotateZ", precision, opSuffix)
+
+    def AddRotateXYZOp(
+        self, precision=None, opSuffix: str = "", isInverseOp: bool = False
+    ) -> XformOp:
+        return self.AddXformOp("rotateXYZ", precision, opSuffix)
+
+    def AddRotateZYXOp(
+        self, precision=None, opSuffix: str = "", isInverseOp: bool = False
+    ) -> XformOp:
+        return self.AddXformOp("rotateZYX", precision, opSuffix)
+
+    def AddOrientOp(
+        self, precision=None, opSuffix: str = "", isInverseOp: bool = False
+    ) -> XformOp:
+        return self.AddXformOp("orient", precision, opSuffix)
+
+    def AddTransformOp(
+        self, precision=None, opSuffix: str = "", isInverseOp: bool = False
+    ) -> XformOp:
+        return self.AddXformOp("transform", precision, opSuffix)
+
+    def MakeMatrixXform(self) -> XformOp:
+        self.ClearXformOpOrder()
+        return self.AddTransformOp()
+
+    def GetOrderedXformOps(self) -> List[XformOp]:
+        ops = []
+        for name in self._order():
+            inverse = name.startswith(_INVERT_PREFIX)
+            name = name[len(_INVERT_PREFIX):] if inverse else name
+            ops.append(
+                XformOp(self._prim.GetAttribute(name), name.split(":")[1], inverse)
+            )
+        return ops
+
+    def SetXformOpOrder(self, ops, resetXformStack: bool = False) -> bool:
+        self._create("xformOpOrder", "token[]", None, [op.GetOpName() for op in ops])
+        return True
+
+    def ClearXformOpOrder(self) -> bool:
+        self._create("xformOpOrder", "token[]", None, [])
+        return True
+
+    def _local_matrix(self, time=None) -> np.ndarray:
+        matrix = np.identity(4)
+        # xformOpOrder 中越後面的 op 越先套用到點上
+        for op in reversed(self.GetOrderedXformOps()):
+            matrix = matrix @ op.GetOpTransform(time)
+        return matrix
+
+    def GetLocalTransformation(self, time=None) -> Matrix4d:
+        return Matrix4d(self._local_matrix(time))
+
+    def ComputeLocalToWorldTransform(self, time=None) -> Matrix4d:
+        matrix = self._local_matrix(time)
+        parent = self._prim.GetParent()
+        while parent and not parent.IsPseudoRoot():
+            matrix = matrix @ Xformable(parent)._local_matrix(time)
+            parent = parent.GetParent()
+        return Matrix4d(matrix)
+
+
+class Xform(Xformable):
+    __slots__ = ()
+    _type_name = "Xform"
+
+
+class Scope(Imageable):
+    __slots__ = ()
+    _type_name = "Scope"
+
+
+_ROTATION_ORDERS = ("XYZ", "XZY", "YXZ", "YZX", "ZXY", "ZYX")
+
+
+class XformCommonAPI(_SchemaBase):
+    """平移 / 樞軸 / 旋轉 / 縮放的常用變換堆疊；
+    已有不相容的 xformOp 時各 Set 回傳 False"""
+
+    __slots__ = ()
+    RotationOrderXYZ, RotationOrderXZY, RotationOrderYXZ = "XYZ", "XZY", "YXZ"
+    RotationOrderYZX, RotationOrderZXY, RotationOrderZYX = "YZX", "ZXY", "ZYX"
+    OpTranslate, OpRotate, OpScale, OpPivot = "translate", "rotate", "scale", "pivot"
+
+    _PIVOT = "xformOp:translate:pivot"
+
+    def _ops(self) -> Dict[str, XformOp]:
+        return {op.GetOpName(): op for op in Xformable(self._prim).GetOrderedXformOps()}
+
+    def _rotate_name(self, ops: Dict[str, XformOp]) -> Optional[str]:
+        return next(
+            (name for name in ops if name[len("xformOp:rotate") :] in _ROTATION_ORDERS),
+            None,
+        )
+
+    def _compatible(self, ops: Dict[str, XformOp]) -> bool:
+        allowed = {
+            "xformOp:translate",
+            self._PIVOT,
+            "xformOp:scale",
+            _INVERT_PREFIX + self._PIVOT,
+            self._rotate_name(ops),
+        }
+        return set(ops) <= allowed
+
+    def _set_op(
+        self, op_type: str, type_name: str, value, time, suffix: str = ""
+    ) -> bool:
+        """建立（或重用）op 並依 translate, pivot, rotate, scale, !invert!pivot 排序"""
+        ops = self._ops()
+        if not self._compatible(ops):
+            return False
+        name = f"xformOp:{op_type}" + (f":{suffix}" if suffix else "")
+        if name.startswith("xformOp:rotate"):
+            existing = self._rotate_name(ops)
+            if existing is not None and existing != name:
+                return False
+        if name not in ops:
+            attribute = self._prim.CreateAttribute(name, type_name, custom=False)
+            ops[name] = XformOp(attribute, op_type)
+            if name == self._PIVOT:
+                ops[_INVERT_PREFIX + name] = XformOp(attribute, op_type, inverse=True)
+        rotate = self._rotate_name(ops)
+        order = [n for n in ("xformOp:translate", self._PIVOT, rotate, "xformOp:scale",
+                             _INVERT_PREFIX + self._PIVOT) if n in ops]
+        Xformable(self._prim).SetXformOpOrder([ops[n] for n in order])
+        return ops[name].Set(value, time)
+
+    def SetTranslate(self, translation, time=None) -> bool:
+        return self._set_op("translate", "double3", _Vec3d(*translation), time)
+
+    def SetPivot(self, pivot, time=None) -> bool:
+        return self._set_op("translate", "float3", _Vec3f(*pivot), time, suffix="pivot")
+
+    def SetRotate(self, rotation, rotOrder: str = "XYZ", time=None) -> bool:
+        return self._set_op(f"rotate{rotOrder}", "float3", _Vec3f(*rotation), time)
+
+    def SetScale(self, scale, time=None) -> bool:
+        return self._set_op("scale", "float3", _Vec3f(*scale), time)
+
+    def SetXformVectors(
+        self, translation, rotation, scale, pivot, rotOrder: str = "XYZ", time=None
+    ) -> bool:
+        return (
+            self.SetTranslate(translation, time)
+            and self.SetRotate(rotation, rotOrder, time)
+            and self.SetScale(scale, time)
+            and self.SetPivot(pivot, time)
+        )
+
+    def GetXformVectors(self, time=None):
+        """(平移, 旋轉, 縮放, 樞軸, 旋轉順序)；未設定的分量為單位值"""
+        ops = self._ops()
+
+        def value(name, default):
+            op = ops.get(name)
+            result = op.Get(time) if op is not None else None
+            return result if result is not None else default
+
+        rotate = self._rotate_name(ops)
+        return (
+            value("xformOp:translate", _Vec3d(0.0, 0.0, 0.0)),
+            value(rotate, _Vec3f(0.0, 0.0, 0.0)) if rotate else _Vec3f(0.0, 0.0, 0.0),
+            value("xformOp:scale", _Vec3f(1.0, 1.0, 1.0)),
+            value(self._PIVOT, _Vec3f(0.0, 0.0, 0.0)),
+            rotate[len("xformOp:rotate") :] if rotate else self.RotationOrderXYZ,
+        )
+
+    GetXformVectorsByAccumulation = GetXformVectors
+
+    def ResetXformStack(self) -> bool:
+        return Xformable(self._prim).ClearXformOpOrder()
+
+
+class Boundable(Xformable):
+    __slots__ = ()
+    _attributes = {"Extent": ("extent", "float3[]", None)}
+
+
+class Gprim(Boundable):
+    __slots__ = ()
+    _attributes = {
+        "DisplayColor": ("primvars:displayColor", "color3f[]", None),
+        "DisplayOpacity": ("primvars:displayOpacity", "float[]", None),
+        "DoubleSided": ("doubleSided", "bool", False),
+        "Orientation": ("orientation", "token", "rightHanded"),
+    }
+
+
+def _gprim(name: str, attributes: Dict[str, Tuple[str, str, Any]], base=Gprim):
+    return type(
+        name, (base,), {"__slots__": (), "_type_name": name, "_attributes": attributes}
+    )
+
+
+Cube = _gprim("Cube", {"Size": ("size", "double", 2.0)})
+Sphere = _gprim("Sphere", {"Radius": ("radius", "double", 1.0)})
+Cylinder = _gprim(
+    "Cylinder",
+    {
+        "Radius": ("radius", "double", 1.0),
+        "Height": ("height", "double", 2.0),
+        "Axis": ("axis", "token", "Z"),
+    },
+)
+Cone = _gprim(
+    "Cone",
+    {
+        "Radius": ("radius", "double", 1.0),
+        "Height": ("height", "double", 2.0),
+        "Axis": ("axis", "token", "Z"),
+    },
+)
+Capsule = _gprim(
+    "Capsule",
+    {
+        "Radius": ("radius", "double", 0.5),
+        "Height": ("height", "double", 1.0),
+        "Axis": ("axis", "token", "Z"),
+    },
+)
+Plane = _gprim(
+    "Plane",
+    {
+        "Width": ("width", "double", 2.0),
+        "Length": ("length", "double", 2.0),
+        "Axis": ("axis", "token", "Z"),
+    },
+)
+
+
+class PointBased(Gprim):
+    __slots__ = ()
+    _attributes = {
+        "Points": ("points", "point3f[]", None),
+        "Normals": ("normals", "normal3f[]", None),
+        "Velocities": ("velocities", "vector3f[]", None),
+    }
+
+
+Mesh = _gprim("Mesh", {
+    "FaceVertexCounts": ("faceVertexCounts", "int[]", None),
+    "FaceVertexIndices": ("faceVertexIndices", "int[]", None),
+    "SubdivisionScheme": ("subdivisionScheme", "token", "catmullClark"),
+}, base=PointBased)
+Points = _gprim("Points", {"Widths": ("widths", "float[]", None)}, base=PointBased)
+BasisCurves = _gprim(
+    "BasisCurves",
+    {
+        "CurveVertexCounts": ("curveVertexCounts", "int[]", None),
+        "Widths": ("widths", "float[]", None),
+        "Type": ("type", "token", "cubic"),
+        "Basis": ("basis", "token", "bezier"),
+    },
+    base=PointBased,
+)
+
+
+class Camera(Xformable):
+    __slots__ = ()
+    _type_name = "Camera"
+    _attributes = {
+        "FocalLength": ("focalLength", "float", 50.0),
+        "HorizontalAperture": ("horizontalAperture", "float", 20.955),
+        "VerticalAperture": ("verticalAperture", "float", 15.2908),
+        "ClippingRange": ("clippingRange", "float2", _Vec2f(1.0, 1000000.0)),
+        "Projection": ("projection", "token", "perspective"),
+        "FocusDistance": ("focusDistance", "float", 0.0),
+        "FStop": ("fStop", "float", 0.0),
+    }
+
+
+class PointInstancer(Boundable):
+    __slots__ = ()
+    _type_name = "PointInstancer"
+    _attributes = {
+        "ProtoIndices": ("protoIndices", "int[]", None),
+        "Ids": ("ids", "int64[]", None),
+        "Positions": ("positions", "point3f[]", None),
+        "Orientations": ("orientations", "quath[]", None),
+        "Scales": ("scales", "float3[]", None),
+        "Velocities": ("velocities", "vector3f[]", None),
+        "AngularVelocities": ("angularVelocities", "vector3f[]", None),
+        "InvisibleIds": ("invisibleIds", "int64[]", None),
+    }
+    _relationships = {"Prototypes": "prototypes"}
+
+
+class Primvar:
+    __slots__ = ("_attribute",)
+
+    def __init__(self, attribute: Attribute):
+        self._attribute = attribute
+
+    def Set(self, value, time=None) -> bool:
+        return self._attribute.Set(value, time)
+
+    def Get(self, time=None):
+        return self._attribute.Get(time)
+
+    def GetAttr(self) -> Attribute:
+        return self._attribute
+
+    def GetName(self) -> str:
+        return self._attribute.GetName()
+
+    def GetPrimvarName(self) -> str:
+        return self._attribute.GetName()[len("primvars:"):]
+
+    def SetInterpolation(self, interpolation: str) -> bool:
+        self._attribute.GetPrim()._record.metadata[
+            f"{self.GetName()}:interpolation"
+        ] = interpolation
+        return True
+
+    def GetInterpolation(self) -> str:
+        return self._attribute.GetPrim()._record.metadata.get(
+            f"{self.GetName()}:interpolation", "constant"
+        )
+
+    def IsDefined(self) -> bool:
+        return bool(self._attribute)
+
+    __bool__ = IsDefined
+
+
+class PrimvarsAPI(_APISchemaBase):
+    __slots__ = ()
+
+    def CreatePrimvar(self, name: str, type_name, interpolation: Optional[str] = None,
+                      elementSize: int = -1) -> Primvar:
+        primvar = Primvar(
+            self._prim.CreateAttribute(f"primvars:{name}", type_name, custom=False)
+        )
+        if interpolation:
+            primvar.SetInterpolation(interpolation)
+        return primvar
+
+    def GetPrimvar(self, name: str) -> Primvar:
+        return Primvar(self._prim.GetAttribute(f"primvars:{name}"))
+
+    def HasPrimvar(self, name: str) -> bool:
+        return self._prim.HasAttribute(f"primvars:{name}")
+
+    def GetPrimvars(self) -> List[Primvar]:
+        return [Primvar(attribute) for attribute in self._prim.GetAttributes()
+                if attribute.GetName().startswith("primvars:")]
+
+
+class _Tokens:
+    """UsdGeom / UsdShade / UsdLux 常用的 token"""
+
+    def __getattr__(self, name: str) -> str:
+        return name.rstrip("_")
+
+
+def _set_stage_up_axis(stage: Stage, axis: str) -> bool:
+    return stage.SetMetadata("upAxis", axis)
+
+
+def _get_stage_up_axis(stage: Stage) -> str:
+    return stage.GetMetadata("upAxis") or "Y"
+
+
+def _set_meters_per_unit(stage: Stage, value: float) -> bool:
+    return stage.SetMetadata("metersPerUnit", float(value))
+
+
+def _get_meters_per_unit(stage: Stage) -> float:
+    return stage.GetMetadata("metersPerUnit") or 0.01
+
+
+class LinearUnits:
+    nanometers, micrometers, millimeters, centimeters = 1e-9, 1e-6, 1e-3, 1e-2
+    meters, kilometers, inches, feet = 1.0, 1000.0, 0.0254, 0.3048
+
+
+def _usdgeom_module() -> types.ModuleType:
+    module = types.ModuleType("pxr.UsdGeom")
+    for cls in (
+        Imageable,
+        Xformable,
+        XformCommonAPI,
+        Xform,
+        Scope,
+        Boundable,
+        Gprim,
+        Cube,
+        Sphere,
+        Cylinder,
+        Cone,
+        Capsule,
+        Plane,
+        PointBased,
+        Mesh,
+        Points,
+        BasisCurves,
+        Camera,
+        PointInstancer,
+        PrimvarsAPI,
+        Primvar,
+        XformOp,
+    ):
+        setattr(module, cls.__name__, cls)
+    module.Tokens = _Tokens()
+    module.LinearUnits = LinearUnits
+    module.SetStageUpAxis = _set_stage_up_axis
+    module.GetStageUpAxis = _get_stage_up_axis
+    module.SetStageMetersPerUnit = _set_meters_per_unit
+    module.GetStageMetersPerUnit = _get_meters_per_unit
+    return module
+
+
+# ---- UsdShade ----
+
+class _ShadeAttribute:
+    """inputs: / outputs: 屬性"""
+
+    __slots__ = ("_attribute",)
+
+    def __init__(self, attribute: Attribute):
+        self._attribute = attribute
+
+    def Set(self, value, time=None) -> bool:
+        return self._attribute.Set(value, time)
+
+    def Get(self, time=None):
+        return self._attribute.Get(time)
+
+    def GetAttr(self) -> Attribute:
+        return self._attribute
+
+    def GetBaseName(self) -> str:
+        return self._attribute.GetName().split(":", 1)[1]
+
+    def GetFullName(self) -> str:
+        return self._attribute.GetName()
+
+    def GetPrim(self) -> Prim:
+        return self._attribute.GetPrim()
+
+    def ConnectToSource(
+        self, source, sourceName: Optional[str] = None, *args, **kwargs
+    ) -> bool:
+        if isinstance(source, _ShadeAttribute):
+            path = source.GetAttr().GetPath()
+        elif isinstance(source, (_SchemaBase, Prim)):
+            path = source.GetPath().AppendProperty(f"outputs:{sourceName or 'out'}")
+        else:
+            path = Path(str(source))
+        return self._attribute.SetConnections([path])
+
+    def GetConnectedSources(self):
+        return self._attribute.GetConnections()
+
+    def HasConnectedSource(self) -> bool:
+        return self._attribute.HasAuthoredConnections()
+
+    def __bool__(self):
+        return bool(self._attribute)
+
+
+class Input(_ShadeAttribute):
+    __slots__ = ()
+
+
+class Output(_ShadeAttribute):
+    __slots__ = ()
+
+
+class _Connectable(_SchemaBase):
+    __slots__ = ()
+
+    def CreateInput(self, name: str, type_name) -> Input:
+        return Input(
+            self._prim.CreateAttribute(f"inputs:{name}", type_name, custom=False)
+        )
+
+    def GetInput(self, name: str) -> Input:
+        return Input(self._prim.GetAttribute(f"inputs:{name}"))
+
+    def GetInputs(self) -> List[Input]:
+        return [
+            Input(a)
+            for a in self._prim.GetAttributes()
+            if a.GetName().startswith("inputs:")
+        ]
+
+    def CreateOutput(self, name: str, type_name) -> Output:
+        return Output(
+            self._prim.CreateAttribute(f"outputs:{name}", type_name, custom=False)
+        )
+
+    def GetOutput(self, name: str) -> Output:
+        return Output(self._prim.GetAttribute(f"outputs:{name}"))
+
+    def ConnectableAPI(self) -> "ConnectableAPI":
+        return ConnectableAPI(self._prim)
+
+
+class Shader(_Connectable):
+    __slots__ = ()
+    _type_name = "Shader"
+    _attributes = {
+        "Id": ("info:id", "token", None),
+        "ImplementationSource": ("info:implementationSource", "token", "id"),
+    }
+
+    def SetSourceAsset(self, asset, sourceType: str = "") -> bool:
+        key = f"info:{sourceType}:sourceAsset" if sourceType else "info:sourceAsset"
+        self._create(key, "asset", None, str(asset))
+        self._create("info:implementationSource", "token", "id", "sourceAsset")
+        return True
+
+    def SetSourceAssetSubIdentifier(
+        self, identifier: str, sourceType: str = ""
+    ) -> bool:
+        key = (
+            f"info:{sourceType}:sourceAsset:subIdentifier"
+            if sourceType
+            else "info:sourceAsset:subIdentifier"
+        )
+        self._create(key, "token", None, identifier)
+        return True
+
+    def GetShaderId(self):
+        return self._prim.GetAttribute("info:id").Get()
+
+
+class NodeGraph(_Connectable):
+    __slots__ = ()
+    _type_name = "NodeGraph"
+
+
+class Material(NodeGraph):
+    __slots__ = ()
+    _type_name = "Material"
+
+    def _terminal(self, name: str, renderContext: str = "") -> Output:
+        full = f"{renderContext}:{name}" if renderContext else name
+        return self.CreateOutput(full, "token")
+
+    def CreateSurfaceOutput(self, renderContext: str = "") -> Output:
+        return self._terminal("surface", renderContext)
+
+    def GetSurfaceOutput(self, renderContext: str = "") -> Output:
+        return self.GetOutput(
+            f"{renderContext}:surface" if renderContext else "surface"
+        )
+
+    def CreateDisplacementOutput(self, renderContext: str = "") -> Output:
+        return self._terminal("displacement", renderContext)
+
+    def CreateVolumeOutput(self, renderContext: str = "") -> Output:
+        return self._terminal("volume", renderContext)
+
+
+class MaterialBindingAPI(_APISchemaBase):
+    __slots__ = ()
+
+    def Bind(self, material, bindingStrength: str = "weakerThanDescendants",
+             materialPurpose: str = "") -> bool:
+        name = (
+            f"material:binding:{materialPurpose}"
+            if materialPurpose
+            else "material:binding"
+        )
+        self._prim.ApplyAPI(MaterialBindingAPI)
+        return self._prim.CreateRelationship(name, custom=False).SetTargets(
+            [material.GetPath()]
+        )
+
+    def UnbindAllBindings(self) -> bool:
+        for name in [
+            n
+            for n in self._prim._record.relationships
+            if n.startswith("material:binding")
+        ]:
+            del self._prim._record.relationships[name]
+        return True
+
+    def GetDirectBindingRel(self, materialPurpose: str = "") -> Relationship:
+        return self._prim.GetRelationship(
+            f"material:binding:{materialPurpose}"
+            if materialPurpose
+            else "material:binding"
+        )
+
+    def ComputeBoundMaterial(self, materialPurpose: str = ""):
+        prim = self._prim
+        while prim and not prim.IsPseudoRoot():
+            targets = prim.GetRelationship("material:binding").GetTargets()
+            if targets:
+                return Material(
+                    prim.GetStage().GetPrimAtPath(targets[0])
+                ), prim.GetRelationship("material:binding")
+            prim = prim.GetParent()
+        return Material(), Relationship(self._prim, "material:binding")
+
+
+class ConnectableAPI(_Connectable):
+    """任意可連接的 prim（Shader、NodeGraph、Material）；連接操作另有靜態方法版本"""
+
+    __slots__ = ()
+
+    @staticmethod
+    def ConnectToSource(
+        shading_attr, source, sourceName: Optional[str] = None, *args, **kwargs
+    ) -> bool:
+        if isinstance(shading_attr, Attribute):
+            shading_attr = Input(shading_attr)
+        return shading_attr.ConnectToSource(source, sourceName)
+
+    @staticmethod
+    def _attribute(shading_attr) -> Attribute:
+        return (
+            shading_attr.GetAttr()
+            if isinstance(shading_attr, _ShadeAttribute)
+            else shading_attr
+        )
+
+    @staticmethod
+    def HasConnectedSource(shading_attr) -> bool:
+        return ConnectableAPI._attribute(shading_attr).HasAuthoredConnections()
+
+    @staticmethod
+    def GetConnectedSource(shading_attr):
+        """(來源 ConnectableAPI, 來源名稱, 來源類型)；沒有連接時來源無效"""
+        attribute = ConnectableAPI._attribute(shading_attr)
+        connections = attribute.GetConnections()
+        if not connections:
+            return ConnectableAPI(), "", ""
+        path = connections[0]
+        prim = attribute.GetPrim().GetStage().GetPrimAtPath(path.GetPrimPath())
+        kind, name = path.name.split(":", 1)
+        return ConnectableAPI(prim), name, "Output" if kind == "outputs" else "Input"
+
+    @staticmethod
+    def DisconnectSource(shading_attr, sourceAttr=None) -> bool:
+        return ConnectableAPI._attribute(shading_attr).SetConnections([])
+
+    ClearSource = ClearSources = DisconnectSource
+
+    @staticmethod
+    def CanConnect(shading_attr, source) -> bool:
+        return True
+
+    def IsContainer(self) -> bool:
+        return self._prim.GetTypeName() in ("NodeGraph", "Material")
+
+    def GetOutputs(self) -> List[Output]:
+        return [
+            Output(a)
+            for a in self._prim.GetAttributes()
+            if a.GetName().startswith("outputs:")
+        ]
+
+
+def _usdshade_module() -> types.ModuleType:
+    module = types.ModuleType("pxr.UsdShade")
+    for cls in (
+        Shader,
+        NodeGraph,
+        Material,
+        MaterialBindingAPI,
+        ConnectableAPI,
+        Input,
+        Output,
+    ):
+        setattr(module, cls.__name__, cls)
+    module.Tokens = _Tokens()
+    return module
+
+
+# ---- UsdLux ----
+
+class _LightBase(Xformable):
+    __slots__ = ()
+    _attributes = {
+        "Intensity": ("inputs:intensity", "float", 1.0),
+        "Exposure": ("inputs:exposure", "float", 0.0),
+        "Color": ("inputs:color", "color3f", _Vec3f(1.0, 1.0, 1.0)),
+        "EnableColorTemperature": ("inputs:enableColorTemperature", "bool", False),
+        "ColorTemperature": ("inputs:colorTemperature", "float", 6500.0),
+        "Normalize": ("inputs:normalize", "bool", False),
+        "Diffuse": ("inputs:diffuse", "float", 1.0),
+        "Specular": ("inputs:specular", "float", 1.0),
+    }
+
+
+def _light(name: str, attributes: Dict[str, Tuple[str, str, Any]]):
+    return type(
+        name,
+        (_LightBase,),
+        {"__slots__": (), "_type_name": name, "_attributes": attributes},
+    )
+
+
+DistantLight = _light("DistantLight", {"Angle": ("inputs:angle", "float", 0.53)})
+DomeLight = _light(
+    "DomeLight",
+    {
+        "TextureFile": ("inputs:texture:file", "asset", None),
+        "TextureFormat": ("inputs:texture:format", "token", "automatic"),
+    },
+)
+SphereLight = _light("SphereLight", {"Radius": ("inputs:radius", "float", 0.5),
+                                     "TreatAsPoint": ("treatAsPoint", "bool", False)})
+RectLight = _light("RectLight", {"Width": ("inputs:width", "float", 1.0),
+                                 "Height": ("inputs:height", "float", 1.0)})
+DiskLight = _light("DiskLight", {"Radius": ("inputs:radius", "float", 0.5)})
+CylinderLight = _light("CylinderLight", {"Length": ("inputs:length", "float", 1.0),
+                                         "Radius": ("inputs:radius", "float", 0.5)})
+
+
+class ShadowAPI(_APISchemaBase):
+    __slots__ = ()
+    _attributes = {
+        "ShadowEnable": ("inputs:shadow:enable", "bool", True),
+        "ShadowColor": ("inputs:shadow:color", "color3f", _Vec3f(0.0, 0.0, 0.0)),
+        "ShadowDistance": ("inputs:shadow:distance", "float", -1.0),
+    }
+
+
+def _usdlux_module() -> types.ModuleType:
+    module = types.ModuleType("pxr.UsdLux")
+    for cls in (
+        DistantLight,
+        DomeLight,
+        SphereLight,
+        RectLight,
+        DiskLight,
+        CylinderLight,
+        ShadowAPI,
+    ):
+        setattr(module, cls.__name__, cls)
+    module.LightAPI = _LightBase
+    module.Tokens = _Tokens()
+    return module
+
+
+# ---------------------------------------------------------------------------
+# omni
+# ---------------------------------------------------------------------------
+
+class Selection:
+    def __init__(self):
+        self._paths: List[str] = []
+
+    def get_selected_prim_paths(self) -> List[str]:
+        return list(self._paths)
+
+    def set_selected_prim_paths(self, paths, expand_in_stage: bool = False):
+        self._paths = [str(path) for path in paths]
+
+    def clear_selected_prim_paths(self):
+        self._paths = []
+
+
+class UsdContext:
+    """omni.usd.get_context() 的模擬"""
+
+    def __init__(self):
+        self._stage = Stage.CreateInMemory()
+        self._selection = Selection()
+
+    def get_stage(self) -> Stage:
+        return self._stage
+
+    def new_stage(self, *args, **kwargs) -> bool:
+        self._stage = Stage.CreateInMemory()
+        self._selection = Selection()
+        return True
+
+    def open_stage(self, url: str, *args, **kwargs) -> bool:
+        self._stage = Stage.Open(url)
+        return True
+
+    def close_stage(self, *args, **kwargs) -> bool:
+        return self.new_stage()
+
+    def save_stage(self, *args, **kwargs) -> bool:
+        return True
+
+    def get_stage_url(self) -> str:
+        return self._stage.GetRootLayer().identifier
+
+    def get_stage_id(self) -> int:
+        return id(self._stage)
+
+    def get_selection(self) -> Selection:
+        return self._selection
+
+
+class Timeline:
+    def __init__(self):
+        self._playing = False
+        self._current = 0.0
+        self._start = 0.0
+        self._end = 0.0
+        self._time_codes_per_second = 24.0
+        self._looping = True
+
+    def play(self, *args, **kwargs):
+        self._playing = True
+
+    def pause(self):
+        self._playing = False
+
+    def stop(self):
+        self._playing = False
+        self._current = self._start
+
+    def is_playing(self) -> bool:
+        return self._playing
+
+    def is_stopped(self) -> bool:
+        return not self._playing and self._current == self._start
+
+    def set_current_time(self, time: float):
+        self._current = float(time)
+
+    def get_current_time(self) -> float:
+        return self._current
+
+    def set_start_time(self, time: float):
+        self._start = float(time)
+
+    def get_start_time(self) -> float:
+        return self._start
+
+    def set_end_time(self, time: float):
+        self._end = float(time)
+
+    def get_end_time(self) -> float:
+        return self._end
+
+    def set_time_codes_per_second(self, value: float):
+        self._time_codes_per_second = float(value)
+
+    def get_time_codes_per_second(self) -> float:
+        return self._time_codes_per_second
+
+    def set_looping(self, looping: bool):
+        self._looping = bool(looping)
+
+    def is_looping(self) -> bool:
+        return self._looping
+
+
+def _infer_type(value) -> str:
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "double"
+    if isinstance(value, str):
+        return "token"
+    if isinstance(value, Matrix4d):
+        return "matrix4d"
+    if isinstance(value, _Vec):
+        return {
+            2: "float2",
+            3: "double3" if "d" in type(value).__name__ else "float3",
+            4: "float4",
+        }[len(value)]
+    if (
+        isinstance(value, (_VtArray, list, tuple))
+        and len(value)
+        and isinstance(value[0], (_Vec, list, tuple))
+    ):
+        return "float3[]"
+    if isinstance(value, (tuple, list)) and len(value) == 3:
+        return "double3"
+    return "double"
+
+
+class _CommandRegistry:
+    """omni.kit.commands 的模擬：常用命令直接操作目前的 Stage"""
+
+    def __init__(self, context: UsdContext):
+        self._context = context
+        self.log: List[Tuple[str, Dict[str, Any]]] = []
+        self._commands: Dict[str, Callable[..., Any]] = {
+            "CreatePrim": self._create_prim,
+            "CreatePrimCommand": self._create_prim,
+            "CreatePrimWithDefaultXform": self._create_prim_with_default_xform,
+            "CreatePrimWithDefaultXformCommand": self._create_prim_with_default_xform,
+            "CreateMeshPrim": self._create_mesh_prim,
+            "CreateMeshPrimWithDefaultXform": self._create_mesh_prim,
+            "CreateMeshPrimWithDefaultXformCommand": self._create_mesh_prim,
+            "DeletePrims": self._delete_prims,
+            "DeletePrimsCommand": self._delete_prims,
+            "MovePrim": self._move_prim,
+            "MovePrimCommand": self._move_prim,
+            "MovePrims": self._move_prims,
+            "CopyPrim": self._copy_prim,
+            "CopyPrimCommand": self._copy_prim,
+            "TransformPrim": self._transform_prim,
+            "TransformPrimCommand": self._transform_prim,
+            "TransformPrimSRT": self._transform_prim_srt,
+            "TransformPrimSRTCommand": self._transform_prim_srt,
+            "ChangeProperty": self._change_property,
+            "ChangePropertyCommand": self._change_property,
+            "CreateAndBindMdlMaterialFromLibrary": self._create_mdl_material,
+            "CreateMdlMaterialPrim": self._create_mdl_material,
+            "CreateMdlMaterialPrimCommand": self._create_mdl_material,
+            "CreatePreviewSurfaceMaterialPrim": self._create_preview_material,
+            "BindMaterial": self._bind_material,
+            "BindMaterialCommand": self._bind_material,
+            "SelectPrims": self._select_prims,
+            "SelectPrimsCommand": self._select_prims,
+            "ToggleVisibilitySelectedPrims": self._toggle_visibility,
+        }
+
+    @property
+    def _stage(self) -> Stage:
+        return self._context.get_stage()
+
+    def register(self, name: str, fn: Callable[..., Any]):
+        self._commands[name] = fn
+
+    def execute(self, name: str, *args, **kwargs):
+        """與 Kit 相同回傳 (是否成功, 結果)"""
+        self.log.append((name, kwargs))
+        command = self._commands.get(name)
+        if command is None:
+            print(f"[mock omni.kit.commands] 未支援的命令: {name}")
+            return False, None
+        return True, command(**kwargs)
+
+    def _unique_path(self, path: str) -> str:
+        candidate, index = path, 1
+        while self._stage.GetPrimAtPath(candidate):
+            candidate = f"{path}_{index:02d}"
+            index += 1
+        return candidate
+
+    def _create_prim(
+        self,
+        prim_type: str = "Xform",
+        prim_path: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+        select_new_prim: bool = True,
+        **kwargs,
+    ) -> str:
+        path = self._unique_path(str(prim_path or f"/{prim_type}"))
+        prim = self._stage.DefinePrim(path, prim_type)
+        for name, value in (attributes or {}).items():
+            prim.CreateAttribute(name, _infer_type(value)).Set(value)
+        if select_new_prim:
+            self._context.get_selection().set_selected_prim_paths([path])
+        return path
+
+    def _create_prim_with_default_xform(
+        self,
+        prim_type: str = "Xform",
+        prim_path: Optional[str] = None,
+        attributes: Optional[Dict[str, Any]] = None,
+        **kwargs,
+    ) -> str:
+        path = self._create_prim(prim_type, prim_path, attributes, **kwargs)
+        xformable = Xformable(self._stage.GetPrimAtPath(path))
+        xformable.AddTranslateOp().Set(_Vec3d(0.0, 0.0, 0.0))
+        xformable.AddRotateXYZOp().Set(_Vec3f(0.0, 0.0, 0.0))
+        xformable.AddScaleOp().Set(_Vec3f(1.0, 1.0, 1.0))
+        return path
+
+    def _create_mesh_prim(
+        self, prim_type: str = "Cube", prim_path: Optional[str] = None, **kwargs
+    ) -> str:
+        path = self._create_prim_with_default_xform(
+            "Mesh", prim_path or f"/{prim_type}", **kwargs
+        )
+        return path
+
+    def _delete_prims(self, paths=(), **kwargs):
+        for path in paths:
+            self._stage.RemovePrim(path)
+
+    def _move_prim(self, path_from: str, path_to: str, **kwargs):
+        layer = self._stage.GetRootLayer()
+        source = layer.GetPrimAtPath(path_from)
+        if source is None:
+            raise RuntimeError(f"prim 不存在: {path_from}")
+        target = layer.ensure(Path(str(path_to)))
+        _copy_record(source, target, layer)
+        layer.remove(Path(str(path_from)))
+
+    def _move_prims(self, paths_to_move: Optional[Dict[str, str]] = None, **kwargs):
+        for path_from, path_to in (paths_to_move or {}).items():
+            self._move_prim(path_from, path_to)
+
+    def _copy_prim(
+        self, path_from: str, path_to: Optional[str] = None, **kwargs
+    ) -> str:
+        layer = self._stage.GetRootLayer()
+        source = layer.GetPrimAtPath(path_from)
+        if source is None:
+            raise RuntimeError(f"prim 不存在: {path_from}")
+        path = self._unique_path(str(path_to or path_from))
+        _copy_record(source, layer.ensure(Path(path)), layer)
+        return path
+
+    def _transform_prim(
+        self, path: str, new_transform_matrix, old_transform_matrix=None, **kwargs
+    ):
+        xformable = Xformable(self._stage.GetPrimAtPath(path))
+        xformable.MakeMatrixXform().Set(Matrix4d(new_transform_matrix))
+
+    def _transform_prim_srt(
+        self,
+        path: str,
+        new_translation=None,
+        new_rotation_euler=None,
+        new_scale=None,
+        **kwargs,
+    ):
+        prim = self._stage.GetPrimAtPath(path)
+        xformable = Xformable(prim)
+        ops = {op.GetOpType(): op for op in xformable.GetOrderedXformOps()}
+        for op_type, value in (
+            ("translate", new_translation),
+            ("rotateXYZ", new_rotation_euler),
+            ("scale", new_scale),
+        ):
+            if value is None:
+                continue
+            op = ops.get(op_type) or xformable.AddXformOp(op_type)
+            op.Set(value)
+
+    def _change_property(self, prop_path: str, value, prev=None, **kwargs):
+        prim_path, name = str(prop_path).split(".", 1)
+        prim = self._stage.GetPrimAtPath(prim_path)
+        if not prim:
+            raise RuntimeError(f"prim 不存在: {prim_path}")
+        attribute = prim.GetAttribute(name)
+        if not attribute:
+            attribute = prim.CreateAttribute(name, _infer_type(value))
+        attribute.Set(value)
+
+    def _material_prim(
+        self, mtl_path: Optional[str], mtl_name: str
+    ) -> Tuple[str, Material]:
+        path = self._unique_path(str(mtl_path or f"/World/Looks/{mtl_name}"))
+        return path, Material.Define(self._stage, path)
+
+    def _create_mdl_material(
+        self,
+        mdl_name: str = "",
+        mtl_name: str = "",
+        mtl_path: Optional[str] = None,
+        mtl_url: str = "",
+        mtl_created_list: Optional[list] = None,
+        bind_selected_prims: bool = False,
+        **kwargs,
+    ) -> str:
+        mtl_name = (
+            mtl_name
+            or (mdl_name or mtl_url).rsplit("/", 1)[-1].replace(".mdl", "")
+            or "Material"
+        )
+        path, material = self._material_prim(mtl_path, mtl_name)
+        shader = Shader.Define(self._stage, f"{path}/Shader")
+        shader.SetSourceAsset(mdl_name or mtl_url, "mdl")
+        shader.SetSourceAssetSubIdentifier(mtl_name, "mdl")
+        material.CreateSurfaceOutput("mdl").ConnectToSource(
+            shader.CreateOutput("out", "token")
+        )
+        if mtl_created_list is not None:
+            mtl_created_list.append(path)
+        if bind_selected_prims:
+            for prim_path in self._context.get_selection().get_selected_prim_paths():
+                self._bind_material(prim_path, path)
+        return path
+
+    def _create_preview_material(
+        self,
+        mtl_path: Optional[str] = None,
+        mtl_name: str = "PreviewSurface",
+        mtl_created_list: Optional[list] = None,
+        **kwargs,
+    ) -> str:
+        path, material = self._material_prim(mtl_path, mtl_name)
+        shader = Shader.Define(self._stage, f"{path}/Shader")
+        shader.CreateIdAttr("UsdPreviewSurface")
+        material.CreateSurfaceOutput().ConnectToSource(
+            shader.CreateOutput("surface", "token")
+        )
+        if mtl_created_list is not None:
+            mtl_created_list.append(path)
+        return path
+
+    def _bind_material(self, prim_path, material_path: str, strength=None, **kwargs):
+        material = Material(self._stage.GetPrimAtPath(material_path))
+        for path in (
+            prim_path if isinstance(prim_path, (list, tuple)) else [prim_path]
+        ):
+            MaterialBindingAPI.Apply(self._stage.GetPrimAtPath(path)).Bind(material)
+
+    def _select_prims(
+        self,
+        old_selected_paths=None,
+        new_selected_paths=(),
+        expand_in_stage: bool = False,
+        **kwargs,
+    ):
+        self._context.get_selection().set_selected_prim_paths(new_selected_paths)
+
+    def _toggle_visibility(self, selected_paths=(), **kwargs):
+        for path in selected_paths:
+            imageable = Imageable(self._stage.GetPrimAtPath(path))
+            if imageable.ComputeVisibility() == "invisible":
+                imageable.MakeVisible()
+            else:
+                imageable.MakeInvisible()
+
+
+def _copy_record(source: PrimRecord, target: PrimRecord, layer: Layer):
+    target.typeName = source.typeName
+    target.specifier = source.specifier
+    target.active = source.active
+    target.metadata = dict(source.metadata)
+    target.api_schemas = list(source.api_schemas)
+    for name, attribute in source.attributes.items():
+        copy = AttributeRecord(
+            name, attribute.typeName, attribute.variability, attribute.custom
+        )
+        copy._default = attribute._default
+        copy.time_samples = dict(attribute.time_samples)
+        copy.connections = list(attribute.connections)
+        target.attributes[name] = copy
+    target.relationships = {
+        name: list(targets) for name, targets in source.relationships.items()
+    }
+    for name, child in source.children.items():
+        _copy_record(child, layer.ensure(target.path.AppendChild(name)), layer)
+
+
+# ---------------------------------------------------------------------------
+# 後端
+# ---------------------------------------------------------------------------
+
+# 無狀態的 pxr 模組由所有後端共用
+_PXR_MODULES = {
+    "Gf": _gf_module(),
+    "Vt": _vt_module(),
+    "Sdf": _sdf_module(),
+    "Usd": _usd_module(),
+    "UsdGeom": _usdgeom_module(),
+    "UsdShade": _usdshade_module(),
+    "UsdLux": _usdlux_module(),
+}
+
+
+class MockUsdBackend:
+    """一組獨立的模擬模組（各自的 Stage、選取、時間軸與命令記錄）"""
+
+    def __init__(self):
+        self.context = UsdContext()
+        self.timeline = Timeline()
+        self.commands = _CommandRegistry(self.context)
+        self.modules = self._build_modules()
+
+    def _build_modules(self) -> Dict[str, types.ModuleType]:
+        pxr = types.ModuleType("pxr")
+        modules = {"pxr": pxr}
+        for name, module in _PXR_MODULES.items():
+            setattr(pxr, name, module)
+            modules[f"pxr.{name}"] = module
+
+        omni = types.ModuleType("omni")
+        omni_usd = types.ModuleType("omni.usd")
+        omni_usd.get_context = lambda name="": self.context
+        omni_usd.get_world_transform_matrix = lambda prim, time=None: \
+            Xformable(prim).ComputeLocalToWorldTransform(time)
+        omni_usd.get_local_transform_matrix = lambda prim, time=None: Xformable(
+            prim
+        ).GetLocalTransformation(time)
+        omni_kit = types.ModuleType("omni.kit")
+        omni_commands = types.ModuleType("omni.kit.commands")
+        omni_commands.execute = self.commands.execute
+        omni_commands.register = self.commands.register
+        omni_timeline = types.ModuleType("omni.timeline")
+        omni_timeline.get_timeline_interface = lambda *args: self.timeline
+        omni.usd, omni.kit, omni.timeline = omni_usd, omni_kit, omni_timeline
+        omni_kit.commands = omni_commands
+        modules.update(
+            {
+                "omni": omni,
+                "omni.usd": omni_usd,
+                "omni.kit": omni_kit,
+                "omni.kit.commands": omni_commands,
+                "omni.timeline": omni_timeline,
+            }
+        )
+        return modules
+
+    @property
+    def stage(self) -> Stage:
+        return self.context.get_stage()
+
+    def reset(self):
+        """換一個全新的 Stage 並清除命令記錄"""
+        self.context.new_stage()
+        self.timeline = Timeline()
+        self.commands.log.clear()
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        root = name.split(".", 1)[0]
+        if level == 0 and root in ("pxr", "omni"):
+            module = self.modules.get(name)
+            if module is None:
+                raise ModuleNotFoundError(f"模擬後端未提供模組: {name}", name=name)
+            return module if fromlist else self.modules[root]
+        return builtins.__import__(name, globals, locals, fromlist, level)
+
+    def builtins(self) -> Dict[str, Any]:
+        """以模擬模組攔截 import 的 builtins（只影響使用它的執行環境）"""
+        namespace = dict(builtins.__dict__)
+        namespace["__import__"] = self._import
+        return namespace
+
+    def environment(self) -> Dict[str, Any]:
+        """生成代碼的執行環境：預先匯入常用模組並提供目前的 Stage"""
+        environment = {
+            "__builtins__": self.builtins(),
+            "omni": self.modules["omni"],
+            "stage": self.stage,
+        }
+        for name in ("Usd", "UsdGeom", "UsdShade", "UsdLux", "Sdf", "Gf", "Vt"):
+            environment[name] = _PXR_MODULES[name]
+        return environment
+
+    def load_module(self, module: types.ModuleType) -> types.ModuleType:
+        """以模擬模組重新載入指定模組的原始碼（例如 usd_bulk），讓它操作模擬 Stage"""
+        with builtins.open(module.__file__, encoding="utf-8") as handle:
+            source = handle.read()
+        clone = types.ModuleType(module.__name__)
+        clone.__file__ = module.__file__
+        clone.__dict__["__builtins__"] = self.builtins()
+        exec(compile(source, module.__file__, "exec"), clone.__dict__)
+        return clone
+
+    def summary(self) -> Dict[str, Any]:
+        """目前 Stage 的概況（依類型統計 prim 數量）"""
+        counts: Dict[str, int] = {}
+        for prim in self.stage.Traverse():
+            type_name = prim.GetTypeName() or "(untyped)"
+            counts[type_name] = counts.get(type_name, 0) + 1
+        return {
+            "prims": sum(counts.values()),
+            "types": counts,
+            "commands": len(self.commands.log),
+        }
@@ -3,39 +3,207 @@ Omniverse Python 代碼生成器
 專門生成可執行的 Omniverse Python 腳本
 """
 
-from langchain_groq import ChatGroq
-from langchain.prompts import ChatPromptTemplate, PromptTemplate
-from langchain.schema.runnable import Runnable
-from langchain.schema.output_parser import StrOutputParser
-from groq_config import engine_config
+import io
 import json
-import traceback
+import re
 import sys
-import io
-from contextlib import redirect_stdout, redirect_stderr
+import time
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+
+from langchain.prompts import ChatPromptTemplate, PromptTemplate
+from langchain.schema.output_parser import StrOutputParser
+from langchain.schema.runnable import Runnable, RunnableLambda
+from langchain_groq import ChatGroq
+
+from api_index import format_issues, validate_script
+from code_extractor import CodeBlockExtractor, extract, is_valid_python
+from code_repair import (
+    SOURCE_NAME,
+    RepairStats,
+    apply_repair,
+    error_summary,
+    failing_lines,
+    numbered_excerpt,
+    parse_hunks,
+    printed_traceback,
+)
+from groq_config import UnifiedEngineConfig, engine_config
+from query_classifier import classify_query
+from script_templates import TemplateLibrary
+from token_usage import UsageCallbackHandler, get_usage_store
+from tracing import tracer
 
 # 模擬 Omniverse 模組（若未安裝）
 try:
-    import omni.usd
     import omni.kit.commands
+    import omni.usd
     OMNIVERSE_AVAILABLE = True
 except ImportError:
     OMNIVERSE_AVAILABLE = False
     print("注意：Omniverse 模組未安裝，將運行在模擬模式")
 
+# 批量操作輔助函式（需要 NumPy 與 USD）
+try:
+    import numpy as np
+
+    import usd_bulk
+    BULK_AVAILABLE = usd_bulk.USD_AVAILABLE
+except ImportError:
+    np = None
+    usd_bulk = None
+    BULK_AVAILABLE = False
+
+# 離線模擬後端：沒有 Omniverse 時在模擬的 omni / pxr 上執行生成的代碼
+try:
+    import mock_usd
+    MOCK_USD_AVAILABLE = True
+except ImportError:
+    mock_usd = None
+    MOCK_USD_AVAILABLE = False
+
+# 模擬後端上也能使用批量輔助函式
+BULK_AVAILABLE = BULK_AVAILABLE or (
+    usd_bulk is not None and MOCK_USD_AVAILABLE and not OMNIVERSE_AVAILABLE
+)
+
+# 物件數量達到此值或需求提到批量時，提示模型改用批量輔助函式
+BULK_THRESHOLD = 100
+BULK_KEYWORDS = ("批量", "大量", "所有物件", "全部物件", "bulk", "batch")
+
+BULK_GUIDANCE = """### 批量操作（大量物件時必須使用）
+執行環境已注入 `usd_bulk` 與 `np`，
+不要逐一呼叫 omni.kit.commands.execute 或 UsdGeom.*.Define：
+```python
+# 一次定義多個物件：變換與顏色以 NumPy 陣列 (N, 3) 傳入，內部使用 Sdf.ChangeBlock
+# 與圖層層級寫入
+paths = usd_bulk.numbered_paths("/World/Cubes", "Cube", 1000)
+usd_bulk.define_prims(
+    paths, prim_type="Cube",
+    translations=usd_bulk.random_positions(1000, extent=50.0),
+    scales=np.full((1000, 3), 0.5),
+    colors=usd_bulk.random_colors(1000)
+)
+
+# 批量修改既有物件
+usd_bulk.set_transforms(
+    paths, translations=usd_bulk.grid_positions(len(paths), spacing=2.0)
+)
+usd_bulk.set_colors(paths, colors=np.tile([1.0, 0.0, 0.0], (len(paths), 1)))
+```
+
+"""
+
+INSTANCER_GUIDANCE = """\
+### 大量相同物件（數量達 {threshold} 以上時必須使用 PointInstancer）
+不要為每個副本定義 prim；原型只定義一次，位置、方向與縮放以 NumPy 陣列寫入：
+```python
+count = 10000
+usd_bulk.define_point_instancer(
+    "/World/Trees",
+    positions=usd_bulk.random_positions(count, extent=200.0, flat=True),
+    prototypes=("Cube",),                                   # 原型類型或既有 prim 路徑
+    rotations=np.column_stack(
+        [np.zeros(count), np.random.uniform(0, 360, count), np.zeros(count)]
+    ),
+    scales=np.random.uniform(0.5, 1.5, (count, 3)),
+    colors=usd_bulk.random_colors(count)
+)
+# 數量不確定時使用 usd_bulk.scatter(path, count, "Cube", positions=...)，
+# 會依門檻自動選擇
+```
+
+"""
+
+
+def requested_count(request: str) -> int:
+    """需求中提到的最大數量"""
+    return max((int(number) for number in re.findall(r"\d+", request)), default=0)
+
+
+def needs_bulk_mode(request: str) -> bool:
+    """需求是否涉及大量物件"""
+    lowered = request.lower()
+    if any(keyword in lowered for keyword in BULK_KEYWORDS):
+        return True
+    return requested_count(request) >= BULK_THRESHOLD
+
+
+def bulk_guidance(request: str) -> str:
+    """依需求規模附加到提示中的批量操作說明"""
+    if not BULK_AVAILABLE or not needs_bulk_mode(request):
+        return ""
+    guidance = BULK_GUIDANCE
+    if requested_count(request) >= usd_bulk.INSTANCER_THRESHOLD:
+        # 先說明 PointInstancer，模型較不會退回逐一定義
+        guidance = (
+            INSTANCER_GUIDANCE.format(threshold=usd_bulk.INSTANCER_THRESHOLD) + guidance
+        )
+    return guidance
+
+
+# 自動修復的最大次數
+MAX_REPAIR_ITERATIONS = 3
+
+REPAIR_PROMPT = PromptTemplate(
+    input_variables=["request", "error", "excerpt"],
+    template="""以下 Omniverse Python 腳本執行失敗，請修正。
+
+原始需求：{request}
+
+錯誤：
+{error}
+
+相關代碼（行號 | 內容，> 為出錯行）：
+{excerpt}
+
+只回覆需要替換的行，格式如下（起、迄為原代碼的行號，含兩端；可有多個區段）：
+@@ 起-迄
+替換後的代碼行
+
+不要重複未修改的行，也不要加上行號。腳本可能已部分執行，修正後的寫法需可重複執行
+（例如新增 xformOp 前先確認是否已存在）。
+"""
+)
+
 
 class OmniverseCodeGenerator:
     """Omniverse Python 代碼生成與執行器"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        execution_backend: str = "auto",
+        max_repair_iterations: int = MAX_REPAIR_ITERATIONS,
+        llm: Runnable = None,
+        engine: UnifiedEngineConfig = None,
+    ):
+        # llm 指定時取代引擎模型（測試與基準測試注入假模型）
+        self.llm = llm
+        # 模型與設定來源，未指定時使用全域 engine_config
+        self.engine = engine or engine_config
         self.chain = self._create_code_generation_chain()
+        self.repair_chain = self._create_repair_chain()
+        self.max_repair_iterations = max_repair_iterations
+        self.repair_stats = RepairStats()
         self.execution_context = self._setup_execution_context()
+        # 從已驗證的生成結果學習的參數化範本
+        self.templates = TemplateLibrary(validator=self._is_trusted_code)
+        # auto：有 Omniverse 時使用 Omniverse，否則使用離線模擬後端；mock：
+        # 一律使用模擬後端
+        self.execution_backend = execution_backend
+        self.mock_backend = None
+        self._mock_bulk = None
+        if execution_backend == "mock" or (
+            execution_backend == "auto" and not OMNIVERSE_AVAILABLE
+        ):
+            if MOCK_USD_AVAILABLE:
+                self.mock_backend = mock_usd.MockUsdBackend()
     
     def _create_code_generation_chain(self) -> Runnable:
         """創建代碼生成鏈"""
         
         # 根據當前引擎選擇合適的提示模板
-        if engine_config.get_current_engine() == "groq":
+        if self.engine.get_current_engine() == "groq":
             # Groq 使用 ChatPromptTemplate
             prompt = ChatPromptTemplate.from_messages([
                 ("system", """您是 Omniverse Python 代碼生成專家，專門撰寫高品質的 Omniverse Python 腳本。
@@ -71,7 +239,7 @@ import omni.kit.commands
 omni.kit.commands.execute('CreatePrimWithDefaultXform',
     prim_type='Cube',
     prim_path='/World/NewCube',
-    attributes={'size': 2.0}
+    attributes={{'size': 2.0}}
 )
 
 # 刪除物件
@@ -122,12 +290,12 @@ translate_attr.Set(Gf.Vec3d(10, 0, 0), Usd.TimeCode(60))
 ## 代碼生成要求：
 
 1. **完整性**：包含所有必要的 import 語句
-2. **錯誤處理**：添加適當的 try/except 包圍
+2. **錯誤處理**：不要用 try/except 吞掉例外；需要捕捉時，處理後必須重新拋出（raise）
 3. **註釋說明**：為主要操作添加中文註釋
 4. **可執行性**：確保代碼可以直接在 Omniverse 中執行
 5. **最佳實踐**：遵循 Omniverse 開發規範
 
-請生成完整的 Python 代碼，格式如下：
+{bulk_guidance}請生成完整的 Python 代碼，格式如下：
 
 ```python
 # 您生成的代碼
@@ -172,7 +340,7 @@ import omni.kit.commands
 omni.kit.commands.execute('CreatePrimWithDefaultXform',
     prim_type='Cube',
     prim_path='/World/NewCube',
-    attributes={'size': 2.0}
+    attributes={{'size': 2.0}}
 )
 
 # 刪除物件
@@ -223,12 +391,12 @@ translate_attr.Set(Gf.Vec3d(10, 0, 0), Usd.TimeCode(60))
 ## 代碼生成要求：
 
 1. **完整性**：包含所有必要的 import 語句
-2. **錯誤處理**：添加適當的 try/except 包圍
+2. **錯誤處理**：不要用 try/except 吞掉例外；需要捕捉時，處理後必須重新拋出（raise）
 3. **註釋說明**：為主要操作添加中文註釋
 4. **可執行性**：確保代碼可以直接在 Omniverse 中執行
 5. **最佳實踐**：遵循 Omniverse 開發規範
 
-請生成完整的 Python 代碼，格式如下：
+{bulk_guidance}請生成完整的 Python 代碼，格式如下：
 
 ```python
 # 您生成的代碼
@@ -237,16 +405,71 @@ translate_attr.Set(Gf.Vec3d(10, 0, 0), Usd.TimeCode(60))
 生成的代碼："""
             )
         
-        # 使用統一引擎配置創建模型實例
-        model = engine_config.create_model_instance(
-            task_type="code",
-            temperature=0.3,  # 較低溫度以提高代碼準確性
-            max_tokens=2000   # 更長的輸出以支援複雜代碼
+        parser = StrOutputParser()
+        
+        # 依需求複雜度選擇模型層級與 max_tokens（簡單操作使用快速模型）
+        models = {}
+        models_version = None
+        
+        def model_for(task_type: str, max_tokens: int) -> Runnable:
+            nonlocal models_version
+            if self.llm is not None:
+                return self.llm
+            # 各層級各保留一個實例；只有設定重新載入（版本改變）時才全部重建
+            version = self.engine.settings_version
+            if version != models_version:
+                models.clear()
+                models_version = version
+            key = (task_type, max_tokens)
+            if key not in models:
+                # 使用統一引擎配置創建模型實例（含截止時間、重試與對沖請求）
+                models[key] = self.engine.create_resilient_model(
+                    task_type=task_type,
+                    # 較低溫度以提高代碼準確性
+                    temperature=self.engine.settings.chains.code_temperature,
+                    max_tokens=max_tokens,
+                )
+            return models[key]
+        
+        base_prompt = prompt
+        prompt = base_prompt.partial(bulk_guidance="")
+        
+        def route(inputs: dict) -> Runnable:
+            request = inputs.get("request", "")
+            plan = classify_query(request, task="code")
+            guidance = bulk_guidance(request)
+            selected = (
+                base_prompt.partial(bulk_guidance=guidance) if guidance else prompt
+            )
+            return selected | model_for(plan.task_type, plan.max_tokens) | parser
+        
+        return RunnableLambda(route, name="omniverse_code_chain").with_types(
+            input_type=prompt.input_schema, output_type=str
         )
+    
+    def _create_repair_chain(self) -> Runnable:
+        """修復鏈：提示只含錯誤與出錯行附近的代碼，回覆為替換區段"""
+        if self.llm is not None:
+            return REPAIR_PROMPT | self.llm | StrOutputParser()
+        model = None
         
-        parser = StrOutputParser()
+        def repair_model(prompt_value) -> Runnable:
+            # 第一次修復時才建立模型，引擎不可用（如未設定金鑰）時不影響模組導入
+            nonlocal model
+            if model is None:
+                chains = self.engine.settings.chains
+                model = self.engine.create_resilient_model(
+                    task_type="code",
+                    temperature=chains.repair_temperature,
+                    max_tokens=chains.repair_max_tokens,
+                )
+            return model
         
-        return prompt | model | parser
+        return (
+            REPAIR_PROMPT
+            | RunnableLambda(repair_model, name="repair_model")
+            | StrOutputParser()
+        )
     
     def _setup_execution_context(self):
         """設置代碼執行上下文"""
@@ -257,31 +480,112 @@ translate_attr.Set(Gf.Vec3d(10, 0, 0), Usd.TimeCode(60))
             'imported_modules': set()
         }
     
-    def generate_code(self, user_request: str) -> dict:
-        """生成 Omniverse Python 代碼"""
+    def generate_code(self, user_request: str, use_templates: bool = True) -> dict:
+        """生成 Omniverse Python 代碼（命中範本時直接在本地套用，不調用 AI）"""
+        result = None
+        for event in self.generate_code_stream(
+            user_request, use_templates=use_templates
+        ):
+            if event["type"] == "result":
+                result = event["result"]
+        return result
+    
+    def generate_code_stream(self, user_request: str, use_templates: bool = True):
+        """串流生成代碼：邊接收邊解析，逐步產出代碼塊事件，最後產出 {"type":
+        "result"}"""
+        # 產生器會在 yield 之間交還控制權，span 以明確的父子關係串接而不設為目前的上下文
+        span = tracer.start_span("generate_code")
         try:
-            # 調用 AI 生成代碼
-            raw_response = self.chain.invoke({"request": user_request})
+            if use_templates:
+                result = self.templates.match(user_request)
+                if result is not None:
+                    span.set_attribute("template_hit", True)
+                    result["timings"] = tracer.stage_timings(span)
+                    yield {"type": "result", "result": result}
+                    return
             
-            # 提取代碼塊
-            code = self._extract_code_block(raw_response)
+            # 調用 AI 生成代碼，單次掃描切出代碼塊與說明
+            extractor = CodeBlockExtractor()
+            chunks = []
+            usage = UsageCallbackHandler()
+            config = {"callbacks": tracer.callbacks(parent=span) + [usage]}
+            for chunk in self.chain.stream({"request": user_request}, config=config):
+                if not chunks:
+                    span.set_attribute(
+                        "time_to_first_chunk_ms", round(span.duration_ms, 3)
+                    )
+                chunks.append(chunk)
+                yield from extractor.feed(chunk)
+            yield from extractor.finish()
+            raw_response = "".join(chunks)
             
-            return {
-                "status": "success",
-                "code": code,
-                "raw_response": raw_response,
-                "explanation": self._extract_explanation(raw_response)
-            }
+            with tracer.span("parse.result", parent=span):
+                result = self._build_result(user_request, raw_response, extractor)
+            result["timings"] = tracer.stage_timings(span)
+            result["usage"] = self._record_usage(usage, "generate_code")
+            yield {"type": "result", "result": result}
             
         except Exception as e:
-            return {
+            span.record_error(e)
+            yield {"type": "result", "result": {
                 "status": "error",
                 "error": str(e),
                 "traceback": traceback.format_exc()
+            }}
+        finally:
+            tracer.end_span(span)
+    
+    def _build_result(
+        self, user_request: str, raw_response: str, extractor: CodeBlockExtractor
+    ) -> dict:
+        """由解析結果組成 generate_code 的回傳格式"""
+        code = extractor.code
+        explanation = extractor.explanation
+        if not extractor.blocks and is_valid_python(raw_response):
+            # 模型省略了圍欄，但整段回應本身就是代碼
+            code, explanation = raw_response.strip(), ""
+        
+        if not code.strip():
+            return {
+                "status": "error",
+                "error": "回應中沒有可用的代碼塊",
+                "raw_response": raw_response
             }
+        
+        # 對照 API 索引的靜態檢查（毫秒級，在執行前找出不存在的命令與方法）
+        validation = validate_script(code)
+        
+        # 範本庫只學習通過安全與靜態檢查的代碼（見 _is_trusted_code）
+        if validation["valid"]:
+            self.templates.learn(user_request, code, explanation)
+        
+        return {
+            "status": "success",
+            "code": code,
+            "raw_response": raw_response,
+            "explanation": explanation,
+            "validation": validation,
+            "blocks": [
+                {"language": block.language, "code": block.code, "closed": block.closed}
+                for block in extractor.blocks
+            ]
+        }
     
-    def execute_code(self, code: str, safe_mode: bool = True) -> dict:
-        """執行生成的代碼"""
+    @tracer.traced("execute_code")
+    def execute_code(
+        self, code: str, safe_mode: bool = True, validate: bool = True
+    ) -> dict:
+        """執行生成的代碼（validate 時先做靜態檢查，不通過則不執行）"""
+        if validate:
+            with tracer.span("validate"):
+                validation = validate_script(code)
+            if not validation["valid"]:
+                return {
+                    "status": "error",
+                    "error": "靜態檢查未通過：\n" + format_issues(validation["issues"]),
+                    "traceback": "",
+                    "validation": validation
+                }
         try:
             # 準備執行環境
             execution_globals = self._prepare_execution_environment()
@@ -290,24 +594,43 @@ translate_attr.Set(Gf.Vec3d(10, 0, 0), Usd.TimeCode(60))
             stdout_capture = io.StringIO()
             stderr_capture = io.StringIO()
             
-            with redirect_stdout(stdout_capture), redirect_stderr(stderr_capture):
+            backend = "mock" if self.mock_backend is not None else "omniverse"
+            with tracer.span("exec", backend=backend), redirect_stdout(
+                stdout_capture
+            ), redirect_stderr(stderr_capture):
                 if safe_mode:
                     # 安全模式：檢查危險操作
                     if self._check_code_safety(code):
-                        exec(code, execution_globals)
+                        exec(compile(code, SOURCE_NAME, "exec"), execution_globals)
                     else:
                         raise ValueError("代碼包含潛在危險操作")
                 else:
                     # 直接執行
-                    exec(code, execution_globals)
+                    exec(compile(code, SOURCE_NAME, "exec"), execution_globals)
             
-            return {
+            # 腳本自行捕捉例外並印出 traceback 時同樣視為失敗，才會進入自動修復
+            printed = printed_traceback(stderr_capture.getvalue()) or printed_traceback(
+                stdout_capture.getvalue()
+            )
+            if printed is not None:
+                return {
+                    "status": "error",
+                    "error": printed.strip().splitlines()[-1],
+                    "traceback": printed,
+                    "stdout": stdout_capture.getvalue(),
+                    "stderr": stderr_capture.getvalue()
+                }
+            result = {
                 "status": "success",
                 "stdout": stdout_capture.getvalue(),
                 "stderr": stderr_capture.getvalue(),
                 "execution_globals": {k: str(v) for k, v in execution_globals.items() 
                                     if not k.startswith('_')}
             }
+            if self.mock_backend is not None:
+                result["backend"] = "mock"
+                result["stage_summary"] = self.mock_backend.summary()
+            return result
             
         except Exception as e:
             return {
@@ -316,47 +639,129 @@ translate_attr.Set(Gf.Vec3d(10, 0, 0), Usd.TimeCode(60))
                 "traceback": traceback.format_exc()
             }
     
-    def _extract_code_block(self, response: str) -> str:
-        """從響應中提取代碼塊"""
-        lines = response.split('\n')
-        code_lines = []
-        in_code_block = False
+    def repair_code(self, user_request: str, code: str, failure: dict):
+        """請模型修正一次；回傳修正後的代碼，無法套用時回傳 None"""
+        lines = failing_lines(failure)
+        usage = UsageCallbackHandler()
+        response = self.repair_chain.invoke({
+            "request": user_request,
+            "error": error_summary(failure),
+            "excerpt": numbered_excerpt(code, lines),
+        }, config={"callbacks": [usage]})
+        self._record_usage(usage, "repair_code")
+        repaired = apply_repair(code, response)
+        if repaired is None and parse_hunks(response) is not None:
+            # 區段重疊、順序錯亂或超出範圍：改為重新生成完整代碼
+            result = self.generate_code(user_request, use_templates=False)
+            if result and result.get("status") == "success":
+                return result["code"]
+        return repaired
+    
+    def _record_usage(self, usage: UsageCallbackHandler, endpoint: str) -> dict:
+        """累計本地生成與修復的 token 用量（呼叫者為 local）"""
+        try:
+            get_usage_store().record(usage.calls, "local", endpoint)
+        except Exception as e:
+            print(f"用量記錄失敗: {e}")
+        return usage.summary()
+    
+    def execute_with_repair(self, user_request: str, code: str, safe_mode: bool = True,
+                            max_iterations: int = None, started: float = None) -> dict:
+        """執行代碼；靜態檢查或執行失敗時自動修復並重試，最多 max_iterations 次"""
+        started = time.perf_counter() if started is None else started
+        max_iterations = (
+            self.max_repair_iterations if max_iterations is None else max_iterations
+        )
+        attempts = []
+        current = code
+        iterations = 0
         
-        for line in lines:
-            if line.strip().startswith('```python'):
-                in_code_block = True
-                continue
-            elif line.strip() == '```' and in_code_block:
-                in_code_block = False
+        while True:
+            execution = self.execute_code(current, safe_mode)
+            if execution["status"] == "success" or iterations >= max_iterations:
                 break
-            elif in_code_block:
-                code_lines.append(line)
+            attempts.append({"code": current, "error": execution["error"]})
+            try:
+                repaired = self.repair_code(user_request, current, execution)
+            except Exception as e:
+                print(f"自動修復失敗: {e}")
+                break
+            if repaired is None or repaired.strip() == current.strip():
+                # 回覆無法套用或沒有變更，再試也不會有進展
+                break
+            current = repaired
+            iterations += 1
         
-        return '\n'.join(code_lines) if code_lines else response
+        elapsed = time.perf_counter() - started
+        success = execution["status"] == "success"
+        self.repair_stats.record(success, iterations, elapsed)
+        return {
+            "status": execution["status"],
+            "code": current,
+            "execution": execution,
+            "repair": {
+                "iterations": iterations,
+                "repaired": current != code,
+                "attempts": attempts,
+                "elapsed": elapsed,
+            }
+        }
+    
+    def generate_working_code(
+        self,
+        user_request: str,
+        safe_mode: bool = True,
+        max_iterations: int = None,
+        use_templates: bool = True,
+    ) -> dict:
+        """生成並執行代碼，失敗時自動修復；elapsed 為取得可執行腳本的總時間（含生成）"""
+        started = time.perf_counter()
+        result = self.generate_code(user_request, use_templates=use_templates)
+        if result["status"] != "success":
+            return result
+        outcome = self.execute_with_repair(
+            user_request, result["code"], safe_mode, max_iterations, started
+        )
+        result = dict(
+            result,
+            code=outcome["code"],
+            execution=outcome["execution"],
+            repair=outcome["repair"],
+        )
+        if outcome["status"] != "success":
+            result["status"] = "error"
+            result["error"] = outcome["execution"]["error"]
+        elif outcome["repair"]["repaired"]:
+            # 修復後可執行的代碼同樣可作為範本
+            result["validation"] = validate_script(outcome["code"])
+            self.templates.learn(
+                user_request, outcome["code"], result.get("explanation", "")
+            )
+        return result
+    
+    def get_repair_stats(self) -> dict:
+        """自動修復的成功率與取得可執行腳本的時間"""
+        return self.repair_stats.summary()
+    
+    def _extract_code_block(self, response: str) -> str:
+        """從完整響應中提取代碼（支援任意語言標記與多個代碼塊）"""
+        return extract(response).code
     
     def _extract_explanation(self, response: str) -> str:
-        """提取代碼說明"""
-        # 簡單的說明提取邏輯
-        lines = response.split('\n')
-        explanation_lines = []
-        
-        for line in lines:
-            if not line.strip().startswith('```') and '```' not in line:
-                explanation_lines.append(line)
-            elif '```python' in line:
-                break
-        
-        return '\n'.join(explanation_lines).strip()
+        """提取代碼塊以外的說明文字"""
+        return extract(response).explanation
     
     def _prepare_execution_environment(self) -> dict:
         """準備代碼執行環境"""
+        if self.mock_backend is not None:
+            return self._prepare_mock_environment()
         try:
-            import omni.usd
             import omni.kit.commands
-            from pxr import Usd, UsdGeom, Sdf, Gf, UsdShade
             import omni.timeline
+            import omni.usd
+            from pxr import Gf, Sdf, Usd, UsdGeom, UsdShade
             
-            return {
+            environment = {
                 'omni': omni,
                 'Usd': Usd,
                 'UsdGeom': UsdGeom,
@@ -374,7 +779,7 @@ translate_attr.Set(Gf.Vec3d(10, 0, 0), Usd.TimeCode(60))
             }
         except ImportError:
             # 在非 Omniverse 環境中的模擬環境
-            return {
+            environment = {
                 'print': print,
                 'len': len,
                 'str': str,
@@ -383,7 +788,33 @@ translate_attr.Set(Gf.Vec3d(10, 0, 0), Usd.TimeCode(60))
                 'list': list,
                 'dict': dict
             }
+        
+        # 批量操作輔助函式
+        if BULK_AVAILABLE:
+            environment['usd_bulk'] = usd_bulk
+            environment['np'] = np
+        return environment
     
+    def _prepare_mock_environment(self) -> dict:
+        """模擬後端的執行環境：import omni / pxr 會取得模擬模組"""
+        environment = self.mock_backend.environment()
+        if usd_bulk is not None:
+            if self._mock_bulk is None:
+                # usd_bulk 以模擬模組重新載入，才會寫入模擬 Stage
+                self._mock_bulk = self.mock_backend.load_module(usd_bulk)
+            environment['usd_bulk'] = self._mock_bulk
+            environment['np'] = np
+        return environment
+    
+    def reset_mock_stage(self):
+        """清空模擬後端的 Stage（批量驗證腳本時讓每個腳本從空場景開始）"""
+        if self.mock_backend is not None:
+            self.mock_backend.reset()
+    
+    def _is_trusted_code(self, code: str) -> bool:
+        """可作為範本直接重用的代碼：通過安全檢查與 API 索引靜態檢查"""
+        return self._check_code_safety(code) and validate_script(code)["valid"]
+
     def _check_code_safety(self, code: str) -> bool:
         """檢查代碼安全性"""
         dangerous_patterns = [
@@ -0,0 +1,136 @@
+"""
+查詢複雜度分類器
+以輕量啟發式規則為每個請求選擇模型層級 (groq_models / ollama_models 的 key) 與
+max_tokens
+"""
+
+import logging
+import re
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class QueryPlan:
+    """單一請求的模型層級與 token 預算"""
+    complexity: str   # simple / moderate / complex
+    task_type: str    # 對應 UnifiedEngineConfig 模型表的 key
+    max_tokens: int
+    reason: str
+
+
+# 各任務在不同複雜度下使用的模型層級與 token 預算
+PLANS = {
+    "semantic": {
+        "simple": ("fast", 400),
+        "moderate": ("semantic", 700),
+        "complex": ("semantic", 1000),
+    },
+    "code": {
+        "simple": ("fast", 500),
+        "moderate": ("code", 1200),
+        "complex": ("code", 2000),
+    },
+}
+
+# 單一步驟即可完成的操作
+SIMPLE_CODE_PATTERNS = re.compile(
+    r"刪除|移除|删除|隱藏|顯示|重新命名|改名|選取|選擇|移動|縮放|旋轉|"
+    r"\b(delete|remove|hide|show|rename|select|move|scale|rotate)\b",
+    re.IGNORECASE
+)
+# 需要較長程式碼的操作
+COMPLEX_CODE_PATTERNS = re.compile(
+    r"動畫|關鍵幀|批量|批次|隨機|材質|物理|碰撞|陰影|燈光|光源|迴圈|每個|場景中的|"
+    r"\b(animation|keyframe|batch|bulk|random|material|physics|light|shadow|loop|each)\b",
+    re.IGNORECASE
+)
+# 需要深入分析的語意查詢
+COMPLEX_SEMANTIC_PATTERNS = re.compile(
+    r"架構|分析|比較|策略|優化|設計|整合|最佳實踐|管線|流程|"
+    r"\b(architecture|analy[sz]e|compare|strategy|optimi[sz]e|design|integrat\w*|pipeline)\b",
+    re.IGNORECASE
+)
+# 簡短的定義型問題
+SIMPLE_SEMANTIC_PATTERNS = re.compile(
+    r"是什麼|是什么|什麼是|定義|縮寫|\bwhat is\b|\bdefine\b",
+    re.IGNORECASE
+)
+CLAUSE_SEPARATORS = re.compile(r"[，,；;。]|並且|並|然後|以及|\band\b|\bthen\b")
+NUMBERS = re.compile(r"\d+")
+# USD 路徑（例如 /World/Cube_10）與座標（例如 (100, 0, 0)）中的數字與逗號不是數量或子句
+USD_PATHS = re.compile(r"(?<![A-Za-z0-9_])/[A-Za-z_][A-Za-z0-9_/.:-]*")
+NUMERIC_TUPLES = re.compile(
+    r"[(\[]?\s*-?\d+(?:\.\d+)?(?:\s*[,，]\s*-?\d+(?:\.\d+)?){1,3}\s*[)\]]?"
+)
+
+
+def _strip_operands(text: str) -> str:
+    """移除路徑與座標，只留下描述操作的文字"""
+    return NUMERIC_TUPLES.sub(" <vec> ", USD_PATHS.sub(" <path> ", text))
+
+
+def _clause_count(text: str) -> int:
+    return len([part for part in CLAUSE_SEPARATORS.split(text) if part.strip()])
+
+
+def _largest_number(text: str) -> int:
+    numbers = [int(n) for n in NUMBERS.findall(text) if len(n) < 7]
+    return max(numbers) if numbers else 0
+
+
+def _classify_code(text: str) -> tuple:
+    operations = _strip_operands(text)
+    clauses = _clause_count(operations)
+    count = _largest_number(operations)
+    fired = []
+    if COMPLEX_CODE_PATTERNS.search(text):
+        fired.append("complex keywords")
+    if clauses >= 3:
+        fired.append(f"clauses={clauses}")
+    if count > 5:
+        fired.append(f"count={count}")
+    if fired:
+        return "complex", ", ".join(fired)
+    if SIMPLE_CODE_PATTERNS.search(text) and clauses <= 1 and len(operations) <= 60:
+        return "simple", "single primitive operation"
+    return "moderate", f"clauses={clauses}, count={count}"
+
+
+def _classify_semantic(text: str) -> tuple:
+    clauses = _clause_count(_strip_operands(text))
+    fired = []
+    if COMPLEX_SEMANTIC_PATTERNS.search(text):
+        fired.append("analysis keywords")
+    if len(text) > 120:
+        fired.append(f"length={len(text)}")
+    if clauses >= 3:
+        fired.append(f"clauses={clauses}")
+    if fired:
+        return "complex", ", ".join(fired)
+    if SIMPLE_SEMANTIC_PATTERNS.search(text):
+        return "simple", "definition question"
+    if len(text) <= 15:
+        return "simple", f"length={len(text)}"
+    return "moderate", "default"
+
+
+def classify_query(text: str, task: str = "semantic") -> QueryPlan:
+    """依查詢內容決定模型層級與 max_tokens，並記錄決策"""
+    text = (text or "").strip()
+    if task == "code":
+        complexity, reason = _classify_code(text)
+    else:
+        task = "semantic"
+        complexity, reason = _classify_semantic(text)
+
+    task_type, max_tokens = PLANS[task][complexity]
+    plan = QueryPlan(
+        complexity=complexity, task_type=task_type, max_tokens=max_tokens, reason=reason
+    )
+    logger.info(
+        "query plan task=%s complexity=%s tier=%s max_tokens=%d reason=%s query=%r",
+        task, complexity, task_type, max_tokens, reason, text[:80]
+    )
+    return plan
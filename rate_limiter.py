@@ -0,0 +1,261 @@
+"""
+Groq 用戶端速率限制
+以令牌桶分別控制每個模型的每分鐘請求數與每分鐘 token 數，排隊等待或快速拒絕
+"""
+
+import itertools
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# 共享儲存中速率限制桶的命名空間
+SHARED_NAMESPACE = "rate_limit"
+
+
+def estimate_tokens(text: str) -> int:
+    """粗估文字的 token 數（CJK 字元約 1 token，其餘約 4 字元 1 token）"""
+    cjk = sum(1 for ch in text if ord(ch) >= 0x2E80)
+    others = len(text) - cjk
+    return cjk + (others + 3) // 4
+
+
+class RateLimitExceeded(RuntimeError):
+    """預估等待時間超過上限，請求被拒絕"""
+
+    def __init__(self, model: str, retry_after: float):
+        super().__init__(f"模型 {model} 已達速率限制，請於 {retry_after:.1f} 秒後重試")
+        self.model = model
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """令牌桶（非執行緒安全，由 ModelRateLimiter 加鎖保護）"""
+
+    def __init__(self, capacity: float, per_minute: float):
+        self.capacity = float(capacity)
+        self.refill_rate = per_minute / 60.0
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+
+    def refill(self, now: float):
+        """依經過時間補充令牌"""
+        elapsed = now - self.last_refill
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_rate)
+        self.last_refill = now
+
+    def wait_time(self, cost: float) -> float:
+        """取得 cost 個令牌還需等待的秒數"""
+        deficit = min(cost, self.capacity) - self.tokens
+        return max(0.0, deficit / self.refill_rate) if deficit > 0 else 0.0
+
+    def consume(self, cost: float):
+        """扣除令牌"""
+        self.tokens -= min(cost, self.capacity)
+
+
+class ModelRateLimiter:
+    """單一模型的請求數與 token 數限制器，呼叫者依先到先服務排隊"""
+
+    def __init__(self, model: str, requests_per_minute: int, tokens_per_minute: int,
+                 max_wait: float = 30.0, store=None):
+        self.model = model
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_wait = max_wait
+        self._requests = TokenBucket(requests_per_minute, requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute, tokens_per_minute)
+        # 跨進程共享儲存（多 worker 時共用配額）
+        self._store = store
+
+        self._lock = threading.Condition()
+        self._tickets = itertools.count()
+        self._serving = 0
+        self._abandoned = set()
+        self._queued_tokens = 0
+        self._queued_requests = 0
+
+        # 統計
+        self._granted = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+
+    def _advance(self):
+        """輪到下一位排隊者"""
+        self._serving += 1
+        while self._serving in self._abandoned:
+            self._abandoned.discard(self._serving)
+            self._serving += 1
+
+    def _local_wait(self, cost: int, now: float) -> float:
+        """目前進程內桶的等待秒數"""
+        self._requests.refill(now)
+        self._tokens.refill(now)
+        return max(self._requests.wait_time(1), self._tokens.wait_time(cost))
+
+    def _shared_buckets(self, cost: int):
+        """共享儲存中的請求數桶與 token 數桶 (key, capacity, refill_per_sec, cost)"""
+        return [
+            (
+                f"{self.model}:requests",
+                self.requests_per_minute,
+                self.requests_per_minute / 60.0,
+                1,
+            ),
+            (
+                f"{self.model}:tokens",
+                self.tokens_per_minute,
+                self.tokens_per_minute / 60.0,
+                cost,
+            ),
+        ]
+
+    def _shared_wait(self, cost: int) -> float:
+        """共享儲存中的桶：兩個桶都足夠時在同一交易內扣除並回傳 0，否則回傳需等待秒數"""
+        return self._store.take_buckets(SHARED_NAMESPACE, self._shared_buckets(cost))
+
+    def _refill(self, now: float):
+        """更新桶的令牌數；共享模式下以共享儲存的值為準（包含其他 worker 的用量）"""
+        if self._store is None:
+            self._requests.refill(now)
+            self._tokens.refill(now)
+            return
+        for bucket, (key, capacity, refill_per_sec, _) in zip(
+            (self._requests, self._tokens), self._shared_buckets(0)
+        ):
+            bucket.tokens = self._store.bucket_level(
+                SHARED_NAMESPACE, key, capacity, refill_per_sec
+            )
+            bucket.last_refill = now
+
+    def projected_wait(self, cost: int) -> float:
+        """預估含前方排隊請求在內的等待秒數"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(
+                self._requests.wait_time(self._queued_requests + 1),
+                self._tokens.wait_time(self._queued_tokens + cost)
+            )
+
+    def acquire(self, cost: int, timeout: Optional[float] = None) -> float:
+        """取得配額，回傳實際等待秒數；預估等待超過上限時拋出 RateLimitExceeded"""
+        limit = self.max_wait if timeout is None else timeout
+        projected = self.projected_wait(cost)
+        if projected > limit:
+            with self._lock:
+                self._rejected += 1
+            raise RateLimitExceeded(self.model, projected)
+
+        start = time.monotonic()
+        with self._lock:
+            ticket = next(self._tickets)
+            self._queued_tokens += cost
+            self._queued_requests += 1
+            try:
+                while True:
+                    # 只有隊首可以取用配額，確保公平
+                    if ticket == self._serving:
+                        now = time.monotonic()
+                        if self._store is not None:
+                            wait = self._shared_wait(cost)
+                        else:
+                            wait = self._local_wait(cost, now)
+                        if wait <= 0:
+                            self._requests.consume(1)
+                            self._tokens.consume(cost)
+                            break
+                    else:
+                        wait = limit
+                    remaining = limit - (time.monotonic() - start)
+                    if remaining <= 0:
+                        self._rejected += 1
+                        raise RateLimitExceeded(self.model, wait)
+                    self._lock.wait(min(wait, remaining))
+            finally:
+                self._queued_tokens -= cost
+                self._queued_requests -= 1
+                if ticket == self._serving:
+                    self._advance()
+                else:
+                    # 逾時離開的排隊者，輪到時直接跳過
+                    self._abandoned.add(ticket)
+                self._lock.notify_all()
+
+            waited = time.monotonic() - start
+            self._granted += 1
+            self._total_wait += waited
+            return waited
+
+    def utilization(self) -> Dict[str, Any]:
+        """目前配額使用狀況"""
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "model": self.model,
+                "requests_per_minute": self.requests_per_minute,
+                "tokens_per_minute": self.tokens_per_minute,
+                "request_utilization": round(
+                    1 - self._requests.tokens / self._requests.capacity, 3
+                ),
+                "token_utilization": round(
+                    1 - self._tokens.tokens / self._tokens.capacity, 3
+                ),
+                "queued_requests": self._queued_requests,
+                "queued_tokens": self._queued_tokens,
+                "granted": self._granted,
+                "rejected": self._rejected,
+                "avg_wait": (
+                    round(self._total_wait / self._granted, 3) if self._granted else 0.0
+                ),
+            }
+
+
+# Groq 各模型的預設配額（每分鐘請求數、每分鐘 token 數）
+DEFAULT_GROQ_LIMITS = {
+    "llama3-8b-8192": {"requests_per_minute": 30, "tokens_per_minute": 30000},
+    "llama3-70b-8192": {"requests_per_minute": 30, "tokens_per_minute": 6000},
+}
+
+
+class RateLimiterRegistry:
+    """依模型名稱管理速率限制器"""
+
+    def __init__(
+        self, limits: Optional[Dict[str, Dict[str, int]]] = None, max_wait: float = 30.0
+    ):
+        self.limits = dict(limits or DEFAULT_GROQ_LIMITS)
+        self.max_wait = max_wait
+        self._limiters: Dict[str, ModelRateLimiter] = {}
+        self._store = None
+        self._lock = threading.Lock()
+
+    def attach_shared_store(self, store):
+        """改用跨進程共享的配額計數"""
+        with self._lock:
+            self._store = store
+            for limiter in self._limiters.values():
+                limiter._store = store
+
+    def set_max_wait(self, max_wait: float):
+        """更新最長等待秒數（含已建立的限制器）"""
+        with self._lock:
+            self.max_wait = max_wait
+            for limiter in self._limiters.values():
+                limiter.max_wait = max_wait
+
+    def get(self, model: str) -> Optional[ModelRateLimiter]:
+        """取得模型的限制器；未設定配額的模型回傳 None"""
+        with self._lock:
+            if model not in self._limiters:
+                limits = self.limits.get(model)
+                if limits is None:
+                    return None
+                self._limiters[model] = ModelRateLimiter(
+                    model, max_wait=self.max_wait, store=self._store, **limits
+                )
+            return self._limiters[model]
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """所有已使用模型的配額狀況"""
+        with self._lock:
+            limiters = list(self._limiters.values())
+        return {limiter.model: limiter.utilization() for limiter in limiters}
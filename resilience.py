@@ -0,0 +1,461 @@
+"""
+模型調用韌性層
+為模型 Runnable 加上每次請求的截止時間、指數退避重試，以及超過 p95 延遲後發送的對沖請求
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+from langchain.schema.runnable import Runnable, RunnableConfig
+
+# 視為暫時性錯誤、值得重試的 HTTP 狀態碼與例外類別名稱
+TRANSIENT_STATUS_CODES = {408, 409, 425, 429, 500, 502, 503, 504}
+TRANSIENT_ERROR_NAMES = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "RateLimitError",
+    "InternalServerError",
+    "ServiceUnavailableError",
+    "ConnectError",
+    "ReadTimeout",
+    "ConnectTimeout",
+    "RemoteProtocolError",
+}
+
+# 所有韌性模型共用的執行緒池（對沖請求會同時佔用兩個執行緒）
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="resilient-llm")
+
+# 已放棄（對沖落敗或逾時）但仍佔用執行緒的同步調用數上限；達到上限時不再發送對沖請求
+MAX_ABANDONED = 16
+_abandoned = 0
+_abandoned_lock = threading.Lock()
+
+
+def _release_abandoned(future):
+    global _abandoned
+    with _abandoned_lock:
+        _abandoned -= 1
+
+
+def _abandon(futures):
+    """取消尚未開始的調用；已在執行的無法中斷，完成前計入 _abandoned"""
+    global _abandoned
+    for future in futures:
+        if future.cancel():
+            continue
+        with _abandoned_lock:
+            _abandoned += 1
+        future.add_done_callback(_release_abandoned)
+
+
+def _executor_saturated() -> bool:
+    with _abandoned_lock:
+        return _abandoned >= MAX_ABANDONED
+
+
+async def _cancel_tasks(tasks):
+    """取消並等待非同步調用結束（底層 HTTP 請求隨之中止）"""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class DeadlineExceeded(TimeoutError):
+    """請求超過截止時間"""
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """判斷錯誤是否為暫時性（連線、逾時、429、5xx）"""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    if status_code in TRANSIENT_STATUS_CODES:
+        return True
+    return type(error).__name__ in TRANSIENT_ERROR_NAMES
+
+
+def _percentile(samples, q: float) -> Optional[float]:
+    """計算百分位數（樣本不足時回傳 None）"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class LatencyTracker:
+    """記錄延遲樣本與重試/對沖統計，供對沖門檻與報表使用"""
+
+    def __init__(self, window: int = 500):
+        self._lock = threading.Lock()
+        # 實際延遲（含對沖效果）
+        self.latencies = deque(maxlen=window)
+        # 不使用對沖時的延遲（主請求完成時間）
+        self.unhedged_latencies = deque(maxlen=window)
+        self.requests = 0
+        self.retries = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    def record(self, latency: float):
+        with self._lock:
+            self.latencies.append(latency)
+
+    def record_unhedged(self, latency: float):
+        with self._lock:
+            self.unhedged_latencies.append(latency)
+
+    def incr(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def quantile(self, q: float, min_samples: int = 20) -> Optional[float]:
+        """目前的延遲百分位數"""
+        with self._lock:
+            if len(self.latencies) < min_samples:
+                return None
+            return _percentile(self.latencies, q)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """統計報表"""
+        with self._lock:
+            latencies = list(self.latencies)
+            unhedged = list(self.unhedged_latencies)
+            requests = self.requests
+            report = {
+                "requests": requests,
+                "retries": self.retries,
+                "timeouts": self.timeouts,
+                "failures": self.failures,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "hedge_rate": round(self.hedged / requests, 3) if requests else 0.0,
+            }
+        for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            actual = _percentile(latencies, q)
+            baseline = _percentile(unhedged, q)
+            report[f"latency_{name}"] = round(actual, 3) if actual is not None else None
+            report[f"unhedged_{name}"] = (
+                round(baseline, 3) if baseline is not None else None
+            )
+            if actual is not None and baseline is not None:
+                report[f"{name}_improvement"] = round(baseline - actual, 3)
+        return report
+
+
+_trackers: Dict[str, LatencyTracker] = {}
+_trackers_lock = threading.Lock()
+
+
+def get_tracker(name: str) -> LatencyTracker:
+    """依名稱取得延遲追蹤器（重建鏈時沿用歷史樣本）"""
+    with _trackers_lock:
+        if name not in _trackers:
+            _trackers[name] = LatencyTracker()
+        return _trackers[name]
+
+
+def estimate_latency(
+    prefix: str, q: float = 0.5, min_samples: int = 20
+) -> Optional[float]:
+    """名稱以 prefix 開頭的追蹤器中最大的延遲百分位數（秒），樣本不足時回傳 None"""
+    with _trackers_lock:
+        trackers = [
+            tracker for name, tracker in _trackers.items() if name.startswith(prefix)
+        ]
+    estimates = [
+        value
+        for value in (tracker.quantile(q, min_samples) for tracker in trackers)
+        if value is not None
+    ]
+    return max(estimates) if estimates else None
+
+
+def get_resilience_stats() -> Dict[str, Dict[str, Any]]:
+    """所有韌性模型的統計"""
+    with _trackers_lock:
+        trackers = dict(_trackers)
+    return {name: tracker.snapshot() for name, tracker in trackers.items()}
+
+
+class ResilientRunnable(Runnable):
+    """包裝模型 Runnable：截止時間、指數退避重試與對沖請求"""
+
+    def __init__(self, runnable: Runnable, fallback: Optional[Runnable] = None,
+                 deadline: float = 60.0, max_retries: int = 2,
+                 backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 hedge: bool = False, hedge_quantile: float = 0.95,
+                 hedge_min_samples: int = 20, name: str = "model"):
+        self.runnable = runnable
+        # 對沖請求的目標：未指定時送往同一引擎
+        self.fallback = fallback
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.name = name
+        self.tracker = get_tracker(name)
+
+    @property
+    def InputType(self) -> Any:
+        return self.runnable.InputType
+
+    @property
+    def OutputType(self) -> Any:
+        return self.runnable.OutputType
+
+    def _backoff(self, attempt: int) -> float:
+        """第 attempt 次重試前的等待秒數（含隨機抖動）"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * (0.5 + random.random() / 2)
+
+    def _deadline_for(self, config: Optional[RunnableConfig]) -> float:
+        configurable = (config or {}).get("configurable", {})
+        return float(configurable.get("deadline", self.deadline))
+
+    def _attempt(
+        self, input: Any, config: Optional[RunnableConfig], time_left: float
+    ) -> Any:
+        """執行一次（可能對沖的）調用"""
+        start = time.monotonic()
+        primary = _executor.submit(self.runnable.invoke, input, config)
+        primary.add_done_callback(
+            lambda f: self.tracker.record_unhedged(time.monotonic() - start)
+        )
+        pending = {primary}
+
+        hedge_delay = self._hedge_delay(time_left)
+        if hedge_delay is not None and not _executor_saturated():
+            done, _ = wait(pending, timeout=hedge_delay)
+            if not done:
+                target = self.fallback or self.runnable
+                hedge_future = _executor.submit(target.invoke, input, config)
+                hedge_future.is_hedge = True
+                pending.add(hedge_future)
+                self.tracker.incr("hedged")
+
+        error: Optional[BaseException] = None
+        while pending:
+            remaining = time_left - (time.monotonic() - start)
+            if remaining <= 0:
+                break
+            done, pending = wait(
+                pending, timeout=remaining, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                if future.exception() is None:
+                    # 落敗的對沖請求不再需要
+                    _abandon(pending)
+                    if getattr(future, "is_hedge", False):
+                        self.tracker.incr("hedge_wins")
+                    self.tracker.record(time.monotonic() - start)
+                    return future.result()
+                error = future.exception()
+
+        if pending:
+            # 逾時：背景執行緒無法中斷，結果將被丟棄
+            _abandon(pending)
+            raise DeadlineExceeded(f"{self.name} 超過截止時間 {time_left:.1f} 秒")
+        raise error
+
+    def _hedge_delay(self, time_left: float) -> Optional[float]:
+        """發送對沖請求前等待的秒數；停用、樣本不足或來不及時回傳 None"""
+        if not self.hedge:
+            return None
+        delay = self.tracker.quantile(self.hedge_quantile, self.hedge_min_samples)
+        return delay if delay is not None and delay < time_left else None
+
+    async def _aattempt(
+        self, input: Any, config: Optional[RunnableConfig], time_left: float
+    ) -> Any:
+        """非同步版本的 _attempt：以 asyncio 任務執行，落敗或逾時的任務直接取消"""
+        start = time.monotonic()
+        primary = asyncio.ensure_future(self.runnable.ainvoke(input, config))
+        primary.add_done_callback(
+            lambda f: self.tracker.record_unhedged(time.monotonic() - start)
+        )
+        pending = {primary}
+        hedge_task = None
+        try:
+            hedge_delay = self._hedge_delay(time_left)
+            if hedge_delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+                if not done:
+                    target = self.fallback or self.runnable
+                    hedge_task = asyncio.ensure_future(target.ainvoke(input, config))
+                    pending.add(hedge_task)
+                    self.tracker.incr("hedged")
+
+            error: Optional[BaseException] = None
+            while pending:
+                remaining = time_left - (time.monotonic() - start)
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=remaining,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge_task:
+                            self.tracker.incr("hedge_wins")
+                        self.tracker.record(time.monotonic() - start)
+                        return task.result()
+                    error = task.exception()
+
+            if pending:
+                raise DeadlineExceeded(f"{self.name} 超過截止時間 {time_left:.1f} 秒")
+            raise error
+        finally:
+            await _cancel_tasks([task for task in pending if not task.done()])
+
+    def invoke(
+        self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any
+    ) -> Any:
+        """帶截止時間與重試的調用"""
+        self.tracker.incr("requests")
+        deadline = self._deadline_for(config)
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            time_left = deadline - (time.monotonic() - start)
+            try:
+                return self._attempt(input, config, time_left)
+            except Exception as e:
+                if isinstance(e, DeadlineExceeded):
+                    self.tracker.incr("timeouts")
+                    raise
+                time_left = deadline - (time.monotonic() - start)
+                delay = self._backoff(attempt)
+                if (
+                    attempt >= self.max_retries
+                    or not is_transient_error(e)
+                    or delay >= time_left
+                ):
+                    self.tracker.incr("failures")
+                    raise
+                attempt += 1
+                self.tracker.incr("retries")
+                time.sleep(delay)
+
+    async def ainvoke(
+        self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any
+    ) -> Any:
+        """非同步調用，截止時間、重試與對沖規則同 invoke"""
+        self.tracker.incr("requests")
+        deadline = self._deadline_for(config)
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            time_left = deadline - (time.monotonic() - start)
+            try:
+                return await self._aattempt(input, config, time_left)
+            except Exception as e:
+                if isinstance(e, DeadlineExceeded):
+                    self.tracker.incr("timeouts")
+                    raise
+                time_left = deadline - (time.monotonic() - start)
+                delay = self._backoff(attempt)
+                if (
+                    attempt >= self.max_retries
+                    or not is_transient_error(e)
+                    or delay >= time_left
+                ):
+                    self.tracker.incr("failures")
+                    raise
+                attempt += 1
+                self.tracker.incr("retries")
+                await asyncio.sleep(delay)
+
+    def stream(
+        self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any
+    ) -> Iterator[Any]:
+        """串流輸出：只在第一個片段送出前重試，不使用對沖"""
+        self.tracker.incr("requests")
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            started = False
+            try:
+                for chunk in self.runnable.stream(input, config, **kwargs):
+                    started = True
+                    yield chunk
+                self.tracker.record(time.monotonic() - start)
+                self.tracker.record_unhedged(time.monotonic() - start)
+                return
+            except Exception as e:
+                time_left = self._deadline_for(config) - (time.monotonic() - start)
+                delay = self._backoff(attempt)
+                if (
+                    started
+                    or attempt >= self.max_retries
+                    or not is_transient_error(e)
+                    or delay >= time_left
+                ):
+                    self.tracker.incr("failures")
+                    raise
+                attempt += 1
+                self.tracker.incr("retries")
+                time.sleep(delay)
+
+    async def astream(self, input: Any, config: Optional[RunnableConfig] = None,
+                      **kwargs: Any) -> AsyncIterator[Any]:
+        """非同步串流：逐片段轉送；只在第一個片段送出前重試，整體超過截止時間時中止"""
+        self.tracker.incr("requests")
+        deadline = self._deadline_for(config)
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            started = False
+            iterator = self.runnable.astream(input, config, **kwargs).__aiter__()
+            try:
+                while True:
+                    remaining = deadline - (time.monotonic() - start)
+                    try:
+                        if remaining <= 0:
+                            raise asyncio.TimeoutError
+                        chunk = await asyncio.wait_for(iterator.__anext__(), remaining)
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        if time.monotonic() - start < deadline:
+                            raise
+                        raise DeadlineExceeded(
+                            f"{self.name} 超過截止時間 {deadline:.1f} 秒"
+                        )
+                    started = True
+                    yield chunk
+                self.tracker.record(time.monotonic() - start)
+                self.tracker.record_unhedged(time.monotonic() - start)
+                return
+            except Exception as e:
+                if isinstance(e, DeadlineExceeded):
+                    self.tracker.incr("timeouts")
+                    raise
+                time_left = deadline - (time.monotonic() - start)
+                delay = self._backoff(attempt)
+                if (
+                    started
+                    or attempt >= self.max_retries
+                    or not is_transient_error(e)
+                    or delay >= time_left
+                ):
+                    self.tracker.incr("failures")
+                    raise
+                attempt += 1
+                self.tracker.incr("retries")
+                await asyncio.sleep(delay)
+            finally:
+                aclose = getattr(iterator, "aclose", None)
+                if aclose is not None:
+                    await aclose()
@@ -0,0 +1,244 @@
+"""
+腳本範本庫
+從已驗證的代碼生成結果學習範本：將需求中的數量、路徑與顏色抽出為參數，
+之後結構相同、只有參數不同的需求直接在本地套用範本，不需調用模型
+"""
+
+import re
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from metrics import CACHE_REQUESTS
+
+# 顏色名稱對應的 RGB（中英文）
+COLORS: Dict[str, Tuple[float, float, float]] = {
+    "紅色": (1.0, 0.0, 0.0), "綠色": (0.0, 1.0, 0.0), "藍色": (0.0, 0.0, 1.0),
+    "黃色": (1.0, 1.0, 0.0), "白色": (1.0, 1.0, 1.0), "黑色": (0.0, 0.0, 0.0),
+    "橙色": (1.0, 0.5, 0.0), "紫色": (0.5, 0.0, 0.5), "灰色": (0.5, 0.5, 0.5),
+    "青色": (0.0, 1.0, 1.0),
+    "red": (1.0, 0.0, 0.0), "green": (0.0, 1.0, 0.0), "blue": (0.0, 0.0, 1.0),
+    "yellow": (1.0, 1.0, 0.0), "white": (1.0, 1.0, 1.0), "black": (0.0, 0.0, 0.0),
+    "orange": (1.0, 0.5, 0.0), "purple": (0.5, 0.0, 0.5), "gray": (0.5, 0.5, 0.5),
+    "cyan": (0.0, 1.0, 1.0),
+}
+
+# 中文字元也屬於 \w，數字邊界只看 ASCII 識別字元
+_NOT_IDENT_BEFORE = r"(?<![A-Za-z0-9_.])"
+_NOT_IDENT_AFTER = r"(?![A-Za-z0-9_.])"
+
+_PARAM_PATTERN = re.compile(
+    r"(?P<path>/[A-Za-z_][A-Za-z0-9_/]*)"
+    r"|(?P<color>"
+    + "|".join(sorted(map(re.escape, COLORS), key=len, reverse=True))
+    + r")"
+    r"|(?P<number>" + _NOT_IDENT_BEFORE + r"\d+(?:\.\d+)?" + _NOT_IDENT_AFTER + ")",
+    re.IGNORECASE,
+)
+
+
+def extract_parameters(request: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """將需求拆成 (結構簽名, [(參數類型, 值)])，簽名中參數以 {type} 佔位"""
+    params: List[Tuple[str, str]] = []
+
+    def replace(match: "re.Match") -> str:
+        kind = match.lastgroup
+        value = match.group(0)
+        params.append((kind, value.lower() if kind == "color" else value))
+        return "{" + kind + "}"
+
+    signature = _PARAM_PATTERN.sub(replace, request)
+    signature = " ".join(signature.split()).lower()
+    return signature, params
+
+
+def _literal_pattern(kind: str, value: str) -> str:
+    """參數值在代碼中的出現形式"""
+    if kind == "number":
+        return _NOT_IDENT_BEFORE + re.escape(value) + _NOT_IDENT_AFTER
+    if kind == "path":
+        return re.escape(value) + r"(?![A-Za-z0-9_])"
+    # 顏色：名稱本身或 RGB 三元組（例如 1.0, 0.0, 0.0 或 1, 0, 0）
+    components = []
+    for component in COLORS[value]:
+        if float(component).is_integer():
+            components.append(r"%d(?:\.0*)?" % component)
+        else:
+            components.append(r"0?" + re.escape(("%g" % component).lstrip("0")) + "0*")
+    return (re.escape(value) + "|" + _NOT_IDENT_BEFORE + r"\s*,\s*".join(components)
+            + _NOT_IDENT_AFTER)
+
+
+def _render_value(kind: str, value: str, original: str) -> str:
+    """把新參數寫成與原出現形式相同種類的字面值"""
+    if kind != "color":
+        return value
+    if original.lower() in COLORS:
+        return value
+    return ", ".join("%.1f" % c for c in COLORS[value])
+
+
+# 數字參數在代碼中出現超過此次數時視為無法定位（可能與其他常數混淆）
+MAX_NUMBER_OCCURRENCES = 3
+
+
+def _split_slots(
+    text: str, params: List[Tuple[str, str]], require_all: bool
+) -> Optional[List[Any]]:
+    """將文字切成字面片段與參數槽；require_all 時每個參數都必須出現"""
+    spans = []
+    for index, (kind, value) in enumerate(params):
+        found = [
+            (m.start(), m.end(), index)
+            for m in re.finditer(_literal_pattern(kind, value), text)
+        ]
+        if require_all and not found:
+            # 需求中的參數沒有反映在代碼中，套用範本會產生錯誤結果
+            return None
+        if kind == "number" and len(found) > MAX_NUMBER_OCCURRENCES:
+            if require_all:
+                return None
+            found = []
+        spans.extend(found)
+    spans.sort()
+    for (_, end, _), (start, _, _) in zip(spans, spans[1:]):
+        if start < end:
+            return None
+
+    parts: List[Any] = []
+    cursor = 0
+    for start, end, index in spans:
+        parts.append(text[cursor:start])
+        parts.append((index, text[start:end]))
+        cursor = end
+    parts.append(text[cursor:])
+    return parts
+
+
+def _fill_slots(parts: List[Any], params: List[Tuple[str, str]]) -> str:
+    pieces = []
+    for part in parts:
+        if isinstance(part, str):
+            pieces.append(part)
+        else:
+            index, original = part
+            kind, value = params[index]
+            pieces.append(_render_value(kind, value, original))
+    return "".join(pieces)
+
+
+class ScriptTemplate:
+    """單一範本：代碼與說明切成字面片段與參數槽"""
+
+    def __init__(self, signature: str, kinds: List[str], code_parts: List[Any],
+                 explanation_parts: List[Any], source_request: str):
+        self.signature = signature
+        self.kinds = kinds
+        # 片段為字串（字面內容）或 (參數索引, 原始出現文字)
+        self.code_parts = code_parts
+        self.explanation_parts = explanation_parts
+        self.source_request = source_request
+        self.hits = 0
+
+    def instantiate(self, params: List[Tuple[str, str]]) -> Tuple[str, str]:
+        """回傳 (代碼, 說明)"""
+        return _fill_slots(self.code_parts, params), _fill_slots(
+            self.explanation_parts, params
+        )
+
+
+def build_template(
+    request: str, code: str, explanation: str = ""
+) -> Optional[ScriptTemplate]:
+    """由一次已驗證的生成結果建立範本；參數無法在代碼中唯一定位時回傳 None"""
+    signature, params = extract_parameters(request)
+    if not params:
+        return None
+    values = [value for _, value in params]
+    if len(set(values)) != len(values):
+        # 相同的值無法分辨對應哪個參數
+        return None
+
+    code_parts = _split_slots(code, params, require_all=True)
+    if code_parts is None:
+        return None
+    explanation_parts = _split_slots(explanation, params, require_all=False) or [
+        explanation
+    ]
+    return ScriptTemplate(
+        signature, [kind for kind, _ in params], code_parts, explanation_parts, request
+    )
+
+
+def is_valid_code(code: str) -> bool:
+    """範本只從可編譯的代碼學習"""
+    try:
+        compile(code, "<template>", "exec")
+        return True
+    except SyntaxError:
+        return False
+
+
+class TemplateLibrary:
+    """以需求結構簽名索引的範本庫（執行緒安全）"""
+
+    def __init__(
+        self, max_templates: int = 500, validator: Callable[[str], bool] = is_valid_code
+    ):
+        self.max_templates = max_templates
+        # 範本命中時不經模型直接使用：learn / load 的所有代碼都須通過此檢查
+        self.validator = validator
+        self._templates: Dict[str, ScriptTemplate] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "learned": 0}
+
+    def learn(self, request: str, code: str, explanation: str = "") -> bool:
+        """從一次成功的生成學習範本（已有同結構範本時保留舊的）；未通過 validator
+        的代碼不學習"""
+        if not is_valid_code(code) or not self.validator(code):
+            return False
+        template = build_template(request, code, explanation)
+        if template is None:
+            return False
+        with self._lock:
+            if template.signature in self._templates:
+                return False
+            if len(self._templates) >= self.max_templates:
+                # 淘汰命中次數最少的範本
+                coldest = min(self._templates.values(), key=lambda t: t.hits)
+                del self._templates[coldest.signature]
+            self._templates[template.signature] = template
+            self.stats["learned"] += 1
+        return True
+
+    def load(self, records: Iterable[Dict[str, Any]]):
+        """從歷程記錄批次學習"""
+        for record in records:
+            if record.get("kind", "code") == "code" and record.get("code"):
+                self.learn(
+                    record["request"], record["code"], record.get("explanation", "")
+                )
+
+    def match(self, request: str) -> Optional[Dict[str, Any]]:
+        """需求命中範本時回傳與 generate_code 相同格式的結果，否則回傳 None"""
+        signature, params = extract_parameters(request)
+        with self._lock:
+            template = self._templates.get(signature) if params else None
+            if template is None or template.kinds != [kind for kind, _ in params]:
+                self.stats["misses"] += 1
+                CACHE_REQUESTS.inc(cache="template", result="miss")
+                return None
+            template.hits += 1
+            self.stats["hits"] += 1
+        CACHE_REQUESTS.inc(cache="template", result="hit")
+        code, explanation = template.instantiate(params)
+        return {
+            "status": "success",
+            "code": code,
+            "raw_response": "",
+            "explanation": explanation,
+            "template": template.source_request,
+        }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._templates)
@@ -0,0 +1,324 @@
+"""
+跨進程共享狀態儲存
+以 SQLite (WAL 模式) 在同一台機器的多個 worker 進程之間共享回應緩存、
+引擎健康狀態與速率限制配額
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Optional, Sequence, Tuple
+
+from langchain.schema import ChatGeneration, Generation
+from langchain.schema.cache import BaseCache
+from langchain.schema.messages import message_to_dict, messages_from_dict
+
+from metrics import CACHE_REQUESTS
+
+DEFAULT_STORE_PATH = os.path.join(tempfile.gettempdir(), "omniverse_shared_store.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS idx_kv_expires ON kv (expires_at);
+CREATE TABLE IF NOT EXISTS buckets (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE TABLE IF NOT EXISTS counters (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    window_start REAL NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+"""
+
+
+class SharedStore:
+    """以 SQLite WAL 實作的跨進程鍵值儲存"""
+
+    def __init__(self, path: Optional[str] = None, busy_timeout: float = 5.0,
+                 purge_interval: Optional[float] = 60.0):
+        self.path = path or os.environ.get("SHARED_STORE_PATH", DEFAULT_STORE_PATH)
+        self.busy_timeout = busy_timeout
+        # 寫入時最多每 purge_interval 秒清除一次過期資料；None 表示不自動清除
+        self.purge_interval = purge_interval
+        self._last_purge = time.monotonic()
+        # 每個執行緒各自持有連接；fork 後依 pid 重新連接
+        self._local = threading.local()
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """取得目前執行緒（與進程）專用的連接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and getattr(self._local, "pid", None) == os.getpid():
+            return conn
+
+        conn = sqlite3.connect(
+            self.path, timeout=self.busy_timeout, isolation_level=None
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _init_schema(self):
+        """建立資料表"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connect().executescript(_SCHEMA)
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        """讀取值（過期視為不存在）"""
+        row = self._connect().execute(
+            "SELECT value, expires_at FROM kv WHERE namespace = ? AND key = ?",
+            (namespace, key)
+        ).fetchone()
+        if row is None:
+            return default
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            return default
+        return json.loads(value)
+
+    def set(self, namespace: str, key: str, value: Any, ttl: Optional[float] = None):
+        """寫入值，可選擇存活秒數"""
+        expires_at = time.time() + ttl if ttl else None
+        self._connect().execute(
+            "INSERT OR REPLACE INTO kv (namespace, key, value, expires_at) "
+            "VALUES (?, ?, ?, ?)",
+            (namespace, key, json.dumps(value, ensure_ascii=False), expires_at),
+        )
+        self._maybe_purge()
+
+    def _maybe_purge(self):
+        """距離上次清除超過 purge_interval 時清除過期資料"""
+        if self.purge_interval is None:
+            return
+        now = time.monotonic()
+        if now - self._last_purge >= self.purge_interval:
+            self._last_purge = now
+            self.purge_expired()
+
+    def delete(self, namespace: str, key: Optional[str] = None):
+        """刪除單一鍵或整個命名空間"""
+        if key is None:
+            self._connect().execute("DELETE FROM kv WHERE namespace = ?", (namespace,))
+        else:
+            self._connect().execute(
+                "DELETE FROM kv WHERE namespace = ? AND key = ?", (namespace, key)
+            )
+
+    def incr(
+        self,
+        namespace: str,
+        key: str,
+        amount: float = 1,
+        window: Optional[float] = None,
+    ) -> float:
+        """原子遞增計數器；指定 window 時為固定時間窗計數"""
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT window_start, value FROM counters "
+                "WHERE namespace = ? AND key = ?",
+                (namespace, key),
+            ).fetchone()
+            if row is None or (window is not None and now - row[0] >= window):
+                window_start, value = now, float(amount)
+            else:
+                window_start, value = row[0], row[1] + amount
+            conn.execute(
+                "INSERT OR REPLACE INTO counters (namespace, key, window_start, value) "
+                "VALUES (?, ?, ?, ?)",
+                (namespace, key, window_start, value),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return value
+
+    def get_counter(self, namespace: str, key: str) -> float:
+        """讀取計數器目前的值"""
+        row = self._connect().execute(
+            "SELECT value FROM counters WHERE namespace = ? AND key = ?",
+            (namespace, key)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def take_tokens(
+        self,
+        namespace: str,
+        key: str,
+        capacity: float,
+        refill_per_sec: float,
+        cost: float,
+        dry_run: bool = False,
+    ) -> float:
+        """原子操作的令牌桶：足夠時扣除並回傳 0，否則回傳需等待的秒數"""
+        return self.take_buckets(
+            namespace, [(key, capacity, refill_per_sec, cost)], dry_run=dry_run
+        )
+
+    @staticmethod
+    def _level(row, capacity: float, refill_per_sec: float, now: float) -> float:
+        return (
+            capacity
+            if row is None
+            else min(capacity, row[0] + (now - row[1]) * refill_per_sec)
+        )
+
+    def take_buckets(
+        self,
+        namespace: str,
+        buckets: Sequence[Tuple[str, float, float, float]],
+        dry_run: bool = False,
+    ) -> float:
+        """在同一個交易內檢查並扣除多個桶 (key, capacity, refill_per_sec, cost)：
+        全部足夠時一起扣除並回傳 0，否則不扣除並回傳需等待的最長秒數"""
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            levels = []
+            wait = 0.0
+            for key, capacity, refill_per_sec, cost in buckets:
+                row = conn.execute(
+                    "SELECT tokens, updated_at FROM buckets "
+                    "WHERE namespace = ? AND key = ?",
+                    (namespace, key),
+                ).fetchone()
+                tokens = self._level(row, capacity, refill_per_sec, now)
+                cost = min(cost, capacity)
+                if tokens < cost:
+                    wait = max(wait, (cost - tokens) / refill_per_sec)
+                levels.append((key, tokens - cost))
+            if wait > 0 or dry_run:
+                conn.execute("ROLLBACK")
+                return wait
+            conn.executemany(
+                "INSERT OR REPLACE INTO buckets (namespace, key, tokens, updated_at) "
+                "VALUES (?, ?, ?, ?)",
+                [(namespace, key, tokens, now) for key, tokens in levels],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return 0.0
+
+    def bucket_level(
+        self, namespace: str, key: str, capacity: float, refill_per_sec: float
+    ) -> float:
+        """讀取桶目前的令牌數（含補充，不扣除）"""
+        row = self._connect().execute(
+            "SELECT tokens, updated_at FROM buckets WHERE namespace = ? AND key = ?",
+            (namespace, key)
+        ).fetchone()
+        return self._level(row, capacity, refill_per_sec, time.time())
+
+    def purge_expired(self) -> int:
+        """清除過期資料，回傳刪除筆數"""
+        cursor = self._connect().execute(
+            "DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?",
+            (time.time(),),
+        )
+        return cursor.rowcount
+
+
+class SharedLLMCache(BaseCache):
+    """LangChain LLM 緩存，所有 worker 共用同一份回應"""
+
+    namespace = "llm_cache"
+
+    def __init__(self, store: SharedStore, ttl: Optional[float] = 3600):
+        self.store = store
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\x00{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        """查詢緩存"""
+        records = self.store.get(self.namespace, self._key(prompt, llm_string))
+        CACHE_REQUESTS.inc(cache="llm", result="miss" if records is None else "hit")
+        if records is None:
+            return None
+        generations = []
+        for record in records:
+            if "message" in record:
+                message = messages_from_dict([record["message"]])[0]
+                generations.append(ChatGeneration(message=message))
+            else:
+                generations.append(Generation(text=record["text"]))
+        return generations
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]):
+        """寫入緩存"""
+        records = []
+        for generation in return_val:
+            if isinstance(generation, ChatGeneration):
+                records.append({"message": message_to_dict(generation.message)})
+            else:
+                records.append({"text": generation.text})
+        self.store.set(
+            self.namespace, self._key(prompt, llm_string), records, ttl=self.ttl
+        )
+
+    def clear(self, **kwargs: Any):
+        """清除所有緩存回應"""
+        self.store.delete(self.namespace)
+
+
+_shared_store: Optional[SharedStore] = None
+_store_lock = threading.Lock()
+
+
+def get_shared_store() -> SharedStore:
+    """取得進程內唯一的共享儲存實例"""
+    global _shared_store
+    with _store_lock:
+        if _shared_store is None:
+            _shared_store = SharedStore()
+        return _shared_store
+
+
+def enable_shared_caches(
+    store: Optional[SharedStore] = None,
+    response_ttl: Optional[float] = None,
+    engine=None,
+) -> SharedStore:
+    """啟用跨 worker 的回應緩存、引擎健康狀態與速率限制共享；engine 為注入的
+    UnifiedEngineConfig，
+    未指定時使用全域 engine_config"""
+    from langchain.globals import set_llm_cache
+
+    if engine is None:
+        from groq_config import engine_config as engine
+    store = store or get_shared_store()
+    if response_ttl is None:
+        # SHARED_CACHE_TTL 或設定檔的 cache.response_ttl
+        response_ttl = engine.settings.cache.response_ttl
+    set_llm_cache(SharedLLMCache(store, ttl=response_ttl))
+    engine.attach_shared_store(store)
+    engine.rate_limiters.attach_shared_store(store)
+    return store
@@ -1,27 +1,51 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import uvicorn
-from langserve_launch_example.chain import get_chain
-import threading
+import argparse
 import asyncio
+import os
+import sys
+from contextlib import asynccontextmanager
 from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
 
-# 創建 FastAPI 應用
-app = FastAPI(
-    title="Omniverse Semantic API",
-    description="為 Omniverse Extension 提供 API 介面",
-    version="1.0.0"
-)
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from langchain.schema.runnable import Runnable
+from pydantic import BaseModel
 
-# 設置 CORS 中間件，允許來自 Omniverse 的請求
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # 在生產環境中應該限制為特定來源
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+import metrics
+from admission import BULK, INTERACTIVE, AdmissionController, AdmissionRejected
+from rate_limiter import RateLimitExceeded
+from token_usage import (
+    GROUP_FIELDS,
+    UsageCallbackHandler,
+    close_usage_store,
+    get_usage_store,
 )
+from tracing import trace_requests, tracer
+
+# 預設服務位址
+DEFAULT_HOST = "localhost"
+DEFAULT_PORT = 8503
+
+# 優雅關閉時要執行的回調
+_shutdown_hooks: List[Callable[[], None]] = []
+
+
+def register_shutdown_hook(hook: Callable[[], None]) -> Callable[[], None]:
+    """註冊關閉回調（可作為裝飾器使用）"""
+    _shutdown_hooks.append(hook)
+    return hook
+
+
+def _run_shutdown_hooks():
+    """依註冊的相反順序執行關閉回調"""
+    while _shutdown_hooks:
+        hook = _shutdown_hooks.pop()
+        try:
+            hook()
+        except Exception as e:
+            print(f"關閉回調執行失敗: {e}")
+
 
 # 請求模型
 class QueryRequest(BaseModel):
@@ -32,106 +56,385 @@ class QueryResponse(BaseModel):
     response: str
     status: str
     execution_time: float
+    # 各階段耗時（毫秒）與可在追蹤輸出檔中查找的追蹤 ID
+    timings: Dict[str, float] = {}
+    trace_id: Optional[str] = None
+    # 本次請求的 token 用量（estimated 為 True 時部分數值由本地分詞器估算）
+    usage: Dict[str, Any] = {}
+
 
-# 初始化 AI 鏈
-chain = get_chain()
+def _get_chain(request: Request) -> Runnable:
+    """取得應用程式共用的 AI 鏈"""
+    return request.app.state.chain
 
-@app.get("/health")
-async def health_check():
-    """健康檢查端點"""
-    return {"status": "healthy", "service": "omniverse-semantic-api"}
 
-@app.post("/api/query", response_model=QueryResponse)
-async def process_query(request: QueryRequest):
-    """處理語意查詢請求"""
+def _get_engine(request: Request):
+    """取得注入的引擎配置，未注入時使用全域 engine_config"""
+    engine = getattr(request.app.state, "engine", None)
+    if engine is None:
+        from groq_config import engine_config
+        engine = engine_config
+    return engine
+
+
+def _caller(request: Request, context: Optional[dict] = None) -> str:
+    """用量統計的呼叫者：X-Caller-Id 標頭、context["caller"]，否則為用戶端位址"""
+    caller = request.headers.get("X-Caller-Id") or (context or {}).get("caller")
+    if caller:
+        return str(caller)[:64]
+    return request.client.host if request.client else "anonymous"
+
+
+async def _record_usage(
+    handler: UsageCallbackHandler, caller: str, endpoint: str
+) -> Dict[str, Any]:
+    """累計用量到本地儲存（在執行緒中寫入，不阻塞事件迴圈）並回傳摘要"""
     try:
-        import time
-        start_time = time.time()
-        
-        # 調用 AI 鏈處理查詢
-        response = chain.invoke({"topic": request.query})
-        
-        execution_time = time.time() - start_time
-        
-        return QueryResponse(
-            response=response,
-            status="success",
-            execution_time=execution_time
+        await asyncio.to_thread(
+            get_usage_store().record, handler.calls, caller, endpoint
         )
-        
     except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Query processing failed: {str(e)}"
-        )
+        print(f"用量記錄失敗: {e}")
+    return handler.summary()
 
-@app.get("/api/status")
-async def get_service_status():
-    """獲取服務狀態"""
-    try:
-        from groq_config import engine_config
-        engine_status = engine_config.get_engine_status()
-        current_engine = engine_status["current_engine"]
-        current_model = engine_status["current_model"]
-        
-        return {
-            "service": "omniverse-semantic-api",
-            "status": "running",
-            "ai_engine": f"{current_engine}-{current_model}",
-            "available_engines": engine_status["available_engines"],
-            "features": {
-                "semantic_analysis": True,
-                "knowledge_integration": True,
-                "collaborative_development": True,
-                "engine_switching": True
-            }
-        }
-    except Exception as e:
+
+def create_app(chain: Optional[Runnable] = None, engine=None) -> FastAPI:
+    """建立 FastAPI 應用（每個 worker 進程各自建立一次）；engine 為注入的
+    UnifiedEngineConfig"""
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        # 啟動時才初始化 AI 鏈，導入模組不會產生任何副作用
+        if getattr(app.state, "chain", None) is None:
+            from langserve_launch_example.chain import get_chain
+            app.state.chain = get_chain(engine=engine)
+        # 設定檔修改後立即重新載入（未安裝 watchdog 時於下次讀取設定時輪詢）
+        from engine_settings import settings_provider
+        watching = settings_provider.watch()
+        # 關閉時寫回用量儲存的 WAL，並寫出最後一次指標快照
+        # （多 worker 時 /metrics 不遺失計數）
+        register_shutdown_hook(close_usage_store)
+        register_shutdown_hook(metrics.registry.flush)
+        yield
+        # 關閉時：新請求已停止接收，進行中的請求已完成
+        if watching:
+            settings_provider.stop()
+        _run_shutdown_hooks()
+        app.state.chain = None
+
+    # 創建 FastAPI 應用
+    app = FastAPI(
+        title="Omniverse Semantic API",
+        description="為 Omniverse Extension 提供 API 介面",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+    app.state.chain = chain
+    app.state.engine = engine
+
+    # 准入控制：互動查詢優先於批量場景分析，預估等待超過截止時間時快速回傳 503
+    if engine is not None:
+        admission_settings = engine.settings.admission
+    else:
+        from engine_settings import get_settings
+        admission_settings = get_settings().admission
+
+    def estimate_latency() -> Optional[float]:
+        # 引擎層（韌性模型）的即時延遲百分位數
+        engine_config = engine
+        if engine_config is None:
+            from groq_config import engine_config
+        return engine_config.estimate_latency(admission_settings.estimate_quantile)
+
+    admission = AdmissionController.from_settings(
+        admission_settings,
+        estimate_latency,
+        {"query": INTERACTIVE, "scene_analyze": BULK},
+    )
+    app.state.admission = admission
+
+    # 設置 CORS 中間件，允許來自 Omniverse 的請求
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # 在生產環境中應該限制為特定來源
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.middleware("http")(trace_requests)
+    app.middleware("http")(metrics.track_requests)
+
+    @app.get("/health")
+    async def health_check():
+        """健康檢查端點"""
         return {
+            "status": "healthy",
             "service": "omniverse-semantic-api",
-            "status": "error",
-            "error": str(e),
-            "ai_engine": "unknown",
-            "features": {}
+            "pid": os.getpid(),
         }
 
-@app.post("/api/scene/analyze")
-async def analyze_scene_context(scene_data: dict):
-    """分析場景上下文並提供建議"""
-    try:
-        from groq_config import engine_config
-        
-        # 基於場景資料生成語意查詢
-        scene_summary = f"場景包含 {len(scene_data.get('objects', []))} 個物件"
-        query = f"分析以下 Omniverse 場景並提供優化建議：{scene_summary}"
-        
-        response = chain.invoke({"topic": query})
-        
-        engine_status = engine_config.get_engine_status()
-        current_engine = engine_status["current_engine"]
-        current_model = engine_status["current_model"]
-        
-        return {
-            "response": response,
-            "timestamp": datetime.now().isoformat(),
-            "ai_engine": f"{current_engine}-{current_model}",
-            "query_type": "semantic_analysis"
-        }
-        
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Scene analysis failed: {str(e)}"
+    @app.get("/metrics")
+    async def metrics_endpoint():
+        """Prometheus 指標（多 worker 時合併所有進程）"""
+        return Response(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+    @app.post("/api/query", response_model=QueryResponse)
+    async def process_query(request: QueryRequest, http_request: Request,
+                            chain: Runnable = Depends(_get_chain)):
+        """處理語意查詢請求"""
+        try:
+            import time
+            start_time = time.time()
+
+            # 請求進入中間件到處理函式開始之間的等待
+            root = tracer.current_span()
+            if root is not None:
+                tracer.record(
+                    "queue.dispatch", root.start_ns / 1e9, start_time, parent=root
+                )
+
+            usage = UsageCallbackHandler()
+            async with admission.admit("query"):
+                with tracer.span("handler") as span:
+                    # 調用 AI 鏈處理查詢（非同步，避免阻塞事件迴圈）
+                    # 呼叫端可在 context["history"] 提供對話上下文
+                    history = request.context.get("history", "")
+                    response = await chain.ainvoke({
+                        "topic": request.query,
+                        "history": history if isinstance(history, str) else ""
+                    }, config={"callbacks": [usage]})
+
+            execution_time = time.time() - start_time
+
+            return QueryResponse(
+                response=response,
+                status="success",
+                execution_time=execution_time,
+                timings=tracer.stage_timings(span),
+                trace_id=span.trace_id,
+                usage=await _record_usage(
+                    usage, _caller(http_request, request.context), "query"
+                ),
+            )
+
+        except AdmissionRejected as e:
+            raise HTTPException(
+                status_code=503,
+                detail=str(e),
+                headers={"Retry-After": e.retry_after_header}
+            )
+        except RateLimitExceeded as e:
+            raise HTTPException(
+                status_code=429,
+                detail=str(e),
+                headers={"Retry-After": str(int(e.retry_after) + 1)}
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Query processing failed: {str(e)}"
+            )
+
+    @app.get("/api/status")
+    async def get_service_status(request: Request):
+        """獲取服務狀態"""
+        try:
+            engine_config = _get_engine(request)
+            engine_status = engine_config.get_engine_status()
+            current_engine = engine_status["current_engine"]
+            current_model = engine_status["current_model"]
+
+            return {
+                "service": "omniverse-semantic-api",
+                "status": "running",
+                "ai_engine": f"{current_engine}-{current_model}",
+                "available_engines": engine_status["available_engines"],
+                "rate_limits": engine_config.get_rate_limit_status(),
+                "resilience": engine_config.get_resilience_status(),
+                "admission": admission.snapshot(),
+                "features": {
+                    "semantic_analysis": True,
+                    "knowledge_integration": True,
+                    "collaborative_development": True,
+                    "engine_switching": True
+                }
+            }
+        except Exception as e:
+            return {
+                "service": "omniverse-semantic-api",
+                "status": "error",
+                "error": str(e),
+                "ai_engine": "unknown",
+                "features": {}
+            }
+
+    @app.get("/api/usage/report")
+    async def usage_report(
+        group_by: str = "caller,engine", since: Optional[str] = None
+    ):
+        """token 用量報表：group_by 為以逗號分隔的欄位，since 為 YYYY-MM-DD"""
+        fields = [field.strip() for field in group_by.split(",")]
+        invalid = [field for field in fields if field not in GROUP_FIELDS]
+        if invalid:
+            raise HTTPException(
+                status_code=400,
+                detail=f"不支援的分組欄位: {', '.join(invalid)}"
+                f"（可用: {', '.join(GROUP_FIELDS)}）",
+            )
+        return await asyncio.to_thread(get_usage_store().report, fields, since)
+
+    @app.post("/api/scene/analyze")
+    async def analyze_scene_context(scene_data: dict, http_request: Request,
+                                    chain: Runnable = Depends(_get_chain)):
+        """分析場景上下文並提供建議"""
+        try:
+            engine_config = _get_engine(http_request)
+
+            # 基於場景資料生成語意查詢
+            scene_summary = f"場景包含 {len(scene_data.get('objects', []))} 個物件"
+            query = f"分析以下 Omniverse 場景並提供優化建議：{scene_summary}"
+
+            usage = UsageCallbackHandler()
+            async with admission.admit("scene_analyze"):
+                response = await chain.ainvoke(
+                    {"topic": query}, config={"callbacks": [usage]}
+                )
+
+            engine_status = engine_config.get_engine_status()
+            current_engine = engine_status["current_engine"]
+            current_model = engine_status["current_model"]
+
+            return {
+                "response": response,
+                "timestamp": datetime.now().isoformat(),
+                "ai_engine": f"{current_engine}-{current_model}",
+                "query_type": "semantic_analysis",
+                "usage": await _record_usage(
+                    usage, _caller(http_request), "scene_analyze"
+                ),
+            }
+
+        except AdmissionRejected as e:
+            raise HTTPException(
+                status_code=503,
+                detail=str(e),
+                headers={"Retry-After": e.retry_after_header}
+            )
+        except RateLimitExceeded as e:
+            raise HTTPException(
+                status_code=429,
+                detail=str(e),
+                headers={"Retry-After": str(int(e.retry_after) + 1)}
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Scene analysis failed: {str(e)}"
+            )
+
+    return app
+
+
+# 供 `uvicorn streamlit_api:app` 使用；AI 鏈在啟動事件中才建立
+app = create_app()
+
+
+def _graceful_shutdown_option(graceful_timeout: int) -> Dict[str, Any]:
+    """uvicorn 0.22 起才支援 timeout_graceful_shutdown；舊版不傳入，由 uvicorn
+    等待請求完成"""
+    import inspect
+
+    import uvicorn
+
+    if (
+        "timeout_graceful_shutdown"
+        in inspect.signature(uvicorn.Config.__init__).parameters
+    ):
+        return {"timeout_graceful_shutdown": graceful_timeout}
+    print(
+        f"uvicorn {uvicorn.__version__} 不支援 timeout_graceful_shutdown，"
+        "忽略 --graceful-timeout"
+    )
+    return {}
+
+
+def run_api_server(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, workers: int = 1,
+                   log_level: str = "info", graceful_timeout: int = 30):
+    """以 uvicorn 執行 API 服務器（workers > 1 時為多進程模式）"""
+    import uvicorn
+
+    options = dict(
+        host=host,
+        port=port,
+        log_level=log_level,
+        **_graceful_shutdown_option(graceful_timeout),
+    )
+    if workers > 1:
+        # 多進程模式需要以導入字串指定應用工廠，讓每個 worker 自行建立應用
+        uvicorn.run(
+            "streamlit_api:create_app", factory=True, workers=workers, **options
         )
+    else:
+        uvicorn.run(create_app(), **options)
+
+
+def run_gunicorn_server(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    workers: int = 1,
+    log_level: str = "info",
+    graceful_timeout: int = 30,
+):
+    """以 gunicorn + UvicornWorker 執行 API 服務器（取代目前進程）"""
+    args = [
+        "gunicorn",
+        "streamlit_api:create_app()",
+        "--worker-class", "uvicorn.workers.UvicornWorker",
+        "--workers", str(workers),
+        "--bind", f"{host}:{port}",
+        "--log-level", log_level,
+        "--graceful-timeout", str(graceful_timeout),
+    ]
+    os.execvp(args[0], args)
+
+
+def main(argv: Optional[List[str]] = None):
+    """命令列入口"""
+    parser = argparse.ArgumentParser(description="Omniverse Semantic API 服務器")
+    parser.add_argument("--host", default=os.environ.get("API_HOST", DEFAULT_HOST))
+    parser.add_argument(
+        "--port", type=int, default=int(os.environ.get("API_PORT", DEFAULT_PORT))
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.environ.get("API_WORKERS", os.cpu_count() or 1)),
+        help="worker 進程數量（預設為 CPU 核心數）"
+    )
+    parser.add_argument("--server", choices=["uvicorn", "gunicorn"], default="uvicorn")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=30,
+        help="關閉時等待進行中請求完成的秒數"
+    )
+    args = parser.parse_args(argv)
+
+    if args.workers > 1:
+        # 各 worker 把指標快照寫入同一目錄，/metrics 才能回報全部進程的數值
+        metrics.prepare_multiprocess_dir()
+
+    runner = run_gunicorn_server if args.server == "gunicorn" else run_api_server
+    runner(
+        host=args.host,
+        port=args.port,
+        workers=max(1, args.workers),
+        log_level=args.log_level,
+        graceful_timeout=args.graceful_timeout
+    )
 
-def run_api_server():
-    """在背景執行 API 服務器"""
-    uvicorn.run(app, host="localhost", port=8503, log_level="info")
 
 if __name__ == "__main__":
     # 直接運行 API 服務器
-    run_api_server()
-else:
-    # 當作為模組導入時，在背景線程運行
-    api_thread = threading.Thread(target=run_api_server, daemon=True)
-    api_thread.start() 
\ No newline at end of file
+    main(sys.argv[1:])
@@ -1,6 +1,19 @@
-import streamlit as st
 import time
+import uuid
+
+import streamlit as st
+
+from background_jobs import JobRunner
+from conversation_memory import ConversationMemory, create_llm_summarizer
+from engine_settings import get_settings
+from engine_status_service import EngineStatusService
+from history_search import HistorySearchIndex
+from history_store import HistoryStore
+from history_view import HistoryPage, paginate, summarize
 from langserve_launch_example.chain import get_chain
+
+# 對話歷程最多保留的顯示訊息數（較舊內容已壓縮進對話記憶的摘要）
+MAX_DISPLAY_MESSAGES = 200
 # 導入代碼生成器 (需要處理 import 錯誤)
 try:
     from omniverse_code_generator import omniverse_code_gen
@@ -215,22 +228,281 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_resource(show_spinner=False)
+def get_shared_chain(engine_name: str):
+    """所有會話共用的語意查詢鏈（每個引擎各建立一次）"""
+    return get_chain()
+
+
+@st.cache_resource(show_spinner=False)
+def get_engine_status_service() -> EngineStatusService:
+    """所有會話共用的引擎狀態快照服務（單一背景執行緒刷新）"""
+    from groq_config import engine_config
+    return EngineStatusService(engine_config, interval=30).start()
+
+
+@st.cache_resource(show_spinner=False)
+def get_memory_summarizer():
+    """所有會話共用的對話摘要模型（使用快速模型層級）"""
+    from groq_config import engine_config
+    try:
+        model = engine_config.create_model_instance(
+            task_type="fast", temperature=0.2, max_tokens=300
+        )
+    except RuntimeError as e:
+        # 引擎不可用（例如未設定 GROQ_API_KEY）時改用抽取式摘要
+        print(f"對話摘要模型無法建立，改用抽取式摘要: {e}")
+        return None
+    return create_llm_summarizer(model)
+
+
+def append_message(role: str, content: str):
+    """加入對話訊息：同時寫入對話記憶，並限制顯示列表長度"""
+    st.session_state.messages.append({"role": role, "content": content})
+    del st.session_state.messages[:-MAX_DISPLAY_MESSAGES]
+    st.session_state.conversation_memory.add(role, content)
+
+
+def append_generated_code(request: str, code: str, explanation: str):
+    """加入代碼記錄，與對話訊息同樣限制顯示列表長度（完整歷程保存在 HistoryStore）"""
+    st.session_state.generated_codes.append({
+        "request": request,
+        "code": code,
+        "timestamp": time.time(),
+        "explanation": explanation
+    })
+    del st.session_state.generated_codes[:-MAX_DISPLAY_MESSAGES]
+
+
+@st.cache_resource(show_spinner=False)
+def get_history_store() -> HistoryStore:
+    """所有會話共用的持久化歷程儲存（背景批次寫入）"""
+    return HistoryStore()
+
+
+@st.cache_resource(show_spinner=False)
+def get_history_index() -> HistorySearchIndex:
+    """所有會話共用的歷程搜尋索引（隨歷程寫入增量更新）"""
+    return HistorySearchIndex.from_store(get_history_store())
+
+
+@st.cache_resource(show_spinner=False)
+def load_code_templates() -> int:
+    """以歷程中的代碼生成結果預先建立範本庫（每個進程一次）"""
+    if not CODE_GEN_AVAILABLE:
+        return 0
+    omniverse_code_gen.templates.load(
+        record for record in get_history_store().iter_all() if record["kind"] == "code"
+    )
+    return len(omniverse_code_gen.templates)
+
+
+def reuse_history_record(record: dict):
+    """重用搜尋到的歷史結果，不再調用模型"""
+    if record["kind"] == "code":
+        append_generated_code(record["request"], record["code"], record["explanation"])
+        st.session_state.last_code_result = {
+            "request": record["request"],
+            "result": {"status": "success", "code": record["code"],
+                       "explanation": record["explanation"], "reused": True}
+        }
+    else:
+        append_message("user", record["request"])
+        append_message("assistant", record["response"])
+        get_history_store().record_query(
+            st.session_state.session_id, record["request"], record["response"]
+        )
+
+
+def get_session_id() -> str:
+    """以網址參數保存會話 ID，重新整理頁面後仍可載入歷程"""
+    session_id = st.query_params.get("sid")
+    if not session_id:
+        session_id = uuid.uuid4().hex[:16]
+        st.query_params["sid"] = session_id
+    return session_id
+
+
+@st.cache_resource(show_spinner=False)
+def get_job_runner() -> JobRunner:
+    """所有會話共用的背景任務執行器"""
+    return JobRunner(max_workers=get_settings().pools.job_workers)
+
+
+def show_engine_error(error: str):
+    """顯示 AI 調用錯誤與引擎切換建議"""
+    st.error(f"系統錯誤：{error}")
+    
+    # 根據當前引擎提供不同的錯誤建議
+    try:
+        from groq_config import engine_config
+        current_engine = engine_config.get_current_engine()
+        
+        if current_engine == "groq":
+            st.error("請確認 Groq API 服務正常運行，且您的 API 金鑰有效。如需協助請檢查 groq_config.py 配置。")
+            st.info("💡 提示：您可以嘗試切換到 Ollama 本地引擎作為備選方案。")
+        else:
+            st.error("請確認 Ollama 服務正常運行，且 llama3.2:3b 模型已正確載入。")
+            st.info("💡 提示：您可以嘗試切換到 Groq 雲端引擎作為備選方案。")
+            
+    except Exception:
+        st.error("AI 引擎出現問題，請檢查配置或嘗試切換引擎。")
+
+
+@st.fragment(run_every=0.5)
+def render_pending_query():
+    """逐步顯示背景查詢的串流結果，完成後寫入對話歷程；
+    只在有進行中的任務時調用，完成後整頁重跑即停止每 0.5 秒的輪詢"""
+    job = st.session_state.get("pending_query_job")
+    if job is None:
+        return
+    
+    if not job.done:
+        st.markdown(f"""
+        <div class="response-box">
+            <strong>系統回應：</strong><br>
+            {job.text or "系統分析中..."}
+        </div>
+        """, unsafe_allow_html=True)
+        return
+    
+    st.session_state.pending_query_job = None
+    if job.status == "done":
+        append_message("assistant", job.text)
+        get_history_store().record_query(
+            st.session_state.session_id, job.description, job.text
+        )
+    else:
+        st.session_state.query_error = job.error
+    st.rerun(scope="app")
+
+
+@st.fragment(run_every=0.5)
+def render_pending_code_job():
+    """等待背景代碼生成完成，完成後保存結果；只在有進行中的任務時調用"""
+    job = st.session_state.get("pending_code_job")
+    if job is None:
+        return
+    
+    if not job.done:
+        st.info(f"AI 正在生成代碼... ({job.elapsed:.1f}s)")
+        # 代碼塊邊生成邊顯示，區塊結束時即完成語法驗證
+        blocks = {}
+        for event in list(job.events):
+            if event["type"] == "block_start":
+                blocks[event["index"]] = {
+                    "language": event["language"],
+                    "code": [],
+                    "valid": None,
+                }
+            elif event["type"] == "code":
+                blocks[event["index"]]["code"].append(event["text"])
+            elif event["type"] == "block_end":
+                blocks[event["index"]]["valid"] = event["valid"]
+        for block in blocks.values():
+            st.code("".join(block["code"]), language=block["language"] or "python")
+            if block["valid"] is False:
+                st.warning("此代碼塊有語法錯誤")
+        return
+    
+    st.session_state.pending_code_job = None
+    if job.status == "done":
+        record_code_result(job.description, job.result)
+    else:
+        st.session_state.last_code_result = {
+            "request": job.description,
+            "result": {"status": "error", "error": job.error}
+        }
+    st.rerun(scope="app")
+
+
+def render_pager(page_info: HistoryPage, state_key: str):
+    """較舊 / 較新頁面切換按鈕"""
+    if page_info.page_count <= 1:
+        return
+    
+    pager_col1, pager_col2, pager_col3 = st.columns([1, 2, 1])
+    with pager_col1:
+        if st.button(
+            "◀ 較舊", key=f"{state_key}_older", disabled=not page_info.has_previous
+        ):
+            st.session_state[state_key] = page_info.page + 1
+            st.rerun()
+    with pager_col2:
+        st.caption(
+            f"第 {page_info.page_count - page_info.page} / {page_info.page_count} 頁，"
+            f"共 {page_info.total} 筆"
+        )
+    with pager_col3:
+        if st.button(
+            "較新 ▶", key=f"{state_key}_newer", disabled=not page_info.has_next
+        ):
+            st.session_state[state_key] = page_info.page - 1
+            st.rerun()
+
+
+def record_code_result(request: str, result: dict):
+    """保存代碼生成結果到會話狀態"""
+    st.session_state.last_code_result = {"request": request, "result": result}
+    if result["status"] == "success":
+        append_generated_code(request, result["code"], result.get("explanation", ""))
+        get_history_store().record_code(
+            st.session_state.session_id,
+            request,
+            result["code"],
+            result.get("explanation", ""),
+        )
+
+
 # 初始化session state
+load_code_templates()
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = get_session_id()
+if 'conversation_memory' not in st.session_state:
+    st.session_state.conversation_memory = ConversationMemory(
+        summarizer=get_memory_summarizer()
+    )
 if 'messages' not in st.session_state:
+    # 從持久化儲存載入此會話的歷程
     st.session_state.messages = []
-if 'chain' not in st.session_state:
-    st.session_state.chain = get_chain()
+    for record in get_history_store().recent(
+        st.session_state.session_id, "query", limit=MAX_DISPLAY_MESSAGES // 2
+    ):
+        for role, content in (
+            ("user", record["request"]),
+            ("assistant", record["response"]),
+        ):
+            st.session_state.messages.append({"role": role, "content": content})
+            st.session_state.conversation_memory.add(role, content)
+if 'pending_query_job' not in st.session_state:
+    st.session_state.pending_query_job = None
+if 'pending_code_job' not in st.session_state:
+    st.session_state.pending_code_job = None
+if 'last_code_result' not in st.session_state:
+    st.session_state.last_code_result = None
 if 'generated_codes' not in st.session_state:
-    st.session_state.generated_codes = []
-# 添加引擎狀態緩存
-if 'last_engine_check' not in st.session_state:
-    st.session_state.last_engine_check = 0
-if 'engine_status_cache' not in st.session_state:
-    st.session_state.engine_status_cache = None
+    st.session_state.generated_codes = [
+        {
+            "request": record["request"],
+            "code": record["code"],
+            "timestamp": record["created_at"],
+            "explanation": record["explanation"]
+        }
+        for record in get_history_store().recent(
+            st.session_state.session_id, "code", limit=MAX_DISPLAY_MESSAGES
+        )
+    ]
+# 歷程分頁 (0 為最新一頁)
+if 'chat_page' not in st.session_state:
+    st.session_state.chat_page = 0
+if 'record_page' not in st.session_state:
+    st.session_state.record_page = 0
 
 # 主標題
 st.markdown('<h1 class="stTitle">Omniverse 語意整合平台</h1>', unsafe_allow_html=True)
-st.markdown('<p class="big-font">企業級智能語意分析與協作開發環境</p>', unsafe_allow_html=True)
+st.markdown(
+    '<p class="big-font">企業級智能語意分析與協作開發環境</p>', unsafe_allow_html=True
+)
 
 # 側邊欄
 with st.sidebar:
@@ -270,21 +542,19 @@ with st.sidebar:
     # 引擎選擇和狀態
     st.markdown("### AI 引擎設定")
     
-    # 取得引擎狀態 (使用緩存避免頻繁檢查)
+    # 取得引擎狀態 (讀取共享快照，渲染時不進行網路檢查)
+    status_service = get_engine_status_service()
     try:
         from groq_config import engine_config
-        import time
         
-        # 檢查是否需要刷新狀態 (每30秒刷新一次)
-        current_time = time.time()
-        should_refresh = (current_time - st.session_state.last_engine_check > 30) or st.session_state.engine_status_cache is None
-        
-        if should_refresh:
-            engine_status = engine_config.get_engine_status(force_refresh=False)
-            st.session_state.engine_status_cache = engine_status
-            st.session_state.last_engine_check = current_time
-        else:
-            engine_status = st.session_state.engine_status_cache
+        engine_status = status_service.snapshot()
+        if engine_status is None or "available_engines" not in engine_status:
+            # 背景服務尚未完成第一次檢查
+            engine_status = {
+                "current_engine": engine_config.get_current_engine(),
+                "current_model": engine_config.get_model("semantic"),
+                "available_engines": {}
+            }
         
         available_engines = engine_status["available_engines"]
         current_engine = engine_status["current_engine"]
@@ -314,9 +584,8 @@ with st.sidebar:
                 with st.spinner(f'正在切換到 {selected_engine.upper()} 引擎...'):
                     if engine_config.switch_engine(selected_engine):
                         st.success(f"已切換到 {selected_engine.upper()} 引擎！")
-                        # 清除緩存，強制重新檢查
-                        st.session_state.engine_status_cache = None
-                        st.session_state.last_engine_check = 0
+                        # 通知背景服務重新檢查
+                        status_service.request_refresh()
                         st.rerun()
                     else:
                         st.error(f"切換到 {selected_engine.upper()} 失敗")
@@ -327,15 +596,15 @@ with st.sidebar:
         engine_name = "Groq" if current_engine == "groq" else "Ollama"
         engine_icon = "🌐" if current_engine == "groq" else "💻"
         
-        # 只測試當前引擎的連接，避免測試其他引擎
         if current_engine in available_engines:
-            connection_status = "已連接" if available_engines[current_engine] else "連接失敗"
+            connection_status = (
+                "已連接" if available_engines[current_engine] else "連接失敗"
+            )
             connection_color = "#00ff41" if available_engines[current_engine] else "#ff4444"
         else:
-            # 如果沒有在 available_engines 中，直接測試當前引擎
-            is_connected = engine_config.test_connection()
-            connection_status = "已連接" if is_connected else "連接失敗"
-            connection_color = "#00ff41" if is_connected else "#ff4444"
+            # 快照尚未包含當前引擎，等待背景服務檢查
+            connection_status = "檢查中"
+            connection_color = "#cccccc"
         
     except Exception as e:
         engine_name = "未知"
@@ -357,25 +626,28 @@ with st.sidebar:
     # 手動刷新按鈕和狀態提示
     col1, col2 = st.columns([1, 1])
     with col1:
-        if st.button("🔄 刷新狀態", help="手動刷新引擎連接狀態"):
-            st.session_state.engine_status_cache = None
-            st.session_state.last_engine_check = 0
-            st.rerun()
+        if st.button("🔄 刷新狀態", help="要求背景服務重新檢查引擎連接狀態"):
+            status_service.request_refresh(force=True)
     
     with col2:
-        # 顯示緩存狀態
-        if hasattr(st.session_state, 'last_engine_check') and st.session_state.last_engine_check > 0:
-            import time
-            time_since_check = int(time.time() - st.session_state.last_engine_check)
-            if time_since_check < 30:
-                st.caption(f"📍 狀態已緩存 ({time_since_check}s 前更新)")
-            else:
-                st.caption("📍 狀態需要更新")
+        # 顯示快照更新時間
+        snapshot_age = status_service.age
+        if snapshot_age is not None:
+            st.caption(f"📍 狀態快照 ({int(snapshot_age)}s 前更新)")
+        else:
+            st.caption("📍 狀態檢查中")
     
     # 清除對話按鈕
     if st.button("清除會話記錄", type="secondary"):
+        # 開始新的會話；舊會話的記錄仍保留在持久化儲存中
+        st.session_state.session_id = uuid.uuid4().hex[:16]
+        st.query_params["sid"] = st.session_state.session_id
         st.session_state.messages = []
+        st.session_state.conversation_memory.clear()
         st.session_state.generated_codes = []
+        st.session_state.last_code_result = None
+        st.session_state.chat_page = 0
+        st.session_state.record_page = 0
         st.rerun()
 
 # 主要內容區域 - 使用標籤頁
@@ -407,7 +679,12 @@ with tab1:
 
     # 對話記錄顯示
     st.markdown("## 對話歷程")
-    for message in st.session_state.messages:
+    # 只渲染目前頁面的訊息，渲染成本不隨會話長度增加
+    chat_page = paginate(
+        st.session_state.messages, st.session_state.chat_page, page_size=10
+    )
+    render_pager(chat_page, "chat_page")
+    for _, message in chat_page.items:
         if message["role"] == "user":
             st.markdown(f"""
             <div class="query-box">
@@ -422,6 +699,13 @@ with tab1:
                 {message["content"]}
             </div>
             """, unsafe_allow_html=True)
+    
+    # 進行中的查詢（背景執行，逐步顯示）；閒置時不建立輪詢片段
+    if st.session_state.pending_query_job is not None:
+        render_pending_query()
+    
+    if 'query_error' in st.session_state:
+        show_engine_error(st.session_state.pop('query_error'))
 
     # 查詢輸入
     st.markdown("## 語意查詢介面")
@@ -470,38 +754,22 @@ with tab1:
 
     # 處理查詢
     if submit_button and user_query.strip():
-        # 添加用戶消息
-        st.session_state.messages.append({"role": "user", "content": user_query})
-        
-        # 顯示載入動畫
-        with st.spinner('系統分析中...'):
-            try:
-                # 調用AI鏈
-                response = st.session_state.chain.invoke({"topic": user_query})
-                
-                # 添加AI回應
-                st.session_state.messages.append({"role": "assistant", "content": response})
-                
-                # 重新運行以更新界面
-                st.rerun()
-                
-            except Exception as e:
-                st.error(f"系統錯誤：{str(e)}")
-                
-                # 根據當前引擎提供不同的錯誤建議
-                try:
-                    from groq_config import engine_config
-                    current_engine = engine_config.get_current_engine()
-                    
-                    if current_engine == "groq":
-                        st.error("請確認 Groq API 服務正常運行，且您的 API 金鑰有效。如需協助請檢查 groq_config.py 配置。")
-                        st.info("💡 提示：您可以嘗試切換到 Ollama 本地引擎作為備選方案。")
-                    else:
-                        st.error("請確認 Ollama 服務正常運行，且 llama3.2:3b 模型已正確載入。")
-                        st.info("💡 提示：您可以嘗試切換到 Groq 雲端引擎作為備選方案。")
-                        
-                except Exception:
-                    st.error("AI 引擎出現問題，請檢查配置或嘗試切換引擎。")
+        if st.session_state.pending_query_job is not None:
+            st.warning("上一個查詢仍在處理中，請稍候。")
+        else:
+            # 取得對話上下文（近期對話 + 滾動摘要）後再添加用戶消息
+            history = st.session_state.conversation_memory.context()
+            append_message("user", user_query)
+            
+            # 在共享背景執行緒中調用AI鏈，不阻塞腳本執行
+            from groq_config import engine_config
+            chain = get_shared_chain(engine_config.get_current_engine())
+            st.session_state.pending_query_job = get_job_runner().submit_stream(
+                chain, {"topic": user_query, "history": history}, description=user_query
+            )
+            
+            # 重新運行以更新界面
+            st.rerun()
 
     elif submit_button and not user_query.strip():
         st.warning("請輸入查詢內容後再提交。")
@@ -554,10 +822,17 @@ with tab2:
     col1, col2, col3 = st.columns(3)
     with col1:
         safe_mode = st.checkbox("安全模式", value=True, help="啟用代碼安全檢查")
+        auto_repair = st.checkbox(
+            "自動修復", value=True, help="執行失敗時把錯誤回饋給模型修正後重試"
+        )
     with col2:
-        add_comments = st.checkbox("添加註釋", value=True, help="在生成的代碼中添加詳細註釋")
+        add_comments = st.checkbox(
+            "添加註釋", value=True, help="在生成的代碼中添加詳細註釋"
+        )
     with col3:
-        error_handling = st.checkbox("錯誤處理", value=True, help="添加 try/except 錯誤處理")
+        error_handling = st.checkbox(
+            "錯誤處理", value=True, help="添加 try/except 錯誤處理"
+        )
     
     # 生成按鈕
     col1, col2, col3 = st.columns([1, 2, 1])
@@ -566,16 +841,20 @@ with tab2:
     
     # 處理代碼生成
     if generate_button and user_code_request.strip():
-        with st.spinner('AI 正在生成代碼...'):
-            try:
-                if CODE_GEN_AVAILABLE:
-                    # 使用真實的代碼生成器
-                    result = omniverse_code_gen.generate_code(user_code_request)
-                else:
-                    # 模擬模式
-                    result = {
-                        "status": "success",
-                        "code": f"""# 模擬生成的代碼 - {user_code_request}
+        if CODE_GEN_AVAILABLE:
+            # 在共享背景執行緒中生成代碼，不阻塞腳本執行
+            st.session_state.pending_code_job = get_job_runner().submit_events(
+                omniverse_code_gen.generate_code_stream,
+                user_code_request,
+                description=user_code_request,
+            )
+        else:
+            # 模擬模式
+            record_code_result(
+                user_code_request,
+                {
+                    "status": "success",
+                    "code": f"""# 模擬生成的代碼 - {user_code_request}
 import omni.usd
 import omni.kit.commands
 from pxr import Usd, UsdGeom, Gf
@@ -592,92 +871,184 @@ try:
     
 except Exception as e:
     print(f"執行錯誤：{{e}}")""",
-                        "explanation": "這是模擬生成的代碼，在實際 Omniverse 環境中會生成真實可執行的代碼。"
-                    }
-                
-                if result["status"] == "success":
-                    # 顯示生成的代碼
-                    st.markdown("### 生成的代碼")
-                    st.code(result["code"], language="python")
-                    
-                    # 顯示說明
-                    if "explanation" in result and result["explanation"]:
-                        st.markdown("### 代碼說明")
-                        st.markdown(result["explanation"])
-                    
-                    # 保存到會話狀態
-                    st.session_state.generated_codes.append({
-                        "request": user_code_request,
-                        "code": result["code"],
-                        "timestamp": time.time(),
-                        "explanation": result.get("explanation", "")
-                    })
-                    
-                    # 執行選項
-                    st.markdown("### 執行選項")
-                    exec_col1, exec_col2 = st.columns(2)
-                    
-                    with exec_col1:
-                        if st.button("立即執行代碼"):
-                            if CODE_GEN_AVAILABLE:
-                                exec_result = omniverse_code_gen.execute_code(result["code"], safe_mode)
-                                if exec_result["status"] == "success":
-                                    st.success("代碼執行成功！")
-                                    if exec_result["stdout"]:
-                                        st.text_area("執行輸出", exec_result["stdout"], height=100)
-                                else:
-                                    st.error(f"執行失敗：{exec_result['error']}")
-                            else:
-                                st.info("模擬模式：代碼已準備就緒，請複製到 Omniverse 中執行")
-                    
-                    with exec_col2:
-                        if st.button("複製到剪貼板"):
-                            try:
-                                import pyperclip
-                                pyperclip.copy(result["code"])
-                                st.success("代碼已複製到剪貼板！")
-                            except ImportError:
-                                st.warning("請手動複製代碼")
-                
-                else:
-                    st.error(f"代碼生成失敗：{result.get('error', '未知錯誤')}")
-                    
-            except Exception as e:
-                st.error(f"系統錯誤：{str(e)}")
+                    "explanation": "這是模擬生成的代碼，"
+                    "在實際 Omniverse 環境中會生成真實可執行的代碼。",
+                },
+            )
     
     elif generate_button and not user_code_request.strip():
         st.warning("請描述您需要的 Omniverse 操作")
+    
+    # 進行中的代碼生成（背景執行）；閒置時不建立輪詢片段
+    if st.session_state.pending_code_job is not None:
+        render_pending_code_job()
+    
+    # 顯示最近一次的生成結果
+    if st.session_state.last_code_result is not None:
+        result = st.session_state.last_code_result["result"]
+        
+        if result["status"] == "success":
+            if result.get("reused"):
+                st.info("此結果重用自歷史記錄，未重新調用模型")
+            elif result.get("template"):
+                st.info(f"此結果由範本即時生成（來源需求：{result['template']}），未調用模型")
+            # 顯示生成的代碼
+            st.markdown("### 生成的代碼")
+            st.code(result["code"], language="python")
+            validation = result.get("validation")
+            if validation and not validation["valid"]:
+                st.warning(
+                    "靜態檢查發現以下問題，執行時將被拒絕：\n\n"
+                    + "\n".join(
+                        f"- 第 {issue['line']} 行：{issue['message']}"
+                        for issue in validation["issues"]
+                    )
+                )
+            
+            # 顯示說明
+            if "explanation" in result and result["explanation"]:
+                st.markdown("### 代碼說明")
+                st.markdown(result["explanation"])
+            
+            # 執行選項
+            st.markdown("### 執行選項")
+            exec_col1, exec_col2 = st.columns(2)
+            
+            with exec_col1:
+                if st.button("立即執行代碼"):
+                    if CODE_GEN_AVAILABLE:
+                        if auto_repair:
+                            outcome = omniverse_code_gen.execute_with_repair(
+                                st.session_state.last_code_result["request"],
+                                result["code"],
+                                safe_mode,
+                            )
+                            exec_result = outcome["execution"]
+                            if outcome["repair"]["repaired"]:
+                                # 保留修正後的代碼，之後複製或重新執行都使用新版本
+                                result["code"] = outcome["code"]
+                                st.info(
+                                    f"經過 {outcome['repair']['iterations']} 次自動修復"
+                                    f"（{outcome['repair']['elapsed']:.1f} 秒），"
+                                    "修正後的代碼："
+                                )
+                                st.code(outcome["code"], language="python")
+                        else:
+                            exec_result = omniverse_code_gen.execute_code(result["code"], safe_mode)
+                        if exec_result["status"] == "success":
+                            st.success("代碼執行成功！")
+                            if exec_result["stdout"]:
+                                st.text_area("執行輸出", exec_result["stdout"], height=100)
+                        else:
+                            st.error(f"執行失敗：{exec_result['error']}")
+                    else:
+                        st.info("模擬模式：代碼已準備就緒，請複製到 Omniverse 中執行")
+            
+            with exec_col2:
+                if st.button("複製到剪貼板"):
+                    try:
+                        import pyperclip
+                        pyperclip.copy(result["code"])
+                        st.success("代碼已複製到剪貼板！")
+                    except ImportError:
+                        st.warning("請手動複製代碼")
+        
+        else:
+            st.error(f"代碼生成失敗：{result.get('error', '未知錯誤')}")
 
 # 標籤頁 3: 執行記錄
 with tab3:
     st.markdown("## 代碼生成與執行記錄")
     
+    # 搜尋過去的查詢與腳本：預設只搜尋目前會話，勾選後搜尋所有會話
+    search_col1, search_col2, search_col3, search_col4 = st.columns([4, 1, 1, 1])
+    with search_col1:
+        search_text = st.text_input(
+            "搜尋歷史記錄：", placeholder="例如：批量創建立方體、材質、燈光"
+        )
+    with search_col2:
+        search_kind = st.selectbox("類型", options=["code", "query"],
+                                   format_func={"code": "代碼", "query": "查詢"}.get)
+    with search_col3:
+        search_semantic = st.checkbox("語意相似", value=False)
+    with search_col4:
+        search_all_sessions = st.checkbox("所有會話", value=False,
+                                          help="包含其他使用者與會話的歷程記錄")
+    
+    if search_text.strip():
+        search_start = time.perf_counter()
+        search_results = get_history_index().search(
+            search_text, kind=search_kind, limit=10, semantic=search_semantic,
+            session_id=None if search_all_sessions else st.session_state.session_id
+        )
+        search_scope = "所有會話" if search_all_sessions else "目前會話"
+        st.caption(f"在{search_scope}中找到 {len(search_results)} 筆結果"
+                   f"（{(time.perf_counter() - search_start) * 1000:.1f} ms）")
+        for hit in search_results:
+            with st.expander(
+                f"{time.strftime('%m-%d %H:%M', time.localtime(hit['created_at']))} · "
+                f"{summarize(hit['request'], 60)} · 相關度 {hit['score']:.2f}"
+            ):
+                if hit["kind"] == "code":
+                    st.code(hit["code"], language="python")
+                else:
+                    st.write(summarize(hit["response"], 300))
+                if st.button("重用此結果", key=f"reuse_{hit['id']}"):
+                    reuse_history_record(hit)
+                    st.success("已加入目前會話，無需重新生成")
+        st.markdown("---")
+    
     if st.session_state.generated_codes:
-        for i, record in enumerate(reversed(st.session_state.generated_codes)):
-            with st.expander(f"記錄 {len(st.session_state.generated_codes) - i}: {record['request'][:50]}..."):
-                st.markdown("**原始需求：**")
-                st.write(record['request'])
-                
-                st.markdown("**生成時間：**")
-                st.write(time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record['timestamp'])))
-                
-                st.markdown("**生成的代碼：**")
-                st.code(record['code'], language="python")
-                
-                if record['explanation']:
-                    st.markdown("**說明：**")
-                    st.write(record['explanation'])
-                
-                # 重新執行按鈕
-                if st.button(f"重新執行代碼 {len(st.session_state.generated_codes) - i}", key=f"reexec_{i}"):
-                    if CODE_GEN_AVAILABLE:
-                        exec_result = omniverse_code_gen.execute_code(record['code'], True)
-                        if exec_result["status"] == "success":
-                            st.success("重新執行成功！")
-                        else:
-                            st.error(f"重新執行失敗：{exec_result['error']}")
-                    else:
-                        st.info("模擬模式：請複製代碼到 Omniverse 中執行")
+        # 目前頁面只列出單行摘要，僅展開選取的一筆記錄
+        record_page = paginate(
+            st.session_state.generated_codes,
+            st.session_state.record_page,
+            page_size=10,
+            newest_first=True,
+        )
+        render_pager(record_page, "record_page")
+        
+        record_labels = {
+            index: (
+                f"記錄 {index + 1} · "
+                f"{time.strftime('%m-%d %H:%M', time.localtime(item['timestamp']))} · "
+                f"{summarize(item['request'], 50)}"
+            )
+            for index, item in record_page.items
+        }
+        selected_index = st.radio(
+            "選擇記錄：",
+            options=list(record_labels),
+            format_func=record_labels.get,
+            key=f"record_select_{record_page.page}"
+        )
+        record = st.session_state.generated_codes[selected_index]
+        
+        st.markdown("**原始需求：**")
+        st.write(record['request'])
+        
+        st.markdown("**生成時間：**")
+        st.write(time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record['timestamp'])))
+        
+        st.markdown("**生成的代碼：**")
+        st.code(record['code'], language="python")
+        
+        if record['explanation']:
+            st.markdown("**說明：**")
+            st.write(record['explanation'])
+        
+        # 重新執行按鈕
+        if st.button(
+            f"重新執行代碼 {selected_index + 1}", key=f"reexec_{selected_index}"
+        ):
+            if CODE_GEN_AVAILABLE:
+                exec_result = omniverse_code_gen.execute_code(record['code'], True)
+                if exec_result["status"] == "success":
+                    st.success("重新執行成功！")
+                else:
+                    st.error(f"重新執行失敗：{exec_result['error']}")
+            else:
+                st.info("模擬模式：請複製代碼到 Omniverse 中執行")
     else:
         st.info("尚無代碼生成記錄")
         st.markdown("前往 **代碼生成器** 標籤頁開始生成您的第一個 Omniverse 腳本！")
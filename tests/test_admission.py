@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from admission import (
+    BULK,
+    INTERACTIVE,
+    AdmissionController,
+    AdmissionRejected,
+    EndpointPolicy,
+)
+
+
+def test_interactive_requests_jump_the_bulk_queue_and_overload_is_rejected():
+    async def scenario():
+        controller = AdmissionController(1, {
+            "query": EndpointPolicy(INTERACTIVE, max_queue=4, deadline=5.0),
+            "scene": EndpointPolicy(BULK, max_queue=1, deadline=5.0),
+        }, estimator=lambda: 1.0)
+        order = []
+
+        async def call(endpoint):
+            async with controller.admit(endpoint):
+                order.append(endpoint)
+                await asyncio.sleep(0.01)
+
+        await controller.acquire("query")
+        tasks = [asyncio.create_task(call("scene"))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call("query")))
+        await asyncio.sleep(0)
+
+        # 批量佇列已滿
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await controller.acquire("scene")
+        assert excinfo.value.reason == "queue_full"
+        # 互動查詢排在批量請求之前：預估等待只計算自己
+        assert controller.projected_wait("query") == 2.0
+        assert controller.projected_wait("scene") == 3.0
+
+        controller.policies["query"].deadline = 1.5
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await controller.acquire("query")
+        assert excinfo.value.reason == "deadline"
+        assert excinfo.value.retry_after_header == "2"
+
+        controller.release()
+        await asyncio.gather(*tasks)
+        return order, controller.snapshot()
+
+    order, snapshot = asyncio.run(scenario())
+    assert order == ["query", "scene"]
+    assert snapshot["active"] == 0
+    assert snapshot["endpoints"]["scene"]["rejected_queue_full"] == 1
+    assert snapshot["endpoints"]["query"]["rejected_deadline"] == 1
+
+
+def test_api_returns_503_with_retry_after_when_projected_wait_exceeds_deadline():
+    httpx = pytest.importorskip("httpx")
+    from engine_settings import EngineSettings
+    from fake_llm import FakeStreamingLLM
+    from groq_config import UnifiedEngineConfig
+    from langserve_launch_example.chain import get_chain
+    from streamlit_api import create_app
+
+    engine = UnifiedEngineConfig(EngineSettings.from_dict({
+        "admission": {"concurrency": 1, "interactive_deadline": 1.0}}))
+    app = create_app(
+        chain=get_chain(FakeStreamingLLM(response="ok", first_token_latency=0.3)),
+        engine=engine,
+    )
+    app.state.admission.estimator = lambda: 2.0
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://api"
+        ) as client:
+            first = asyncio.create_task(
+                client.post("/api/query", json={"query": "cube"})
+            )
+            await asyncio.sleep(0.1)
+            second = await client.post("/api/query", json={"query": "sphere"})
+            return await first, second
+
+    first, second = asyncio.run(scenario())
+    assert first.status_code == 200
+    assert second.status_code == 503
+    assert second.headers["Retry-After"] == "2"
+    assert (
+        app.state.admission.snapshot()["endpoints"]["query"]["rejected_deadline"] == 1
+    )
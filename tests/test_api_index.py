@@ -0,0 +1,117 @@
+from api_index import format_issues, validate_script
+
+VALID_SCRIPT = '''
+import omni.usd
+import omni.kit.commands
+from pxr import UsdGeom, Gf
+
+stage = omni.usd.get_context().get_stage()
+cube = UsdGeom.Cube.Define(stage, "/World/Cube")
+cube.CreateSizeAttr(2.0)
+UsdGeom.Xformable(cube).AddTranslateOp().Set(Gf.Vec3d(0, 1, 0))
+omni.kit.commands.execute(
+    "ChangePropertyCommand", prop_path="/World/Cube.size", value=3.0, prev=None
+)
+'''
+
+
+def test_valid_script_passes() -> None:
+    result = validate_script(VALID_SCRIPT)
+    assert result["valid"], format_issues(result["issues"])
+    assert result["elapsed_ms"] < 100
+
+
+def test_unknown_commands_arguments_and_methods_are_reported_with_lines() -> None:
+    script = '''
+import omni.kit.commands as commands
+from pxr import Usd, UsdGeom
+
+stage = Usd.Stage.CreateInMemory()
+sphere = UsdGeom.Sphere.Define(stage, "/World/Sphere")
+sphere.CreateRadiusAtr(1.0)
+prim = stage.GetPrimAtPath("/World/Sphere")
+prim.GetAtribute("radius")
+UsdGeom.Spheer.Define(stage, "/World/Other")
+commands.execute("CreatePrimz", prim_path="/World/A")
+commands.execute("CreatePrim", prim_path="/World/A", prim_typ="Cube")
+for sphere in stage.Traverse():
+    sphere.AnythingGoes()
+'''
+    result = validate_script(script)
+    found = {(issue["line"], issue["kind"]) for issue in result["issues"]}
+    assert found == {
+        (7, "attribute"),
+        (9, "attribute"),
+        (10, "symbol"),
+        (11, "command"),
+        (12, "argument"),
+    }
+
+    syntax = validate_script("def broken(:\n    pass")
+    assert not syntax["valid"] and syntax["issues"][0]["kind"] == "syntax"
+
+
+def test_live_kit_commands_and_runtime_pxr_override_the_snapshot(
+    tmp_path, monkeypatch
+) -> None:
+    import json
+    import sys
+    import types
+
+    from api_index import load_index
+
+    registry = {}
+
+    class ExtensionCommand:
+        def __init__(self, prim_path, radius=1.0):
+            pass
+
+    def register(name):
+        registry[name] = {"my.extension": ExtensionCommand}
+
+    commands = types.ModuleType("omni.kit.commands")
+    commands.get_commands = lambda: dict(registry)
+    kit = types.ModuleType("omni.kit")
+    kit.commands = commands
+    omni = types.ModuleType("omni")
+    omni.kit = kit
+    monkeypatch.setitem(sys.modules, "omni", omni)
+    monkeypatch.setitem(sys.modules, "omni.kit", kit)
+    monkeypatch.setitem(sys.modules, "omni.kit.commands", commands)
+
+    # 快照來自不同的 USD 版本：缺少 UsdGeom.Cube 的成員
+    snapshot = tmp_path / "index.json"
+    snapshot.write_text(
+        json.dumps(
+            {
+                "pxr": {"UsdGeom": {"Cube": ["Define"]}},
+                "commands": {"CreatePrim": ["prim_path", "prim_type"]},
+            }
+        ),
+        encoding="utf-8",
+    )
+    register("CreateSphereOnSurface")
+    index = load_index(str(snapshot))
+
+    script = '''
+import omni.kit.commands
+from pxr import UsdGeom
+cube = UsdGeom.Cube.Define(None, "/World/Cube")
+cube.CreateSizeAttr(2.0)
+omni.kit.commands.execute(
+    "CreateSphereOnSurfaceCommand", prim_path="/World/S", radius=2.0
+)
+omni.kit.commands.execute("CreatePrim", prim_path="/World/A", prim_type="Cube")
+omni.kit.commands.execute("RegisteredLater", prim_path="/World/B")
+'''
+    # 擴充功能在索引載入後才註冊的命令同樣可以通過
+    register("RegisteredLater")
+    result = validate_script(script, index)
+    assert result["valid"], format_issues(result["issues"])
+
+    bad = validate_script(
+        "import omni.kit.commands\n"
+        'omni.kit.commands.execute("CreateSphereOnSurface", size=1)',
+        index,
+    )
+    assert [issue["kind"] for issue in bad["issues"]] == ["argument"]
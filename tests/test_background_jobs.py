@@ -0,0 +1,64 @@
+import threading
+import time
+
+from background_jobs import JobRunner
+
+
+def _wait_done(job, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not job.done and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+def test_jobs_move_from_pending_to_running_to_done_or_error() -> None:
+    runner = JobRunner(max_workers=1)
+    started, release = threading.Event(), threading.Event()
+
+    def blocking():
+        started.set()
+        release.wait(5)
+        return 42
+
+    first = runner.submit_call(blocking, description="first")
+    second = runner.submit_call(lambda: 1 / 0, description="second")
+    assert started.wait(5)
+    # 單一執行緒：第二個任務仍在排隊
+    assert (first.status, second.status) == ("running", "pending")
+    assert runner.active_count() == 2
+
+    release.set()
+    assert _wait_done(first).status == "done" and first.result == 42
+    assert _wait_done(second).status == "error"
+    assert (
+        "division by zero" in second.error and "ZeroDivisionError" in second.traceback
+    )
+    assert second.finished_at is not None and runner.active_count() == 0
+    assert runner.get(first.id) is first
+    runner.shutdown(wait=True)
+
+
+def test_stream_and_event_jobs_accumulate_output_and_expired_jobs_are_pruned() -> None:
+    class Chunks:
+        def stream(self, input):
+            yield from ["立方體", " cube"]
+
+    def events():
+        yield {"type": "attempt", "attempt": 1}
+        yield {"type": "result", "result": {"valid": True}}
+
+    runner = JobRunner(max_workers=2, retention=0.0)
+    stream = _wait_done(runner.submit_stream(Chunks(), "x"))
+    assert stream.chunks == ["立方體", " cube"]
+    assert stream.result == stream.text == "立方體 cube"
+
+    evented = _wait_done(runner.submit_events(events))
+    assert evented.events == [{"type": "attempt", "attempt": 1}]
+    assert evented.result == {"valid": True}
+
+    # 保留 0 秒：提交新任務時移除已完成的任務
+    time.sleep(0.01)
+    latest = runner.submit_call(lambda: None)
+    assert runner.get(stream.id) is None and runner.get(evented.id) is None
+    assert runner.get(latest.id) is latest
+    runner.shutdown(wait=True)
@@ -1,10 +1,9 @@
+from fake_llm import FakeStreamingLLM
 from langserve_launch_example import get_chain
 
 
 def test_my_chain() -> None:
-    """Edit this test to test your chain."""
-    from langchain.llms.human import HumanInputLLM
-
-    llm = HumanInputLLM(input_func=lambda *args, **kwargs: "foo")
+    """The chain runs end to end on an injected fake model."""
+    llm = FakeStreamingLLM(response="foo")
     chain = get_chain(llm)
-    chain.invoke({"text": "foo"})
+    assert chain.invoke({"topic": "foo"}) == "foo"
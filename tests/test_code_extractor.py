@@ -0,0 +1,37 @@
+from code_extractor import CodeBlockExtractor, extract
+
+RESPONSE = """以下是代碼：
+```Python
+import omni.usd
+print("hi")
+```
+安裝依賴：
+~~~bash
+pip install numpy
+~~~
+```
+x = 1
+"""
+
+
+def test_extract_handles_any_tag_multiple_and_unclosed_blocks() -> None:
+    result = extract(RESPONSE)
+    assert [(b.language, b.closed) for b in result.blocks] == [
+        ("python", True),
+        ("bash", True),
+        ("", False),
+    ]
+    assert result.code == 'import omni.usd\nprint("hi")\n\nx = 1'
+    assert result.explanation == "以下是代碼：\n安裝依賴："
+
+
+def test_streaming_matches_full_parse_for_any_chunking() -> None:
+    for size in (1, 2, 5, 13):
+        extractor = CodeBlockExtractor()
+        events = []
+        for start in range(0, len(RESPONSE), size):
+            events += extractor.feed(RESPONSE[start:start + size])
+        events += extractor.finish()
+        assert extractor.code == extract(RESPONSE).code
+        ends = [event for event in events if event["type"] == "block_end"]
+        assert [event["valid"] for event in ends] == [True, True, True]
@@ -0,0 +1,75 @@
+from langchain_core.runnables import RunnableLambda
+
+from code_repair import apply_repair, failing_lines, numbered_excerpt
+from omniverse_code_generator import OmniverseCodeGenerator
+
+CODE = "a = 1\nb = 2\nc = a / 0\nd = 4\ne = 5\nf = 6\ng = 7\nh = 8\ni = 9"
+
+
+def test_excerpt_and_hunks_touch_only_failing_lines() -> None:
+    failure = {
+        "traceback": "Traceback...\n"
+        '  File "<generated>", line 3, in <module>\n'
+        "ZeroDivisionError"
+    }
+    assert failing_lines(failure) == [3]
+    excerpt = numbered_excerpt(CODE, [3], context=1)
+    assert excerpt.splitlines() == [" 2 | b = 2", ">3 | c = a / 0", " 4 | d = 4"]
+
+    repaired = apply_repair(CODE, "```\n@@ 3\nc = a / 1\n@@ 8-9\nh = 80\n```")
+    assert repaired.splitlines()[2] == "c = a / 1"
+    assert repaired.splitlines()[-1] == "h = 80"
+    assert apply_repair(CODE, "@@ 40\nx = 1") is None
+    assert apply_repair(CODE, "```python\nprint('full')\n```") == "print('full')"
+
+
+def test_execute_with_repair_retries_until_the_script_runs() -> None:
+    generator = OmniverseCodeGenerator(
+        execution_backend="mock", max_repair_iterations=2
+    )
+    responses = iter(["@@ 3\nc = a / 2", "@@ 9\ni = 9"])
+    generator.repair_chain = RunnableLambda(lambda inputs: next(responses))
+
+    outcome = generator.execute_with_repair("除法", CODE)
+    assert outcome["status"] == "success"
+    assert outcome["repair"]["iterations"] == 1
+    assert "c = a / 2" in outcome["code"]
+
+    broken = "from pxr import UsdGeom\nUsdGeom.Cubee"
+    generator.repair_chain = RunnableLambda(lambda inputs: "@@ 2\nUsdGeom.Cubee")
+    outcome = generator.execute_with_repair("立方體", broken)
+    assert outcome["status"] == "error" and outcome["repair"]["attempts"]
+
+    stats = generator.get_repair_stats()
+    assert stats["runs"] == 2 and stats["success_rate"] == 0.5
+
+
+def test_overlapping_hunks_fall_back_to_regeneration_and_printed_tracebacks_fail() -> (
+    None
+):
+    assert apply_repair(CODE, "@@ 2-4\nx = 1\n@@ 3\ny = 2") is None
+    assert apply_repair(CODE, "@@ 8\nh = 80\n@@ 3\nc = a / 1") is None
+
+    generator = OmniverseCodeGenerator(
+        execution_backend="mock", max_repair_iterations=1
+    )
+    generator.repair_chain = RunnableLambda(
+        lambda inputs: "@@ 2-4\nb = 2\n@@ 3\nc = a / 1"
+    )
+    generator.generate_code = lambda request, use_templates=True: {
+        "status": "success",
+        "code": "a = 1",
+    }
+    outcome = generator.execute_with_repair("除法", CODE)
+    assert outcome["status"] == "success" and outcome["code"] == "a = 1"
+
+    # 腳本自行捕捉例外並印出 traceback：視為失敗並指出出錯的行
+    swallowed = (
+        "import traceback\n"
+        "try:\n    x = 1 / 0\n"
+        "except Exception:\n    traceback.print_exc()"
+    )
+    execution = generator.execute_code(swallowed)
+    assert execution["status"] == "error"
+    assert execution["error"] == "ZeroDivisionError: division by zero"
+    assert failing_lines(execution) == [3]
@@ -0,0 +1,40 @@
+import time
+
+from conversation_memory import TRUNCATION_MARK, ConversationMemory
+from rate_limiter import estimate_tokens
+
+
+def test_context_is_empty_without_history() -> None:
+    assert ConversationMemory().context() == ""
+
+
+def test_old_turns_are_compacted_into_summary() -> None:
+    memory = ConversationMemory(max_context_tokens=200, compact_threshold_tokens=50)
+    for i in range(20):
+        memory.add("user", f"如何建立第 {i} 個立方體？" * 3)
+        memory.add("assistant", "回答 " * 40)
+
+    deadline = time.time() + 5
+    while memory.stats()["messages"] > 2 and time.time() < deadline:
+        time.sleep(0.01)
+
+    stats = memory.stats()
+    assert stats["messages"] <= 2
+    assert memory.summary
+    assert "第 19 個立方體" in memory.context()
+
+
+def test_oversize_newest_turn_is_truncated_to_the_budget() -> None:
+    memory = ConversationMemory(max_context_tokens=100)
+    memory.add("user", "建立立方體")
+    memory.add("assistant", "立方體" * 100 + "結尾" + "cube " * 200)
+
+    context = memory.context()
+    assert "建立立方體" not in context
+    assert context.startswith("近期對話：\n系統：立方體立方體")
+    assert context.rstrip().endswith(TRUNCATION_MARK)
+    assert "結尾" not in context
+    # 訊息本身（不含角色標籤）不超過預算；記憶中仍保留原文
+    content = context.split("系統：", 1)[1].rstrip()
+    assert 90 <= estimate_tokens(content) <= 100
+    assert memory.stats()["tokens"] > 100
@@ -0,0 +1,148 @@
+import os
+
+import pytest
+
+from engine_settings import EngineSettings, SettingsProvider, load_settings
+from groq_config import UnifiedEngineConfig
+
+
+def test_file_and_env_layers_are_typed_and_validated(tmp_path):
+    pytest.importorskip("yaml")
+    path = tmp_path / "engine.yaml"
+    path.write_text(
+        "groq:\n  models:\n    code: big-model\nresilience:\n  deadline: 20\n"
+        "cache:\n  health_ttl: 5\n",
+        encoding="utf-8",
+    )
+    environ = {
+        "GROQ_API_KEY": "env-key",
+        "ENGINE__RESILIENCE__DEADLINE": "7.5",
+        "ENGINE__RESILIENCE__HEDGE_TO": "none",
+        "ENGINE__POOLS__JOB_WORKERS": "3",
+    }
+
+    settings = load_settings(str(path), environ)
+    assert settings.groq.api_key == "env-key"
+    assert settings.groq.models["code"] == "big-model"
+    assert settings.groq.models["default"] == "llama3-8b-8192"
+    assert settings.resilience.deadline == 7.5
+    assert settings.resilience.hedge_to is None
+    assert settings.cache.health_ttl == 5.0
+    assert settings.pools.job_workers == 3
+    assert settings.to_dict()["groq"]["api_key"] == "***"
+
+    with pytest.raises(ValueError):
+        EngineSettings.from_dict({"resilience": {"deadlin": 1}})
+    with pytest.raises(ValueError):
+        EngineSettings.from_dict({"probe": {"timeout": "soon"}})
+    with pytest.raises(ValueError):
+        EngineSettings.from_dict({"engine": "openai"})
+
+
+def test_injected_settings_reach_engine_and_chain_and_hot_reload(tmp_path):
+    from fake_llm import FakeStreamingLLM
+    from langserve_launch_example.chain import get_chain
+
+    engine = UnifiedEngineConfig(
+        EngineSettings.from_dict(
+            {
+                "engine": "ollama",
+                "ollama": {"base_url": "http://ollama.test:1"},
+                "cache": {"health_ttl": 1},
+            }
+        )
+    )
+    assert engine.current_engine == "ollama"
+    assert engine.ollama_base_url == "http://ollama.test:1"
+    assert engine._cache_duration == 1.0
+    assert (
+        get_chain(FakeStreamingLLM(response="ok"), engine=engine).invoke(
+            {"topic": "cube"}
+        )
+        == "ok"
+    )
+
+    path = tmp_path / "engine.json"
+    path.write_text(
+        '{"groq": {"models": {"code": "model-a"}}, "resilience": {"max_retries": 1}}',
+        encoding="utf-8",
+    )
+    provider = SettingsProvider(str(path), environ={}, check_interval=0)
+    engine = UnifiedEngineConfig(provider)
+    assert engine.get_model("code") == "model-a"
+    version = engine.settings_version
+
+    path.write_text(
+        '{"groq": {"models": {"code": "model-b"}}, "resilience": {"max_retries": 4}}',
+        encoding="utf-8",
+    )
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+    assert engine.settings.groq.models["code"] == "model-b"
+    assert engine.get_model("code") == "model-b"
+    assert engine.resilience_options["max_retries"] == 4
+    assert engine.settings_version == version + 1
+
+    # 無效的設定不會取代目前設定
+    path.write_text('{"resilience": {"max_retries": -1}}', encoding="utf-8")
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 2 * 10 ** 9))
+    assert engine.settings.resilience.max_retries == 4
+    assert provider.last_error
+
+
+def test_chain_keeps_one_model_per_tier_until_settings_reload(tmp_path, monkeypatch):
+    from fake_llm import FakeStreamingLLM
+    from langserve_launch_example.chain import get_chain
+
+    path = tmp_path / "engine.json"
+    path.write_text('{"resilience": {"max_retries": 1}}', encoding="utf-8")
+    engine = UnifiedEngineConfig(
+        SettingsProvider(str(path), environ={}, check_interval=0)
+    )
+    built = []
+
+    def create_resilient_model(task_type="default", **kwargs):
+        built.append((task_type, kwargs["max_tokens"]))
+        return FakeStreamingLLM(response="ok")
+
+    monkeypatch.setattr(engine, "create_resilient_model", create_resilient_model)
+    chain = get_chain(engine=engine)
+    # 簡單與複雜查詢交替：每個層級只建立一次
+    for topic in [
+        "USD 是什麼",
+        "分析 RTX 渲染管線的架構設計",
+        "USD 是什麼",
+        "分析 RTX 渲染管線的架構設計",
+    ]:
+        assert chain.invoke({"topic": topic}) == "ok"
+    assert built == [("fast", 400), ("semantic", 1000)]
+
+    path.write_text('{"resilience": {"max_retries": 3}}', encoding="utf-8")
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+    chain.invoke({"topic": "USD 是什麼"})
+    assert built[-1] == ("fast", 400) and len(built) == 3
+
+
+def test_missing_groq_key_is_reported_and_engine_follows_reload(tmp_path):
+    path = tmp_path / "engine.json"
+    path.write_text('{"engine": "groq"}', encoding="utf-8")
+    engine = UnifiedEngineConfig(
+        SettingsProvider(str(path), environ={}, check_interval=0)
+    )
+    assert engine.groq_api_key is None
+    with pytest.raises(RuntimeError, match="GROQ_API_KEY"):
+        engine.create_model_instance("fast")
+    assert not engine.test_groq_connection()
+
+    path.write_text('{"engine": "ollama"}', encoding="utf-8")
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+    assert engine.settings.engine == "ollama"
+    assert engine.get_current_engine() == "ollama"
+
+    # 與 engine 無關的重新載入不會覆蓋執行期間的手動切換
+    engine.current_engine = "groq"
+    path.write_text(
+        '{"engine": "ollama", "cache": {"health_ttl": 3}}', encoding="utf-8"
+    )
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 2 * 10 ** 9))
+    assert engine.settings.cache.health_ttl == 3.0
+    assert engine.get_current_engine() == "groq"
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from engine_status_service import EngineStatusService
+
+
+class FakeConfig:
+    """記錄每次狀態查詢；block 設定時第一次查詢會等待 release"""
+
+    def __init__(self, block: bool = False):
+        self.calls = []
+        self.in_refresh = threading.Event()
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+
+    def get_engine_status(self, force_refresh: bool = False):
+        self.calls.append(force_refresh)
+        self.in_refresh.set()
+        self.release.wait(5)
+        return {"current_engine": "groq", "calls": len(self.calls)}
+
+    def get_rate_limit_status(self):
+        return {}
+
+
+def _wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+def test_request_refresh_wakes_the_loop_and_forces_once() -> None:
+    config = FakeConfig()
+    service = EngineStatusService(config, interval=60).start()
+    try:
+        assert _wait_for(lambda: service.snapshot() is not None)
+        assert config.calls == [False] and service.age is not None
+
+        service.request_refresh(force=True)
+        assert _wait_for(lambda: len(config.calls) == 2)
+        service.request_refresh()
+        assert _wait_for(lambda: len(config.calls) == 3)
+        assert config.calls == [False, True, False]
+        assert _wait_for(lambda: service.snapshot()["calls"] == 3)
+    finally:
+        service.stop()
+
+
+def test_refresh_requested_during_a_refresh_is_not_lost() -> None:
+    config = FakeConfig(block=True)
+    service = EngineStatusService(config, interval=60).start()
+    try:
+        assert config.in_refresh.wait(5)
+        # 要求在刷新進行中送達：刷新結束後必須再刷新一次，不等待 60 秒的間隔
+        service.request_refresh(force=True)
+        config.release.set()
+        assert _wait_for(lambda: len(config.calls) == 2, timeout=2)
+        assert config.calls == [False, True]
+    finally:
+        service.stop()
@@ -0,0 +1,36 @@
+import time
+
+from fake_llm import CODE_RESPONSE, FakeStreamingLLM, split_tokens
+
+
+def test_latency_profile_is_applied_to_streaming():
+    llm = FakeStreamingLLM(
+        response="a b c d e", first_token_latency=0.05, tokens_per_second=100
+    )
+
+    start = time.perf_counter()
+    chunks = list(llm.stream("hello"))
+    elapsed = time.perf_counter() - start
+
+    assert "".join(chunk.content for chunk in chunks) == "a b c d e"
+    assert len(chunks) == len(split_tokens("a b c d e")) == 5
+    # 0.05 秒首個 token + 4 個間隔各 0.01 秒
+    assert 0.09 <= elapsed < 0.5
+    assert chunks[-1].usage_metadata["output_tokens"] == 5
+
+
+def test_code_generator_runs_on_injected_fake_model():
+    from omniverse_code_generator import OmniverseCodeGenerator
+
+    generator = OmniverseCodeGenerator(
+        execution_backend="mock", llm=FakeStreamingLLM.from_profile("instant")
+    )
+    result = generator.generate_code(
+        "在原點建立一個紅色立方體 benchmark", use_templates=False
+    )
+
+    assert result["status"] == "success"
+    assert result["code"] in CODE_RESPONSE
+    assert result["validation"]["valid"]
+    assert result["usage"]["estimated"] is False
+    assert generator.execute_code(result["code"])["status"] == "success"
@@ -0,0 +1,47 @@
+import history_search
+from history_search import HistorySearchIndex, tokenize
+from history_store import HistoryStore
+
+
+def test_tokenize_splits_cjk_bigrams_and_camel_case() -> None:
+    assert tokenize("創建立方體") == ["創建", "建立", "立方", "方體"]
+    assert "prim" in tokenize("CreatePrimCommand")
+
+
+def test_index_updates_from_store_writes(tmp_path) -> None:
+    store = HistoryStore(str(tmp_path / "history.db"), flush_interval=0.05)
+    store.record_code("s1", "創建10個立方體", "cube = 1")
+    store.flush()
+    index = HistorySearchIndex.from_store(store)
+    store.record_code("s2", "設置燈光強度", "light = 1")
+    store.record_query("s2", "立方體的材質", "使用 UsdShade")
+    store.flush()
+
+    assert len(index) == 3
+    hits = index.search("立方體", kind="code")
+    assert [hit["request"] for hit in hits] == ["創建10個立方體"]
+    assert hits[0]["code"] == "cube = 1"
+    assert index.search("燈光", semantic=True)[0]["request"] == "設置燈光強度"
+    store.close()
+
+
+def test_search_can_be_scoped_to_a_session_and_semantic_only_rescores_candidates(
+        monkeypatch) -> None:
+    index = HistorySearchIndex()
+    index.add_many([
+        {"id": 1, "session_id": "s1", "kind": "code", "request": "創建立方體"},
+        {"id": 2, "session_id": "s2", "kind": "code", "request": "創建立方體陣列"},
+        {"id": 3, "session_id": "s2", "kind": "code", "request": "設置燈光強度"},
+    ] + [{"id": i, "session_id": "s3", "kind": "code", "request": f"light {i}"}
+         for i in range(4, 104)])
+
+    assert [doc_id for doc_id, _ in index.search_ids("立方體", session_id="s1")] == [1]
+    assert {doc_id for doc_id, _ in index.search_ids("立方體")} == {1, 2}
+
+    # 語意相似度只計算 BM25 候選，不掃描全部向量
+    calls = []
+    real_cosine = history_search.cosine
+    monkeypatch.setattr(history_search, "cosine",
+                        lambda a, b: calls.append(1) or real_cosine(a, b))
+    hits = index.search_ids("創建立方體", semantic=True, session_id="s2")
+    assert [doc_id for doc_id, _ in hits] == [2] and len(calls) == 1
@@ -0,0 +1,68 @@
+from history_store import HistoryStore, request_hash
+
+
+def test_writes_are_batched_flushed_and_reloaded_across_instances(tmp_path) -> None:
+    path = str(tmp_path / "history.db")
+    store = HistoryStore(path, batch_size=3, flush_interval=0.2)
+    batches = []
+    store.add_listener(
+        lambda records: batches.append([record["request"] for record in records])
+    )
+
+    for i in range(7):
+        store.record_code("s1", f"建立 {i} 個立方體", f"cube = {i}")
+    store.record_query("s2", "USD 是什麼", "Universal Scene Description")
+    assert store.flush()
+    assert [len(batch) for batch in batches] == [3, 3, 2]
+    assert store.count("s1", "code") == 7
+    store.record_query("s2", "什麼是 prim", "場景中的節點")
+    # 關閉時寫入剩餘的排隊記錄
+    store.close()
+
+    reloaded = HistoryStore(path)
+    recent = reloaded.recent("s1", "code", limit=2)
+    assert [row["code"] for row in recent] == ["cube = 5", "cube = 6"]
+    assert reloaded.recent("s1", "code", limit=2, offset=5)[0]["code"] == "cube = 0"
+    assert [row["request"] for row in reloaded.recent("s2", "query")] == [
+        "USD 是什麼",
+        "什麼是 prim",
+    ]
+    assert reloaded.find_by_request("  建立 3 個立方體 ", "code")["code"] == "cube = 3"
+    assert reloaded.find_by_request("建立 3 個立方體", "query") is None
+
+    ids = [row["id"] for row in reloaded.iter_all(batch_size=2)]
+    assert ids == sorted(ids) and len(ids) == 9
+    assert reloaded.get_many(ids[:2])[ids[0]]["request_hash"] == request_hash(
+        "建立 0 個立方體"
+    )
+    reloaded.close()
+
+
+def test_failed_batch_is_rolled_back_and_only_bad_records_are_dropped(tmp_path) -> None:
+    store = HistoryStore(
+        str(tmp_path / "history.db"), batch_size=10, flush_interval=0.1
+    )
+    written, failures = [], []
+    store.add_listener(
+        lambda records: written.extend(record["request"] for record in records)
+    )
+    store.add_error_listener(lambda records, error: failures.append((records, error)))
+
+    store.record_query("s1", "第一筆", "ok")
+    # 缺少欄位的記錄讓整批提交失敗
+    store._enqueue({"session_id": "s1", "kind": "query", "request": "壞的記錄"})
+    store.record_query("s1", "第三筆", "ok")
+    assert store.flush()
+
+    assert written == ["第一筆", "第三筆"]
+    assert store.failed == 1
+    [(records, error)] = failures
+    assert [record["request"] for record in records] == [
+        "壞的記錄"
+    ] and "id" not in records[0]
+    assert error is not None
+    # 回滾後只留下成功逐筆寫入的記錄，ID 與通知內容一致
+    rows = store.recent("s1", "query")
+    assert [row["request"] for row in rows] == ["第一筆", "第三筆"]
+    assert len({row["id"] for row in rows}) == 2
+    store.close()
@@ -0,0 +1,18 @@
+from history_view import paginate, summarize
+
+
+def test_paginate_returns_newest_page_first() -> None:
+    items = list(range(25))
+    page = paginate(items, page=0, page_size=10)
+    assert [index for index, _ in page.items] == list(range(15, 25))
+    assert page.page_count == 3
+    assert page.has_previous and not page.has_next
+
+    oldest = paginate(items, page=5, page_size=10, newest_first=True)
+    assert oldest.page == 2
+    assert [item for _, item in oldest.items] == [4, 3, 2, 1, 0]
+
+
+def test_summarize_collapses_whitespace_and_truncates() -> None:
+    assert summarize("創建\n  立方體") == "創建 立方體"
+    assert summarize("a" * 20, limit=10) == "a" * 9 + "…"
@@ -0,0 +1,63 @@
+import pytest
+
+pytest.importorskip("uvicorn")
+
+from llm_stub_server import StubBehavior, StubServer, create_app  # noqa: E402
+from resilience import is_transient_error  # noqa: E402
+
+
+@pytest.fixture
+def stub():
+    with StubServer(
+        create_app(StubBehavior("instant"), StubBehavior("instant"))
+    ) as server:
+        yield server
+
+
+@pytest.fixture
+def engine(stub, monkeypatch):
+    from groq_config import UnifiedEngineConfig
+
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.setenv("GROQ_BASE_URL", stub.url)
+    monkeypatch.setenv("OLLAMA_BASE_URL", stub.url)
+    return UnifiedEngineConfig()
+
+
+def test_engine_probes_and_streams_against_stub(stub, engine):
+    assert engine.test_groq_connection()
+    assert engine.test_ollama_connection()
+
+    stub.behaviors["groq"].update(response="cube on the floor")
+    chunks = list(engine.create_model_instance("fast").stream("place a cube"))
+    assert "".join(chunk.content for chunk in chunks) == "cube on the floor"
+    assert (
+        sum((chunk.usage_metadata or {}).get("output_tokens", 0) for chunk in chunks)
+        == 4
+    )
+
+    stub.behaviors["ollama"].update(down=True)
+    assert not engine.test_ollama_connection()
+
+
+def test_injected_rate_limits_and_errors_are_transient(stub, engine):
+    from groq import Groq, RateLimitError
+
+    stub.behaviors["groq"].update(rate_limit_rpm=1)
+    client = Groq(api_key="test", base_url=stub.url, max_retries=0)
+    client.chat.completions.create(
+        model="llama3-8b-8192", messages=[{"role": "user", "content": "hi"}]
+    )
+    with pytest.raises(RateLimitError) as excinfo:
+        client.chat.completions.create(
+            model="llama3-8b-8192", messages=[{"role": "user", "content": "hi"}]
+        )
+    assert excinfo.value.response.headers["retry-after"]
+    assert is_transient_error(excinfo.value)
+
+    stub.behaviors["ollama"].update(fail_next=1, error_status=503)
+    ollama = engine.create_model_instance("fast", engine="ollama")
+    with pytest.raises(Exception) as excinfo:
+        ollama.invoke("hi")
+    assert "503" in str(excinfo.value)
+    assert ollama.invoke("hi")
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+import metrics
+from metrics import MetricsCallbackHandler, MetricsRegistry
+
+
+def test_worker_snapshots_are_merged(tmp_path):
+    first = MetricsRegistry(str(tmp_path))
+    first.counter("requests_total", "requests", ("engine",)).inc(2, engine="groq")
+    first.histogram(
+        "latency_seconds", "latency", ("engine",), buckets=(0.1, 1.0)
+    ).observe(0.05, engine="groq")
+    first.flush()
+    # 把快照改名為另一個 pid，模擬已寫出快照的另一個 worker
+    os.replace(tmp_path / f"metrics_{os.getpid()}.json", tmp_path / "metrics_1.json")
+
+    second = MetricsRegistry(str(tmp_path))
+    second.counter("requests_total", "requests", ("engine",)).inc(1, engine="groq")
+    second.histogram(
+        "latency_seconds", "latency", ("engine",), buckets=(0.1, 1.0)
+    ).observe(0.5, engine="groq")
+    text = second.render()
+
+    assert 'requests_total{engine="groq"} 3' in text
+    assert 'latency_seconds_bucket{engine="groq",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{engine="groq",le="1"} 2' in text
+    assert 'latency_seconds_bucket{engine="groq",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{engine="groq"} 2' in text
+
+
+def test_metrics_endpoint_reports_http_and_llm_requests():
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import ChatPromptTemplate
+
+    from streamlit_api import create_app
+
+    metrics.registry.clear()
+    model = GenericFakeChatModel(
+        messages=iter(["hello world"] * 5),
+        callbacks=[MetricsCallbackHandler("groq", "fake-model", "fast")],
+    )
+    chain = ChatPromptTemplate.from_template("{topic}") | model | StrOutputParser()
+
+    with TestClient(create_app(chain=chain)) as client:
+        assert client.post("/api/query", json={"query": "cube"}).status_code == 200
+        response = client.get("/metrics")
+
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'http_requests_total{method="POST",path="/api/query",status="200"} 1' in text
+    assert (
+        'llm_requests_total{engine="groq",model="fake-model",task_type="fast",'
+        'status="success"} 1'
+        in text
+    )
+    assert (
+        'llm_request_duration_seconds_count{engine="groq",model="fake-model",'
+        'task_type="fast"} 1'
+        in text
+    )
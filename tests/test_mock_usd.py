@@ -0,0 +1,173 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+import mock_usd  # noqa: E402
+import usd_bulk  # noqa: E402
+
+GENERATED_SCRIPT = '''
+import omni.usd
+import omni.kit.commands
+from pxr import Usd, UsdGeom, UsdShade, Sdf, Gf
+
+stage = omni.usd.get_context().get_stage()
+cube = UsdGeom.Cube.Define(stage, "/World/Cube")
+cube.CreateSizeAttr(4.0)
+xform = UsdGeom.Xformable(cube)
+xform.AddTranslateOp().Set(Gf.Vec3d(1.0, 2.0, 3.0))
+xform.AddRotateYOp().Set(10.0, 0)
+xform.GetOrderedXformOps()[1].Set(50.0, 10)
+
+omni.kit.commands.execute(
+    "CreatePrimWithDefaultXform", prim_type="Sphere", prim_path="/World/Sphere"
+)
+omni.kit.commands.execute(
+    "ChangeProperty", prop_path="/World/Sphere.radius", value=0.25, prev=None
+)
+
+material = UsdShade.Material.Define(stage, "/World/Looks/Red")
+shader = UsdShade.Shader.Define(stage, "/World/Looks/Red/Shader")
+color = shader.CreateInput("diffuseColor", Sdf.ValueTypeNames.Color3f)
+color.Set(Gf.Vec3f(1.0, 0.0, 0.0))
+surface = shader.CreateOutput("surface", Sdf.ValueTypeNames.Token)
+material.CreateSurfaceOutput().ConnectToSource(surface)
+UsdShade.MaterialBindingAPI(cube.GetPrim()).Bind(material)
+'''
+
+
+def test_generated_script_runs_against_mock_modules() -> None:
+    backend = mock_usd.MockUsdBackend()
+    exec(compile(GENERATED_SCRIPT, "<generated>", "exec"), backend.environment())
+
+    stage = backend.stage
+    cube = mock_usd.Cube(stage.GetPrimAtPath("/World/Cube"))
+    assert cube.GetSizeAttr().Get() == 4.0
+    assert tuple(
+        mock_usd.Xformable(cube).GetLocalTransformation().ExtractTranslation()
+    ) == (1.0, 2.0, 3.0)
+    rotate = stage.GetPrimAtPath("/World/Cube").GetAttribute("xformOp:rotateY")
+    assert rotate.Get(5) == pytest.approx(30.0)
+    assert stage.GetPrimAtPath("/World/Sphere").GetAttribute("radius").Get() == 0.25
+    assert (
+        mock_usd.Sphere(stage.GetPrimAtPath("/World/Sphere")).GetRadiusAttr().Get()
+        == 0.25
+    )
+    binding = stage.GetPrimAtPath("/World/Cube").GetRelationship("material:binding")
+    assert binding.GetTargets() == ["/World/Looks/Red"]
+    assert backend.summary()["types"]["Cube"] == 1
+    assert [name for name, _ in backend.commands.log] == [
+        "CreatePrimWithDefaultXform",
+        "ChangeProperty",
+    ]
+
+    with pytest.raises(ImportError):
+        exec("import omni.kit.viewport.utility", backend.environment())
+
+
+def test_usd_bulk_reloaded_on_mock_backend_authors_arrays() -> None:
+    backend = mock_usd.MockUsdBackend()
+    bulk = backend.load_module(usd_bulk)
+    assert bulk.get_stage() is backend.stage
+
+    paths = bulk.numbered_paths("/World/Cubes", "Cube", 20)
+    bulk.define_prims(
+        paths, translations=bulk.grid_positions(20), colors=[1.0, 0.0, 0.0]
+    )
+    bulk.scatter("/World/Many", 500, rotations=[0.0, 90.0, 0.0], threshold=10)
+
+    stage = backend.stage
+    assert stage.GetPrimAtPath("/World/Cubes").GetTypeName() == "Xform"
+    assert tuple(
+        mock_usd.Cube(stage.GetPrimAtPath(paths[3])).GetDisplayColorAttr().Get()[0]
+    ) == (1.0, 0.0, 0.0)
+    instancer = mock_usd.PointInstancer(stage.GetPrimAtPath("/World/Many"))
+    assert len(instancer.GetPositionsAttr().Get()) == 500
+    assert abs(instancer.GetOrientationsAttr().Get()[0].GetReal() - 0.7071) < 1e-3
+
+    backend.reset()
+    assert backend.summary()["prims"] == 0
+
+
+COMMON_API_SCRIPT = '''
+import omni.usd
+from pxr import UsdGeom, UsdLux, UsdShade, Sdf, Gf
+
+stage = omni.usd.get_context().get_stage()
+UsdGeom.Xform.Define(stage, "/World")
+cube = UsdGeom.Cube.Define(stage, "/World/Cube")
+cube.GetSizeAttr().Set(2.0)
+cube.GetDisplayColorAttr().Set([Gf.Vec3f(0.2, 0.4, 1.0)])
+
+api = UsdGeom.XformCommonAPI(cube)
+api.SetTranslate(Gf.Vec3d(1, 2, 3))
+api.SetRotate(Gf.Vec3f(0, 45, 0))
+api.SetScale(Gf.Vec3f(2, 2, 2))
+api.SetPivot(Gf.Vec3f(0, 1, 0))
+
+light = UsdLux.SphereLight.Define(stage, "/World/Light")
+light.GetIntensityAttr().Set(3000.0)
+
+material = UsdShade.Material.Define(stage, "/World/Looks/Blue")
+shader = UsdShade.Shader.Define(stage, "/World/Looks/Blue/Shader")
+shader.CreateIdAttr("UsdPreviewSurface")
+color = shader.CreateInput("diffuseColor", Sdf.ValueTypeNames.Color3f)
+texture = UsdShade.Shader.Define(stage, "/World/Looks/Blue/Texture")
+rgb = texture.CreateOutput("rgb", Sdf.ValueTypeNames.Float3)
+UsdShade.ConnectableAPI.ConnectToSource(color, rgb)
+material.CreateSurfaceOutput().ConnectToSource(shader.ConnectableAPI(), "surface")
+UsdShade.MaterialBindingAPI(cube).Bind(material)
+'''
+
+
+def test_builtin_attributes_xform_common_api_and_connectable_api_match_usd() -> None:
+    backend = mock_usd.MockUsdBackend()
+    exec(compile(COMMON_API_SCRIPT, "<generated>", "exec"), backend.environment())
+
+    stage = backend.stage
+    cube = stage.GetPrimAtPath("/World/Cube")
+    # 內建屬性第一次寫入時以結構描述的型別建立
+    assert cube.GetAttribute("size").Get() == 2.0
+    assert cube.GetAttribute("size").GetTypeName() == "double"
+    assert (
+        mock_usd.SphereLight(stage.GetPrimAtPath("/World/Light")).GetRadiusAttr().Get()
+        == 0.5
+    )
+    with pytest.raises(RuntimeError):
+        mock_usd.Cube(stage.GetPrimAtPath("/World/Missing")).GetSizeAttr().Set(1.0)
+
+    # 與 usd-core 相同的 op 順序、向量與矩陣
+    ops = [op.GetOpName() for op in mock_usd.Xformable(cube).GetOrderedXformOps()]
+    assert ops == [
+        "xformOp:translate",
+        "xformOp:translate:pivot",
+        "xformOp:rotateXYZ",
+        "xformOp:scale",
+        "!invert!xformOp:translate:pivot",
+    ]
+    translation, rotation, scale, pivot, order = mock_usd.XformCommonAPI(
+        cube
+    ).GetXformVectors()
+    assert (tuple(translation), tuple(rotation), tuple(scale), tuple(pivot), order) == \
+        ((1, 2, 3), (0, 45, 0), (2, 2, 2), (0, 1, 0), "XYZ")
+    matrix = mock_usd.Xformable(cube).GetLocalTransformation()
+    assert tuple(matrix.ExtractTranslation()) == pytest.approx((1.0, 1.0, 3.0))
+    assert matrix[0][0] == pytest.approx(2 ** 0.5)
+    # 已有不相容的 op 時不修改堆疊
+    sphere = mock_usd.Sphere.Define(stage, "/World/Sphere")
+    mock_usd.Xformable(sphere).AddTransformOp()
+    assert mock_usd.XformCommonAPI(sphere).SetTranslate((1, 0, 0)) is False
+
+    color = mock_usd.Shader(stage.GetPrimAtPath("/World/Looks/Blue/Shader")).GetInput(
+        "diffuseColor"
+    )
+    source, name, kind = mock_usd.ConnectableAPI.GetConnectedSource(color)
+    assert (source.GetPath(), name, kind) == (
+        "/World/Looks/Blue/Texture",
+        "rgb",
+        "Output",
+    )
+    assert mock_usd.ConnectableAPI(
+        stage.GetPrimAtPath("/World/Looks/Blue")
+    ).IsContainer()
+    mock_usd.ConnectableAPI.DisconnectSource(color)
+    assert not mock_usd.ConnectableAPI.HasConnectedSource(color)
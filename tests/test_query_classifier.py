@@ -0,0 +1,79 @@
+import pytest
+
+from query_classifier import classify_query
+
+
+@pytest.mark.parametrize("query, complexity, task_type, max_tokens", [
+    # 簡單：定義型問題或 15 字以內
+    ("USD 是什麼", "simple", "fast", 400),
+    ("What is a prim in USD and how is it stored on disk?", "simple", "fast", 400),
+    ("", "simple", "fast", 400),
+    ("a" * 15, "simple", "fast", 400),
+    # 一般
+    ("a" * 16, "moderate", "semantic", 700),
+    ("如何在 Omniverse 場景中加入一個新的立方體", "moderate", "semantic", 700),
+    ("How do I add a cube to my stage?", "moderate", "semantic", 700),
+    ("如何在場景中建立立方體，設定它的大小與顏色", "moderate", "semantic", 700),
+    ("a" * 120, "moderate", "semantic", 700),
+    # 複雜：分析關鍵字、超過 120 字或 3 個以上子句
+    ("分析 RTX 渲染管線的架構設計", "complex", "semantic", 1000),
+    ("Compare USD layers with Maya references", "complex", "semantic", 1000),
+    ("a" * 121, "complex", "semantic", 1000),
+    ("如何建立立方體，設定大小，然後匯出", "complex", "semantic", 1000),
+])
+def test_semantic_queries_are_routed_by_complexity(
+    query, complexity, task_type, max_tokens
+) -> None:
+    plan = classify_query(query)
+    assert (plan.complexity, plan.task_type, plan.max_tokens) == (
+        complexity,
+        task_type,
+        max_tokens,
+    )
+
+
+@pytest.mark.parametrize("query, complexity, task_type, max_tokens", [
+    # 簡單：單一基本操作、單一子句且不超過 60 字
+    ("刪除立方體", "simple", "fast", 500),
+    ("delete the selected cube", "simple", "fast", 500),
+    ("rotate 5 cubes", "simple", "fast", 500),
+    ("move " + "x" * 55, "simple", "fast", 500),
+    # 路徑與座標中的數字、逗號不算數量或子句
+    ("刪除 /World/Cube_10", "simple", "fast", 500),
+    ("delete /World/Light2024", "simple", "fast", 500),
+    ("move cube to 100, 0, 0", "simple", "fast", 500),
+    ("將 /World/Cube_7 移動到 (1.5, 2, -3)", "simple", "fast", 500),
+    # 一般
+    ("move " + "x" * 56, "moderate", "code", 1200),
+    ("移動立方體，然後旋轉", "moderate", "code", 1200),
+    ("建立一個紅色立方體", "moderate", "code", 1200),
+    ("Create 5 spheres", "moderate", "code", 1200),
+    # 複雜：關鍵字、數量超過 5 或 3 個以上子句
+    ("Create 6 spheres", "complex", "code", 2000),
+    ("為每個立方體加上材質", "complex", "code", 2000),
+    ("add a keyframe animation to the cube", "complex", "code", 2000),
+    ("建立立方體，放大兩倍，再改成紅色", "complex", "code", 2000),
+])
+def test_code_queries_are_routed_by_complexity(
+    query, complexity, task_type, max_tokens
+) -> None:
+    plan = classify_query(query, task="code")
+    assert (plan.complexity, plan.task_type, plan.max_tokens) == (
+        complexity,
+        task_type,
+        max_tokens,
+    )
+
+
+def test_reason_names_the_rule_that_fired() -> None:
+    assert classify_query("Create 6 spheres", task="code").reason == "count=6"
+    keywords = classify_query("為每個立方體加上材質", task="code")
+    assert keywords.reason == "complex keywords"
+    clauses = classify_query("建立立方體，放大兩倍，再改成紅色", task="code")
+    assert clauses.reason == "clauses=3"
+    assert classify_query("a" * 121).reason == "length=121"
+
+
+def test_unknown_task_falls_back_to_semantic() -> None:
+    assert classify_query("USD 是什麼", task="chat").task_type == "fast"
+    assert classify_query("分析場景", task="chat").max_tokens == 1000
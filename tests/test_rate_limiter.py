@@ -0,0 +1,72 @@
+import pytest
+
+from rate_limiter import ModelRateLimiter, RateLimitExceeded, estimate_tokens
+
+
+def test_estimate_tokens_counts_cjk_per_character() -> None:
+    assert estimate_tokens("刪除立方體") == 5
+    assert estimate_tokens("abcdefgh") == 2
+
+
+def test_acquire_within_budget_does_not_wait() -> None:
+    limiter = ModelRateLimiter("test", requests_per_minute=60, tokens_per_minute=1000)
+    assert limiter.acquire(500) < 0.1
+    usage = limiter.utilization()
+    assert usage["granted"] == 1
+    assert usage["token_utilization"] == pytest.approx(0.5, abs=0.01)
+
+
+def test_acquire_sheds_when_projected_wait_too_long() -> None:
+    limiter = ModelRateLimiter(
+        "test", requests_per_minute=60, tokens_per_minute=600, max_wait=0.5
+    )
+    limiter.acquire(600)
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        limiter.acquire(300)
+    assert excinfo.value.retry_after > 0.5
+    assert limiter.utilization()["rejected"] == 1
+
+
+def test_shared_buckets_are_not_overspent_and_projection_sees_other_workers(
+    tmp_path,
+) -> None:
+    import threading
+
+    from shared_store import SharedStore
+
+    path = str(tmp_path / "store.db")
+    # 兩個 worker：各自的 SharedStore 連接與限制器
+    workers = [
+        ModelRateLimiter(
+            "shared",
+            requests_per_minute=6000,
+            tokens_per_minute=60,
+            max_wait=0.0,
+            store=SharedStore(path),
+        )
+        for _ in range(2)
+    ]
+    granted = []
+    barrier = threading.Barrier(2)
+
+    def run(limiter):
+        barrier.wait()
+        for _ in range(20):
+            try:
+                limiter.acquire(6, timeout=0.0)
+                granted.append(1)
+            except RateLimitExceeded:
+                pass
+
+    threads = [threading.Thread(target=run, args=(limiter,)) for limiter in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # 容量 60、每次 6：最多 10 次（測試期間每秒僅補充 1 個 token）
+    assert 10 <= len(granted) <= 11
+
+    idle = ModelRateLimiter("shared", requests_per_minute=6000, tokens_per_minute=60,
+                            store=SharedStore(path))
+    assert idle.projected_wait(30) > 20
+    assert idle.utilization()["token_utilization"] > 0.8
@@ -0,0 +1,151 @@
+import asyncio
+import itertools
+import time
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from fake_llm import FakeStreamingLLM
+from resilience import DeadlineExceeded, ResilientRunnable, get_tracker
+
+_names = itertools.count()
+
+
+class Flaky(Exception):
+    status_code = 503
+
+
+def _name() -> str:
+    return f"test-{next(_names)}"
+
+
+def _flaky(failures: int, result: str = "ok"):
+    """前 failures 次調用拋出 503，之後回傳 result"""
+    calls = []
+
+    def call(_):
+        calls.append(1)
+        if len(calls) <= failures:
+            raise Flaky("busy")
+        return result
+
+    async def acall(value):
+        return call(value)
+
+    return RunnableLambda(call, afunc=acall), calls
+
+
+def _sleeper(seconds: float, result: str):
+    async def acall(_):
+        await asyncio.sleep(seconds)
+        return result
+
+    def call(_):
+        time.sleep(seconds)
+        return result
+
+    return RunnableLambda(call, afunc=acall)
+
+
+def _warm(name: str, latency: float):
+    """填入延遲樣本，讓對沖門檻約為 latency 秒"""
+    tracker = get_tracker(name)
+    for _ in range(20):
+        tracker.record(latency)
+    return tracker
+
+
+def test_deadline_expiry_sync_and_async() -> None:
+    model = ResilientRunnable(
+        _sleeper(0.5, "late"), deadline=0.1, max_retries=0, name=_name()
+    )
+    with pytest.raises(DeadlineExceeded):
+        model.invoke("x")
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(model.ainvoke("x"))
+    assert time.monotonic() - started < 0.4
+    assert model.tracker.timeouts == 2
+
+    streaming = ResilientRunnable(
+        FakeStreamingLLM(response="a b c d", first_token_latency=0.5),
+        deadline=0.1,
+        max_retries=0,
+        name=_name(),
+    )
+
+    async def consume():
+        return [chunk async for chunk in streaming.astream("x")]
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(consume())
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_transient_errors_are_retried_and_permanent_ones_are_not(
+    use_async: bool,
+) -> None:
+    def run(model):
+        return asyncio.run(model.ainvoke("x")) if use_async else model.invoke("x")
+
+    runnable, calls = _flaky(2)
+    model = ResilientRunnable(runnable, max_retries=2, backoff_base=0.01, name=_name())
+    assert run(model) == "ok"
+    assert len(calls) == 3
+    assert model.tracker.retries == 2
+
+    runnable, calls = _flaky(5)
+    model = ResilientRunnable(runnable, max_retries=1, backoff_base=0.01, name=_name())
+    with pytest.raises(Flaky):
+        run(model)
+    assert len(calls) == 2
+
+    permanent = RunnableLambda(
+        lambda _: (_ for _ in ()).throw(ValueError("bad request"))
+    )
+    model = ResilientRunnable(permanent, max_retries=3, backoff_base=0.01, name=_name())
+    with pytest.raises(ValueError):
+        model.invoke("x")
+    assert model.tracker.retries == 0
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_faster_hedge_wins_and_primary_wins_when_fast(use_async: bool) -> None:
+    def run(model):
+        return asyncio.run(model.ainvoke("x")) if use_async else model.invoke("x")
+
+    name = _name()
+    _warm(name, 0.05)
+    model = ResilientRunnable(
+        _sleeper(0.5, "primary"),
+        fallback=_sleeper(0.01, "hedge"),
+        hedge=True,
+        deadline=2.0,
+        name=name,
+    )
+    assert run(model) == "hedge"
+    assert model.tracker.hedged == 1
+    assert model.tracker.hedge_wins == 1
+
+    name = _name()
+    _warm(name, 0.2)
+    model = ResilientRunnable(
+        _sleeper(0.01, "primary"),
+        fallback=_sleeper(0.01, "hedge"),
+        hedge=True,
+        deadline=2.0,
+        name=name,
+    )
+    assert run(model) == "primary"
+    assert model.tracker.hedged == 0
+
+
+def test_astream_forwards_chunks() -> None:
+    model = ResilientRunnable(FakeStreamingLLM(response="a b c d"), name=_name())
+
+    async def consume():
+        return [chunk.content async for chunk in model.astream("x")]
+
+    chunks = asyncio.run(consume())
+    assert len(chunks) == 4
+    assert "".join(chunks) == "a b c d"
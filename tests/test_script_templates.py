@@ -0,0 +1,64 @@
+from script_templates import TemplateLibrary, extract_parameters
+
+CODE = '''from pxr import UsdGeom, Gf
+for i in range(10):
+    cube = UsdGeom.Cube.Define(stage, f"/World/Cubes/Cube_{i}")
+    cube.CreateDisplayColorAttr([Gf.Vec3f(1.0, 0.0, 0.0)])
+'''
+
+
+def test_extract_parameters_builds_structural_signature() -> None:
+    signature, params = extract_parameters("在 /World/Cubes 下創建10個紅色立方體")
+    assert signature == "在 {path} 下創建{number}個{color}立方體"
+    assert params == [("path", "/World/Cubes"), ("number", "10"), ("color", "紅色")]
+
+
+def test_library_instantiates_matching_requests_locally() -> None:
+    library = TemplateLibrary()
+    assert library.learn("在 /World/Cubes 下創建10個紅色立方體", CODE)
+
+    result = library.match("在 /World/Boxes 下創建25個藍色立方體")
+    assert result["status"] == "success"
+    assert "range(25)" in result["code"]
+    assert "/World/Boxes/Cube_" in result["code"]
+    assert "Gf.Vec3f(0.0, 0.0, 1.0)" in result["code"]
+    assert library.match("創建一個球體") is None
+
+
+def test_library_skips_code_that_does_not_reflect_parameters() -> None:
+    library = TemplateLibrary()
+    assert not library.learn("創建10個立方體", "cube = 1\n")
+    assert not library.learn("創建10個立方體", "for i in range(10):\n  pass(")
+
+
+def test_generator_library_only_learns_validated_safe_code_from_history() -> None:
+    from omniverse_code_generator import OmniverseCodeGenerator
+
+    generator = OmniverseCodeGenerator(execution_backend="mock")
+    generator.templates.load(
+        [
+            {
+                "kind": "code",
+                "request": "在 /World/Cubes 下創建10個紅色立方體",
+                "code": CODE,
+            },
+            {
+                "kind": "code",
+                "request": "在 /World/Spheres 下創建10個紅色球體",
+                "code": CODE.replace("UsdGeom.Cube", "UsdGeom.Cubee").replace(
+                    "Cubes", "Spheres"
+                ),
+            },
+            {
+                "kind": "code",
+                "request": "在 /World/Lights 下創建10個紅色燈光",
+                "code": "import os\n" + CODE.replace("Cubes", "Lights"),
+            },
+        ]
+    )
+    assert len(generator.templates) == 1
+    assert generator.templates.match("在 /World/Balls 下創建3個藍色球體") is None
+    assert not generator.templates.learn(
+        "在 /World/Lights 下創建10個紅色燈光",
+        "import os\n" + CODE.replace("Cubes", "Lights"),
+    )
@@ -0,0 +1,88 @@
+from langchain.globals import get_llm_cache, set_llm_cache
+from langchain.schema import ChatGeneration
+from langchain.schema.messages import AIMessage
+
+import shared_store
+from shared_store import SharedLLMCache, SharedStore
+
+
+def test_two_store_instances_on_one_path_share_entries(tmp_path) -> None:
+    path = str(tmp_path / "store.db")
+    first, second = SharedStore(path), SharedStore(path)
+
+    first.set("engine_health", "groq", {"available": True})
+    first.set("engine_health", "expired", {"available": True}, ttl=-1)
+    assert second.get("engine_health", "groq") == {"available": True}
+    assert second.get("engine_health", "expired", "missing") == "missing"
+    second.delete("engine_health")
+    assert first.get("engine_health", "groq") is None
+
+    assert first.incr("hits", "query") == 1
+    assert second.incr("hits", "query", 2) == 3
+    assert first.get_counter("hits", "query") == 3
+
+    assert (
+        first.take_tokens("rate", "model", capacity=10, refill_per_sec=0.001, cost=8)
+        == 0.0
+    )
+    assert (
+        second.take_tokens("rate", "model", capacity=10, refill_per_sec=0.001, cost=8)
+        > 0
+    )
+
+    # 一個 worker 寫入的回應，另一個 worker 直接命中
+    generation = ChatGeneration(message=AIMessage(content="立方體已建立"))
+    SharedLLMCache(first).update("prompt", "llm", [generation])
+    cached = SharedLLMCache(second).lookup("prompt", "llm")
+    assert [g.message.content for g in cached] == ["立方體已建立"]
+    assert SharedLLMCache(second).lookup("prompt", "other-llm") is None
+
+
+def test_expired_rows_are_purged_periodically_on_write(tmp_path) -> None:
+    store = SharedStore(str(tmp_path / "store.db"), purge_interval=0)
+    store.set("llm_cache", "old", "x", ttl=-1)
+    store.set("llm_cache", "kept", "y", ttl=60)
+    rows = store._connect().execute("SELECT key FROM kv").fetchall()
+    assert rows == [("kept",)]
+
+    # 間隔未到時不清除
+    idle = SharedStore(str(tmp_path / "idle.db"), purge_interval=3600)
+    idle.set("llm_cache", "old", "x", ttl=-1)
+    idle.set("llm_cache", "new", "y")
+    assert idle._connect().execute("SELECT COUNT(*) FROM kv").fetchone() == (2,)
+    assert idle.purge_expired() == 1
+
+
+def test_injected_engine_gets_the_shared_store(tmp_path, monkeypatch) -> None:
+    from engine_settings import EngineSettings
+    from fake_llm import FakeStreamingLLM
+    from groq_config import UnifiedEngineConfig, engine_config
+
+    previous_cache = get_llm_cache()
+    # 導入時建立的模組層級 app 不啟用全域緩存
+    monkeypatch.setenv("SHARED_CACHE", "0")
+    from langserve_launch_example.server import create_app
+
+    monkeypatch.setenv("SHARED_STORE_PATH", str(tmp_path / "store.db"))
+    monkeypatch.setattr(shared_store, "_shared_store", None)
+    monkeypatch.setattr(engine_config, "_shared_store", engine_config._shared_store)
+    engine = UnifiedEngineConfig(
+        EngineSettings.from_dict({"cache": {"response_ttl": 60}})
+    )
+    try:
+        create_app(
+            shared_cache=True, llm=FakeStreamingLLM(response="ok"), engine=engine
+        )
+        store = shared_store.get_shared_store()
+        assert engine._shared_store is store
+        assert engine.rate_limiters._store is store
+        assert get_llm_cache().ttl == 60
+        assert engine_config._shared_store is not store
+
+        # 其他 worker 的引擎寫入的健康狀態對注入的引擎可見
+        other = UnifiedEngineConfig(EngineSettings.from_dict({}))
+        other.attach_shared_store(SharedStore(str(tmp_path / "store.db")))
+        other._cache_status("ollama", True)
+        assert engine._get_cached_status("ollama") is True
+    finally:
+        set_llm_cache(previous_cache)
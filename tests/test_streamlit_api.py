@@ -0,0 +1,121 @@
+import pytest
+
+import streamlit_api
+from engine_settings import EngineSettings
+from fake_llm import FakeStreamingLLM
+from groq_config import UnifiedEngineConfig
+from langserve_launch_example.chain import get_chain
+
+
+def test_factory_injects_chain_and_engine_and_runs_hooks_on_lifespan_shutdown(
+    monkeypatch,
+) -> None:
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(streamlit_api, "_shutdown_hooks", [])
+    engine = UnifiedEngineConfig(
+        EngineSettings.from_dict({"admission": {"concurrency": 3}})
+    )
+    app = streamlit_api.create_app(
+        chain=get_chain(FakeStreamingLLM(response="ok")), engine=engine
+    )
+    assert app.state.engine is engine
+    assert app.state.admission.concurrency == 3
+
+    calls = []
+    streamlit_api.register_shutdown_hook(lambda: calls.append("first"))
+
+    @streamlit_api.register_shutdown_hook
+    def failing():
+        calls.append("failing")
+        raise RuntimeError("boom")
+
+    with TestClient(app) as client:
+        assert (
+            client.post("/api/query", json={"query": "cube"}).json()["response"] == "ok"
+        )
+        assert calls == []
+    # 依註冊的相反順序執行，失敗的回調不影響其餘回調
+    assert calls == ["failing", "first"]
+    assert app.state.chain is None
+    assert streamlit_api._shutdown_hooks == []
+
+
+def test_lifespan_shutdown_closes_usage_store_and_flushes_metrics(
+        tmp_path, monkeypatch) -> None:
+    pytest.importorskip("httpx")
+    import os
+
+    from fastapi.testclient import TestClient
+
+    import token_usage
+
+    monkeypatch.setattr(streamlit_api, "_shutdown_hooks", [])
+    usage_store = token_usage.UsageStore(str(tmp_path / "usage.db"))
+    monkeypatch.setattr(token_usage, "_usage_store", usage_store)
+    registry = streamlit_api.metrics.registry
+    monkeypatch.setattr(registry, "directory", str(tmp_path / "metrics"))
+
+    app = streamlit_api.create_app(chain=get_chain(FakeStreamingLLM(response="ok")))
+    with TestClient(app) as client:
+        client.post("/api/query", json={"query": "cube"})
+        assert len(streamlit_api._shutdown_hooks) == 2
+
+    assert streamlit_api._shutdown_hooks == []
+    assert os.path.exists(tmp_path / "metrics" / f"metrics_{os.getpid()}.json")
+    # WAL 已寫回資料庫檔，重新開啟仍可讀到用量
+    assert os.path.getsize(str(tmp_path / "usage.db") + "-wal") == 0
+    [group] = usage_store.report(["endpoint"])["groups"]
+    assert group["endpoint"] == "query"
+
+
+def test_cli_arguments_reach_the_selected_server(monkeypatch) -> None:
+    import uvicorn
+
+    runs = []
+    monkeypatch.setattr(
+        uvicorn, "run", lambda target, **options: runs.append((target, options))
+    )
+    monkeypatch.setattr(streamlit_api.metrics, "prepare_multiprocess_dir", lambda: None)
+
+    streamlit_api.main(
+        [
+            "--host",
+            "0.0.0.0",
+            "--port",
+            "9000",
+            "--workers",
+            "4",
+            "--graceful-timeout",
+            "5",
+        ]
+    )
+    target, options = runs.pop()
+    assert target == "streamlit_api:create_app"
+    assert options == {"factory": True, "workers": 4, "host": "0.0.0.0", "port": 9000,
+                       "log_level": "info", "timeout_graceful_shutdown": 5}
+
+    # 不支援 timeout_graceful_shutdown 的 uvicorn 不傳入此參數
+    class OldConfig:
+        def __init__(self, app, host="127.0.0.1", port=8000):
+            pass
+
+    monkeypatch.setattr(uvicorn, "Config", OldConfig)
+    streamlit_api.main(["--workers", "1", "--log-level", "debug"])
+    target, options = runs.pop()
+    assert not isinstance(target, str)
+    assert "timeout_graceful_shutdown" not in options
+    assert options["log_level"] == "debug"
+
+    executed = []
+    monkeypatch.setattr(
+        streamlit_api.os, "execvp", lambda file, args: executed.append(args)
+    )
+    streamlit_api.main(
+        ["--server", "gunicorn", "--workers", "2", "--graceful-timeout", "7"]
+    )
+    args = executed.pop()
+    assert args[:2] == ["gunicorn", "streamlit_api:create_app()"]
+    assert args[args.index("--workers") + 1] == "2"
+    assert args[args.index("--graceful-timeout") + 1] == "7"
@@ -0,0 +1,67 @@
+import pytest
+
+import token_usage
+from token_usage import UsageCallbackHandler, UsageStore, count_tokens
+
+
+def _fake_chain():
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import ChatPromptTemplate
+
+    model = GenericFakeChatModel(
+        messages=iter(["建立一個立方體 cube"] * 5),
+        metadata={"engine": "groq", "model": "fake-model", "task_type": "fast"},
+    )
+    return ChatPromptTemplate.from_template("{topic}") | model | StrOutputParser()
+
+
+def test_usage_is_estimated_and_aggregated(tmp_path):
+    handler = UsageCallbackHandler()
+    _fake_chain().invoke({"topic": "create a cube"}, config={"callbacks": [handler]})
+
+    summary = handler.summary()
+    assert summary["llm_calls"] == 1
+    assert summary["estimated"] is True
+    assert summary["prompt_tokens"] == count_tokens("create a cube")
+    assert summary["completion_tokens"] == count_tokens("建立一個立方體 cube")
+    assert summary["models"] == ["groq:fake-model"]
+
+    store = UsageStore(str(tmp_path / "usage.db"))
+    store.record(handler.calls, caller="alice", endpoint="query")
+    store.record(handler.calls, caller="alice", endpoint="query")
+    store.record(handler.calls, caller="bob", endpoint="query")
+    groups = store.report(["caller"])["groups"]
+    assert [group["caller"] for group in groups] == ["alice", "bob"]
+    assert groups[0]["calls"] == 2
+    assert groups[0]["total_tokens"] == 2 * summary["total_tokens"]
+    assert groups[0]["token_share"] == pytest.approx(2 / 3, abs=1e-3)
+
+
+def test_query_response_carries_usage_and_report_groups_by_caller(
+    tmp_path, monkeypatch
+):
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from streamlit_api import create_app
+
+    monkeypatch.setattr(
+        token_usage, "_usage_store", UsageStore(str(tmp_path / "usage.db"))
+    )
+
+    with TestClient(create_app(chain=_fake_chain())) as client:
+        response = client.post(
+            "/api/query", json={"query": "cube"}, headers={"X-Caller-Id": "extension"}
+        )
+        report = client.get(
+            "/api/usage/report", params={"group_by": "caller,engine,model"}
+        ).json()
+        invalid = client.get("/api/usage/report", params={"group_by": "secret"})
+
+    usage = response.json()["usage"]
+    assert usage["total_tokens"] > 0
+    assert report["groups"][0]["caller"] == "extension"
+    assert report["groups"][0]["engine"] == "groq"
+    assert report["groups"][0]["total_tokens"] == usage["total_tokens"]
+    assert invalid.status_code == 400
@@ -0,0 +1,98 @@
+import json
+
+import pytest
+
+import tracing
+from tracing import InMemoryExporter, OtlpFileExporter, Tracer
+
+
+def _fake_chain(tracer):
+    from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import ChatPromptTemplate
+
+    model = GenericFakeChatModel(messages=iter(["hello world"] * 10))
+    chain = ChatPromptTemplate.from_template("say {topic}") | model | StrOutputParser()
+    return chain.with_config(callbacks=tracer.callbacks())
+
+
+def test_chain_stages_are_recorded_and_exported_as_otlp(tmp_path):
+    memory = InMemoryExporter()
+    path = tmp_path / "spans.jsonl"
+    tracer = Tracer([memory, OtlpFileExporter(str(path))])
+    chain = _fake_chain(tracer)
+
+    with tracer.span("request") as root:
+        assert "".join(chain.stream({"topic": "cube"})) == "hello world"
+        timings = tracer.stage_timings(root)
+
+    assert {"prompt", "llm", "parse", "time_to_first_token"} <= set(timings)
+    spans = {span.name: span for span in memory.spans}
+    assert spans["llm"].trace_id == root.trace_id
+    assert spans["request"].parent_id is None
+
+    exported = json.loads(path.read_text().splitlines()[0])
+    otlp_spans = exported["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert {span["name"] for span in otlp_spans} >= {
+        "request",
+        "prompt",
+        "llm",
+        "parse",
+    }
+    assert all(span["traceId"] == root.trace_id for span in otlp_spans)
+
+
+def test_query_response_includes_stage_timings(monkeypatch):
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    from streamlit_api import create_app
+
+    memory = InMemoryExporter()
+    tracer = Tracer([memory])
+    monkeypatch.setattr(tracing, "tracer", tracer)
+    monkeypatch.setattr("streamlit_api.tracer", tracer)
+
+    with TestClient(create_app(chain=_fake_chain(tracer))) as client:
+        response = client.post("/api/query", json={"query": "cube"})
+
+    body = response.json()
+    assert response.status_code == 200
+    assert body["trace_id"] == response.headers["X-Trace-Id"]
+    assert {"queue.dispatch", "prompt", "llm", "parse"} <= set(body["timings"])
+    assert any(span.name == "http POST /api/query" for span in memory.spans)
+
+
+def test_root_span_ends_after_the_last_streamed_chunk(monkeypatch):
+    pytest.importorskip("httpx")
+    import asyncio
+    import time
+
+    from fastapi import FastAPI
+    from fastapi.responses import StreamingResponse
+    from fastapi.testclient import TestClient
+
+    memory = InMemoryExporter()
+    monkeypatch.setattr(tracing, "tracer", Tracer([memory]))
+    last_chunk_ns = []
+
+    app = FastAPI()
+    app.middleware("http")(tracing.trace_requests)
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                await asyncio.sleep(0.05)
+                last_chunk_ns[:] = [time.time_ns()]
+                yield f"chunk {i}\n"
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    with TestClient(app) as client:
+        response = client.get("/stream")
+
+    assert response.text == "chunk 0\nchunk 1\nchunk 2\n"
+    [root] = [span for span in memory.spans if span.name == "http GET /stream"]
+    assert response.headers["X-Trace-Id"] == root.trace_id
+    assert root.end_ns >= last_chunk_ns[0] and root.duration_ms >= 150
+    assert root.attributes["status_code"] == 200
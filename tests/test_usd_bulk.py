@@ -0,0 +1,50 @@
+import pytest
+
+pxr = pytest.importorskip("pxr")
+
+from pxr import Usd, UsdGeom  # noqa: E402
+
+import usd_bulk  # noqa: E402
+
+
+def test_define_prims_authors_defined_prims_with_transforms_and_colors() -> None:
+    stage = Usd.Stage.CreateInMemory()
+    paths = usd_bulk.numbered_paths("/World/Cubes", "Cube", 50)
+    positions = usd_bulk.grid_positions(50, spacing=3.0)
+    usd_bulk.define_prims(
+        paths, translations=positions, colors=[1.0, 0.0, 0.0], stage=stage
+    )
+
+    cubes = [prim for prim in stage.Traverse() if prim.GetTypeName() == "Cube"]
+    assert len(cubes) == 50
+    assert stage.GetPrimAtPath("/World/Cubes").GetTypeName() == "Xform"
+
+    cube = UsdGeom.Cube(stage.GetPrimAtPath(paths[7]))
+    translate = UsdGeom.Xformable(cube).GetLocalTransformation().ExtractTranslation()
+    assert tuple(translate) == tuple(positions[7])
+    assert tuple(cube.GetDisplayColorAttr().Get()[0]) == (1.0, 0.0, 0.0)
+
+    usd_bulk.set_transforms(paths[:2], scales=[2.0, 2.0, 2.0], stage=stage)
+    order = UsdGeom.Xformable(stage.GetPrimAtPath(paths[0])).GetXformOpOrderAttr().Get()
+    assert list(order) == ["xformOp:translate", "xformOp:scale"]
+
+
+def test_scatter_switches_to_point_instancer_above_threshold() -> None:
+    stage = Usd.Stage.CreateInMemory()
+    usd_bulk.scatter("/World/Few", 5, stage=stage, threshold=10)
+    usd_bulk.scatter(
+        "/World/Many",
+        500,
+        rotations=[0.0, 90.0, 0.0],
+        colors=[0.0, 1.0, 0.0],
+        stage=stage,
+        threshold=10,
+    )
+
+    assert stage.GetPrimAtPath("/World/Few/Cube_4").GetTypeName() == "Cube"
+    instancer = UsdGeom.PointInstancer(stage.GetPrimAtPath("/World/Many"))
+    assert len(instancer.GetPositionsAttr().Get()) == 500
+    assert len(instancer.GetPrototypesRel().GetTargets()) == 1
+    orientation = instancer.GetOrientationsAttr().Get()[0]
+    assert abs(orientation.GetReal() - 0.7071) < 1e-3
+    assert sum(1 for _ in stage.Traverse()) < 20
@@ -0,0 +1,295 @@
+"""
+Token 用量統計
+每次模型調用優先取 Groq / Ollama 回應中的用量，沒有時以本地分詞器估算；
+依呼叫者、引擎、模型與任務類型累計在本地 SQLite，供用量報表查詢 token 與延遲花在哪裡
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from metrics import response_token_usage
+from rate_limiter import estimate_tokens
+
+try:
+    from langchain_core.callbacks import BaseCallbackHandler
+    LANGCHAIN_AVAILABLE = True
+except ImportError:
+    BaseCallbackHandler = object
+    LANGCHAIN_AVAILABLE = False
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+DEFAULT_USAGE_PATH = os.path.join(tempfile.gettempdir(), "omniverse_token_usage.db")
+
+# 報表可用的分組欄位
+GROUP_FIELDS = ("caller", "engine", "model", "task_type", "endpoint")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    day TEXT NOT NULL,
+    caller TEXT NOT NULL,
+    engine TEXT NOT NULL,
+    model TEXT NOT NULL,
+    task_type TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    calls INTEGER NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    estimated_calls INTEGER NOT NULL,
+    latency REAL NOT NULL,
+    PRIMARY KEY (day, caller, engine, model, task_type, endpoint)
+);
+"""
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """本地計算 token 數：有 tiktoken 時使用 cl100k_base（與 Llama 分詞器相近），
+    否則以字元數粗估"""
+    global _encoding
+    if not text:
+        return 0
+    if TIKTOKEN_AVAILABLE:
+        if _encoding is None:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        return len(_encoding.encode(text, disallowed_special=()))
+    return estimate_tokens(text)
+
+
+def _prompt_text(
+    prompts: Optional[List[Any]], messages: Optional[List[List[Any]]]
+) -> str:
+    if messages:
+        return "\n".join(
+            str(getattr(message, "content", message))
+            for batch in messages
+            for message in batch
+        )
+    return "\n".join(str(prompt) for prompt in prompts or [])
+
+
+class UsageCallbackHandler(BaseCallbackHandler):
+    """收集單次請求中所有模型調用的 token 用量（每個請求建立一個）"""
+
+    run_inline = True
+
+    def __init__(self):
+        self.calls: List[Dict[str, Any]] = []
+        self._pending: Dict[Any, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, prompt: str, kwargs: Dict[str, Any]):
+        metadata = kwargs.get("metadata") or {}
+        params = kwargs.get("invocation_params") or {}
+        with self._lock:
+            self._pending[run_id] = {
+                "engine": metadata.get("engine")
+                or metadata.get("ls_provider")
+                or "unknown",
+                "model": (
+                    metadata.get("model")
+                    or params.get("model")
+                    or params.get("model_name")
+                    or metadata.get("ls_model_name")
+                    or "unknown"
+                ),
+                "task_type": metadata.get("task_type") or "unknown",
+                "prompt": prompt,
+                "started": time.perf_counter(),
+            }
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, _prompt_text(prompts, None), kwargs)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, _prompt_text(None, messages), kwargs)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            pending = self._pending.pop(run_id, None)
+        if pending is None:
+            return
+        prompt = pending.pop("prompt")
+        latency = time.perf_counter() - pending.pop("started")
+        usage = response_token_usage(response)
+        estimated = not usage
+        if estimated:
+            output = "".join(
+                generation.text
+                for batch in response.generations
+                for generation in batch
+            )
+            usage = {
+                "prompt_tokens": count_tokens(prompt),
+                "completion_tokens": count_tokens(output),
+            }
+        with self._lock:
+            self.calls.append(
+                {**pending, **usage, "estimated": estimated, "latency": latency}
+            )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._pending.pop(run_id, None)
+
+    def summary(self) -> Dict[str, Any]:
+        """QueryResponse 用的用量摘要"""
+        with self._lock:
+            calls = list(self.calls)
+        prompt = sum(call["prompt_tokens"] for call in calls)
+        completion = sum(call["completion_tokens"] for call in calls)
+        return {
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "total_tokens": prompt + completion,
+            "llm_calls": len(calls),
+            "estimated": any(call["estimated"] for call in calls),
+            "models": sorted({f"{call['engine']}:{call['model']}" for call in calls}),
+        }
+
+
+class UsageStore:
+    """以 SQLite 依日期、呼叫者、引擎、模型、任務類型與端點累計用量（多 worker
+    共用同一檔案）"""
+
+    def __init__(self, path: Optional[str] = None, busy_timeout: float = 5.0):
+        self.path = path or os.environ.get("USAGE_STORE_PATH", DEFAULT_USAGE_PATH)
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connect().executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and getattr(self._local, "pid", None) == os.getpid():
+            return conn
+        conn = sqlite3.connect(
+            self.path, timeout=self.busy_timeout, isolation_level=None
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def record(
+        self, calls: List[Dict[str, Any]], caller: str = "anonymous", endpoint: str = ""
+    ):
+        """累計一次請求中各模型調用的用量"""
+        if not calls:
+            return
+        day = time.strftime("%Y-%m-%d")
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for call in calls:
+                conn.execute(
+                    """INSERT INTO usage VALUES (?, ?, ?, ?, ?, ?, 1, ?, ?, ?, ?)
+                       ON CONFLICT (day, caller, engine, model, task_type, endpoint)
+                       DO UPDATE SET
+                           calls = calls + 1,
+                           prompt_tokens = prompt_tokens + excluded.prompt_tokens,
+                           completion_tokens =
+                               completion_tokens + excluded.completion_tokens,
+                           estimated_calls = estimated_calls + excluded.estimated_calls,
+                           latency = latency + excluded.latency""",
+                    (
+                        day,
+                        caller,
+                        call["engine"],
+                        call["model"],
+                        call["task_type"],
+                        endpoint,
+                        call["prompt_tokens"],
+                        call["completion_tokens"],
+                        int(call["estimated"]),
+                        call["latency"],
+                    ),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def report(
+        self, group_by: List[str] = ("caller", "engine"), since: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """依指定欄位分組的用量，依 token 總數排序；since 為 YYYY-MM-DD"""
+        fields = [field for field in group_by if field in GROUP_FIELDS] or ["engine"]
+        columns = ", ".join(fields)
+        rows = self._connect().execute(
+            f"""SELECT {columns}, SUM(calls), SUM(prompt_tokens),
+                       SUM(completion_tokens), SUM(estimated_calls), SUM(latency)
+                FROM usage WHERE day >= ? GROUP BY {columns}
+                ORDER BY SUM(prompt_tokens + completion_tokens) DESC""",
+            (since or "",)
+        ).fetchall()
+        total_tokens = sum(row[-4] + row[-3] for row in rows) or 1
+        groups = []
+        for row in rows:
+            calls, prompt, completion, estimated, latency = row[len(fields):]
+            tokens = prompt + completion
+            groups.append(
+                {
+                    **dict(zip(fields, row)),
+                    "calls": calls,
+                    "prompt_tokens": prompt,
+                    "completion_tokens": completion,
+                    "total_tokens": tokens,
+                    "token_share": round(tokens / total_tokens, 4),
+                    "avg_prompt_tokens": round(prompt / calls, 1),
+                    "avg_completion_tokens": round(completion / calls, 1),
+                    "avg_latency": round(latency / calls, 3),
+                    # 每個輸出 token 的平均耗時，比較不同模型的生成速度
+                    "ms_per_completion_token": (
+                        round(latency * 1000 / completion, 2) if completion else None
+                    ),
+                    "estimated_calls": estimated,
+                }
+            )
+        return {"group_by": fields, "since": since, "groups": groups}
+
+    def clear(self):
+        self._connect().execute("DELETE FROM usage")
+
+    def close(self):
+        """把 WAL 寫回資料庫檔並關閉目前執行緒的連接"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = self._connect()
+        try:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            conn.close()
+            self._local.conn = None
+
+
+_usage_store: Optional[UsageStore] = None
+_store_lock = threading.Lock()
+
+
+def get_usage_store() -> UsageStore:
+    """取得進程內唯一的用量儲存實例"""
+    global _usage_store
+    with _store_lock:
+        if _usage_store is None:
+            _usage_store = UsageStore()
+        return _usage_store
+
+
+def close_usage_store():
+    """關閉進程內的用量儲存（尚未建立時不做任何事）"""
+    with _store_lock:
+        if _usage_store is not None:
+            _usage_store.close()
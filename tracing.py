@@ -0,0 +1,564 @@
+"""
+端到端延遲追蹤
+以 contextvars 串接父子 span，記錄排隊、提示渲染、首個 token、生成、
+解析與執行各階段的耗時；
+完成的追蹤可輸出為 JSON Lines 或 OTLP/JSON 檔案，並可在根 span 期間啟用取樣式剖析器
+"""
+
+import functools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from langchain_core.callbacks import BaseCallbackHandler
+    LANGCHAIN_AVAILABLE = True
+except ImportError:
+    BaseCallbackHandler = object
+    LANGCHAIN_AVAILABLE = False
+
+SERVICE_NAME = "omniverse-semantic"
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+def _new_id(size: int) -> str:
+    return os.urandom(size).hex()
+
+
+class Span:
+    """單一階段的計時記錄"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns",
+                 "attributes", "events", "status", "sampled", "thread_id", "_trace")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, sampled: bool = True,
+                 start_ns: Optional[int] = None, **attributes: Any):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else _new_id(16)
+        self.span_id = _new_id(8)
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = attributes
+        self.events: List[Dict[str, Any]] = []
+        self.status = "ok"
+        self.sampled = parent.sampled if parent else sampled
+        self.thread_id = threading.get_ident()
+        self._trace: "_Trace" = parent._trace if parent else _Trace(self)
+
+    @property
+    def is_root(self) -> bool:
+        return self.parent_id is None
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns or time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes: Any):
+        self.events.append(
+            {"name": name, "time_ns": time.time_ns(), "attributes": attributes}
+        )
+
+    def record_error(self, error: BaseException):
+        self.status = "error"
+        self.attributes["error"] = f"{type(error).__name__}: {error}"[:500]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+            "events": self.events,
+        }
+
+
+class _Trace:
+    """同一追蹤中已完成的 span"""
+
+    __slots__ = ("root", "spans", "exported", "lock")
+
+    def __init__(self, root: Span):
+        self.root = root
+        self.spans: List[Span] = []
+        self.exported = False
+        self.lock = threading.Lock()
+
+
+class JsonLinesExporter:
+    """每個 span 一行 JSON"""
+
+    def __init__(self, path: str):
+        self.path = path.format(pid=os.getpid())
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        lines = "".join(
+            json.dumps(span.to_dict(), ensure_ascii=False, default=str) + "\n"
+            for span in spans
+        )
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [
+        {"key": key, "value": _otlp_value(value)}
+        for key, value in attributes.items()
+        if value is not None
+    ]
+
+
+class OtlpFileExporter:
+    """OTLP/JSON 檔案格式：每行一個 ExportTraceServiceRequest，可用 OpenTelemetry
+    Collector 的 otlpjsonfile 讀入"""
+
+    def __init__(self, path: str, service_name: str = SERVICE_NAME):
+        self.path = path.format(pid=os.getpid())
+        self.service_name = service_name
+        self._lock = threading.Lock()
+
+    def _span(self, span: Span) -> Dict[str, Any]:
+        record = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": 2 if span.is_root and span.name.startswith("http") else 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": _otlp_attributes(span.attributes),
+            "events": [
+                {"timeUnixNano": str(event["time_ns"]), "name": event["name"],
+                 "attributes": _otlp_attributes(event["attributes"])}
+                for event in span.events
+            ],
+            # 1 = OK，2 = ERROR
+            "status": {"code": 2 if span.status == "error" else 1},
+        }
+        if span.parent_id:
+            record["parentSpanId"] = span.parent_id
+        return record
+
+    def export(self, spans: List[Span]):
+        request = {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": _otlp_attributes(
+                            {
+                                "service.name": self.service_name,
+                                "process.pid": os.getpid(),
+                            }
+                        )
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "tracing"},
+                            "spans": [self._span(span) for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+
+
+class InMemoryExporter:
+    """保留最近的 span（測試與除錯用）"""
+
+    def __init__(self, limit: int = 10000):
+        self.spans: deque = deque(maxlen=limit)
+
+    def export(self, spans: List[Span]):
+        self.spans.extend(spans)
+
+
+class SamplingProfiler:
+    """取樣式剖析器：根 span 期間定時擷取其執行緒的呼叫堆疊，結束時以 collapsed stack
+    格式寫出（可直接交給 flamegraph.pl / speedscope）
+
+    非同步伺服器中根 span 在事件迴圈執行緒上，取樣結果會包含同時處理中的其他請求
+    """
+
+    def __init__(self, path: str, interval: float = 0.005, max_depth: int = 64):
+        self.path = path.format(pid=os.getpid())
+        self.interval = interval
+        self.max_depth = max_depth
+        self._active: Dict[int, Span] = {}
+        self._samples: Dict[str, Counter] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, span: Span):
+        with self._lock:
+            self._active[span.thread_id] = span
+            self._samples[span.span_id] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, name="trace-profiler", daemon=True
+                )
+                self._thread.start()
+
+    def stop(self, span: Span):
+        with self._lock:
+            if self._active.get(span.thread_id) is span:
+                del self._active[span.thread_id]
+            samples = self._samples.pop(span.span_id, None)
+        if samples:
+            prefix = f"{span.name} [{span.trace_id}]"
+            lines = "".join(
+                f"{prefix};{stack} {count}\n" for stack, count in samples.items()
+            )
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+
+    def _stack(self, frame) -> str:
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(
+                f"{code.co_name} "
+                f"({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+            )
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def _loop(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, span in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        self._samples[span.span_id][self._stack(frame)] += 1
+
+
+class Tracer:
+    """建立、串接與輸出 span
+
+    每個請求都會收集 span 以提供各階段耗時；只有依 sample_rate 取樣的追蹤才會輸出與剖析
+    """
+
+    def __init__(self, exporters: Optional[List[Any]] = None, sample_rate: float = 1.0,
+                 profiler: Optional[Any] = None, recent: int = 100):
+        self.exporters = list(exporters or [])
+        self.sample_rate = sample_rate
+        # 剖析器掛鉤：任何具有 start(span) / stop(span) 的物件
+        self.profiler = profiler
+        self.recent_traces: deque = deque(maxlen=recent)
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        """TRACE_JSON_FILE / TRACE_OTLP_FILE 指定輸出檔（路徑可含 {pid}），
+        TRACE_SAMPLE_RATE 為取樣率，
+        TRACE_PROFILE_FILE 啟用取樣剖析（TRACE_PROFILE_INTERVAL_MS 為取樣間隔）"""
+        exporters = []
+        if os.getenv("TRACE_JSON_FILE"):
+            exporters.append(JsonLinesExporter(os.environ["TRACE_JSON_FILE"]))
+        if os.getenv("TRACE_OTLP_FILE"):
+            exporters.append(OtlpFileExporter(os.environ["TRACE_OTLP_FILE"]))
+        profiler = None
+        if os.getenv("TRACE_PROFILE_FILE"):
+            interval = float(os.getenv("TRACE_PROFILE_INTERVAL_MS", "5")) / 1000
+            profiler = SamplingProfiler(
+                os.environ["TRACE_PROFILE_FILE"], interval=interval
+            )
+        return cls(
+            exporters,
+            sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "1.0")),
+            profiler=profiler,
+        )
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def start_span(
+        self,
+        name: str,
+        parent: Optional[Span] = None,
+        start_ns: Optional[int] = None,
+        **attributes: Any,
+    ) -> Span:
+        """開始 span（不改變目前的上下文）；parent 未指定時以目前的 span 為父"""
+        parent = parent or _current_span.get()
+        sampled = parent.sampled if parent else random.random() < self.sample_rate
+        span = Span(
+            name, parent=parent, sampled=sampled, start_ns=start_ns, **attributes
+        )
+        if span.is_root and span.sampled and self.profiler is not None:
+            self.profiler.start(span)
+        return span
+
+    def end_span(self, span: Span, end_ns: Optional[int] = None):
+        if span.end_ns is not None:
+            return
+        span.end_ns = end_ns or time.time_ns()
+        trace = span._trace
+        with trace.lock:
+            trace.spans.append(span)
+            if span.is_root:
+                trace.exported = True
+                spans = list(trace.spans)
+            elif trace.exported:
+                # 根 span 已輸出後才結束的 span 單獨輸出
+                spans = [span]
+            else:
+                return
+        if span.is_root:
+            if span.sampled and self.profiler is not None:
+                self.profiler.stop(span)
+            self.recent_traces.append(spans)
+        if span.sampled:
+            self._export(spans)
+
+    def record(
+        self,
+        name: str,
+        start: float,
+        end: Optional[float] = None,
+        parent: Optional[Span] = None,
+        **attributes: Any,
+    ) -> Span:
+        """記錄已知起迄時間（time.time() 秒）的 span，例如任務在佇列中的等待時間"""
+        span = self.start_span(
+            name, parent=parent, start_ns=int(start * 1e9), **attributes
+        )
+        self.end_span(span, end_ns=int((end or time.time()) * 1e9))
+        return span
+
+    def _export(self, spans: List[Span]):
+        for exporter in self.exporters:
+            try:
+                exporter.export(spans)
+            except Exception as e:
+                print(f"追蹤輸出失敗 ({type(exporter).__name__}): {e}")
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        parent: Optional[Span] = None,
+        start_ns: Optional[int] = None,
+        **attributes: Any,
+    ):
+        """在區塊期間成為目前的 span"""
+        span = self.start_span(name, parent=parent, start_ns=start_ns, **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+
+    def traced(self, name: Optional[str] = None) -> Callable:
+        """函式裝飾器版本的 span"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(name or fn.__qualname__):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def callbacks(
+        self, parent: Optional[Span] = None
+    ) -> List["TracingCallbackHandler"]:
+        """LangChain config 用的 callbacks 清單"""
+        return (
+            [TracingCallbackHandler(self, parent=parent)] if LANGCHAIN_AVAILABLE else []
+        )
+
+    @staticmethod
+    def stage_timings(span: Span) -> Dict[str, float]:
+        """span 所屬追蹤中已完成各階段的耗時（毫秒，同名 span 加總）"""
+        trace = span._trace
+        with trace.lock:
+            spans = list(trace.spans)
+        timings: Dict[str, float] = {}
+        for item in spans:
+            if item.name.startswith("chain."):
+                continue
+            timings[item.name] = round(
+                timings.get(item.name, 0.0) + item.duration_ms, 3
+            )
+            for key in ("time_to_first_token", "time_to_first_chunk"):
+                value = item.attributes.get(f"{key}_ms")
+                if value is not None:
+                    timings[key] = value
+        return timings
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """將 LangChain 的執行過程轉為 span：提示模板為 prompt、輸出解析器為 parse、
+    模型調用為 llm（含首個 token 時間）"""
+
+    # 在呼叫端的執行緒與上下文中執行，父 span 與時間順序才正確
+    run_inline = True
+
+    def __init__(self, tracer: Tracer, parent: Optional[Span] = None):
+        self.tracer = tracer
+        self.parent = parent
+        self._spans: Dict[Any, Span] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, name: str, run_id, parent_run_id, **attributes: Any) -> Span:
+        with self._lock:
+            parent = self._spans.get(parent_run_id)
+        span = self.tracer.start_span(name, parent=parent or self.parent, **attributes)
+        with self._lock:
+            self._spans[run_id] = span
+        return span
+
+    def _end(self, run_id, error: Optional[BaseException] = None) -> Optional[Span]:
+        with self._lock:
+            span = self._spans.pop(run_id, None)
+        if span is not None:
+            if error is not None:
+                span.record_error(error)
+            self.tracer.end_span(span)
+        return span
+
+    @staticmethod
+    def _stage(serialized: Optional[Dict[str, Any]], kwargs: Dict[str, Any]) -> str:
+        serialized = serialized or {}
+        name = (
+            kwargs.get("name")
+            or serialized.get("name")
+            or (serialized.get("id") or ["chain"])[-1]
+        )
+        if "Prompt" in name:
+            return "prompt"
+        if "Parser" in name:
+            return "parse"
+        return f"chain.{name}"
+
+    def on_chain_start(
+        self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs
+    ):
+        self._start(self._stage(serialized, kwargs), run_id, parent_run_id)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def _start_llm(self, serialized, run_id, parent_run_id, kwargs):
+        params = kwargs.get("invocation_params") or {}
+        metadata = kwargs.get("metadata") or {}
+        model = (
+            params.get("model")
+            or params.get("model_name")
+            or metadata.get("ls_model_name")
+        )
+        self._start("llm", run_id, parent_run_id, model=model,
+                    provider=metadata.get("ls_provider"))
+
+    def on_llm_start(
+        self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs
+    ):
+        self._start_llm(serialized, run_id, parent_run_id, kwargs)
+
+    def on_chat_model_start(
+        self, serialized, messages, *, run_id, parent_run_id=None, **kwargs
+    ):
+        self._start_llm(serialized, run_id, parent_run_id, kwargs)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        with self._lock:
+            span = self._spans.get(run_id)
+        if span is not None and "time_to_first_token_ms" not in span.attributes:
+            span.set_attribute("time_to_first_token_ms", round(span.duration_ms, 3))
+            span.add_event("first_token")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            span = self._spans.get(run_id)
+        if span is not None:
+            usage = (getattr(response, "llm_output", None) or {}).get(
+                "token_usage"
+            ) or {}
+            for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+                if key in usage:
+                    span.set_attribute(key, usage[key])
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+
+async def _traced_body(body_iterator, span: Span):
+    """逐塊轉送回應內容，最後一塊送出（或串流中斷）後才結束根 span"""
+    try:
+        async for chunk in body_iterator:
+            yield chunk
+    except BaseException as e:
+        span.record_error(e)
+        raise
+    finally:
+        tracer.end_span(span)
+
+
+async def trace_requests(request, call_next):
+    """FastAPI / Starlette HTTP 中間件：每個請求一個根 span，追蹤 ID 由 X-Trace-Id
+    標頭回傳；串流回應的根 span 涵蓋整個內容的產生時間"""
+    span = tracer.start_span(f"http {request.method} {request.url.path}",
+                             method=request.method, path=request.url.path)
+    token = _current_span.set(span)
+    try:
+        response = await call_next(request)
+    except BaseException as e:
+        span.record_error(e)
+        tracer.end_span(span)
+        raise
+    finally:
+        _current_span.reset(token)
+
+    span.set_attribute("status_code", response.status_code)
+    if response.status_code >= 500:
+        span.status = "error"
+    response.headers["X-Trace-Id"] = span.trace_id
+    body_iterator = getattr(response, "body_iterator", None)
+    if body_iterator is None:
+        tracer.end_span(span)
+    else:
+        response.body_iterator = _traced_body(body_iterator, span)
+    return response
+
+
+# 全局追蹤器實例（輸出設定取自環境變數）
+tracer = Tracer.from_env()
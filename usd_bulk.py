@@ -0,0 +1,308 @@
+"""
+USD 批量操作輔助函式
+生成的腳本在大量物件時改用這些函式：在 Sdf.ChangeBlock 中直接於圖層上建立 PrimSpec
+與屬性，
+變換與顏色以 NumPy 陣列傳入，避免逐一呼叫 Kit 命令或 UsdGeom.*.Define 觸發的通知與重組
+"""
+
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    from pxr import Gf, Sdf, Usd, UsdGeom, Vt
+    USD_AVAILABLE = True
+except ImportError:
+    USD_AVAILABLE = False
+
+try:
+    import omni.usd
+    OMNIVERSE_AVAILABLE = True
+except ImportError:
+    OMNIVERSE_AVAILABLE = False
+
+# 相同物件的數量達到此值時改用 PointInstancer
+INSTANCER_THRESHOLD = 1000
+
+_fallback_stage = None
+
+
+def get_stage():
+    """Omniverse 中回傳目前的 Stage，否則回傳進程內的記憶體 Stage"""
+    global _fallback_stage
+    if OMNIVERSE_AVAILABLE:
+        return omni.usd.get_context().get_stage()
+    if _fallback_stage is None:
+        _fallback_stage = Usd.Stage.CreateInMemory()
+    return _fallback_stage
+
+
+def _as_rows(values, count: int, name: str) -> Optional[np.ndarray]:
+    """將輸入整理為 (count, 3) 的陣列；單一值會廣播到所有物件"""
+    if values is None:
+        return None
+    array = np.asarray(values, dtype=np.float64)
+    if array.ndim == 1:
+        array = np.broadcast_to(array, (count, array.shape[0]))
+    if array.shape != (count, 3):
+        raise ValueError(f"{name} 的形狀應為 ({count}, 3)，實際為 {array.shape}")
+    return array
+
+
+def _set_attribute(spec, name: str, type_name, value, uniform: bool = False):
+    attribute = spec.attributes.get(name)
+    if attribute is None:
+        variability = Sdf.VariabilityUniform if uniform else Sdf.VariabilityVarying
+        attribute = Sdf.AttributeSpec(spec, name, type_name, variability)
+    attribute.default = value
+
+
+def _define_parents(layer, stage, paths: Iterable):
+    """確保父路徑為已定義的 Xform（Sdf.CreatePrimInLayer 只會建立 over）"""
+    seen = set()
+    for path in paths:
+        parent = path.GetParentPath()
+        while parent != Sdf.Path.absoluteRootPath and parent not in seen:
+            seen.add(parent)
+            prim = stage.GetPrimAtPath(parent)
+            if not (prim and prim.IsDefined()):
+                spec = Sdf.CreatePrimInLayer(layer, parent)
+                spec.specifier = Sdf.SpecifierDef
+                if not spec.typeName:
+                    spec.typeName = "Xform"
+            parent = parent.GetParentPath()
+
+
+def _author_xform(spec, index: int, translations, rotations, scales):
+    """寫入變換屬性並合併 xformOpOrder"""
+    order_attribute = spec.attributes.get("xformOpOrder")
+    order = (
+        list(order_attribute.default)
+        if order_attribute is not None and order_attribute.default
+        else []
+    )
+    for op, values, type_name, vector in (
+        ("xformOp:translate", translations, Sdf.ValueTypeNames.Double3, Gf.Vec3d),
+        ("xformOp:rotateXYZ", rotations, Sdf.ValueTypeNames.Float3, Gf.Vec3f),
+        ("xformOp:scale", scales, Sdf.ValueTypeNames.Float3, Gf.Vec3f),
+    ):
+        if values is None:
+            continue
+        _set_attribute(spec, op, type_name, vector(*values[index].tolist()))
+        if op not in order:
+            order.append(op)
+    if order:
+        _set_attribute(
+            spec,
+            "xformOpOrder",
+            Sdf.ValueTypeNames.TokenArray,
+            Vt.TokenArray(order),
+            uniform=True,
+        )
+
+
+def define_prims(
+    paths: Sequence[str],
+    prim_type: str = "Cube",
+    translations=None,
+    rotations=None,
+    scales=None,
+    colors=None,
+    stage=None,
+    layer=None,
+) -> List[str]:
+    """批量定義物件並設置變換與顯示顏色（單一 ChangeBlock 內完成）"""
+    stage = stage or get_stage()
+    layer = layer or stage.GetEditTarget().GetLayer()
+    sdf_paths = [Sdf.Path(path) for path in paths]
+    count = len(sdf_paths)
+    translations = _as_rows(translations, count, "translations")
+    rotations = _as_rows(rotations, count, "rotations")
+    scales = _as_rows(scales, count, "scales")
+    colors = _as_rows(colors, count, "colors")
+
+    with Sdf.ChangeBlock():
+        _define_parents(layer, stage, sdf_paths)
+        for index, path in enumerate(sdf_paths):
+            spec = Sdf.CreatePrimInLayer(layer, path)
+            spec.specifier = Sdf.SpecifierDef
+            spec.typeName = prim_type
+            _author_xform(spec, index, translations, rotations, scales)
+            if colors is not None:
+                _set_attribute(
+                    spec,
+                    "primvars:displayColor",
+                    Sdf.ValueTypeNames.Color3fArray,
+                    Vt.Vec3fArray([Gf.Vec3f(*colors[index].tolist())]),
+                )
+    return [str(path) for path in sdf_paths]
+
+
+def set_transforms(paths: Sequence[str], translations=None, rotations=None, scales=None,
+                   stage=None, layer=None):
+    """批量修改既有物件的變換"""
+    stage = stage or get_stage()
+    layer = layer or stage.GetEditTarget().GetLayer()
+    count = len(paths)
+    translations = _as_rows(translations, count, "translations")
+    rotations = _as_rows(rotations, count, "rotations")
+    scales = _as_rows(scales, count, "scales")
+    with Sdf.ChangeBlock():
+        for index, path in enumerate(paths):
+            spec = Sdf.CreatePrimInLayer(layer, Sdf.Path(path))
+            _author_xform(spec, index, translations, rotations, scales)
+
+
+def set_colors(paths: Sequence[str], colors, stage=None, layer=None):
+    """批量修改既有物件的顯示顏色"""
+    stage = stage or get_stage()
+    layer = layer or stage.GetEditTarget().GetLayer()
+    colors = _as_rows(colors, len(paths), "colors")
+    with Sdf.ChangeBlock():
+        for index, path in enumerate(paths):
+            spec = Sdf.CreatePrimInLayer(layer, Sdf.Path(path))
+            _set_attribute(
+                spec,
+                "primvars:displayColor",
+                Sdf.ValueTypeNames.Color3fArray,
+                Vt.Vec3fArray([Gf.Vec3f(*colors[index].tolist())]),
+            )
+
+
+def euler_to_quaternions(rotations) -> np.ndarray:
+    """XYZ 歐拉角（度）轉為四元數陣列，欄位順序為 (x, y, z, w)，與 Vt.QuathArray
+    的記憶體配置相同"""
+    radians = np.radians(np.asarray(rotations, dtype=np.float64)) / 2.0
+    cx, cy, cz = np.cos(radians).T
+    sx, sy, sz = np.sin(radians).T
+    # 依 X、Y、Z 順序旋轉（q = qz * qy * qx）
+    return np.stack([
+        sx * cy * cz - cx * sy * sz,
+        cx * sy * cz + sx * cy * sz,
+        cx * cy * sz - sx * sy * cz,
+        cx * cy * cz + sx * sy * sz,
+    ], axis=1)
+
+
+def define_point_instancer(path: str, positions, prototypes: Sequence[str] = ("Cube",),
+                           proto_indices=None, rotations=None, scales=None, colors=None,
+                           stage=None) -> str:
+    """以 PointInstancer 建立大量相同物件：每種原型只定義一次，實例資料以陣列屬性保存
+
+    prototypes 為原型的物件類型（例如 "Cube"、"Sphere"）或既有原型的路徑
+    """
+    stage = stage or get_stage()
+    positions = np.asarray(positions, dtype=np.float32)
+    count = len(positions)
+
+    # 只寫入少量 prim 與陣列屬性，不需要 ChangeBlock（其中也不能呼叫 Stage 層級的
+    # Define）
+    instancer = UsdGeom.PointInstancer.Define(stage, path)
+    prototype_paths = []
+    for index, prototype in enumerate(prototypes):
+        if prototype.startswith("/"):
+            prototype_paths.append(Sdf.Path(prototype))
+            continue
+        prototype_path = Sdf.Path(path).AppendPath(f"Prototypes/{prototype}_{index}")
+        prim = stage.DefinePrim(prototype_path, prototype)
+        if colors is not None and np.asarray(colors).ndim == 1:
+            # 單一顏色設在原型上，不需要逐實例的 primvar
+            UsdGeom.Gprim(prim).CreateDisplayColorAttr(
+                Vt.Vec3fArray(
+                    [Gf.Vec3f(*np.asarray(colors, dtype=np.float64).tolist())]
+                )
+            )
+        prototype_paths.append(prototype_path)
+    instancer.CreatePrototypesRel().SetTargets(prototype_paths)
+
+    if proto_indices is None:
+        proto_indices = np.zeros(count, dtype=np.int32)
+    instancer.CreateProtoIndicesAttr(
+        Vt.IntArray.FromNumpy(np.asarray(proto_indices, dtype=np.int32))
+    )
+    instancer.CreatePositionsAttr(Vt.Vec3fArray.FromNumpy(positions))
+    if rotations is not None:
+        quaternions = euler_to_quaternions(_as_rows(rotations, count, "rotations"))
+        instancer.CreateOrientationsAttr(Vt.QuathArray.FromNumpy(quaternions.astype(np.float16)))
+    if scales is not None:
+        instancer.CreateScalesAttr(
+            Vt.Vec3fArray.FromNumpy(
+                _as_rows(scales, count, "scales").astype(np.float32)
+            )
+        )
+    if colors is not None and np.asarray(colors).ndim == 2:
+        # 逐實例顏色
+        primvar = UsdGeom.PrimvarsAPI(instancer).CreatePrimvar(
+            "displayColor", Sdf.ValueTypeNames.Color3fArray, UsdGeom.Tokens.varying
+        )
+        primvar.Set(
+            Vt.Vec3fArray.FromNumpy(
+                _as_rows(colors, count, "colors").astype(np.float32)
+            )
+        )
+    return path
+
+
+def scatter(
+    path: str,
+    count: int,
+    prim_type: str = "Cube",
+    positions=None,
+    rotations=None,
+    scales=None,
+    colors=None,
+    threshold: Optional[int] = None,
+    stage=None,
+) -> str:
+    """放置 count 個相同物件：少量時逐一定義，達到門檻時改用 PointInstancer"""
+    threshold = INSTANCER_THRESHOLD if threshold is None else threshold
+    positions = random_positions(count) if positions is None else positions
+    if count >= threshold:
+        return define_point_instancer(
+            path,
+            positions,
+            prototypes=(prim_type,),
+            rotations=rotations,
+            scales=scales,
+            colors=colors,
+            stage=stage,
+        )
+    define_prims(
+        numbered_paths(path, prim_type, count),
+        prim_type=prim_type,
+        translations=positions,
+        rotations=rotations,
+        scales=scales,
+        colors=colors,
+        stage=stage,
+    )
+    return path
+
+
+def numbered_paths(parent: str, name: str, count: int) -> List[str]:
+    """/World/Cubes、Cube、3 -> ['/World/Cubes/Cube_0', ...]"""
+    parent = parent.rstrip("/")
+    return [f"{parent}/{name}_{index}" for index in range(count)]
+
+
+def random_positions(count: int, extent: float = 50.0, seed: Optional[int] = None,
+                     flat: bool = False) -> np.ndarray:
+    """在 [-extent, extent] 範圍內的隨機位置；flat 時 y 固定為 0"""
+    positions = np.random.default_rng(seed).uniform(-extent, extent, size=(count, 3))
+    if flat:
+        positions[:, 1] = 0.0
+    return positions
+
+
+def grid_positions(count: int, spacing: float = 2.0) -> np.ndarray:
+    """在 XZ 平面上排成近似正方形的網格"""
+    columns = int(np.ceil(np.sqrt(count))) or 1
+    index = np.arange(count)
+    positions = np.zeros((count, 3))
+    positions[:, 0] = (index % columns) * spacing
+    positions[:, 2] = (index // columns) * spacing
+    return positions
+
+
+def random_colors(count: int, seed: Optional[int] = None) -> np.ndarray:
+    return np.random.default_rng(seed).uniform(0.0, 1.0, size=(count, 3))